@@ -5,6 +5,8 @@ Created on Feb 12, 2019
 
 @author: Frank Feuerbacher
 """
+from diagnostics.startup_trace import StartupTrace
+StartupTrace.install('backend')
 
 from common.python_debugger import PythonDebugger
 from common.critical_settings import CriticalSettings
@@ -106,14 +108,16 @@ class MainThreadLoop:
     @classmethod
     def start_back_end_bridge(cls) -> None:
         module_logger.debug(f'starting BackendBridge')
-        from backend.back_end_bridge import BackendBridge
-        from discovery.playable_trailer_service import PlayableTrailerService
-        BackendBridge(PlayableTrailerService())
+        with StartupTrace.stage('BackendBridge'):
+            from backend.back_end_bridge import BackendBridge
+            from discovery.playable_trailer_service import PlayableTrailerService
+            BackendBridge(PlayableTrailerService())
 
     @classmethod
     def start_backend_worker_thread(cls) -> None:
         try:
-            import backend_service_worker
+            with StartupTrace.stage('backend_service_worker.import'):
+                import backend_service_worker
             thread = threading.Thread(
                 target=backend_service_worker.startup_non_main_thread,
                 name='back_end_service.startup_non_main_thread',
@@ -12,6 +12,7 @@ from common.garbage_collector import GarbageCollector
 from common.imports import *
 from common.logger import LazyLogger
 from common.monitor import Monitor
+from common.settings import Settings
 from backend.movie_stats import LibraryMovieStats
 from discovery.base_discover_movies import BaseDiscoverMovies
 from discovery.discover_library_movies import DiscoverLibraryMovies
@@ -146,7 +147,8 @@ class DiscoveryManager:
             Monitor.throw_exception_if_abort_requested(timeout=1.0)
             Monitor.set_startup_complete()
             Monitor.register_settings_changed_listener(cls.load_trailers,
-                                                       'DiscoveryManager.load_trailers')
+                                                       'DiscoveryManager.load_trailers',
+                                                       settings=Settings.DISCOVERY_SETTINGS)
             cls._initialized = True
 
     @classmethod
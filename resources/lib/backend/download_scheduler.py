@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Limits how many youtube-dl transfers (trailer downloads and video
+information) run at once against each remote site.
+
+The limit of each site adapts in the manner of TCP congestion control
+(additive increase, multiplicative decrease): every healthy transfer
+raises it by ADDITIVE_INCREASE / limit, so it grows by about
+ADDITIVE_INCREASE per round of transfers. A TOO_MANY_REQUESTS (429)
+response, or a download slower than THROTTLED_BYTES_PER_SECOND, halves it.
+Complaints about transfers which started before the last decrease are
+already answered by it, and are ignored.
+
+The learned limits are persisted, so that the next run starts where this
+one left off. The download throughput of each movie source is kept for
+reporting.
+"""
+from pathlib import Path
+
+import io
+import os
+import sys
+import threading
+import time
+
+import simplejson as json
+from simplejson import JSONDecodeError
+
+from common.constants import Constants
+from common.disk_utils import DiskUtils
+from common.exceptions import AbortException
+from common.imports import *
+from common.logger import LazyLogger
+from common.monitor import Monitor
+from common.movie_constants import MovieField
+from common.settings import Settings
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+
+class DownloadScheduler:
+    """
+    Process wide. Thread safe.
+    """
+    YOUTUBE_SITE: Final[str] = 'YouTube'
+    ITUNES_SITE: Final[str] = 'iTunes'
+
+    MINIMUM_SLOTS: Final[float] = 1.0
+    MAXIMUM_SLOTS: Final[float] = 4.0
+    ADDITIVE_INCREASE: Final[float] = 0.25
+    MULTIPLICATIVE_DECREASE: Final[float] = 0.5
+
+    # Downloads smaller than THROTTLE_CHECK_BYTES are dominated by
+    # connection setup and say nothing about throttling
+
+    THROTTLED_BYTES_PER_SECOND: Final[int] = 64 * 1024
+    THROTTLE_CHECK_BYTES: Final[int] = 1024 * 1024
+
+    # Weight of the newest download in the moving average of throughput
+
+    THROUGHPUT_WEIGHT: Final[float] = 0.25
+
+    _logger: LazyLogger = None
+    _condition: threading.Condition = threading.Condition()
+    _limits_path: Path = None
+    _limits_loaded: bool = False
+
+    # site -> slot limit, slots in use and time of last decrease
+
+    _limits: Dict[str, float] = {}
+    _in_use: Dict[str, int] = {}
+    _last_decrease: Dict[str, float] = {}
+
+    # movie source -> downloads, bytes, seconds spent downloading and moving
+    # average of bytes per second
+
+    _downloads: Dict[str, int] = {}
+    _bytes: Dict[str, int] = {}
+    _seconds: Dict[str, float] = {}
+    _throughput: Dict[str, float] = {}
+
+    @classmethod
+    def class_init(cls) -> None:
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+        cls._limits_path = Path(os.path.join(Settings.get_remote_db_cache_path(),
+                                             'index', 'download_limits.json'))
+
+    @classmethod
+    def get_site(cls, source: str) -> str:
+        """
+        :param source: Movie source
+        :return: The remote site which youtube-dl uses for the source
+        """
+        if source == MovieField.ITUNES_SOURCE:
+            return cls.ITUNES_SITE
+        return cls.YOUTUBE_SITE
+
+    @classmethod
+    def get_limit(cls, source: str) -> float:
+        """
+        :param source: Movie source
+        :return: Current (fractional) slot limit of the source's site
+        """
+        with cls._condition:
+            cls._load_limits_if_needed()
+            return cls._limits.get(cls.get_site(source), cls.MINIMUM_SLOTS)
+
+    @classmethod
+    def acquire(cls, source: str) -> float:
+        """
+        Waits for a free slot on the source's site. Every acquire must be
+        matched by a release.
+
+        :param source: Movie source
+        :return: Time the slot was acquired, to pass to release
+        """
+        site: str = cls.get_site(source)
+        with cls._condition:
+            cls._load_limits_if_needed()
+            while (cls._in_use.get(site, 0)
+                   >= int(cls._limits.get(site, cls.MINIMUM_SLOTS))):
+                cls._condition.wait(timeout=0.5)
+                Monitor.throw_exception_if_abort_requested()
+            cls._in_use[site] = cls._in_use.get(site, 0) + 1
+            return time.time()
+
+    @classmethod
+    def release(cls, source: str, acquired: float, rc: Optional[int],
+                seconds: float = 0.0, size: int = 0) -> bool:
+        """
+        Frees the slot and adapts the site's limit to the outcome
+
+        :param source: Movie source
+        :param acquired: Returned by acquire
+        :param rc: VideoDownloader error code, 0 on success. None when
+                   nothing was requested from the site
+        :param seconds: Time spent transferring
+        :param size: Bytes downloaded, 0 when nothing was downloaded
+        :return: True when a TOO_MANY_REQUESTS was answered by reducing
+                 concurrency, False when the site must be left alone
+                 (already at MINIMUM_SLOTS)
+        """
+        site: str = cls.get_site(source)
+        throttled: bool = (rc == 0 and size >= cls.THROTTLE_CHECK_BYTES
+                           and seconds > 0.0
+                           and size / seconds < cls.THROTTLED_BYTES_PER_SECOND)
+        congested: bool = rc == Constants.HTTP_TOO_MANY_REQUESTS or throttled
+        backed_off: bool = False
+        with cls._condition:
+            cls._in_use[site] = max(cls._in_use.get(site, 0) - 1, 0)
+            limit: float = cls._limits.get(site, cls.MINIMUM_SLOTS)
+            new_limit: float = limit
+            if congested:
+                if acquired < cls._last_decrease.get(site, 0.0):
+                    backed_off = True
+                elif limit > cls.MINIMUM_SLOTS:
+                    new_limit = max(limit * cls.MULTIPLICATIVE_DECREASE,
+                                    cls.MINIMUM_SLOTS)
+                    cls._last_decrease[site] = time.time()
+                    backed_off = True
+            elif rc == 0:
+                new_limit = min(limit + cls.ADDITIVE_INCREASE / limit,
+                                cls.MAXIMUM_SLOTS)
+            cls._limits[site] = new_limit
+            cls._condition.notify_all()
+
+            if size > 0 and seconds > 0.0:
+                cls._downloads[source] = cls._downloads.get(source, 0) + 1
+                cls._bytes[source] = cls._bytes.get(source, 0) + size
+                cls._seconds[source] = cls._seconds.get(source, 0.0) + seconds
+                rate: float = size / seconds
+                average: float = cls._throughput.get(source)
+                if average is None:
+                    average = rate
+                else:
+                    average += cls.THROUGHPUT_WEIGHT * (rate - average)
+                cls._throughput[source] = average
+
+        if int(new_limit) != int(limit):
+            if cls._logger.isEnabledFor(LazyLogger.DEBUG):
+                cls._logger.debug(f'{site} concurrent transfers: {int(limit)} -> '
+                                  f'{int(new_limit)} throttled: {throttled}')
+            cls.save_limits()
+        return backed_off
+
+    @classmethod
+    def get_throughput(cls, source: str) -> float:
+        """
+        :param source: Movie source
+        :return: Moving average of the source's download speed, bytes per
+                 second. 0.0 before anything is downloaded
+        """
+        return cls._throughput.get(source, 0.0)
+
+    @classmethod
+    def get_report(cls) -> Dict[str, Any]:
+        """
+        :return: Slot limits of every site and download totals of every
+                 movie source
+        """
+        with cls._condition:
+            cls._load_limits_if_needed()
+            report: Dict[str, Any] = {
+                'limits': dict(cls._limits),
+                'in_use': dict(cls._in_use),
+                'sources': {source: {'downloads': cls._downloads[source],
+                                     'bytes': cls._bytes[source],
+                                     'seconds': cls._seconds[source],
+                                     'bytes_per_second': cls._throughput[source]}
+                            for source in cls._downloads}}
+        return report
+
+    @classmethod
+    def save_limits(cls) -> None:
+        """
+        Persists the slot limits
+
+        :return:
+        """
+        try:
+            with cls._condition:
+                limits: Dict[str, float] = dict(cls._limits)
+
+            parent_dir, file_name = os.path.split(cls._limits_path)
+            DiskUtils.create_path_if_needed(parent_dir)
+            tmp_path: str = str(cls._limits_path) + '.tmp'
+            with io.open(tmp_path, mode='wt', newline=None,
+                         encoding='utf-8') as limits_file:
+                limits_file.write(json.dumps(limits))
+            os.replace(tmp_path, cls._limits_path)
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception:
+            cls._logger.exception(f'path: {cls._limits_path}')
+
+    @classmethod
+    def _load_limits_if_needed(cls) -> None:
+        """
+        Reads the persisted slot limits, once. Must hold _condition.
+        """
+        if cls._limits_loaded:
+            return
+
+        cls._limits_loaded = True
+        try:
+            if not os.path.exists(cls._limits_path):
+                return
+
+            with io.open(cls._limits_path, mode='rt', newline=None,
+                         encoding='utf-8') as limits_file:
+                limits: Dict[str, float] = json.load(limits_file)
+            for site, limit in limits.items():
+                cls._limits[site] = min(max(float(limit), cls.MINIMUM_SLOTS),
+                                        cls.MAXIMUM_SLOTS)
+        except AbortException:
+            reraise(*sys.exc_info())
+        except (JSONDecodeError, ValueError, TypeError, AttributeError):
+            cls._logger.exception(f'Discarding corrupt download limits: '
+                                  f'{cls._limits_path}')
+        except Exception:
+            cls._logger.exception(f'path: {cls._limits_path}')
+
+
+DownloadScheduler.class_init()
@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Keeps partially downloaded trailers, so that an interrupted download
+(Kodi shutdown, the box sleeping, a TOO_MANY_REQUESTS) resumes where it
+stopped instead of starting over.
+
+VideoDownloader.get_video downloads into a staging folder (STAGING_FOLDER)
+next to where the trailer used to be downloaded, with youtube-dl's
+continuedl option: youtube-dl leaves an incomplete download in a '.part'
+file and, on the next attempt, asks the site for only the remaining bytes
+(an HTTP range request). Each movie being downloaded has a small json
+manifest, naming the url the partial download belongs to, the format
+youtube-dl chose for it and when it was last attempted.
+
+The format (format_id) is part of the downloaded file's name, so bytes of
+one format are never resumed as another's. The next attempt asks for the
+recorded format first, so a partial download is continued even though the
+format TrailerFormatPolicy would choose has since changed (with the
+measured throughput, say).
+
+Partial downloads are discarded when the url changes, after
+MAXIMUM_ATTEMPTS attempts, on a permanent error, or when they have not been
+attempted for STALE_DAYS (reclaim). Partial downloads of other formats are
+discarded once the trailer is downloaded. Reclaiming only lists the
+staging folder, it never walks the trailer cache.
+"""
+import glob
+import io
+import os
+import sys
+import threading
+import time
+
+import simplejson as json
+from simplejson import JSONDecodeError
+
+from common.constants import Constants
+from common.disk_utils import DiskUtils
+from common.exceptions import AbortException
+from common.imports import *
+from common.logger import LazyLogger
+from common.monitor import Monitor
+from diagnostics.statistics import Statistics
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+
+class DownloadStaging:
+    """
+    Process wide. Thread safe.
+    """
+    STAGING_FOLDER: Final[str] = Constants.DOWNLOAD_STAGING_FOLDER
+    MANIFEST_SUFFIX: Final[str] = '.manifest.json'
+
+    # Suffixes youtube-dl gives files of incomplete downloads
+
+    PARTIAL_SUFFIXES: Final[Tuple[str, ...]] = ('.part', '.ytdl')
+    MAXIMUM_ATTEMPTS: Final[int] = 5
+    STALE_DAYS: Final[int] = 3
+    SECONDS_PER_DAY: Final[int] = 24 * 60 * 60
+
+    _logger: LazyLogger = None
+    _lock: threading.RLock = threading.RLock()
+
+    @classmethod
+    def class_init(cls) -> None:
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+    @classmethod
+    def get_staging_folder(cls, folder: str) -> str:
+        """
+        :param folder: Folder trailers are downloaded to
+        :return: Staging folder within it, created if needed
+        """
+        staging_folder: str = os.path.join(folder, cls.STAGING_FOLDER)
+        DiskUtils.create_path_if_needed(staging_folder)
+        return staging_folder
+
+    @staticmethod
+    def get_file_prefix(movie_id: Union[int, str]) -> str:
+        """
+        :param movie_id:
+        :return: Start of the name of every file downloaded for the movie
+        """
+        return f'_rt_{movie_id}_'
+
+    @classmethod
+    def get_format_prefix(cls, movie_id: Union[int, str], format_id: str) -> str:
+        """
+        :param movie_id:
+        :param format_id: youtube-dl's id of the downloaded format
+        :return: Start of the name of every file downloaded for the movie
+                 in the format
+        """
+        return f'{cls.get_file_prefix(movie_id)}f{format_id}_'
+
+    @classmethod
+    def get_output_template(cls, staging_folder: str,
+                            movie_id: Union[int, str]) -> str:
+        """
+        :param staging_folder:
+        :param movie_id:
+        :return: youtube-dl's outtmpl option for the movie's trailer. The
+                 embedded % fields are for youtube-dl to fill in
+        """
+        return os.path.join(staging_folder,
+                            f'{cls.get_format_prefix(movie_id, "%(format_id)s")}'
+                            f'%(title)s.%(ext)s')
+
+    @classmethod
+    def get_manifest_path(cls, staging_folder: str,
+                          movie_id: Union[int, str]) -> str:
+        return os.path.join(staging_folder, f'{movie_id}{cls.MANIFEST_SUFFIX}')
+
+    @classmethod
+    def is_partial(cls, path: str) -> bool:
+        """
+        :param path:
+        :return: True when the path is an incomplete youtube-dl download
+        """
+        return path.endswith(cls.PARTIAL_SUFFIXES)
+
+    @classmethod
+    def get_files(cls, staging_folder: str,
+                  movie_id: Union[int, str]) -> List[str]:
+        """
+        :param staging_folder:
+        :param movie_id:
+        :return: Every file, complete or not, downloaded for the movie
+        """
+        pattern: str = os.path.join(staging_folder,
+                                    f'{glob.escape(cls.get_file_prefix(movie_id))}*')
+        return glob.glob(pattern)
+
+    @classmethod
+    def get_downloaded_file(cls, staging_folder: str,
+                            movie_id: Union[int, str]) -> Optional[str]:
+        """
+        :param staging_folder:
+        :param movie_id:
+        :return: The movie's completely downloaded trailer, if any
+        """
+        for path in cls.get_files(staging_folder, movie_id):
+            if not cls.is_partial(path):
+                return path
+        return None
+
+    @classmethod
+    def get_staged_bytes(cls, staging_folder: str, movie_id: Union[int, str],
+                         format_id: Optional[str] = None) -> int:
+        """
+        :param staging_folder:
+        :param movie_id:
+        :param format_id: Only count the bytes of this format, if any
+        :return: Bytes of the movie's trailer already downloaded
+        """
+        prefix: str = ''
+        if format_id is not None:
+            prefix = cls.get_format_prefix(movie_id, format_id)
+        staged_bytes: int = 0
+        for path in cls.get_files(staging_folder, movie_id):
+            if (path.endswith('.ytdl')
+                    or not os.path.basename(path).startswith(prefix)):
+                continue
+            try:
+                staged_bytes += os.path.getsize(path)
+            except OSError:
+                pass  # Removed by youtube-dl
+        return staged_bytes
+
+    @classmethod
+    def begin(cls, staging_folder: str, movie_id: Union[int, str],
+              url: str) -> int:
+        """
+        Records an attempt to download the movie's trailer. Partial downloads
+        of a different url, or which failed too often, are discarded.
+
+        :param staging_folder:
+        :param movie_id:
+        :param url: To download from
+        :return: Bytes which will not be downloaded again, when the format
+                 of the partial download (get_format_id) is downloaded
+        """
+        manifest_path: str = cls.get_manifest_path(staging_folder, movie_id)
+        with cls._lock:
+            manifest: Dict[str, Any] = cls._read_manifest(manifest_path)
+            if (manifest.get('url') != url
+                    or manifest.get('attempts', 0) >= cls.MAXIMUM_ATTEMPTS):
+                if len(manifest) > 0 and cls._logger.isEnabledFor(LazyLogger.DEBUG):
+                    cls._logger.debug(f'Restarting download of {movie_id} '
+                                      f'attempts: {manifest.get("attempts", 0)}')
+                cls._remove_files(cls.get_files(staging_folder, movie_id))
+                manifest = {'url': url,
+                            'movie_id': str(movie_id),
+                            'started': time.time(),
+                            'attempts': 0}
+
+            manifest['attempts'] += 1
+            manifest['updated'] = time.time()
+            cls._write_manifest(manifest_path, manifest)
+
+        return cls.get_staged_bytes(staging_folder, movie_id,
+                                    manifest.get('format_id'))
+
+    @classmethod
+    def get_format_id(cls, staging_folder: str,
+                      movie_id: Union[int, str]) -> Optional[str]:
+        """
+        :param staging_folder:
+        :param movie_id:
+        :return: youtube-dl's id of the format of the partial download,
+                 None when unknown
+        """
+        with cls._lock:
+            return cls._read_manifest(
+                cls.get_manifest_path(staging_folder, movie_id)).get('format_id')
+
+    @classmethod
+    def set_format_id(cls, staging_folder: str, movie_id: Union[int, str],
+                      format_id: Optional[str]) -> None:
+        """
+        Records the format youtube-dl chose for the movie's trailer, to be
+        asked for when the download is resumed
+
+        :param staging_folder:
+        :param movie_id:
+        :param format_id: youtube-dl's id of the format
+        :return:
+        """
+        if format_id is None:
+            return
+
+        manifest_path: str = cls.get_manifest_path(staging_folder, movie_id)
+        with cls._lock:
+            manifest: Dict[str, Any] = cls._read_manifest(manifest_path)
+            if len(manifest) == 0 or manifest.get('format_id') == format_id:
+                return
+            manifest['format_id'] = str(format_id)
+            cls._write_manifest(manifest_path, manifest)
+
+    @classmethod
+    def finish(cls, staging_folder: str, movie_id: Union[int, str],
+               resumed_bytes: int) -> None:
+        """
+        Records that the movie's trailer is completely downloaded. The
+        caller moves it out of the staging folder. Partial downloads of
+        other formats are discarded.
+
+        :param staging_folder:
+        :param movie_id:
+        :param resumed_bytes: Returned by begin
+        :return:
+        """
+        with cls._lock:
+            cls._remove_files([path for path in cls.get_files(staging_folder, movie_id)
+                               if cls.is_partial(path)]
+                              + [cls.get_manifest_path(staging_folder, movie_id)])
+        if resumed_bytes > 0:
+            Statistics.add_resumed_download(resumed_bytes)
+            if cls._logger.isEnabledFor(LazyLogger.DEBUG):
+                cls._logger.debug(f'Resumed download of {movie_id} saved '
+                                  f'{DiskUtils.sizeof_fmt(resumed_bytes)}')
+
+    @classmethod
+    def discard(cls, staging_folder: str, movie_id: Union[int, str]) -> None:
+        """
+        Removes everything downloaded for the movie, after a permanent
+        failure.
+
+        :param staging_folder:
+        :param movie_id:
+        :return:
+        """
+        with cls._lock:
+            cls._remove_files(cls.get_files(staging_folder, movie_id)
+                              + [cls.get_manifest_path(staging_folder, movie_id)])
+
+    @classmethod
+    def reclaim(cls, folder: str, now: float = None) -> int:
+        """
+        Removes the partial downloads not attempted for STALE_DAYS, as well
+        as files left without a manifest for as long (a downloaded trailer
+        which was not moved to the cache, for example).
+
+        :param folder: Folder trailers are downloaded to
+        :param now: time.time()
+        :return: Bytes reclaimed
+        """
+        if now is None:
+            now = time.time()
+        oldest: float = now - cls.STALE_DAYS * cls.SECONDS_PER_DAY
+        staging_folder: str = os.path.join(folder, cls.STAGING_FOLDER)
+        if not os.path.isdir(staging_folder):
+            return 0
+
+        reclaimed_files: int = 0
+        reclaimed_bytes: int = 0
+        try:
+            with cls._lock:
+                # name -> (size, time modified) of every file
+
+                files: Dict[str, Tuple[int, float]] = {}
+                with os.scandir(staging_folder) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            st: os.stat_result = entry.stat()
+                            files[entry.name] = (st.st_size, st.st_mtime)
+
+                active: Set[str] = set()
+                for name, (size, modified) in files.items():
+                    if not name.endswith(cls.MANIFEST_SUFFIX):
+                        continue
+                    manifest: Dict[str, Any] = cls._read_manifest(
+                        os.path.join(staging_folder, name))
+                    if manifest.get('updated', modified) >= oldest:
+                        active.add(cls.get_file_prefix(name[:-len(cls.MANIFEST_SUFFIX)]))
+
+                for name, (size, modified) in files.items():
+                    Monitor.throw_exception_if_abort_requested()
+                    if modified >= oldest or name.startswith(tuple(active)):
+                        continue
+                    if name.endswith(cls.MANIFEST_SUFFIX):
+                        prefix: str = cls.get_file_prefix(
+                            name[:-len(cls.MANIFEST_SUFFIX)])
+                        if prefix in active:
+                            continue
+                    cls._remove_files([os.path.join(staging_folder, name)])
+                    reclaimed_files += 1
+                    reclaimed_bytes += size
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception:
+            cls._logger.exception(f'folder: {staging_folder}')
+
+        if reclaimed_files > 0:
+            Statistics.add_reclaimed_partial_downloads(reclaimed_files,
+                                                      reclaimed_bytes)
+            if cls._logger.isEnabledFor(LazyLogger.DEBUG):
+                cls._logger.debug(f'Reclaimed {reclaimed_files} stale downloads '
+                                  f'{DiskUtils.sizeof_fmt(reclaimed_bytes)}')
+        return reclaimed_bytes
+
+    @classmethod
+    def _read_manifest(cls, manifest_path: str) -> Dict[str, Any]:
+        """
+        :param manifest_path:
+        :return: The manifest, empty when missing or corrupt
+        """
+        try:
+            if os.path.exists(manifest_path):
+                with io.open(manifest_path, mode='rt', newline=None,
+                             encoding='utf-8') as manifest_file:
+                    manifest: Dict[str, Any] = json.load(manifest_file)
+                if isinstance(manifest, dict):
+                    return manifest
+        except AbortException:
+            reraise(*sys.exc_info())
+        except (JSONDecodeError, ValueError, OSError):
+            cls._logger.exception(f'Discarding corrupt manifest: {manifest_path}')
+        return {}
+
+    @classmethod
+    def _write_manifest(cls, manifest_path: str,
+                        manifest: Dict[str, Any]) -> None:
+        try:
+            tmp_path: str = manifest_path + '.tmp'
+            with io.open(tmp_path, mode='wt', newline=None,
+                         encoding='utf-8') as manifest_file:
+                manifest_file.write(json.dumps(manifest))
+            os.replace(tmp_path, manifest_path)
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception:
+            cls._logger.exception(f'path: {manifest_path}')
+
+    @classmethod
+    def _remove_files(cls, paths: List[str]) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                cls._logger.exception(f'path: {path}')
+
+
+DownloadStaging.class_init()
@@ -18,6 +18,7 @@ from common.imports import *
 from common.exceptions import AbortException
 from common.logger import LazyLogger
 from common.monitor import Monitor
+from diagnostics.spans import Spans
 from common.settings import Settings
 
 module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
@@ -34,6 +35,7 @@ module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file_
 '''
 
 
+@Spans.timed('ffmpeg.normalize')
 def normalize(in_file: str, out_file: str, use_compand: bool = False) -> int:
     """
     Normalize the audio of the given video file.
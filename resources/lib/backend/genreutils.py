@@ -9,11 +9,11 @@ import os
 import sys
 import threading
 from contextlib import closing
-import xmltodict
 import xbmcvfs
 
 from common.exceptions import AbortException
 from common.constants import Constants, GenreEnum
+from common.definition_bundle import DefinitionBundle
 from common.imports import *
 from common.logger import LazyLogger
 from common.messages import Messages
@@ -285,6 +285,17 @@ class LoadGenreDefinitions:
             try:
                 path = os.path.join(Constants.ADDON_PATH,
                                     'resources', 'genres')
+                key: str = DefinitionBundle.get_key(path)
+                source_map: Dict[str, Dict[str, _BaseGenreEntry]] = \
+                    DefinitionBundle.load('genres', key)
+                if source_map is not None:
+                    Genres._source_map.update(source_map)
+                    return
+
+                # Slow to import, see LoadCertificationDefinitions
+
+                import xmltodict
+
                 for file in os.listdir(path):
                     xml_file = os.path.join(path, file)
                     if (file.endswith('.xml') and
@@ -299,6 +310,9 @@ class LoadGenreDefinitions:
                         except Exception as e:
                             cls._logger.exception('Failed to parse {}'
                                                   .format(file))
+
+                if len(Genres._source_map) > 0:
+                    DefinitionBundle.save('genres', key, Genres._source_map)
             except AbortException:
                 reraise(*sys.exc_info())
             except Exception as e:
@@ -647,7 +661,8 @@ class GenreUtils:
         if cls._logger is None:
             cls._logger = module_logger.getChild(cls.__name__)
             Monitor.register_settings_changed_listener(cls.on_settings_changed,
-                                                       'GenreUtils.on_settings_changed')
+                                                       'GenreUtils.on_settings_changed',
+                                                       settings=Settings.GENRE_SETTINGS)
 
     @classmethod
     def on_settings_changed(cls) -> None:
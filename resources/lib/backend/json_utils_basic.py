@@ -12,12 +12,9 @@ from email.utils import parsedate_tz
 from enum import Enum, auto
 
 from common.debug_utils import Debug
-from requests import Response
 
 import simplejson as json
 import random
-import requests
-from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
 
 import threading
 import calendar
@@ -32,6 +29,7 @@ from common.logger import LazyLogger, Trace
 from common.exceptions import AbortException
 from common.messages import Messages
 from common.monitor import Monitor
+from diagnostics.spans import Spans
 from backend import backend_constants
 
 module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
@@ -654,6 +652,7 @@ class JsonUtilsBasic:
                 destination]
 
     @classmethod
+    @Spans.timed('json.get_json')
     def get_json(cls, url: str,
                  second_attempt: bool = False,
                  dump_results: bool = False,
@@ -682,6 +681,12 @@ class JsonUtilsBasic:
         :return:
         """
 
+        # requests, with urllib3 and certifi, is the slowest import on the
+        # backend's startup path. Import it with the first request.
+
+        import requests
+        from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
+
         result: Result
         result = Result(rc=JsonReturnCode.UNKNOWN_ERROR, status=-1,
                         msg='Result not returned', data=None)
@@ -1012,7 +1017,8 @@ class JsonUtilsBasic:
         return movie_results
 
     @classmethod
-    def response_checker(cls, response: Response, msg: str = '',
+    def response_checker(cls, response: ForwardRef('requests.Response'),
+                         msg: str = '',
                          url: str = '') -> JsonReturnCode:
         '''
 
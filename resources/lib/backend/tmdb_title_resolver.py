@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Resolves a movie title and year to a TMDb id without asking TMDb.
+
+Every movie with a TMDb id whose title is recorded in the MovieCatalog
+(TMDb discovery pages, TMDb search results, fully discovered movies from
+any source) is found by an exact lookup of its normalized title and year
+(MovieCatalog.find_tmdb_id), using the catalog's (title_key, year) index.
+Case, accents and punctuation are ignored, but every word must agree:
+"Halloween II" is not "Halloween III" and "Thing" is not "The Thing".
+Without a year, the title must identify a single movie whose runtime
+agrees. Otherwise the caller falls back to searching TMDb, whose results
+are recorded in the catalog and so are found here the next time.
+"""
+import sys
+import time
+
+from cache.movie_catalog import MovieCatalog
+from common.exceptions import AbortException
+from common.imports import *
+from common.logger import LazyLogger
+from diagnostics.spans import Spans
+from diagnostics.statistics import Statistics
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+
+class TMDbTitleResolver:
+    """
+    Process wide. Thread safe (through MovieCatalog).
+    """
+    _logger: LazyLogger = None
+
+    @classmethod
+    def class_init(cls) -> None:
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+    @classmethod
+    def resolve(cls, title: str, year: Union[int, str, None] = None,
+                runtime_seconds: int = 0) -> Optional[int]:
+        """
+        :param title:
+        :param year: Release year, or None (or 0) when unknown
+        :param runtime_seconds: 0 when unknown
+        :return: TMDb id of the movie with this title, otherwise None and
+                 TMDb must be searched
+        """
+        start: float = time.perf_counter()
+        tmdb_id: Optional[int] = None
+        try:
+            try:
+                year = int(year) or None
+            except (TypeError, ValueError):
+                year = None
+            try:
+                runtime_seconds = int(runtime_seconds)
+            except (TypeError, ValueError):
+                runtime_seconds = 0
+
+            tmdb_id = MovieCatalog.find_tmdb_id(title=title, year=year,
+                                                runtime_seconds=runtime_seconds)
+            if tmdb_id is not None:
+                Statistics.add_tmdb_title_resolver_hit()
+            else:
+                Statistics.add_tmdb_title_resolver_miss()
+
+            if cls._logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
+                cls._logger.debug_extra_verbose(
+                    f'title: {title} year: {year} runtime: {runtime_seconds} '
+                    f'tmdb_id: {tmdb_id}')
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception:
+            cls._logger.exception(f'title: {title} year: {year}')
+        finally:
+            Spans.record('tmdb.title_resolver.resolve',
+                         time.perf_counter() - start)
+        return tmdb_id
+
+
+TMDbTitleResolver.class_init()
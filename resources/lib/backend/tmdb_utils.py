@@ -13,7 +13,10 @@ import sys
 import simplejson
 from cache.base_reverse_index_cache import BaseReverseIndexCache
 from cache.json_cache_helper import JsonCacheHelper
+from cache.movie_catalog import MovieCatalog
 from backend.backend_constants import TMDbConstants
+from backend.tmdb_title_resolver import TMDbTitleResolver
+from cache.tmdb_search_cache import TMDbSearchCache
 
 from common.imports import *
 
@@ -153,6 +156,7 @@ class TMDBMatcher:
         self._year_to_match: Union[str, None] = year
         self._runtime_seconds_to_match: int = runtime_seconds
         self.candidate_movies: List[clz.CandidateMovie] = []
+        self._searched: bool = False
 
         data = {
             'api_key': Settings.get_tmdb_api_key(),
@@ -263,6 +267,14 @@ class TMDBMatcher:
                     self._add(movie, tmdb_title, tmdb_year,
                               tmdb_language, tmdb_id, runtime_seconds)
 
+                # Let TMDbTitleResolver find these without searching again
+
+                MovieCatalog.add_tmdb_titles(
+                    (movie.get('id'), movie.get('title'),
+                     (movie.get('release_date') or '')[:4], None)
+                    for movie in results)
+                self._searched = True
+
         except AbortException:
             reraise(*sys.exc_info())
 
@@ -286,6 +298,12 @@ class TMDBMatcher:
                         self._year_to_match,
                         runtime_seconds=self._runtime_seconds_to_match)
 
+    def is_searched(self) -> bool:
+        """
+        :return: True if TMDb answered the search, even if nothing was found
+        """
+        return self._searched
+
     def get_best_score(self) -> (Union[MovieType, None], int):
         clz = type(self)
 
@@ -507,6 +525,7 @@ class TMDBUtils:
                     # cls._logger.debug(f'tmdb_id: {tmdb_id} kodi_id: {kodi_id}')
                     if tmdb_id is not None:
                         cls._library_json_cache.add_item(str(kodi_id), str(tmdb_id))
+                        MovieCatalog.update_details(movie)
 
     @classmethod
     def get_kodi_id_for_tmdb_id(cls, tmdb_id: int) -> int:
@@ -537,6 +556,9 @@ class TMDBUtils:
     def get_tmdb_id_from_title_year(title: str, year: Union[int, str],
                                     runtime_seconds: int = 0) -> int:
         """
+        Searches made recently are answered by TMDbSearchCache and titles
+        already known locally are resolved by TMDbTitleResolver. TMDb is
+        only searched when neither knows.
 
         :param title:
         :param year:
@@ -547,15 +569,35 @@ class TMDBUtils:
         try:
             if year is not None:
                 year = int(year)
-            tmdb_id = TMDBUtils._get_tmdb_id_from_title_year(title, year,
-                                                             runtime_seconds=
-                                                             runtime_seconds)
+            cached: bool
+            cached, tmdb_id = TMDbSearchCache.lookup(title, year,
+                                                     runtime_seconds)
+            if tmdb_id is not None:
+                return tmdb_id
+
+            # The title may have been discovered since TMDb last found nothing
+
+            tmdb_id = TMDbTitleResolver.resolve(title, year,
+                                                runtime_seconds=runtime_seconds)
+            if tmdb_id is not None or cached:
+                return tmdb_id
+
+            searched: bool
+            tmdb_id, searched = TMDBUtils._get_tmdb_id_from_title_year(
+                title, year, runtime_seconds=runtime_seconds)
             if tmdb_id is None and year is not None:
-                tmdb_id = TMDBUtils._get_tmdb_id_from_title_year(
+                tmdb_id, searched_next = TMDBUtils._get_tmdb_id_from_title_year(
                     title, year + 1, runtime_seconds=runtime_seconds)
+                searched = searched and searched_next
             if tmdb_id is None and year is not None:
-                tmdb_id = TMDBUtils._get_tmdb_id_from_title_year(
+                tmdb_id, searched_previous = TMDBUtils._get_tmdb_id_from_title_year(
                     title, year - 1, runtime_seconds=runtime_seconds)
+                searched = searched and searched_previous
+
+            # Failed searches are tried again next time
+
+            if tmdb_id is not None or searched:
+                TMDbSearchCache.add(title, year, tmdb_id, runtime_seconds)
 
         except (AbortException, CommunicationException):
             reraise(*sys.exc_info())
@@ -568,23 +610,26 @@ class TMDBUtils:
 
     @staticmethod
     def _get_tmdb_id_from_title_year(title: str, year: int,
-                                     runtime_seconds: int = 0) -> Optional[int]:
+                                     runtime_seconds: int = 0
+                                     ) -> Tuple[Optional[int], bool]:
         """
             The library may not have the TMDb id's for a movie.
             See if TMDb has one.
         :param title:
         :param year:
         :param runtime_seconds:
-        :return:
+        :return: The TMDb id, or None, and whether TMDb answered the search
         """
         year_str = None
         if year is not None and year != 0:
             year_str = str(year)
 
         best_match = None
+        searched: bool = False
         try:
             matcher = TMDBMatcher(title, year_str, runtime_seconds)
             best_match, best_score = matcher.get_best_score()
+            searched = matcher.is_searched()
 
         except (AbortException, CommunicationException):
             reraise(*sys.exc_info())
@@ -596,8 +641,8 @@ class TMDBUtils:
         if best_match is not None:
             tmdb_id = best_match.get('id', None)
         if tmdb_id is None:
-            return None
-        return int(tmdb_id)
+            return None, searched
+        return int(tmdb_id), searched
 
 
 TMDBUtils.class_init()
@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Chooses which of a trailer's formats (resolutions) VideoDownloader.get_video
+downloads.
+
+Left to itself, youtube-dl downloads the best format offered, so cached
+trailers are often 1080p or larger: a few of them fill the trailer cache,
+keeping CacheManager's garbage collection busy, and each costs more to
+normalize. Instead, the smallest format which meets the quality target is
+downloaded. The target is the trailer_quality setting, lowered to the
+height of Kodi's display, since a larger trailer only gets scaled down.
+
+Each trailer should also download within DOWNLOAD_SECONDS at the source's
+measured speed (DownloadScheduler.get_throughput) and, when the number of
+cached trailers is limited, fit its share of the trailer cache (the size
+limit, or percentage of the disk, divided by that number). When the
+smallest format meeting the target is too large, the best format below the
+target that fits is chosen. The cache share never lowers the quality more
+than one step of HEIGHTS below the target, only a slow download does,
+failing all else to the smallest format.
+
+YouTube offers a single file (video and audio) of 360p at most, higher
+resolutions only as separate video and audio formats, which youtube-dl
+merges with ffmpeg. So when ffmpeg is available (FFmpegMergerPP, as
+youtube-dl decides) merged formats are preferred, single file formats
+being the fallback, for sites offering only those. youtube-dl can only
+limit the size of the video format of a merge, so its limit is lowered by
+AUDIO_BYTES, a typical trailer's audio.
+
+The size and download time of every trailer are recorded by format, and
+reported with the latency report (Spans).
+"""
+import shutil
+import sys
+import threading
+
+import xbmc
+
+import youtube_dl
+from youtube_dl.postprocessor import FFmpegMergerPP
+
+from backend.download_scheduler import DownloadScheduler
+from common.exceptions import AbortException
+from common.imports import *
+from common.logger import LazyLogger
+from common.settings import Settings
+from diagnostics.spans import Spans
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+
+class TrailerFormatPolicy:
+    """
+    Process wide. Thread safe.
+    """
+    BYTES_PER_MB: Final[int] = 1024 * 1024
+
+    # The usual video heights, steps of quality
+
+    HEIGHTS: Final[Tuple[int, ...]] = (144, 240, 360, 480, 720, 1080, 1440, 2160)
+
+    # Longest a trailer should take to download, at the measured speed
+
+    DOWNLOAD_SECONDS: Final[float] = 60.0
+
+    # Size of a trailer's audio format: about 2.5 minutes at 160 kbps
+
+    AUDIO_BYTES: Final[int] = 3 * BYTES_PER_MB
+
+    _logger: LazyLogger = None
+    _lock: threading.RLock = threading.RLock()
+
+    # Whether youtube-dl can merge formats with the ffmpeg of the ffmpeg_path
+    # setting (or on the PATH), found by is_merge_available
+
+    _merge_available: Optional[bool] = None
+    _merge_ffmpeg_path: Optional[str] = None
+
+    # format (see get_format_key) -> downloads, bytes and seconds spent
+    # downloading
+
+    _downloads: Dict[str, int] = {}
+    _bytes: Dict[str, int] = {}
+    _seconds: Dict[str, float] = {}
+
+    @classmethod
+    def class_init(cls) -> None:
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+        Spans.register_report_section('trailer_formats', cls.get_report)
+
+    @classmethod
+    def get_display_height(cls) -> int:
+        """
+        :return: Lines of resolution of Kodi's display, 0 when unknown
+        """
+        try:
+            return int(xbmc.getInfoLabel('System.ScreenHeight'))
+        except ValueError:
+            return 0
+
+    @classmethod
+    def get_target_height(cls) -> int:
+        """
+        :return: Lines of resolution which downloaded trailers should have,
+                 0 for the best available
+        """
+        quality: int = Settings.get_trailer_quality()
+        display_height: int = cls.get_display_height()
+        if display_height <= 0:
+            return quality
+        if quality <= 0:
+            return display_height
+        return min(quality, display_height)
+
+    @classmethod
+    def get_floor_height(cls, target: int) -> int:
+        """
+        :param target: Height
+        :return: The step of HEIGHTS below target, 0 when there is none
+        """
+        floor: int = 0
+        for height in cls.HEIGHTS:
+            if height >= target:
+                break
+            floor = height
+        return floor
+
+    @classmethod
+    def get_cache_budget(cls) -> int:
+        """
+        :return: Bytes of the trailer cache available to each trailer, 0
+                 when the cache is not limited in size, or not in its
+                 number of trailers (the size alone does not tell how many
+                 trailers share it)
+        """
+        if (not Settings.is_use_trailer_cache()
+                or not Settings.is_limit_number_of_cached_trailers()):
+            return 0
+
+        budget: int = 0
+        if Settings.is_limit_size_of_cached_trailers():
+            budget = Settings.get_max_size_of_cached_trailers_mb() * cls.BYTES_PER_MB
+
+        if Settings.is_limit_percent_of_cached_trailers():
+            try:
+                disk_size: int = shutil.disk_usage(
+                    Settings.get_downloaded_trailer_cache_path()).total
+                percent_budget: int = int(
+                    disk_size * Settings.get_max_percent_of_cached_trailers())
+                if budget == 0 or percent_budget < budget:
+                    budget = percent_budget
+            except AbortException:
+                reraise(*sys.exc_info())
+            except Exception:
+                cls._logger.exception('')
+
+        if budget <= 0:
+            return 0
+        return budget // max(Settings.get_max_number_of_cached_trailers(), 1)
+
+    @classmethod
+    def get_download_limit(cls, source: str) -> int:
+        """
+        :param source: Movie source
+        :return: Largest trailer, in bytes, which downloads from the source
+                 within DOWNLOAD_SECONDS. 0 for no limit
+        """
+        throughput: float = DownloadScheduler.get_throughput(source)
+        download_limit: int = int(throughput * cls.DOWNLOAD_SECONDS)
+        if download_limit <= 0:
+            return 0
+
+        # Rounded down to a power of two, so that the chosen format does not
+        # change with every download
+
+        return 1 << (download_limit.bit_length() - 1)
+
+    @staticmethod
+    def get_size_filter(*limits: int, audio_bytes: int = 0) -> str:
+        """
+        :param limits: Bytes, 0 for no limit
+        :param audio_bytes: Of an audio format to be merged with the
+               format, taken from the limit
+        :return: youtube-dl format filter for the smallest limit. Formats
+                 of unknown size pass
+        """
+        limit: int = min((limit for limit in limits if limit > 0), default=0)
+        if limit == 0:
+            return ''
+        return f'[filesize<=?{max(limit - audio_bytes, 1)}]'
+
+    @classmethod
+    def is_merge_available(cls) -> bool:
+        """
+        :return: True when youtube-dl can merge a video and an audio format
+                 (ffmpeg is installed)
+        """
+        ffmpeg_path: str = Settings.get_ffmpeg_path() or ''
+        with cls._lock:
+            if (cls._merge_available is None
+                    or ffmpeg_path != cls._merge_ffmpeg_path):
+                params: Dict[str, Any] = {}
+                if len(ffmpeg_path) > 0:
+                    params['ffmpeg_location'] = ffmpeg_path
+                try:
+                    cls._merge_available = FFmpegMergerPP(
+                        youtube_dl.YoutubeDL(params)).available
+                except AbortException:
+                    reraise(*sys.exc_info())
+                except Exception:
+                    cls._logger.exception('')
+                    cls._merge_available = False
+                cls._merge_ffmpeg_path = ffmpeg_path
+            return cls._merge_available
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Forgets whether formats can be merged, it is found again on next use
+
+        :return:
+        """
+        with cls._lock:
+            cls._merge_available = None
+
+    @classmethod
+    def get_default_format(cls) -> str:
+        """
+        :return: The format selector youtube-dl uses when given none
+        """
+        if cls.is_merge_available():
+            return 'bestvideo+bestaudio/best'
+        return 'best'
+
+    @classmethod
+    def get_format(cls, source: str) -> Optional[str]:
+        """
+        :param source: Movie source
+        :return: youtube-dl format selector (the format option) for a
+                 trailer from the source. None to leave the choice to
+                 youtube-dl (best available, no limits)
+        """
+        target: int = cls.get_target_height()
+        cache_budget: int = cls.get_cache_budget()
+        download_limit: int = cls.get_download_limit(source)
+        if target <= 0 and cache_budget <= 0 and download_limit <= 0:
+            return None
+
+        def get_choices(audio_bytes: int) -> List[Tuple[str, str]]:
+            """
+            :param audio_bytes: Taken from the size limits
+            :return: (best or worst, filters) of each alternative, in order
+            """
+            size_filter: str = cls.get_size_filter(cache_budget, download_limit,
+                                                   audio_bytes=audio_bytes)
+            download_filter: str = cls.get_size_filter(download_limit,
+                                                       audio_bytes=audio_bytes)
+            choices: List[Tuple[str, str]] = []
+            if target > 0:
+                floor: int = cls.get_floor_height(target)
+                choices.append(('worst', f'[height>={target}]{size_filter}'))
+                if floor > 0:
+                    choices.append(('best', f'[height>={floor}][height<{target}]'
+                                            f'{size_filter}'))
+                    if cache_budget > 0:
+                        # Over the cache budget rather than below floor
+
+                        choices.append(('worst',
+                                        f'[height>={floor}]{download_filter}'))
+                    if download_limit > 0:
+                        choices.append(('best',
+                                        f'[height<{floor}]{download_filter}'))
+                else:
+                    choices.append(('best', f'[height<{target}]{size_filter}'))
+            else:
+                choices.append(('best', size_filter))
+            if download_limit > 0:
+                choices.append(('worst', '[height>0]'))
+            return choices
+
+        alternatives: List[str] = []
+        if cls.is_merge_available():
+            alternatives.extend(f'{choice}video{filters}+bestaudio'
+                                for choice, filters in get_choices(cls.AUDIO_BYTES))
+        alternatives.extend(f'{choice}{filters}'
+                            for choice, filters in get_choices(0))
+
+        # Formats of unknown height
+
+        alternatives.append('best')
+        return '/'.join(alternatives)
+
+    @classmethod
+    def select_height(cls, heights: Iterable[int]) -> int:
+        """
+        Chooses among formats known only by their height, such as those
+        of an iTunes feature page
+
+        :param heights: Of each format offered
+        :return: Smallest height meeting the quality target, otherwise the
+                 largest height. 0 when heights is empty
+        """
+        heights = sorted(set(heights))
+        if len(heights) == 0:
+            return 0
+
+        target: int = cls.get_target_height()
+        if target > 0:
+            for height in heights:
+                if height >= target:
+                    return height
+        return heights[-1]
+
+    @staticmethod
+    def get_format_key(info: Optional[MovieType]) -> str:
+        """
+        :param info: youtube-dl's information about a download
+        :return: Name of the downloaded format, such as '720p'
+        """
+        if info is None:
+            return 'unknown'
+        height: Optional[int] = info.get('height')
+        if isinstance(height, int) and height > 0:
+            return f'{height}p'
+        return str(info.get('format_id', 'unknown'))
+
+    @classmethod
+    def record_download(cls, info: Optional[MovieType], size: int,
+                        seconds: float) -> None:
+        """
+        Records a completed trailer download
+
+        :param info: youtube-dl's information about the download
+        :param size: Bytes of the trailer
+        :param seconds: Time spent downloading
+        :return:
+        """
+        key: str = cls.get_format_key(info)
+        with cls._lock:
+            cls._downloads[key] = cls._downloads.get(key, 0) + 1
+            cls._bytes[key] = cls._bytes.get(key, 0) + size
+            cls._seconds[key] = cls._seconds.get(key, 0.0) + seconds
+
+    @classmethod
+    def get_report(cls) -> Dict[str, Any]:
+        """
+        :return: Current target and, for each format downloaded, the
+                 average bytes per trailer and download time
+        """
+        with cls._lock:
+            formats: Dict[str, Any] = {
+                key: {'downloads': downloads,
+                      'bytes_per_trailer': cls._bytes[key] // downloads,
+                      'seconds_per_trailer': cls._seconds[key] / downloads}
+                for key, downloads in cls._downloads.items()}
+        return {'target_height': cls.get_target_height(),
+                'cache_budget': cls.get_cache_budget(),
+                'formats': formats}
+
+
+TrailerFormatPolicy.class_init()
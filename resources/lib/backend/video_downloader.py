@@ -6,22 +6,27 @@ Created on Apr 5, 2019
 import xbmc
 
 from backend.backend_constants import YOUTUBE_URL
+from backend.download_scheduler import DownloadScheduler
+from backend.download_staging import DownloadStaging
+from backend.trailer_format_policy import TrailerFormatPolicy
+from backend.youtube_dl_pool import YoutubeDLPool
 from common.debug_utils import Debug
 from common.imports import *
 
 import datetime
-import glob
 import simplejson as json
 import os
 import random
 import sys
 import threading
-
-import youtube_dl
+import time
+from collections import deque
+from typing import Deque
 
 from common.constants import Constants
 from common.logger import LazyLogger
 from common.monitor import Monitor
+from diagnostics.spans import Spans
 from common.exceptions import AbortException
 from common.movie_constants import MovieField, MovieType
 from common.certification import Certifications, WorldCertifications
@@ -59,13 +64,12 @@ LOG_ALL = False
 LOGGER_ENABLE_LEVEL = LazyLogger.DEBUG
 LOG_LOCK: bool = False
 DUMP_JSON: bool = False
-YIELD_LOCK: bool = False
 
 
 class VideoDownloader:
     """
     Downloads Videos, or video information for individual or playlists. Uses
-    embedded youtube-dl to accomplish this.
+    youtube-dl, run by YoutubeDLPool's worker processes, to accomplish this.
 
     """
     DOWNLOAD_ERROR = 10
@@ -79,6 +83,13 @@ class VideoDownloader:
     UNKNOWN_ERROR = 16
     ABORT_REQUESTED = 99
 
+    # Errors after which a partial download is useless. After any other
+    # error, the next attempt resumes it.
+
+    PERMANENT_ERRORS: Final[Tuple[int, ...]] = (BLOCKED_ERROR, UNAVAILABLE,
+                                                FORBIDDEN, NOT_FOUND, AGE_LIMIT,
+                                                PRIVATE_VIDEO)
+
     # Initialize to a year ago
     # Is an estimate of when the Too Many Requests will expire
     _too_many_requests_resume_time = datetime.datetime.now() - datetime.timedelta(365)
@@ -128,6 +139,16 @@ class VideoDownloader:
         'youtube_lock': 0
     }
 
+    # Most entries an incremental get_tfh_index fetches. Roughly ten pages
+    # of the channel, far more than are published between refreshes.
+
+    TFH_INCREMENTAL_ENTRIES: Final[int] = 300
+
+    # Entries of the TFH index passed to the handler at once, when reading
+    # the entire index
+
+    TFH_INDEX_BATCH_SIZE: Final[int] = 100
+
     def __init__(self) -> None:
         """
 
@@ -144,6 +165,7 @@ class VideoDownloader:
         self.error_lines: List[str] = []
         self._download_eta = None
         self._download_finished = False
+        self._index_requests: int = 0
 
     @staticmethod
     def get_youtube_wait_seconds() -> ClassVar[datetime.timedelta]:
@@ -224,6 +246,13 @@ class VideoDownloader:
                 # cls._logger.debug(f'Delaying {int(time_to_wait)} seconds for source: {source}')
                 Monitor.throw_exception_if_abort_requested(time_to_wait)
 
+            # Record the start of this transaction before another thread
+            # can measure its delay from the previous one
+
+            if source == MovieField.ITUNES_SOURCE:
+                cls._last_itunes_request_timestamp = datetime.datetime.now()
+            else:
+                cls._last_youtube_request_timestamp = datetime.datetime.now()
         finally:
             cls.release_lock(source)
             if LOG_LOCK:
@@ -236,32 +265,48 @@ class VideoDownloader:
 
         # LOCK RELEASED
 
-        if source == MovieField.ITUNES_SOURCE:
-            cls._last_itunes_request_timestamp = datetime.datetime.now()
-        else:
-            cls._last_youtube_request_timestamp = datetime.datetime.now()
-
     @classmethod
     def get_delay(cls, delay_range: Tuple[float, float]) -> float:
         lower = int(13 * delay_range[0])
         upper = int(13 * delay_range[1])
         return float(random.randint(lower, upper)) / 13.0
 
+    @classmethod
+    def record_too_many_requests(cls, rc: int, backed_off: bool = False) -> None:
+        """
+        Blocks further requests for a while after a TOO_MANY_REQUESTS, unless
+        DownloadScheduler answered it by reducing concurrency
+
+        :param rc: VideoDownloader error code of the request
+        :param backed_off: DownloadScheduler.release reduced concurrency
+        :return:
+        """
+        if rc != Constants.HTTP_TOO_MANY_REQUESTS:
+            cls._retry_attempts = 0
+        elif not backed_off:
+            cls._retry_attempts += 1
+            cls._too_many_requests_resume_time = (
+                    datetime.datetime.now() + (RETRY_DELAY * cls._retry_attempts))
+
     def set_error(self, rc: int, force: bool = False) -> None:
         if self._error == 0 or force:
             self._error = rc
 
+    @Spans.timed('video.get_video')
     def get_video(self, url: str, folder: str, movie_id: Union[int, str],
                   title: str, source: str,
                   block: bool = True) -> Tuple[int, Optional[MovieType]]:
         """
-             Downloads a video from the given url into the given folder.
+             Downloads a video from the given url into the staging folder
+             within the given folder. An interrupted download is resumed by
+             the next call for the same movie.
 
         :param url:      To download from
-        :param folder:   To download to
+        :param folder:   To download to (within DownloadStaging's folder)
         :param movie_id: To pass to youtube-dl to embed in the created file name
         :param title:    For logging
-        :param source:   Movie source used to determine delay
+        :param source:   Movie source used to determine delay and the
+                         format downloaded (TrailerFormatPolicy)
         :param block:    Wait extended period of time for TOO_MANY_REQUESTS,
                          if needed.
         :return:
@@ -272,14 +317,17 @@ class VideoDownloader:
 
         if clz._logger.isEnabledFor(LazyLogger.DISABLED):
             clz._logger.debug_extra_verbose(f'title: {title}')
-        start_time: datetime.datetime = None
+        start_time: datetime.datetime = datetime.datetime.now()
+        slot_acquired: float = 0.0
+        download_start: float = 0.0
+        downloaded_bytes: int = 0
+        resumed_bytes: int = 0
+        staging_folder: str = DownloadStaging.get_staging_folder(folder)
         try:
-            start_time = clz.get_lock(source, reason=f'get_video: {title}')
-            # HAVE LOCK
-            if LOG_LOCK:
-                clz._logger.debug(f'HAVE LOCK: '
-                                  f'{clz.get_lock_source(source)} '
-                                  f'for {source}')
+            # Downloads from the same site may run concurrently, up to the
+            # limit DownloadScheduler has learned
+
+            slot_acquired = DownloadScheduler.acquire(source)
 
             if not block:
                 too_many_requests = clz.check_too_many_requests(url, source)
@@ -293,9 +341,19 @@ class VideoDownloader:
 
             clz.delay_between_transactions(source, True,
                                            reason=f'get_video {title}')
-            # The embedded % fields are for youtube_dl to fill  in.
-
-            template = os.path.join(folder, f'_rt_{movie_id}_%(title)s.%(ext)s')
+            resumed_bytes = DownloadStaging.begin(staging_folder, movie_id, url)
+            download_format: Optional[str] = TrailerFormatPolicy.get_format(source)
+            partial_format_id: Optional[str] = DownloadStaging.get_format_id(
+                staging_folder, movie_id)
+            if partial_format_id is not None:
+                # Continue the partial download, in its format while it is
+                # offered
+
+                if download_format is None:
+                    download_format = TrailerFormatPolicy.get_default_format()
+                download_format = f'{partial_format_id}/{download_format}'
+            download_start = time.perf_counter()
+            template = DownloadStaging.get_output_template(staging_folder, movie_id)
 
             # Collect and respond to output from youtube-dl
             if source == MovieField.ITUNES_SOURCE:
@@ -321,9 +379,19 @@ class VideoDownloader:
                 'forcejson': 'true',
                 'outtmpl': template,
                 'updatetime': 'false',
+                # Resume a partial download with a range request
+                'continuedl': True,
                 'logger': video_logger,
                 'progress_hooks': [VideoDownloadProgressHook(self).status_hook]
             }
+            if download_format is not None:
+                ydl_opts['format'] = download_format
+            ffmpeg_path: str = Settings.get_ffmpeg_path()
+            if ffmpeg_path:
+                # To merge video and audio formats
+
+                ydl_opts['ffmpeg_location'] = ffmpeg_path
+
             # Optional cookie-file used to avoid youtube 429 errors (see
             # above).
 
@@ -352,19 +420,25 @@ class VideoDownloader:
             # clz._logger.debug_extra_verbose(f'title: {title} starting download')
 
             rc: int = 0
-            with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-                try:
-                    rc = ydl.download([url])
-                except DownloadError as e:
-                    for arg in e.args:
-                        if 'Video unavailable' in arg:
-                            self.set_error(VideoDownloader.UNAVAILABLE)
-                            if clz._logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
-                                clz._logger.debug_extra_verbose(f'error UNAVAILABLE arg: '
-                                                                f'{arg}')
-                        elif clz._logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
-                            clz._logger.debug_verbose(f'error GENERIC DOWNLOAD arg: '
-                                                      f'{arg}')
+            try:
+                rc = YoutubeDLPool.run(YoutubeDLPool.DOWNLOAD, url, ydl_opts)
+            except DownloadError as e:
+                for arg in e.args:
+                    if 'Video unavailable' in arg:
+                        self.set_error(VideoDownloader.UNAVAILABLE)
+                        if clz._logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
+                            clz._logger.debug_extra_verbose(f'error UNAVAILABLE arg: '
+                                                            f'{arg}')
+                    elif clz._logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
+                        clz._logger.debug_verbose(f'error GENERIC DOWNLOAD arg: '
+                                                  f'{arg}')
+            finally:
+                # The format youtube-dl chose, reported before downloading
+
+                if video_logger.raw_data is not None:
+                    DownloadStaging.set_format_id(
+                        staging_folder, movie_id,
+                        video_logger.raw_data.get('format_id'))
 
             wait_attempts: int = -1
             ten_minutes: int = 10 * 60 * 2
@@ -378,69 +452,66 @@ class VideoDownloader:
 
             movie: MovieType = video_logger.data
             if self._error == 0:
-                trailer_path: str = os.path.join(folder, f'_rt_{movie_id}*')
-                trailer_files: List[str] = glob.glob(trailer_path)
-                trailer_file: str = None
-                if trailer_files is not None:
-                    if len(trailer_files) > 0:
-                        trailer_file = trailer_files[0]
-                    #
-                    # Don't know why, but sometimes youtube_dl returns incorrect
-                    # file extension.
-                    #
-                    # Also, sometimes youtube_dl does not always inform the
-                    # VideoLogger of the download. In this case we generate
-                    # the expected return structure here
-                    #
-                    if movie is None:
-                        # The only field expected
-                        if clz._logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
-                            clz._logger.debug_extra_verbose(f'movie is None: {title}')
-
-                        movie = {MovieField.TRAILER: trailer_file}
-
-                    movie.setdefault(MovieField.TRAILER, trailer_file)
-                    if trailer_file != movie[MovieField.TRAILER]:
-                        if clz._logger.isEnabledFor(LazyLogger.DISABLED):
-                            clz._logger.debug_extra_verbose(
-                                'youtube_dl gave incorrect file name:',
-                                movie[MovieField.TRAILER], 'changing to:',
-                                trailer_file)
-
-                        movie[MovieField.TRAILER] = trailer_file
+                trailer_file: str = DownloadStaging.get_downloaded_file(staging_folder,
+                                                                        movie_id)
+                #
+                # Don't know why, but sometimes youtube_dl returns incorrect
+                # file extension.
+                #
+                # Also, sometimes youtube_dl does not always inform the
+                # VideoLogger of the download. In this case we generate
+                # the expected return structure here
+                #
+                if movie is None:
+                    # The only field expected
+                    if clz._logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
+                        clz._logger.debug_extra_verbose(f'movie is None: {title}')
+
+                    movie = {MovieField.TRAILER: trailer_file}
+
+                movie.setdefault(MovieField.TRAILER, trailer_file)
+                if trailer_file != movie[MovieField.TRAILER]:
+                    if clz._logger.isEnabledFor(LazyLogger.DISABLED):
+                        clz._logger.debug_extra_verbose(
+                            'youtube_dl gave incorrect file name:',
+                            movie[MovieField.TRAILER], 'changing to:',
+                            trailer_file)
+
+                    movie[MovieField.TRAILER] = trailer_file
+                if trailer_file is not None:
+                    trailer_size: int = os.path.getsize(trailer_file)
+                    downloaded_bytes = max(trailer_size - resumed_bytes, 0)
+                    DownloadStaging.finish(staging_folder, movie_id,
+                                           resumed_bytes)
+                    TrailerFormatPolicy.record_download(
+                        video_logger.raw_data, trailer_size,
+                        time.perf_counter() - download_start)
         except AbortException:
+            # Keep any partial download, to resume
+
             self.set_error(VideoDownloader.ABORT_REQUESTED, force=True)
             movie = None
-            to_delete = os.path.join(folder, f'_rt_{movie_id}*')
-            to_delete = glob.glob(to_delete)
-            for aFile in to_delete:
-                try:
-                    os.remove(aFile)
-                except Exception as e:
-                    pass
             reraise(*sys.exc_info())
         except Exception as e:
             self.set_error(3)
             if self._error == 3:
                 clz._logger.exception(f'Error downloading: {title} {source} url: {url}')
         finally:
-            clz.release_lock(source)
-            # LOCK RELEASED
-            if LOG_LOCK:
-                clz._logger.debug(f'RELEASED LOCK: '
-                                  f'{clz.get_lock_source(source)} '
-                                  f'for {source}')
-
-            elapsed_time: datetime.timedelta = start_time - datetime.datetime.now()
+            backed_off: bool = False
+            if slot_acquired > 0.0:
+                if download_start > 0.0:
+                    download_seconds: float = time.perf_counter() - download_start
+                    backed_off = DownloadScheduler.release(source, slot_acquired,
+                                                           self._error,
+                                                           download_seconds,
+                                                           downloaded_bytes)
+                else:
+                    DownloadScheduler.release(source, slot_acquired, None)
+
+            elapsed_time: datetime.timedelta = datetime.datetime.now() - start_time
             elapsed_seconds: int = int(elapsed_time.total_seconds())
             clz._logger.debug(f'Time taken to get_video {title}: {elapsed_seconds}')
-            if self._error != Constants.HTTP_TOO_MANY_REQUESTS:
-                clz._retry_attempts = 0
-            else:
-                VideoDownloader._retry_attempts += 1
-                VideoDownloader._too_many_requests_resume_time = (
-                        datetime.datetime.now() + (
-                            RETRY_DELAY * VideoDownloader._retry_attempts))
+            clz.record_too_many_requests(self._error, backed_off)
 
         if movie is None:
             self.set_error(1)
@@ -453,13 +524,8 @@ class VideoDownloader:
             video_logger.log_error()
             if self._error != 0:
                 movie = None
-                to_delete = os.path.join(folder, f'_rt_{movie_id}*')
-                to_delete = glob.glob(to_delete)
-                for aFile in to_delete:
-                    try:
-                        os.remove(aFile)
-                    except Exception as e:
-                        pass
+                if self._error in clz.PERMANENT_ERRORS:
+                    DownloadStaging.discard(staging_folder, movie_id)
 
         Monitor.throw_exception_if_abort_requested()
         return self._error, movie
@@ -473,7 +539,12 @@ class VideoDownloader:
         :param movie_source: Used to determine delay between requests
         :param block:        Wait extended period of time for TOO_MANY_REQUESTS,
                              if needed.
-        :return: a dictionary (MovieType) from the json returned by site
+        :return: the info dicts (MovieType) youtube-dl reports for the url,
+                 one for each entry of a playlist
+
+        Requests are spaced apart (delay_between_transactions) and, like
+        downloads, limited by DownloadScheduler, so that the concurrency of
+        the site adapts to TOO_MANY_REQUESTS.
         """
         clz = VideoDownloader
         trailer_info: List[MovieType] = []
@@ -481,15 +552,11 @@ class VideoDownloader:
         clz.delay_between_transactions(movie_source, False,
                                        reason=f'Get Info for {movie_source}')
         info_logger = TfhInfoLogger(self, url, parse_json_as_youtube=False)
+        slot_acquired: float = 0.0
+        requested: bool = False
 
         try:
-            # TODO: Resume here
-            clz.get_lock(movie_source)
-            # HAVE LOCK
-            if LOG_LOCK:
-                clz._logger.debug(f'HAVE LOCK '
-                                  f'{clz.get_lock_source(movie_source)} '
-                                  f'for {movie_source}')
+            slot_acquired = DownloadScheduler.acquire(movie_source)
 
             if not block:
                 too_many_requests = clz.check_too_many_requests(url, movie_source)
@@ -502,7 +569,6 @@ class VideoDownloader:
                 clz.wait_if_too_many_requests(movie_source, True)
 
             ydl_opts = {
-                'forcejson': 'true',
                 'skip_download': 'true',
                 'logger': info_logger,
                 'progress_hooks': [TrailerInfoProgressHook(self).status_hook]
@@ -515,24 +581,24 @@ class VideoDownloader:
 
             # Start Download
 
-            with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-                try:
-                    ydl.download([url])
-                except DownloadError as e:
-                    for arg in e.args:
-                        if arg in 'ERROR: Video unavailable':
-                            self.set_error(VideoDownloader.UNAVAILABLE)
-                            clz._logger.debug(f'error? {arg}')
-                        else:
-                            clz._logger.error(f'error? {arg}')
-
-            # Wait for download
-
-            while info_logger.is_finished is None and self._error == 0:
-                Monitor.throw_exception_if_abort_requested(timeout=0.5)
-
-            if self._error == 0:
-                trailer_info: List[MovieType] = info_logger.get_trailer_info()
+            requested = True
+            info: Optional[MovieType] = None
+            try:
+                info = YoutubeDLPool.run(YoutubeDLPool.EXTRACT_INFO, url, ydl_opts)
+            except DownloadError as e:
+                for arg in e.args:
+                    if arg in 'ERROR: Video unavailable':
+                        self.set_error(VideoDownloader.UNAVAILABLE)
+                        clz._logger.debug(f'error? {arg}')
+                    else:
+                        clz._logger.error(f'error? {arg}')
+
+            if self._error == 0 and info is not None:
+                if info.get('_type') == 'playlist':
+                    trailer_info = [entry for entry in info.get('entries') or []
+                                    if entry is not None]
+                else:
+                    trailer_info = [info]
 
         except AbortException:
             reraise(*sys.exc_info())
@@ -545,19 +611,11 @@ class VideoDownloader:
                         'Failed to download site info for:', url)
             trailer_info = []
         finally:
-            clz.release_lock(movie_source)  # LOCK RELEASED
-            if LOG_LOCK:
-                clz._logger.debug(f'RELEASED LOCK '
-                                  f'{clz.get_lock_source(movie_source)} '
-                                  f'for {movie_source}')
-
-            if self._error != Constants.HTTP_TOO_MANY_REQUESTS:
-                clz._retry_attempts = 0
-            else:
-                VideoDownloader._retry_attempts += 1
-                VideoDownloader._too_many_requests_resume_time = (
-                        datetime.datetime.now() + (
-                            RETRY_DELAY * VideoDownloader._retry_attempts))
+            backed_off: bool = False
+            if slot_acquired > 0.0:
+                backed_off = DownloadScheduler.release(
+                    movie_source, slot_acquired, self._error if requested else None)
+            clz.record_too_many_requests(self._error, backed_off)
 
         if LOG_ALL or self._error not in (0, VideoDownloader.ABORT_REQUESTED):
             clz._logger.debug('Results for url:', url, 'error:', self._error)
@@ -572,7 +630,8 @@ class VideoDownloader:
         return 0, trailer_info
 
     def get_tfh_index(self, url: str, trailer_handler,
-                      block: bool = False) -> int:
+                      block: bool = False,
+                      incremental: bool = False) -> int:
         """
         Fetches all of the urls in the Trailers From Hell playlist. Note that
         the entire list is well over a thousand and that indiscriminate
@@ -582,10 +641,22 @@ class VideoDownloader:
         reducing how many trailers are requested at a time, caching and
         throttling of requests should be used.
 
+        The entries are taken from youtube-dl's info dicts as the playlist
+        is read (extract_info without processing), they are not printed as
+        json and parsed again.
+
         :param url: points to playlist
-        :param trailer_handler: Call back to DiscoverTFHMovies to process each
-                returned entry as it occurs.
+        :param trailer_handler: Call back to DiscoverTFHMovies to process a
+                list of returned entries as they occur. When the handler
+                returns True no more entries are fetched.
         :param block: If true, then wait until no longer TOO_MANY_REQUESTS
+        :param incremental: If true, then fetch the entries in playlist order
+                (newest first), at most TFH_INCREMENTAL_ENTRIES of them, one
+                at a time, so that the handler can stop at the first entry
+                it already has. Pages of the playlist are only fetched as
+                they are reached. Otherwise, the entire playlist is fetched
+                and handed over in random order, TFH_INDEX_BATCH_SIZE
+                entries at a time.
         :return:
         """
 
@@ -593,7 +664,8 @@ class VideoDownloader:
         start_time: datetime.datetime = datetime.datetime.now()
         clz.delay_between_transactions(MovieField.TFH_SOURCE, False,
                                        reason=f'get_tfh_index')
-        tfh_index_logger = TfhIndexLogger(self, trailer_handler, url)
+        tfh_index_logger = TfhIndexLogger(self, url)
+        self._index_requests = 0
 
         try:
             clz.get_lock(MovieField.TFH_SOURCE)
@@ -644,7 +716,6 @@ class VideoDownloader:
                 }
             """
             ydl_opts = {
-                'forcejson': True,
                 'noplaylist': False,
                 'extract_flat': 'in_playlist',
                 'ignoreerrors': True,
@@ -653,10 +724,10 @@ class VideoDownloader:
                 'sleep_interval': 1,
                 'max_sleep_interval': 8,
                 #  'playlist_items': trailers_to_download,
-                'playlistrandom': True,
                 'progress_hooks': [TFHIndexProgressHook(self).status_hook]
                 # 'debug_printtraffic': True
             }
+
             cookie_path = Settings.get_youtube_dl_cookie_path()
             if len(cookie_path) > 0 and os.path.exists(cookie_path):
                 ydl_opts['cookiefile'] = cookie_path
@@ -669,16 +740,15 @@ class VideoDownloader:
 
             clz._logger.debug(f'options: {ydl_opts}')
 
-            with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-                try:
-                    ydl.download([url])
-                except DownloadError as e:
-                    for arg in e.args:
-                        if arg in 'ERROR: Video unavailable':
-                            self.set_error(VideoDownloader.UNAVAILABLE)
-                            clz._logger.debug(f'error? {arg}')
-                        else:
-                            clz._logger.error(f'error? {arg}')
+            try:
+                self.read_tfh_index(url, ydl_opts, trailer_handler, incremental)
+            except DownloadError as e:
+                for arg in e.args:
+                    if arg in 'ERROR: Video unavailable':
+                        self.set_error(VideoDownloader.UNAVAILABLE)
+                        clz._logger.debug(f'error? {arg}')
+                    else:
+                        clz._logger.error(f'error? {arg}')
         except AbortException:
             reraise(*sys.exc_info())
 
@@ -686,19 +756,14 @@ class VideoDownloader:
             if self._error == 0:
                 clz._logger.exception(f'Error downloading: url: {url}')
         finally:
+            self._index_requests = tfh_index_logger.get_number_of_requests()
             clz.release_lock(MovieField.TFH_SOURCE)
             if LOG_LOCK:
                 clz._logger.debug(f'RELEASED LOCK '
                                   f'{clz.get_lock_source(MovieField.TFH_SOURCE)} '
                                   f'for {MovieField.TFH_SOURCE}')
 
-            if self._error != Constants.HTTP_TOO_MANY_REQUESTS:
-                clz._retry_attempts = 0
-            else:
-                VideoDownloader._retry_attempts += 1
-                VideoDownloader._too_many_requests_resume_time = (
-                        datetime.datetime.now() + (
-                            RETRY_DELAY * VideoDownloader._retry_attempts))
+            clz.record_too_many_requests(self._error)
 
         if LOG_ALL or self._error not in (0, VideoDownloader.ABORT_REQUESTED):
             clz._logger.debug('Results for url:', url, 'error:', self._error)
@@ -711,6 +776,65 @@ class VideoDownloader:
             clz._logger.debug(f'self._error: {self._error}')
         return self._error
 
+    def read_tfh_index(self, url: str, ydl_opts: Dict[str, Any],
+                       trailer_handler, incremental: bool) -> None:
+        """
+        Reads the TFH playlist for get_tfh_index, passing the entries to the
+        handler as they are read.
+
+        :param url: points to playlist
+        :param ydl_opts: youtube-dl options
+        :param trailer_handler: See get_tfh_index
+        :param incremental: See get_tfh_index
+        :return:
+        """
+        clz = VideoDownloader
+
+        def entries_handler(entries: List[MovieType]) -> bool:
+            Monitor.throw_exception_if_abort_requested()
+            return self.handle_tfh_entries(trailer_handler, entries, url)
+
+        if incremental:
+            YoutubeDLPool.run(YoutubeDLPool.PLAYLIST, url, ydl_opts,
+                              entries_handler=entries_handler, batch_size=1,
+                              limit=clz.TFH_INCREMENTAL_ENTRIES)
+        else:
+            # As playlistrandom, every page is read before the first entry
+            # is used
+
+            YoutubeDLPool.run(YoutubeDLPool.PLAYLIST, url, ydl_opts,
+                              entries_handler=entries_handler,
+                              batch_size=clz.TFH_INDEX_BATCH_SIZE, shuffle=True)
+
+    def handle_tfh_entries(self, trailer_handler, entries: List[MovieType],
+                           url: str) -> bool:
+        """
+        :param trailer_handler: See get_tfh_index
+        :param entries: Entries of the TFH playlist, as read by youtube-dl
+        :param url: points to playlist
+        :return: True when the handler wants no more entries
+        """
+        clz = VideoDownloader
+        if self._error != 0:
+            return True
+
+        movies: List[MovieType] = TfhIndexLogger.populate_youtube_movies(entries, url)
+        try:
+            return bool(trailer_handler(movies))
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception:
+            clz._logger.exception(f'url: {url}')
+        return False
+
+    def get_number_of_index_requests(self) -> int:
+        """
+        :return: Number of requests youtube-dl made to YouTube (the channel's
+                 web page and each page of the playlist) during the last
+                 get_tfh_index
+        """
+        return self._index_requests
+
     @classmethod
     def get_lock(cls, source: str, reason: str = '') -> datetime.datetime:
         start_time: datetime.datetime = datetime.datetime.now()
@@ -790,6 +914,7 @@ class BaseYDLogger:
       - to log
       - to scan and respond to events, such as json-text or diagnostic msgs
     """
+    MAXIMUM_LOG_LINES: Final[int] = 200
 
     _logger: LazyLogger = None
 
@@ -800,9 +925,12 @@ class BaseYDLogger:
     def __init__(self, downloader: VideoDownloader, url: str,
                  parse_json_as_youtube: bool = True) -> None:
         clz = type(self)
-        self.debug_lines: List[str] = []
-        self.warning_lines: List[str] = []
-        self.error_lines: List[str] = []
+
+        # Only the most recent lines are kept, for logging after a failure
+
+        self.debug_lines: Deque[str] = deque(maxlen=BaseYDLogger.MAXIMUM_LOG_LINES)
+        self.warning_lines: Deque[str] = deque(maxlen=BaseYDLogger.MAXIMUM_LOG_LINES)
+        self.error_lines: Deque[str] = deque(maxlen=BaseYDLogger.MAXIMUM_LOG_LINES)
         self._downloader: VideoDownloader = downloader
         self.index = 0
         self.total = 0
@@ -1040,7 +1168,7 @@ class BaseYDLogger:
             Monitor.throw_exception_if_abort_requested()
 
         clz = BaseYDLogger
-        if 'Error Constants.HTTP_TOO_MANY_REQUESTS' in line:
+        if 'HTTP Error 429' in line or 'Too Many Requests' in line:
             self.set_error(Constants.HTTP_TOO_MANY_REQUESTS, force=True)
             type(self)._logger.info(
                 'Abandoning download. Too Many Requests')
@@ -1071,17 +1199,17 @@ class BaseYDLogger:
                                                    Dante on HALF HUMAN"}
                                                    [download] Downloading video 15 of 1448
 
-        :return:
+        :return: The most recent MAXIMUM_LOG_LINES lines
         """
-        return self.debug_lines
+        return list(self.debug_lines)
 
     def get_warning(self) -> List[str]:
-        return self.warning_lines
+        return list(self.warning_lines)
 
     def get_error(self) -> List[str]:
-        return self.error_lines
+        return list(self.error_lines)
 
-    def log_lines(self, lines: List[str], label: str) -> None:
+    def log_lines(self, lines: Iterable[str], label: str) -> None:
         if self._downloader._error == VideoDownloader.ABORT_REQUESTED:
             return
 
@@ -1110,16 +1238,26 @@ class TfhIndexLogger(BaseYDLogger):
     def class_init(cls):
         cls._logger = module_logger.getChild(cls.__name__)
 
-    def __init__(self, downloader: VideoDownloader,
-                 trailer_handler, url: str) -> None:
-        super().__init__(downloader, url, parse_json_as_youtube=True)
+    def __init__(self, downloader: VideoDownloader, url: str) -> None:
+        super().__init__(downloader, url, parse_json_as_youtube=False)
         clz = type(self)
-        self._trailer_handler = trailer_handler
+        self._requests: int = 0
+
+    def get_number_of_requests(self) -> int:
+        """
+        :return: Number of web pages and playlist pages youtube-dl reported
+                 fetching
+        """
+        return self._requests
 
     def debug(self, line: str) -> None:
         """
+        Counts the requests made for the index. The entries themselves are
+        not logged, VideoDownloader.read_tfh_index takes them from
+        youtube-dl directly.
 
-        Sample lines from actual use:
+        Sample lines from actual use (from when forcejson was set, so that
+        each entry was also printed as json):
 
         trailersfromhell: Downloading webpage
         [download] Downloading playlist: Trailers From Hell - Videos
@@ -1150,49 +1288,37 @@ class TfhIndexLogger(BaseYDLogger):
 
              :return:
         """
-        clz = type(self)
         super().debug(line)
-        start_time: datetime.datetime = None
-        if YIELD_LOCK:
-            #
-            # Give another thread a chance to fetch a movie
-            #
-            start_time = datetime.datetime.now()
-
-            self._downloader.release_lock(MovieField.TFH_SOURCE)
-            # LOCK RELEASED
-            if LOG_LOCK:
-                clz._logger.debug(f'RELEASED LOCK '
-                                  f'{self._downloader.get_lock_source(MovieField.TFH_SOURCE)} '
-                                  f'for {MovieField.TFH_SOURCE}')
-                clz._logger.debug(f'Yielding Lock between TFH index entries')
-
-            # ..... Some other thread can get video
-
-        if self._parsed_movie is not None and self._downloader._error == 0:
-            try:
-                self._trailer_handler(self._parsed_movie)
-                self._parsed_movie = None  # Don't send duplicates
+        if 'Downloading webpage' in line or 'Downloading page' in line:
+            self._requests += 1
 
-            except Exception as e:
-                clz._logger.exception(f'url: {self.url}')
+    @classmethod
+    def populate_youtube_movies(cls, entries: List[MovieType],
+                                url: str) -> List[MovieType]:
+        """
+            Creates Kodi MovieTypes for entries of the TFH playlist.
 
-        if YIELD_LOCK:
-            # RE-ACQUIRE LOCK
-            self._downloader.get_lock(MovieField.TFH_SOURCE)
-            # HAVE LOCK
-            if LOG_LOCK:
-                clz._logger.debug(f'HAVE LOCK '
-                                  f'{self._downloader.get_lock_source(MovieField.TFH_SOURCE)} '
-                                  f'for {MovieField.TFH_SOURCE}')
+            Settings common to every entry are looked up once.
 
-                elapsed_time: datetime.timedelta = start_time - datetime.datetime.now()
-                elapsed_seconds: int = int(elapsed_time.total_seconds())
-                clz._logger.debug(f'TFH index Yield of: {elapsed_seconds}')
+        :param entries: As reported by youtube-dl
+        :param url: Of the playlist, for logging
+        :return: A MovieType for each entry which could be converted
+        """
+        country_id = Settings.get_country_iso_3166_1().lower()
+        certifications = WorldCertifications.get_certifications(country_id)
+        unrated_id = certifications.get_unrated_certification().get_preferred_id()
+        movies: List[MovieType] = []
+        for entry in entries:
+            movie: MovieType = cls.populate_youtube_movie_info(entry, url,
+                                                               unrated_id=unrated_id)
+            if movie is not None:
+                movies.append(movie)
+        return movies
 
     @classmethod
     def populate_youtube_movie_info(cls, movie_data: MovieType,
-                                    url: str) -> MovieType:
+                                    url: str,
+                                    unrated_id: str = None) -> MovieType:
         """
             Creates a Kodi MovieType from the data returned from Youtube.
 
@@ -1239,9 +1365,10 @@ class TfhIndexLogger(BaseYDLogger):
 
             if movie_data.get('description') is None:
                 description = movie_data.get('description', '')
-            country_id = Settings.get_country_iso_3166_1().lower()
-            certifications = WorldCertifications.get_certifications(country_id)
-            unrated_id = certifications.get_unrated_certification().get_preferred_id()
+            if unrated_id is None:
+                country_id = Settings.get_country_iso_3166_1().lower()
+                certifications = WorldCertifications.get_certifications(country_id)
+                unrated_id = certifications.get_unrated_certification().get_preferred_id()
             trailers_in_playlist = movie_data.get('n_entries', 1)
             movie = {MovieField.SOURCE: 'unknown',
                      MovieField.YOUTUBE_ID: trailer_id,
@@ -1311,41 +1438,20 @@ VideoLogger.class_init()
 
 
 class TfhInfoLogger(BaseYDLogger):
+    """
+    Logger for get_info. The information itself is returned by youtube-dl's
+    extract_info.
+    """
     _logger = None
-    country_id = None
-    certifications = None
-    unrated_id = None
 
     def __init__(self, downloader: VideoDownloader, url: str,
                  parse_json_as_youtube: bool = False) -> None:
         super().__init__(downloader, url, parse_json_as_youtube=parse_json_as_youtube)
 
-        self._trailer_info: List[MovieType] = []
-        self.is_finished = False
-
     @classmethod
     def class_init(cls):
         if cls._logger is None:
             cls._logger = module_logger.getChild(cls.__name__)
-            cls.country_id = Settings.get_country_iso_3166_1().lower()
-            cls.certifications = WorldCertifications.get_certifications(cls.country_id)
-            cls.unrated_id = cls.certifications.get_unrated_certification().\
-                get_preferred_id()
-
-    def get_trailer_info(self) -> List[MovieType]:
-        return self._trailer_info
-
-    def debug(self, line: str) -> None:
-        """
-             :return:
-        """
-        clz = type(self)
-        super().debug(line)
-
-        if self.raw_data is not None:
-            self._trailer_info.append(self.raw_data)
-
-        # How do we know when finished?
 
 
 TfhInfoLogger.class_init()
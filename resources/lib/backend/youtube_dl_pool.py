@@ -0,0 +1,581 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Runs youtube-dl (trailer downloads, video information and the TFH index)
+in long-lived python processes (youtube_dl_worker.py), rather than on the
+back-end's threads.
+
+In-process, youtube-dl's extraction holds the GIL for long stretches,
+stalling discovery and the bridge to the front-end, its memory stays with
+Kodi's process, and patches it needs (such as datetime.strptime) leak into
+the add-on. A worker uses another core, may be limited in memory and can be
+killed when it hangs.
+
+Each worker runs one job at a time. Up to the youtube_dl_workers setting
+(0, off, by default) are started, on demand. A worker whose python is not
+the add-on's version is not used: youtube-dl and the patches made to it
+would differ from those running in-process. youtube-dl's log lines and
+progress reports are passed back as they happen and replayed to the
+caller's logger and progress hooks, on the caller's thread, so
+VideoDownloader sees the same calls as when youtube-dl runs in-process.
+
+A job fails when its worker is silent for longer than the job's timeout,
+or dies; the worker is killed and replaced. Workers are replaced after
+MAXIMUM_JOBS_PER_WORKER jobs, or once they have used more than the
+youtube_dl_worker_memory_mb setting.
+
+When youtube_dl_workers is 0, or no worker can be started, jobs run
+in-process, as before. After a worker fails to start, jobs run in-process
+for RETRY_SECONDS, doubling with each further failure up to
+MAXIMUM_RETRY_SECONDS, before another start is tried.
+"""
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Deque
+
+import simplejson as json
+from simplejson import JSONDecodeError
+import xbmc
+
+import youtube_dl
+from youtube_dl.utils import DownloadError
+
+from backend import youtube_dl_worker
+from common.exceptions import AbortException
+from common.imports import *
+from common.logger import LazyLogger
+from common.monitor import Monitor
+from common.settings import Settings
+from diagnostics.spans import Spans
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+
+class YoutubeDLWorker:
+    """
+    One worker process. Used by one thread at a time.
+    """
+    # Marks the end of the worker's output
+
+    EOF: Final[Dict[str, Any]] = {'type': 'eof'}
+
+    _logger: LazyLogger = None
+
+    def __init__(self, python: str, memory_limit: int) -> None:
+        """
+        Starts the worker process. The caller must wait for it to be ready.
+
+        :param python: Interpreter to run the worker with
+        :param memory_limit: Bytes the worker may allocate, 0 for no limit
+        """
+        clz = type(self)
+        if clz._logger is None:
+            clz._logger = module_logger.getChild(clz.__name__)
+
+        self.jobs: int = 0
+        self.max_rss: int = 0
+        self.pid: int = 0
+        self._messages: queue.Queue = queue.Queue()
+
+        # The worker needs youtube_dl, but none of the add-on's modules
+        # (nor Kodi's python path)
+
+        env: Dict[str, str] = os.environ.copy()
+        env['PYTHONPATH'] = os.path.dirname(os.path.dirname(
+            os.path.abspath(youtube_dl.__file__)))
+        env['PYTHONIOENCODING'] = 'utf-8'
+        args: List[str] = [python, youtube_dl_worker.__file__,
+                           str(memory_limit)]
+        if xbmc.getCondVisibility('System.Platform.Windows'):
+            # Prevent console for python from opening
+
+            self._process: subprocess.Popen = subprocess.Popen(
+                args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, shell=False, universal_newlines=True,
+                encoding='utf-8', bufsize=1, env=env, close_fds=True,
+                creationflags=subprocess.DETACHED_PROCESS)
+        else:
+            self._process: subprocess.Popen = subprocess.Popen(
+                args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, shell=False, universal_newlines=True,
+                encoding='utf-8', bufsize=1, env=env, close_fds=True)
+        self._reader: threading.Thread = threading.Thread(
+            target=self._read_messages, name='youtube-dl worker reader',
+            daemon=True)
+        self._reader.start()
+
+    def _read_messages(self) -> None:
+        """
+        Queues each message from the worker, as it arrives
+        """
+        clz = type(self)
+        try:
+            for line in self._process.stdout:
+                try:
+                    self._messages.put(json.loads(line))
+                except (JSONDecodeError, ValueError):
+                    clz._logger.error(f'Unexpected output: {line}')
+        except Exception:
+            pass  # Killed
+        self._messages.put(clz.EOF)
+
+    def wait_until_ready(self, timeout: float) -> bool:
+        """
+        :param timeout: Seconds to wait for the worker to start
+        :return: True when the worker is ready for jobs and runs the same
+                 python version as the add-on
+        """
+        clz = type(self)
+        message: Optional[Dict[str, Any]] = self.receive(timeout)
+        if message is None or message.get('type') != 'ready':
+            return False
+
+        self.pid = message.get('pid', 0)
+        python: List[int] = message.get('python') or []
+        if python != list(sys.version_info[:2]):
+            clz._logger.error(f'Worker python version: {python} differs from '
+                              f'{list(sys.version_info[:2])}')
+            return False
+        return True
+
+    def send(self, message: Dict[str, Any]) -> None:
+        self._process.stdin.write(json.dumps(message) + '\n')
+        self._process.stdin.flush()
+
+    def receive(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Waits for the next message from the worker
+
+        :param timeout: Seconds to wait
+        :return: The message, EOF if the worker died or None when nothing
+                 arrived in time
+        """
+        deadline: float = time.monotonic() + timeout
+        while True:
+            try:
+                return self._messages.get(
+                    timeout=min(max(deadline - time.monotonic(), 0.0), 0.5))
+            except queue.Empty:
+                pass
+            Monitor.throw_exception_if_abort_requested()
+            if time.monotonic() >= deadline:
+                return None
+
+    def close(self) -> None:
+        """
+        Asks the worker to exit, by closing its input
+        """
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=1.0)
+        except Exception:
+            self.kill()
+
+    def kill(self) -> None:
+        try:
+            self._process.kill()
+            self._process.wait(timeout=1.0)
+        except Exception:
+            pass
+
+
+class YoutubeDLPool:
+    """
+    Process wide. Thread safe.
+    """
+    DOWNLOAD: Final[str] = youtube_dl_worker.DOWNLOAD
+    EXTRACT_INFO: Final[str] = youtube_dl_worker.EXTRACT_INFO
+    PLAYLIST: Final[str] = youtube_dl_worker.PLAYLIST
+
+    # Seconds a job's worker may be silent before the job fails. youtube-dl
+    # reports progress and logs each request, so a worker is only this quiet
+    # when it hangs.
+
+    TIMEOUTS: Final[Dict[str, float]] = {DOWNLOAD: 5.0 * 60.0,
+                                         EXTRACT_INFO: 2.0 * 60.0,
+                                         PLAYLIST: 5.0 * 60.0}
+    STARTUP_SECONDS: Final[float] = 30.0
+    RETRY_SECONDS: Final[float] = 60.0
+    MAXIMUM_RETRY_SECONDS: Final[float] = 60.0 * 60.0
+    MAXIMUM_JOBS_PER_WORKER: Final[int] = 50
+    BYTES_PER_MB: Final[int] = 1024 * 1024
+    LATENCY_PERCENTILES: Final[Tuple[float, ...]] = (50.0, 99.0)
+
+    _logger: LazyLogger = None
+    _condition: threading.Condition = threading.Condition()
+    _idle: List[YoutubeDLWorker] = []
+    _workers: List[YoutubeDLWorker] = []
+    _waiters: Deque[object] = deque()
+    _starting: int = 0
+    _next_job: int = 0
+    _failed_starts: int = 0
+
+    # time.monotonic() until which jobs run in-process, after a failed start
+
+    _unavailable_until: float = 0.0
+    _closed: bool = False
+    _abort_listener_registered: bool = False
+
+    _jobs: int = 0
+    _in_process_jobs: int = 0
+    _started: int = 0
+    _recycled: int = 0
+    _timeouts: int = 0
+    _crashes: int = 0
+
+    @classmethod
+    def class_init(cls) -> None:
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+    @staticmethod
+    def get_span_name(operation: str) -> str:
+        """
+        :param operation:
+        :return: Name of the Spans histogram of the operation's latencies
+        """
+        return f'youtube_dl.{operation}'
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        """
+        :return: True when jobs are run by worker processes
+        """
+        return (Settings.get_youtube_dl_workers() > 0
+                and not cls._is_unavailable() and not cls._closed)
+
+    @classmethod
+    def _is_unavailable(cls) -> bool:
+        """
+        :return: True while waiting to retry starting a worker
+        """
+        return time.monotonic() < cls._unavailable_until
+
+    @classmethod
+    def run(cls, operation: str, url: str, ydl_opts: Dict[str, Any],
+            timeout: float = None,
+            entries_handler: Callable[[List[MovieType]], bool] = None,
+            batch_size: int = 100, limit: int = 0,
+            shuffle: bool = False) -> Any:
+        """
+        Runs a youtube-dl operation, in a worker when possible
+
+        :param operation: DOWNLOAD, EXTRACT_INFO or PLAYLIST
+        :param url:
+        :param ydl_opts: youtube-dl options. The logger and progress_hooks
+                         are called on this thread
+        :param timeout: Seconds the worker may be silent, TIMEOUTS if None
+        :param entries_handler: For PLAYLIST, given each batch of entries.
+                                Returns True when it wants no more
+        :param batch_size: See youtube_dl_worker.read_playlist
+        :param limit: See youtube_dl_worker.read_playlist
+        :param shuffle: See youtube_dl_worker.read_playlist
+        :return: What youtube-dl returns for the operation
+        :raises DownloadError: When youtube-dl fails, or the worker times
+                               out or dies
+        """
+        start: float = time.perf_counter()
+        try:
+            worker: Optional[YoutubeDLWorker] = None
+            if cls.is_enabled():
+                worker = cls._acquire()
+            if worker is None:
+                with cls._condition:
+                    cls._in_process_jobs += 1
+                with youtube_dl.YoutubeDL(ydl_opts) as ydl:
+                    return youtube_dl_worker.run_operation(
+                        ydl, operation, url, batch_size=batch_size, limit=limit,
+                        shuffle=shuffle, entries_handler=entries_handler)
+
+            if timeout is None:
+                timeout = cls.TIMEOUTS.get(operation, cls.TIMEOUTS[cls.DOWNLOAD])
+            request: Dict[str, Any] = {
+                'operation': operation,
+                'url': url,
+                'options': {key: value for key, value in ydl_opts.items()
+                            if key not in ('logger', 'progress_hooks')},
+                'batch_size': batch_size,
+                'limit': limit,
+                'shuffle': shuffle}
+            return cls._run_job(worker, request, ydl_opts, timeout,
+                                entries_handler)
+        finally:
+            Spans.record(cls.get_span_name(operation),
+                         time.perf_counter() - start)
+
+    @classmethod
+    def _run_job(cls, worker: YoutubeDLWorker, request: Dict[str, Any],
+                 ydl_opts: Dict[str, Any], timeout: float,
+                 entries_handler: Callable[[List[MovieType]], bool]) -> Any:
+        """
+        Runs a job in the worker, replaying its output on this thread
+
+        :return: See run
+        """
+        logger = ydl_opts.get('logger')
+        hooks: List[Callable[[Dict[str, Any]], None]]
+        hooks = ydl_opts.get('progress_hooks', [])
+        reusable: bool = False
+        failure: str = ''
+        result: Optional[Dict[str, Any]] = None
+        try:
+            with cls._condition:
+                cls._next_job += 1
+                job: int = cls._next_job
+                cls._jobs += 1
+            request['job'] = job
+            worker.send(request)
+            while result is None:
+                message: Optional[Dict[str, Any]] = worker.receive(timeout)
+                if message is None:
+                    with cls._condition:
+                        cls._timeouts += 1
+                    failure = (f'ERROR: youtube-dl worker {worker.pid} silent '
+                               f'for {timeout:.0f} seconds')
+                    break
+                if message is YoutubeDLWorker.EOF:
+                    with cls._condition:
+                        cls._crashes += 1
+                    failure = f'ERROR: youtube-dl worker {worker.pid} died'
+                    break
+                if message.get('job') != job:
+                    continue
+
+                kind: str = message.get('type')
+                if kind == 'log':
+                    if logger is not None:
+                        getattr(logger, message.get('level', 'debug'))(
+                            message.get('line', ''))
+                elif kind == 'progress':
+                    for hook in hooks:
+                        hook(message.get('status', {}))
+                elif kind == 'entries':
+                    done: bool = bool(entries_handler(message.get('entries', [])))
+                    worker.send({'job': job, 'more': not done})
+                elif kind == 'result':
+                    result = message
+        except AbortException:
+            reraise(*sys.exc_info())
+        except OSError:
+            # Writing to a worker which died
+
+            with cls._condition:
+                cls._crashes += 1
+            failure = f'ERROR: youtube-dl worker {worker.pid} died'
+        finally:
+            if result is not None:
+                worker.jobs += 1
+                worker.max_rss = max(worker.max_rss, result.get('max_rss', 0))
+                error: Optional[Dict[str, str]] = result.get('error')
+                reusable = error is None or error.get('type') != 'MemoryError'
+            cls._release(worker, reusable)
+
+        if result is None:
+            if logger is not None:
+                logger.error(failure)
+            cls._logger.error(f'{failure} url: {request.get("url")}')
+            raise DownloadError(failure)
+
+        error = result.get('error')
+        if error is not None:
+            if error.get('type') != 'DownloadError':
+                cls._logger.error(f'youtube-dl failed url: {request.get("url")} '
+                                  f'{error.get("message")}')
+            raise DownloadError(error.get('message', ''))
+        return result.get('value')
+
+    @classmethod
+    def _acquire(cls) -> Optional[YoutubeDLWorker]:
+        """
+        Waits for an idle worker, starting one if there are fewer than the
+        youtube_dl_workers setting
+
+        :return: A worker, None when no worker could be started
+        """
+        # Callers are served in turn. Otherwise a thread which releases a
+        # worker takes it straight back, starving the others.
+
+        waiter: object = object()
+        with cls._condition:
+            cls._waiters.append(waiter)
+            try:
+                while True:
+                    if cls._is_unavailable() or cls._closed:
+                        return None
+                    if cls._waiters[0] is waiter:
+                        if len(cls._idle) > 0:
+                            return cls._idle.pop()
+                        if (len(cls._workers) + cls._starting
+                                < Settings.get_youtube_dl_workers()):
+                            cls._starting += 1
+                            break
+                    cls._condition.wait(timeout=0.5)
+                    Monitor.throw_exception_if_abort_requested()
+            finally:
+                cls._waiters.remove(waiter)
+                cls._condition.notify_all()
+
+        worker: Optional[YoutubeDLWorker] = None
+        try:
+            worker = cls._start_worker()
+        finally:
+            with cls._condition:
+                cls._starting -= 1
+                if worker is not None:
+                    cls._workers.append(worker)
+                cls._condition.notify_all()
+        return worker
+
+    @classmethod
+    def _start_worker(cls) -> Optional[YoutubeDLWorker]:
+        """
+        :return: A new, ready worker. None when workers can not be run, in
+                 which case jobs run in-process until a start is retried
+        """
+        if not cls._abort_listener_registered:
+            cls._abort_listener_registered = True
+            Monitor.register_abort_listener(cls.shutdown, 'YoutubeDLPool.shutdown')
+
+        python: Optional[str] = cls.get_python()
+        worker: Optional[YoutubeDLWorker] = None
+        try:
+            if python is not None:
+                worker = YoutubeDLWorker(
+                    python,
+                    Settings.get_youtube_dl_worker_memory_mb() * cls.BYTES_PER_MB)
+                if worker.wait_until_ready(cls.STARTUP_SECONDS):
+                    with cls._condition:
+                        cls._started += 1
+                        cls._failed_starts = 0
+                    if cls._logger.isEnabledFor(LazyLogger.DEBUG):
+                        cls._logger.debug(f'Started youtube-dl worker {worker.pid}')
+                    return worker
+        except AbortException:
+            if worker is not None:
+                worker.kill()
+            reraise(*sys.exc_info())
+        except Exception:
+            cls._logger.exception(f'python: {python}')
+
+        if worker is not None:
+            worker.kill()
+        with cls._condition:
+            cls._failed_starts += 1
+            retry_seconds: float = min(
+                cls.RETRY_SECONDS * 2 ** (cls._failed_starts - 1),
+                cls.MAXIMUM_RETRY_SECONDS)
+            cls._unavailable_until = time.monotonic() + retry_seconds
+        cls._logger.error(f'Unable to start youtube-dl worker with python: '
+                          f'{python}. Running youtube-dl in-process for '
+                          f'{retry_seconds:.0f} seconds')
+        return None
+
+    @classmethod
+    def _release(cls, worker: YoutubeDLWorker, reusable: bool) -> None:
+        """
+        Returns the worker to the pool, or retires it
+
+        :param worker:
+        :param reusable: False when the worker's state is unknown (its job
+                         timed out, for example)
+        """
+        memory_limit: int = (Settings.get_youtube_dl_worker_memory_mb()
+                             * cls.BYTES_PER_MB)
+        recycle: bool = (worker.jobs >= cls.MAXIMUM_JOBS_PER_WORKER
+                         or 0 < memory_limit < worker.max_rss)
+        with cls._condition:
+            if reusable and not recycle and not cls._closed:
+                cls._idle.append(worker)
+                cls._condition.notify_all()
+                return
+
+            if worker in cls._workers:
+                cls._workers.remove(worker)
+            if reusable:
+                cls._recycled += 1
+            cls._condition.notify_all()
+
+        if cls._logger.isEnabledFor(LazyLogger.DEBUG):
+            cls._logger.debug(f'Retiring youtube-dl worker {worker.pid} jobs: '
+                              f'{worker.jobs} max_rss: {worker.max_rss}')
+        if reusable:
+            worker.close()
+        else:
+            worker.kill()
+
+    @classmethod
+    def get_python(cls) -> Optional[str]:
+        """
+        :return: The python interpreter to run workers with. Kodi's own
+                 executable (sys.executable) is usually Kodi, not python
+        """
+        python: str = Settings.get_youtube_dl_worker_python()
+        if len(python) > 0:
+            return python
+
+        if os.path.basename(sys.executable).lower().startswith('python'):
+            return sys.executable
+
+        return shutil.which('python3') or shutil.which('python')
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """
+        Stops every worker
+
+        :return:
+        """
+        with cls._condition:
+            cls._closed = True
+            workers: List[YoutubeDLWorker] = list(cls._workers)
+            idle: List[YoutubeDLWorker] = list(cls._idle)
+            cls._workers.clear()
+            cls._idle.clear()
+            cls._condition.notify_all()
+
+        for worker in workers:
+            if worker in idle:
+                worker.close()
+            else:
+                worker.kill()
+
+    @classmethod
+    def get_report(cls) -> Dict[str, Any]:
+        """
+        :return: Worker and job counts and the latency of each operation
+        """
+        with cls._condition:
+            report: Dict[str, Any] = {
+                'workers': len(cls._workers),
+                'idle': len(cls._idle),
+                'in_process': not cls.is_enabled(),
+                'jobs': cls._jobs,
+                'in_process_jobs': cls._in_process_jobs,
+                'started': cls._started,
+                'failed_starts': cls._failed_starts,
+                'recycled': cls._recycled,
+                'timeouts': cls._timeouts,
+                'crashes': cls._crashes}
+
+        for operation in cls.TIMEOUTS:
+            histogram = Spans.get_histogram(cls.get_span_name(operation))
+            if histogram.get_count() == 0:
+                continue
+            latency: Dict[str, Any] = {'count': histogram.get_count()}
+            for percentile in cls.LATENCY_PERCENTILES:
+                latency[f'p{percentile:g}_seconds'] = (
+                    histogram.get_percentile(percentile) / 1000000.0)
+            report[operation] = latency
+        return report
+
+
+YoutubeDLPool.class_init()
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Runs youtube-dl jobs for YoutubeDLPool in a separate python process, so that
+extraction neither holds the add-on's GIL nor grows (or patches) the
+add-on's process. Started as a script:
+
+    python youtube_dl_worker.py <memory limit in bytes, 0 for none>
+
+Nothing but the python library and youtube_dl may be imported here, the
+add-on's modules need Kodi. When there are no workers, YoutubeDLPool runs
+jobs in-process with run_operation.
+
+The protocol is one json object per line. Requests arrive on stdin:
+
+    {"job": 7, "operation": "download" | "extract_info" | "playlist",
+     "url": "...", "options": {youtube-dl options},
+     "batch_size": 100, "limit": 0, "shuffle": true}
+
+For each request the worker writes, on stdout, any number of:
+
+    {"job": 7, "type": "log", "level": "debug" | "warning" | "error",
+     "line": "..."}
+    {"job": 7, "type": "progress", "status": {progress hook status}}
+    {"job": 7, "type": "entries", "entries": [...]}    (playlist only)
+
+followed by:
+
+    {"job": 7, "type": "result", "value": ..., "max_rss": bytes,
+     "error": null | {"type": "DownloadError", "message": "..."}}
+
+After each "entries" message the worker waits for {"job": 7, "more": bool}.
+Once started, the worker writes {"type": "ready", "pid": ..., "version": ...,
+"python": [major, minor]}.
+"""
+import itertools
+import json
+import os
+import random
+import sys
+import traceback
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import youtube_dl
+from youtube_dl.utils import DownloadError
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows
+
+DOWNLOAD: str = 'download'
+EXTRACT_INFO: str = 'extract_info'
+PLAYLIST: str = 'playlist'
+
+
+def read_playlist(ydl: youtube_dl.YoutubeDL, url: str, batch_size: int,
+                  limit: int = 0,
+                  shuffle: bool = False) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Reads a playlist's entries from youtube-dl's info dicts, without
+    processing them (extract_info process=False). The entries are then a
+    generator which fetches pages of the playlist as it is consumed.
+
+    :param ydl:
+    :param url: Of the playlist. May first resolve to another url, as a
+                channel does to its videos tab
+    :param batch_size: Entries yielded at a time
+    :param limit: Read at most this many entries, 0 for all
+    :param shuffle: Read every entry (every page) and yield them in random
+                    order, as playlistrandom does
+    :return: Lists of entries
+    """
+    playlist: Optional[Dict[str, Any]] = ydl.extract_info(url, download=False,
+                                                          process=False)
+    redirects: int = 0
+    while (playlist is not None and 'entries' not in playlist
+           and playlist.get('_type') in ('url', 'url_transparent')
+           and redirects < 3):
+        redirects += 1
+        playlist = ydl.extract_info(playlist['url'], download=False,
+                                    ie_key=playlist.get('ie_key'),
+                                    process=False)
+    if playlist is None:
+        return
+
+    entries = playlist.get('entries') or []
+    if limit > 0:
+        entries = itertools.islice(entries, limit)
+    if shuffle:
+        entries = list(entries)
+        random.shuffle(entries)
+
+    batch: List[Dict[str, Any]] = []
+    for entry in entries:
+        if entry is None:  # Skipped by ignoreerrors
+            continue
+
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if len(batch) > 0:
+        yield batch
+
+
+def get_max_rss() -> int:
+    """
+    :return: Peak resident memory of this process, in bytes. 0 if unknown
+    """
+    if resource is None:
+        return 0
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def limit_memory(limit: int) -> None:
+    """
+    Makes allocations beyond limit bytes fail with MemoryError
+
+    :param limit: 0 for no limit
+    :return:
+    """
+    if resource is None or limit <= 0:
+        return
+
+    # RLIMIT_DATA covers the heap without counting shared libraries, as
+    # RLIMIT_AS would
+
+    kind: int = getattr(resource, 'RLIMIT_DATA', resource.RLIMIT_AS)
+    try:
+        resource.setrlimit(kind, (limit, limit))
+    except (ValueError, OSError):
+        pass  # Leave the limit to YoutubeDLPool's check of max_rss
+
+
+class Connection:
+    """
+    The worker's end of the protocol. youtube-dl's own output to stdout is
+    moved to stderr, stdout carries only messages.
+    """
+
+    def __init__(self) -> None:
+        self._output = sys.stdout
+        sys.stdout = sys.stderr
+
+    def send(self, message: Dict[str, Any]) -> None:
+        self._output.write(json.dumps(message, default=str) + '\n')
+        self._output.flush()
+
+    @staticmethod
+    def receive() -> Optional[Dict[str, Any]]:
+        """
+        :return: The next request, None once the pool closed stdin
+        """
+        line: str = sys.stdin.readline()
+        if len(line) == 0:
+            return None
+        return json.loads(line)
+
+
+class JobLogger:
+    """
+    youtube-dl logger which passes every line on to the pool
+    """
+
+    def __init__(self, connection: Connection, job: int) -> None:
+        self._connection: Connection = connection
+        self._job: int = job
+
+    def _send(self, level: str, line: str) -> None:
+        self._connection.send({'job': self._job, 'type': 'log',
+                               'level': level, 'line': line})
+
+    def debug(self, line: str) -> None:
+        self._send('debug', line)
+
+    def warning(self, line: str) -> None:
+        self._send('warning', line)
+
+    def error(self, line: str) -> None:
+        self._send('error', line)
+
+
+def run_operation(ydl: youtube_dl.YoutubeDL, operation: str, url: str,
+                  batch_size: int = 100, limit: int = 0, shuffle: bool = False,
+                  entries_handler: Callable[[List[Dict[str, Any]]], bool] = None
+                  ) -> Any:
+    """
+    Runs one youtube-dl operation, in whichever process calls it
+
+    :param ydl:
+    :param operation: DOWNLOAD, EXTRACT_INFO or PLAYLIST
+    :param url:
+    :param batch_size: See read_playlist
+    :param limit: See read_playlist
+    :param shuffle: See read_playlist
+    :param entries_handler: Given each batch of a PLAYLIST's entries.
+                            Returns True when it wants no more
+    :return: What youtube-dl returns for the operation. None for PLAYLIST
+    """
+    if operation == DOWNLOAD:
+        return ydl.download([url])
+    if operation == EXTRACT_INFO:
+        return ydl.extract_info(url, download=False)
+    if operation == PLAYLIST:
+        for batch in read_playlist(ydl, url, batch_size, limit=limit,
+                                   shuffle=shuffle):
+            if entries_handler(batch):
+                break
+        return None
+    raise ValueError(f'Unknown operation: {operation}')
+
+
+class Disconnected(Exception):
+    """
+    The pool went away while a job was running
+    """
+    pass
+
+
+def run_job(connection: Connection, request: Dict[str, Any]) -> bool:
+    """
+    :param connection:
+    :param request:
+    :return: False when the pool has gone away
+    """
+    job: int = request.get('job', 0)
+    options: Dict[str, Any] = dict(request.get('options') or {})
+    options['logger'] = JobLogger(connection, job)
+    options['progress_hooks'] = [
+        lambda status: connection.send({'job': job, 'type': 'progress',
+                                        'status': status})]
+
+    def send_entries(entries: List[Dict[str, Any]]) -> bool:
+        connection.send({'job': job, 'type': 'entries', 'entries': entries})
+        reply: Optional[Dict[str, Any]] = connection.receive()
+        if reply is None:
+            raise Disconnected()
+        return not reply.get('more', False)
+
+    value: Any = None
+    error: Optional[Dict[str, str]] = None
+    try:
+        with youtube_dl.YoutubeDL(options) as ydl:
+            value = run_operation(ydl, request.get('operation'),
+                                  request.get('url'),
+                                  batch_size=request.get('batch_size', 100),
+                                  limit=request.get('limit', 0),
+                                  shuffle=request.get('shuffle', False),
+                                  entries_handler=send_entries)
+    except Disconnected:
+        return False
+    except DownloadError as e:
+        error = {'type': 'DownloadError', 'message': str(e)}
+    except MemoryError:
+        error = {'type': 'MemoryError', 'message': 'Worker memory limit exceeded'}
+    except Exception as e:
+        error = {'type': type(e).__name__, 'message': traceback.format_exc()}
+
+    connection.send({'job': job, 'type': 'result', 'value': value,
+                     'error': error, 'max_rss': get_max_rss()})
+    return True
+
+
+def main(argv: List[str]) -> int:
+    # This script's directory holds add-on modules (utils, json_utils...)
+    # which must not shadow anything youtube-dl imports
+
+    script_dir: str = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:] = [path for path in sys.path
+                   if os.path.abspath(path or '.') != script_dir]
+
+    limit_memory(int(argv[1]) if len(argv) > 1 else 0)
+    connection: Connection = Connection()
+    connection.send({'type': 'ready', 'pid': os.getpid(),
+                     'version': getattr(youtube_dl, '__version__', ''),
+                     'python': list(sys.version_info[:2])})
+    while True:
+        request: Optional[Dict[str, Any]] = connection.receive()
+        if request is None:
+            return 0
+        if not run_job(connection, request):
+            return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -17,6 +17,8 @@ from common.settings import Settings
 from backend.api import DiscoveryManager
 from common.logger import (LazyLogger, Trace)
 from cache.cache_manager import CacheManager
+from diagnostics.spans import SamplingProfiler, Spans
+from diagnostics.startup_trace import StartupTrace
 
 module_logger = LazyLogger.get_addon_module_logger(file_path=__file__)
 
@@ -36,23 +38,33 @@ def startup_non_main_thread() -> None:
     except Exception as e:
         module_logger.exception(e)
 
-    Settings.save_settings()
+    with StartupTrace.stage('Settings.save_settings'):
+        Settings.save_settings()
     Monitor.register_settings_changed_listener(
-        Settings.on_settings_changed, 'Settings.on_settings_changed')
+        LazyLogger.on_settings_changed, 'LazyLogger.on_settings_changed',
+        settings=Settings.LOGGING_SETTINGS)
+    Monitor.register_abort_listener(LazyLogger.stop_background_writer,
+                                   'LazyLogger.stop_background_writer')
     Monitor.register_settings_changed_listener(
-        LazyLogger.on_settings_changed, 'LazyLogger.on_settings_changed')
+        Spans.on_settings_changed, 'Spans.on_settings_changed',
+        settings=Settings.INSTRUMENTATION_SETTINGS)
+    Monitor.register_abort_listener(Spans.on_abort, 'Spans.on_abort')
+    if Settings.is_sampling_profiler_enabled():
+        SamplingProfiler.start()
     try:
         Settings.get_locale()
     except AbortException:
         reraise(*sys.exc_info())
     except Exception:
         module_logger.exception(e, lazy_logger=True)
-    DiscoveryManager.load_trailers()
+    with StartupTrace.stage('DiscoveryManager.load_trailers'):
+        DiscoveryManager.load_trailers()
 
     # Start the periodic garbage collector
 
     CacheManager.get_instance().start_cache_garbage_collection_thread()
     NetworkStats.auto_report(frequency_minutes=30)
+    StartupTrace.finish('discovery_started')
 
 
 def post_install() -> None:
@@ -29,6 +29,7 @@ from common.settings import Settings
 from backend import backend_constants
 from common.disk_utils import DiskUtils
 from backend.json_utils_basic import (JsonUtilsBasic)
+from diagnostics.spans import Spans
 from diagnostics.statistics import Statistics
 
 module_logger = LazyLogger.get_addon_module_logger(file_path=__file__)
@@ -112,6 +113,7 @@ class BaseCache:
         return status, movie
 
     @classmethod
+    @Spans.timed('cache.read_cache_json')
     def read_cache_json(cls, movie_id: str,
                         source: str = None,
                         error_msg: str = ''
@@ -209,6 +211,7 @@ class BaseCache:
         return movie
 
     @classmethod
+    @Spans.timed('cache.write_cache_json')
     def write_cache_json(cls, movie: RawMovie) -> None:
         """
             Write the given movie information into the cache as JSON
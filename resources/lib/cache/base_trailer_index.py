@@ -8,24 +8,16 @@ from pathlib import Path
 
 from common.imports import *
 
-import datetime
-import io
-import simplejson as json
-from common.movie import AbstractMovieId, TMDbMovieId, TMDbMovie
-from simplejson import (JSONDecodeError)
 import os
 import sys
 import threading
 
-import xbmcvfs
-
-from common.imports import *
-from common.constants import Constants
+from cache.movie_catalog import MovieCatalog
 from common.exceptions import AbortException
 from common.logger import LazyLogger
 from common.monitor import Monitor
+from common.movie import AbstractMovie, AbstractMovieId
 from common.settings import Settings
-from common.disk_utils import DiskUtils
 
 module_logger = LazyLogger.get_addon_module_logger(file_path=__file__)
 
@@ -50,14 +42,16 @@ class BaseTrailerIndex:
 
     CACHE_PATH_DIR: str = os.path.join(Settings.get_remote_db_cache_path(),
                                        'index')
+    SOURCE: str = None
     _lock = threading.RLock()
-    _last_saved = datetime.datetime(year=1900, month=1, day=1)
     _parameters = None
-    _unsaved_changes: int = 0
     _logger = None
 
     _cache: Dict[str, AbstractMovieId] = {}
     _cache_loaded: bool = False
+
+    # json file used before the MovieCatalog, converted on first use
+
     _cache_path: Path = None
 
     @classmethod
@@ -74,11 +68,15 @@ class BaseTrailerIndex:
             cls._logger.exception()
 
     @classmethod
-    def add(cls, abstract_movie_id: AbstractMovieId, flush: bool = False) -> None:
+    def add(cls, abstract_movie_id: Union[AbstractMovieId, AbstractMovie],
+            flush: bool = False) -> None:
         """
+        Adds, or replaces, the entry for the given movie. When given a
+        fully discovered movie, its title, year and trailer are also
+        recorded in the MovieCatalog, to correlate it with other sources.
 
         :param abstract_movie_id:
-        :param flush:
+        :param flush: Ignored, changes are always committed
         :return:
          """
         # cls._logger.debug(f'movie_id: {abstract_movie_id}')
@@ -86,13 +84,14 @@ class BaseTrailerIndex:
         with cls._lock:
             try:
                 cls.load_cache()
-                if isinstance(abstract_movie_id, TMDbMovie):
-                    # cls._logger.debug(f'Converting to TMDBMovie')
-                    movie = abstract_movie_id.get_as_movie_id_type()
-                    # cls._logger.debug(f'Converted to: {type(abstract_movie_id)}')
+                with MovieCatalog.transaction():
+                    if isinstance(abstract_movie_id, AbstractMovie):
+                        MovieCatalog.update_details(abstract_movie_id)
+                        abstract_movie_id = abstract_movie_id.get_as_movie_id_type()
+                    MovieCatalog.put_trailer_index_entry(abstract_movie_id)
                 cls._cache[abstract_movie_id.get_id()] = abstract_movie_id
-                cls._unsaved_changes += 1
-                cls.save_cache(flush=flush)  # If needed
+            except AbortException:
+                reraise(*sys.exc_info())
             except Exception:
                 cls._logger.exception()
 
@@ -107,21 +106,18 @@ class BaseTrailerIndex:
         known whether to include the trailers or not.
 
         :param abstract_movie_id:
-        :param flush:
+        :param flush: Ignored, changes are always committed
         :return:
          """
         with cls._lock:
             try:
                 cls.load_cache()
-                try:
-                    movie_id: str = abstract_movie_id.get_id()
-                    if movie_id in cls._cache:
-                        del cls._cache[movie_id]
-                        cls._unsaved_changes += 1
-                except KeyError:
-                    pass
-
-                cls.save_cache(flush=flush)  # If needed
+                movie_id: str = abstract_movie_id.get_id()
+                if movie_id in cls._cache:
+                    MovieCatalog.remove_trailer_index_entry(cls.SOURCE, movie_id)
+                    del cls._cache[movie_id]
+            except AbortException:
+                reraise(*sys.exc_info())
             except Exception:
                 cls._logger.exception()
 
@@ -204,110 +200,72 @@ class BaseTrailerIndex:
     def clear(cls) -> None:
         with cls._lock:
             try:
-                cls._cache.clear()
-                cls.save_cache(flush=True)
+                cls.load_cache()
+                MovieCatalog.clear_trailer_index(cls.SOURCE)
+                cls._cache = {}
+            except AbortException:
+                reraise(*sys.exc_info())
             except Exception:
                 cls._logger.exception()
 
     @classmethod
     def load_cache(cls) -> None:
         """
-        Loads the cache of TMDb Ids which are known to have trailers.
+        Reads this index's entries from the MovieCatalog. The first time,
+        the entries of the json file used before the catalog are moved into
+        the catalog.
 
         :return:
         """
-        try:
+        with cls._lock:
             if cls._cache_loaded:
                 return
 
-            parent_dir, file_name = os.path.split(cls._cache_path)
-            DiskUtils.create_path_if_needed(parent_dir)
-
-            with cls._lock:
-                if os.path.exists(cls._cache_path):
-                    with io.open(cls._cache_path, mode='rt', newline=None,
-                                 encoding='utf-8') as cache_file:
-                        temp_cache: Dict[str, Dict[str, str]] = json.load(
-                            cache_file, encoding='utf-8')
-                        new_cache: Dict[str, AbstractMovieId] = {}
-                        for data in temp_cache.values():
-                            try:
-                                movie_id = AbstractMovieId.de_serialize(data)
-                                new_cache[movie_id.get_id()] = movie_id
-                            except Exception:
-                                cls._logger.exception()
-
-                        cls._cache = new_cache
-                        cls._last_saved = datetime.datetime.now()
-                        cls._unsaved_changes = 0
-                else:
-                    cls._cache.clear()
-
+            try:
+                legacy: Dict[str, Dict[str, Any]] = MovieCatalog.read_legacy_file(
+                    str(cls._cache_path))
+                if legacy is not None:
+                    with MovieCatalog.transaction():
+                        for data in legacy.values():
+                            movie_id = AbstractMovieId.de_serialize(data)
+                            if movie_id is not None:
+                                MovieCatalog.put_trailer_index_entry(movie_id)
+                    MovieCatalog.remove_legacy_file(str(cls._cache_path))
+
+                cls._cache = {movie_id.get_id(): movie_id for movie_id in
+                              MovieCatalog.get_trailer_index(cls.SOURCE)}
                 cls._cache_loaded = True
-
-            Monitor.throw_exception_if_abort_requested()
-
-        except AbortException:
-            reraise(*sys.exc_info())
-        except IOError as e:
-            cls._logger.exception('')
-        except JSONDecodeError as e:
-            os.remove(cls._cache_path)
-        except Exception as e:
-            cls._logger.exception('')
+                Monitor.throw_exception_if_abort_requested()
+            except AbortException:
+                reraise(*sys.exc_info())
+            except Exception:
+                cls._logger.exception(f'Failed to load index: {cls.SOURCE}')
 
     @classmethod
     def save_cache(cls, flush: bool = False) -> None:
         """
+        add and remove commit their changes as they are made. Use flush
+        after changing entries returned by get or get_all, to write every
+        entry.
+
         :param flush:
         :return:
         """
-        flush = True
+        if not flush:
+            return
+
         with cls._lock:
             if not cls._cache_loaded:
                 return
 
-            if (not flush and
-                    (cls._unsaved_changes <
-                     Constants.TRAILER_CACHE_FLUSH_UPDATES)
-                    and
-                    (datetime.datetime.now() - cls._last_saved) <
-                    datetime.timedelta(minutes=5)):
-                return
-
             try:
-                # cls._logger.debug(f'saving cache {cls._cache_path}')
-                parent_dir, file_name = os.path.split(cls._cache_path)
-                DiskUtils.create_path_if_needed(parent_dir)
-                tmp_path: Path = Path(str(cls._cache_path) + '.tmp')
-                tmp_path = Path(xbmcvfs.validatePath(tmp_path.as_posix()))
-                tmp_cache: Dict[str, Dict[str, str]] = {}
-                for movie in cls._cache.values():
-                    tmp_cache[movie.get_id()] = movie.serialize()
-
-                with cls._lock, io.open(tmp_path, mode='wt', newline=None,
-                                        encoding='utf-8') as cache_file:
-                    # Can create reverse_cache from cache
-                    json_text = json.dumps(tmp_cache,
-                                           ensure_ascii=False,
-                                           indent=3, sort_keys=True)
-                    cache_file.write(json_text)
-                    cache_file.flush()
-                    cls._last_saved = datetime.datetime.now()
-                    cls._unsaved_changes = 0
-
-                try:
-                    os.replace(tmp_path, cls._cache_path)
-                except OSError:
-                    cls._logger.exception(f'Failed to replace missing movie'
-                                          f' information cache: {cls._cache_path}')
-
+                with MovieCatalog.transaction():
+                    for movie_id in cls._cache.values():
+                        MovieCatalog.put_trailer_index_entry(movie_id)
                 Monitor.throw_exception_if_abort_requested()
             except AbortException:
                 reraise(*sys.exc_info())
-            except IOError as e:
-                cls._logger.exception()
-            except Exception as e:
+            except Exception:
                 cls._logger.exception()
 
 
@@ -30,6 +30,7 @@ from common.movie_constants import MovieField, MovieType
 from common.settings import Settings
 from backend import backend_constants
 from common.disk_utils import DiskUtils
+from diagnostics.spans import Spans
 from diagnostics.statistics import Statistics
 
 module_logger = LazyLogger.get_addon_module_logger(file_path=__file__)
@@ -100,6 +101,7 @@ class Cache:
         return status, tmdb_movie
 
     @classmethod
+    @Spans.timed('cache.read_tmdb_cache_json')
     def read_tmdb_cache_json(cls, tmdb_id: Union[int, str],
                              error_msg: str = ''
                              ) -> Union[TMDbMovie, None]:
@@ -196,6 +198,7 @@ class Cache:
         return tmdb_movie
 
     @classmethod
+    @Spans.timed('cache.write_tmdb_cache_json')
     def write_tmdb_cache_json(cls, tmdb_movie: TMDbMovie,
                               library_id: str) -> None:
         """
@@ -15,6 +15,7 @@ import threading
 
 import xbmcvfs
 
+from backend.download_staging import DownloadStaging
 from common.constants import Constants
 from common.imports import *
 from common.logger import LazyLogger, Trace
@@ -440,13 +441,16 @@ class CacheManager:
         """
         local_class = CacheManager
 
-        # Purge off any stray undeleted temp files
+        # Purge off any stray undeleted temp files. Incomplete downloads
+        # are kept, in the staging folder, until they become stale.
+
         folder = xbmcvfs.translatePath('special://temp')
         to_delete = os.path.join(folder, '_rt_*')
         to_delete = glob.glob(to_delete)
         for a_file in to_delete:
             Monitor.throw_exception_if_abort_requested()
             os.remove(a_file)
+        DownloadStaging.reclaim(folder)
 
         del folder
         del to_delete
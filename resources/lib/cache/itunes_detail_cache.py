@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Remembers the trailers offered by each iTunes feature page, so that
+DiscoverItunesMovies does not fetch the page again (through youtube-dl)
+while the movie's entry in the iTunes feed is unchanged.
+
+Each page is stored with a fingerprint of the feed entry it was fetched
+for. When Apple posts a new trailer, the feed entry, and so its
+fingerprint, changes and the page is fetched again. Only what
+DiscoverItunesMovies needs to choose a trailer is kept, the choice itself
+is made again each time, since it depends upon the settings.
+
+Fetched pages are written in batches (flush), in the MovieCatalog
+database.
+"""
+import hashlib
+import sys
+import threading
+import time
+
+import simplejson as json
+
+from cache.movie_catalog import MovieCatalog
+from common.exceptions import AbortException
+from common.imports import *
+from common.logger import LazyLogger
+from common.movie_constants import MovieType
+from diagnostics.statistics import Statistics
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+
+class ITunesDetailCache:
+    """
+    Process wide. Thread safe.
+    """
+    SECONDS_PER_DAY: Final[int] = 24 * 60 * 60
+
+    # Trailer urls on Apple's servers change without the feed changing
+
+    EXPIRE_DAYS: Final[int] = 14
+
+    # Fields of each trailer (as reported by youtube-dl) and of each of its
+    # formats, which are kept
+
+    TRAILER_FIELDS: Final[Tuple[str, ...]] = ('fulltitle', 'language',
+                                              'thumbnail', 'upload_date')
+    FORMAT_FIELDS: Final[Tuple[str, ...]] = ('language', 'height', 'url')
+
+    _logger: LazyLogger = None
+    _lock: threading.RLock = threading.RLock()
+
+    # feature_url -> (fingerprint, trailers json, time fetched)
+
+    _details: Dict[str, Tuple[str, str, float]] = None
+    _unsaved: Dict[str, Tuple[str, str, float]] = {}
+
+    @classmethod
+    def class_init(cls) -> None:
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+    @staticmethod
+    def get_fingerprint(feed_entry: Dict[str, Any]) -> str:
+        """
+        :param feed_entry: A movie's entry in the iTunes feed
+        :return: Value which changes when the entry changes
+        """
+        text: str = json.dumps(feed_entry, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def get_trailers(cls, feature_url: str,
+                     fingerprint: str) -> Optional[List[MovieType]]:
+        """
+        :param feature_url:
+        :param fingerprint: Of the feed entry for the feature
+        :return: The trailers (downloadable_trailers of
+                 DiscoverItunesMovies.get_detailed_trailer_information)
+                 offered by the feature page, or None if the page must be
+                 fetched
+        """
+        try:
+            with cls._lock:
+                cls._load()
+                entry: Optional[Tuple[str, str, float]]
+                entry = cls._details.get(feature_url)
+
+            if (entry is None or entry[0] != fingerprint
+                    or time.time() - entry[2] > cls.EXPIRE_DAYS * cls.SECONDS_PER_DAY):
+                Statistics.add_itunes_detail_cache_miss()
+                return None
+
+            Statistics.add_itunes_detail_cache_hit()
+            return json.loads(entry[1])
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception:
+            cls._logger.exception(f'feature_url: {feature_url}')
+        return None
+
+    @classmethod
+    def add_trailers(cls, feature_url: str, fingerprint: str,
+                     trailers: List[MovieType]) -> None:
+        """
+        Records the trailers of a successfully fetched feature page. Saved
+        by the next flush.
+
+        :param feature_url:
+        :param fingerprint: Of the feed entry for the feature
+        :param trailers: As reported by youtube-dl
+        :return:
+        """
+        kept: List[MovieType] = []
+        for trailer in trailers:
+            kept_trailer: MovieType = {field: trailer[field]
+                                       for field in cls.TRAILER_FIELDS
+                                       if field in trailer}
+            kept_trailer['formats'] = [
+                {field: promotion_format[field]
+                 for field in cls.FORMAT_FIELDS if field in promotion_format}
+                for promotion_format in trailer.get('formats', [])]
+            kept.append(kept_trailer)
+
+        entry: Tuple[str, str, float] = (fingerprint,
+                                         json.dumps(kept, ensure_ascii=False),
+                                         time.time())
+        with cls._lock:
+            cls._load()
+            cls._details[feature_url] = entry
+            cls._unsaved[feature_url] = entry
+
+    @classmethod
+    def flush(cls) -> None:
+        """
+        Saves the pages added since the last flush, in one transaction, and
+        removes expired pages.
+
+        :return:
+        """
+        try:
+            with cls._lock:
+                unsaved: Dict[str, Tuple[str, str, float]] = cls._unsaved
+                cls._unsaved = {}
+
+            with MovieCatalog.transaction():
+                MovieCatalog.put_itunes_details(
+                    (feature_url, fingerprint, trailers, fetched)
+                    for feature_url, (fingerprint, trailers, fetched)
+                    in unsaved.items())
+                removed: int = MovieCatalog.remove_itunes_details(
+                    time.time() - cls.EXPIRE_DAYS * cls.SECONDS_PER_DAY)
+
+            if cls._logger.isEnabledFor(LazyLogger.DEBUG):
+                cls._logger.debug(f'Saved {len(unsaved)} iTunes feature pages '
+                                  f'removed {removed}')
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception:
+            cls._logger.exception('')
+
+    @classmethod
+    def _load(cls) -> None:
+        """
+        Reads every cached page, on first use. Must hold _lock.
+        """
+        if cls._details is not None:
+            return
+
+        cls._details = {}
+        for feature_url, fingerprint, trailers, fetched in \
+                MovieCatalog.get_itunes_details():
+            cls._details[feature_url] = (fingerprint, trailers, fetched)
+
+
+ITunesDetailCache.class_init()
@@ -4,13 +4,13 @@ Created on 9/30/21
 
 @author: Frank Feuerbacher
 """
-import datetime
 import threading
 from pathlib import Path
 
 from cache.base_trailer_index import BaseTrailerIndex
 from common.imports import *
 from common.logger import LazyLogger
+from common.movie_constants import MovieField
 from common.movie import ITunesMovieId, ITunesMovie, AbstractMovieId, ITunesMovieId, \
     ITunesMovie
 
@@ -20,11 +20,10 @@ module_logger = LazyLogger.get_addon_module_logger(file_path=__file__)
 class ITunesTrailerIndex(BaseTrailerIndex):
 
     CACHE_NAME: str = 'itunes_trailer_index'
+    SOURCE: str = MovieField.ITUNES_SOURCE
 
     _lock = threading.RLock()
-    _last_saved = datetime.datetime(year=1900, month=1, day=1)
     _parameters = None
-    _unsaved_changes: int = 0
     _logger: LazyLogger = None
 
     _cache: Dict[str, ITunesMovieId] = {}
@@ -57,11 +56,6 @@ class ITunesTrailerIndex(BaseTrailerIndex):
                               f'{movie.has_local_trailer()} '
                               f'trailer: {movie.get_has_trailer()}')
 
-        if isinstance(movie, ITunesMovie):
-            # cls._logger.debug(f'Converting to ITunesMovie')
-            movie = movie.get_as_movie_id_type()
-            # cls._logger.debug(f'Converted to: {type(movie)}')
-
         super().add(movie, flush)
 
     @classmethod
@@ -10,12 +10,12 @@ from pathlib import Path
 from cache.base_trailer_index import BaseTrailerIndex
 from cache.cache import Cache
 
-import datetime
 from common.movie import (AbstractMovieId, TMDbMovieId, TMDbMovie, LibraryMovieId,
                           LibraryMovie)
 import threading
 from common.imports import *
 from common.logger import LazyLogger
+from common.movie_constants import MovieField
 
 
 module_logger = LazyLogger.get_addon_module_logger(file_path=__file__)
@@ -24,11 +24,10 @@ module_logger = LazyLogger.get_addon_module_logger(file_path=__file__)
 class LibraryTrailerIndex(BaseTrailerIndex):
 
     CACHE_NAME: str = 'library_trailer_index'
+    SOURCE: str = MovieField.LIBRARY_SOURCE
 
     _lock = threading.RLock()
-    _last_saved = datetime.datetime(year=1900, month=1, day=1)
     _parameters = None
-    _unsaved_changes: int = 0
     _logger = None
 
     _cache: Dict[str, LibraryMovieId] = {}
@@ -62,11 +61,6 @@ class LibraryTrailerIndex(BaseTrailerIndex):
                               f'{movie.has_local_trailer()} '
                               f'trailer: {movie.get_trailer_path()}')
 
-        if isinstance(movie, LibraryMovie):
-            # cls._logger.debug(f'Converting to LibraryMovie')
-            movie = movie.get_as_movie_id_type()
-            # cls._logger.debug(f'Converted to: {type(movie)}')
-
         if cls._first_use:
             cls.check_local_trailer_entries()
 
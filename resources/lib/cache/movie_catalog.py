@@ -0,0 +1,693 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+One indexed catalog of every movie known to the caches, regardless of
+source. It replaces the per-source json files of the reverse index caches
+(BaseReverseIndexCache) and the trailer indexes (BaseTrailerIndex).
+
+Each movie, as known by one source, is one row keyed by (source, movie_id),
+where movie_id is the source's own id (library id, TMDb id, iTunes id or
+TFH id). Secondary indexes on tmdb_id, library_id, youtube_id and
+(title_key, year) answer cross-source questions, such as "which TMDb movie
+has this TFH trailer", with one indexed query instead of a walk through
+several caches.
+
+    in_reverse_index    The row belongs to the source's BaseReverseIndexCache
+    in_trailer_index    The row belongs to the source's BaseTrailerIndex
+
+The same database also holds the results of TMDb title searches, see
+TMDbSearchCache, and the trailers offered by iTunes feature pages, see
+ITunesDetailCache.
+
+The catalog is a sqlite database, <remote_db_cache>/index/movie_catalog.db.
+Every change is made in a transaction; use MovieCatalog.transaction() to
+group several changes.
+"""
+import contextlib
+import io
+import os
+import re
+import sqlite3
+import sys
+import threading
+import unicodedata
+
+import simplejson as json
+
+from common.exceptions import AbortException
+from common.imports import *
+from common.logger import LazyLogger
+from common.movie import AbstractMovie, AbstractMovieId
+from common.movie_constants import MovieField
+from common.settings import Settings
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+
+class MovieCatalog:
+    """
+    Process wide catalog. Thread safe.
+    """
+    SCHEMA_VERSION: Final[int] = 4
+    CATALOG_FILE: Final[str] = 'movie_catalog.db'
+
+    # Runtimes of different cuts (and sources) of the same movie differ
+
+    RUNTIME_TOLERANCE_SECONDS: Final[int] = 15 * 60
+
+    # Results of TMDb title searches, see TMDbSearchCache. tmdb_id is NULL
+    # when nothing was found
+
+    TMDB_SEARCH_TABLE: Final[str] = '''CREATE TABLE IF NOT EXISTS tmdb_search (
+               search_key TEXT NOT NULL PRIMARY KEY,
+               tmdb_id INTEGER,
+               searched REAL NOT NULL,
+               used REAL NOT NULL) WITHOUT ROWID'''
+    TMDB_SEARCH_INDEX: Final[str] = ('CREATE INDEX IF NOT EXISTS tmdb_search_used '
+                                     'ON tmdb_search (used)')
+
+    # Trailers offered by an iTunes feature page, see ITunesDetailCache.
+    # fingerprint identifies the feed entry the page was fetched for
+
+    ITUNES_DETAIL_TABLE: Final[str] = '''CREATE TABLE IF NOT EXISTS itunes_detail (
+               feature_url TEXT NOT NULL PRIMARY KEY,
+               fingerprint TEXT NOT NULL,
+               trailers TEXT NOT NULL,
+               fetched REAL NOT NULL) WITHOUT ROWID'''
+    TABLES: Final[Tuple[str, ...]] = ('movie', 'tmdb_search', 'itunes_detail')
+
+    SCHEMA: Final[Tuple[str, ...]] = (
+        '''CREATE TABLE IF NOT EXISTS movie (
+               source TEXT NOT NULL,
+               movie_id TEXT NOT NULL,
+               tmdb_id INTEGER,
+               library_id INTEGER,
+               youtube_id TEXT,
+               title_key TEXT,
+               year INTEGER,
+               runtime INTEGER,
+               in_reverse_index INTEGER NOT NULL DEFAULT 0,
+               in_trailer_index INTEGER NOT NULL DEFAULT 0,
+               has_trailer INTEGER,
+               has_local_trailer INTEGER,
+               PRIMARY KEY (source, movie_id)) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS movie_tmdb_id ON movie (tmdb_id)',
+        'CREATE INDEX IF NOT EXISTS movie_library_id ON movie (library_id)',
+        'CREATE INDEX IF NOT EXISTS movie_youtube_id ON movie (youtube_id)',
+        'CREATE INDEX IF NOT EXISTS movie_title_year ON movie (title_key, year)',
+        TMDB_SEARCH_TABLE,
+        TMDB_SEARCH_INDEX,
+        ITUNES_DETAIL_TABLE)
+
+    # Statements which upgrade a catalog from the keyed version to the next
+
+    UPGRADES: Final[Dict[int, Tuple[str, ...]]] = {
+        1: ('ALTER TABLE movie ADD COLUMN runtime INTEGER',),
+        2: (TMDB_SEARCH_TABLE, TMDB_SEARCH_INDEX),
+        3: (ITUNES_DETAIL_TABLE,)}
+
+    # AbstractMovieId subclass stored for each source, see
+    # AbstractMovieId.de_serialize
+
+    MOVIE_ID_CLASSES: Final[Dict[str, str]] = {
+        MovieField.TMDB_SOURCE: 'TMDbMovieId',
+        MovieField.LIBRARY_SOURCE: 'LibraryMovieId',
+        MovieField.TFH_SOURCE: 'TFHMovieId',
+        MovieField.ITUNES_SOURCE: 'ITunesMovieId'}
+
+    YOUTUBE_ID_PATTERN: Final[Pattern] = re.compile(
+        r'(?:video_id=|[?&]v=|youtu\.be/|/embed/)([A-Za-z0-9_-]{11})')
+
+    _logger: LazyLogger = None
+    _lock: threading.RLock = threading.RLock()
+    _connection: sqlite3.Connection = None
+    _transaction_depth: int = 0
+
+    @classmethod
+    def class_init(cls) -> None:
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+    @classmethod
+    def get_catalog_path(cls) -> str:
+        return os.path.join(Settings.get_remote_db_cache_path(), 'index',
+                            cls.CATALOG_FILE)
+
+    @classmethod
+    def _get_connection(cls) -> sqlite3.Connection:
+        """
+        Opens the catalog on first use. An unreadable catalog is replaced by
+        an empty one, it is rebuilt as movies are discovered again.
+
+        :return:
+        """
+        if cls._connection is not None:
+            return cls._connection
+
+        path: str = cls.get_catalog_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            cls._connection = cls._open(path)
+        except sqlite3.DatabaseError as e:
+            cls._logger.error(f'Replacing unreadable catalog: {path} {e}')
+            for suffix in ('', '-wal', '-shm'):
+                try:
+                    os.remove(path + suffix)
+                except OSError:
+                    pass
+            cls._connection = cls._open(path)
+        return cls._connection
+
+    @classmethod
+    def _open(cls, path: str) -> sqlite3.Connection:
+        # Transactions are begun explicitly, see transaction
+
+        connection: sqlite3.Connection = sqlite3.connect(
+            path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            version: int = connection.execute('PRAGMA user_version').fetchone()[0]
+            if version != cls.SCHEMA_VERSION:
+                connection.execute('BEGIN IMMEDIATE')
+                if 0 < version < cls.SCHEMA_VERSION:
+                    for old_version in range(version, cls.SCHEMA_VERSION):
+                        for statement in cls.UPGRADES[old_version]:
+                            connection.execute(statement)
+                else:
+                    # New, or written by a newer version of the add-on
+
+                    for table in cls.TABLES:
+                        connection.execute(f'DROP TABLE IF EXISTS {table}')
+                    for statement in cls.SCHEMA:
+                        connection.execute(statement)
+                connection.execute(f'PRAGMA user_version={cls.SCHEMA_VERSION}')
+                connection.execute('COMMIT')
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    @classmethod
+    @contextlib.contextmanager
+    def transaction(cls) -> Iterator[sqlite3.Connection]:
+        """
+        Groups changes into one transaction, which is rolled back if the
+        block raises. Transactions nest, only the outermost one commits.
+
+        :return: The connection to execute statements on
+        """
+        with cls._lock:
+            connection: sqlite3.Connection = cls._get_connection()
+            if cls._transaction_depth > 0:
+                cls._transaction_depth += 1
+                try:
+                    yield connection
+                finally:
+                    cls._transaction_depth -= 1
+                return
+
+            connection.execute('BEGIN IMMEDIATE')
+            cls._transaction_depth = 1
+            try:
+                yield connection
+            except BaseException:
+                cls._transaction_depth = 0
+                connection.execute('ROLLBACK')
+                raise
+            cls._transaction_depth = 0
+            connection.execute('COMMIT')
+
+    @classmethod
+    def _query(cls, sql: str, parameters: Tuple[Any, ...] = ()) -> List[Tuple]:
+        with cls._lock:
+            return cls._get_connection().execute(sql, parameters).fetchall()
+
+    @staticmethod
+    def get_title_key(title: str) -> str:
+        """
+        Normalizes a title for matching: case, accents and punctuation are
+        ignored.
+
+        :param title:
+        :return: Lower case words separated by single spaces, or None
+        """
+        if not title:
+            return None
+
+        unaccented: str = ''.join(
+            char for char in unicodedata.normalize('NFKD', title)
+            if not unicodedata.combining(char))
+        return ' '.join(re.findall(r'\w+', unaccented.casefold())) or None
+
+    @classmethod
+    def get_youtube_id(cls, url: str) -> str:
+        """
+        :param url: Trailer url or youtube plugin path
+        :return: The youtube video id, or None
+        """
+        if not url:
+            return None
+
+        match = cls.YOUTUBE_ID_PATTERN.search(url)
+        if match is None:
+            return None
+        return match.group(1)
+
+    @staticmethod
+    def _to_int(value: Any) -> Optional[int]:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    # Reverse index (BaseReverseIndexCache)
+
+    @classmethod
+    def set_reverse_tmdb_id(cls, source: str, movie_id: str,
+                            tmdb_id: str) -> None:
+        """
+        :param source:
+        :param movie_id: Id of the movie within source
+        :param tmdb_id:
+        :return:
+        """
+        library_id: Optional[int] = None
+        if source == MovieField.LIBRARY_SOURCE:
+            library_id = cls._to_int(movie_id)
+
+        with cls.transaction() as connection:
+            connection.execute(
+                '''INSERT INTO movie (source, movie_id, tmdb_id, library_id,
+                                      in_reverse_index)
+                   VALUES (?, ?, ?, ?, 1)
+                   ON CONFLICT (source, movie_id) DO UPDATE SET
+                       tmdb_id = COALESCE(excluded.tmdb_id, tmdb_id),
+                       library_id = COALESCE(excluded.library_id, library_id),
+                       in_reverse_index = 1''',
+                (source, movie_id, cls._to_int(tmdb_id), library_id))
+
+    @classmethod
+    def remove_reverse_tmdb_id(cls, source: str, movie_id: str) -> None:
+        with cls.transaction() as connection:
+            connection.execute(
+                'UPDATE movie SET in_reverse_index = 0 '
+                'WHERE source = ? AND movie_id = ?', (source, movie_id))
+
+    @classmethod
+    def get_reverse_tmdb_id(cls, source: str, movie_id: str) -> Optional[int]:
+        """
+        :param source:
+        :param movie_id:
+        :return: TMDb id recorded in source's reverse index for movie_id
+        """
+        rows: List[Tuple] = cls._query(
+            'SELECT tmdb_id FROM movie WHERE source = ? AND movie_id = ? '
+            'AND in_reverse_index = 1', (source, movie_id))
+        if not rows:
+            return None
+        return rows[0][0]
+
+    @classmethod
+    def get_reverse_movie_id(cls, source: str, tmdb_id: str) -> Optional[str]:
+        """
+        :param source:
+        :param tmdb_id:
+        :return: Id of the movie in source's reverse index which has tmdb_id
+        """
+        rows: List[Tuple] = cls._query(
+            'SELECT movie_id FROM movie WHERE tmdb_id = ? AND source = ? '
+            'AND in_reverse_index = 1 LIMIT 1', (cls._to_int(tmdb_id), source))
+        if not rows:
+            return None
+        return rows[0][0]
+
+    @classmethod
+    def get_reverse_index(cls, source: str) -> List[Tuple[str, Optional[int]]]:
+        """
+        :param source:
+        :return: (movie_id, tmdb_id) of every entry in source's reverse index
+        """
+        return cls._query('SELECT movie_id, tmdb_id FROM movie '
+                          'WHERE source = ? AND in_reverse_index = 1', (source,))
+
+    @classmethod
+    def clear_reverse_index(cls, source: str) -> None:
+        with cls.transaction() as connection:
+            connection.execute('UPDATE movie SET in_reverse_index = 0 '
+                               'WHERE source = ?', (source,))
+
+    # Trailer index (BaseTrailerIndex)
+
+    @classmethod
+    def put_trailer_index_entry(cls, movie_id: AbstractMovieId) -> None:
+        """
+        :param movie_id:
+        :return:
+        """
+        with cls.transaction() as connection:
+            connection.execute(
+                '''INSERT INTO movie (source, movie_id, tmdb_id, library_id,
+                                      has_trailer, has_local_trailer,
+                                      in_trailer_index)
+                   VALUES (?, ?, ?, ?, ?, ?, 1)
+                   ON CONFLICT (source, movie_id) DO UPDATE SET
+                       tmdb_id = COALESCE(excluded.tmdb_id, tmdb_id),
+                       library_id = COALESCE(excluded.library_id, library_id),
+                       has_trailer = excluded.has_trailer,
+                       has_local_trailer = excluded.has_local_trailer,
+                       in_trailer_index = 1''',
+                (movie_id.get_source(), movie_id.get_id(),
+                 cls._to_int(movie_id.get_tmdb_id()),
+                 cls._to_int(movie_id.get_library_id()),
+                 movie_id.get_has_trailer(), movie_id.has_local_trailer()))
+
+    @classmethod
+    def remove_trailer_index_entry(cls, source: str, movie_id: str) -> None:
+        with cls.transaction() as connection:
+            connection.execute(
+                'UPDATE movie SET in_trailer_index = 0 '
+                'WHERE source = ? AND movie_id = ?', (source, movie_id))
+
+    @classmethod
+    def get_trailer_index(cls, source: str) -> List[AbstractMovieId]:
+        """
+        :param source:
+        :return: Every entry of source's trailer index
+        """
+        class_name: str = cls.MOVIE_ID_CLASSES[source]
+        movie_ids: List[AbstractMovieId] = []
+        for movie_id, tmdb_id, library_id, has_trailer, has_local_trailer in \
+                cls._query('SELECT movie_id, tmdb_id, library_id, has_trailer, '
+                           'has_local_trailer FROM movie '
+                           'WHERE source = ? AND in_trailer_index = 1',
+                           (source,)):
+            movie_ids.append(AbstractMovieId.de_serialize({
+                MovieField.CLASS: class_name,
+                MovieField.MOVIEID: movie_id,
+                MovieField.LIBRARY_ID: library_id,
+                MovieField.TMDB_ID: tmdb_id,
+                MovieField.HAS_TRAILER: None if has_trailer is None
+                else bool(has_trailer),
+                MovieField.HAS_LOCAL_TRAILER: None if has_local_trailer is None
+                else bool(has_local_trailer)}))
+        return movie_ids
+
+    @classmethod
+    def clear_trailer_index(cls, source: str) -> None:
+        with cls.transaction() as connection:
+            connection.execute('UPDATE movie SET in_trailer_index = 0 '
+                               'WHERE source = ?', (source,))
+
+    # Details used to correlate sources
+
+    @classmethod
+    def update_details(cls, movie: AbstractMovie) -> None:
+        """
+        Records the title, year, runtime, youtube trailer and known ids of a
+        fully discovered movie.
+
+        :param movie:
+        :return:
+        """
+        title_key: str = cls.get_title_key(movie.get_title())
+        year: Optional[int] = cls._to_int(movie.get_year()) or None
+        runtime: Optional[int] = cls._to_int(movie.get_runtime()) or None
+        tmdb_id: Optional[int] = cls._to_int(movie.get_tmdb_id())
+        youtube_id: str = cls.get_youtube_id(movie.get_trailer_path())
+        with cls.transaction() as connection:
+            connection.execute(
+                '''INSERT INTO movie (source, movie_id, tmdb_id, library_id,
+                                      youtube_id, title_key, year, runtime)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (source, movie_id) DO UPDATE SET
+                       tmdb_id = COALESCE(excluded.tmdb_id, tmdb_id),
+                       library_id = COALESCE(excluded.library_id, library_id),
+                       youtube_id = COALESCE(excluded.youtube_id, youtube_id),
+                       title_key = COALESCE(excluded.title_key, title_key),
+                       year = COALESCE(excluded.year, year),
+                       runtime = COALESCE(excluded.runtime, runtime)''',
+                (movie.get_source(), movie.get_id(), tmdb_id,
+                 cls._to_int(movie.get_library_id()),
+                 youtube_id, title_key, year, runtime))
+
+    @classmethod
+    def add_tmdb_titles(cls,
+                        titles: Iterable[Tuple[Any, str, Any, Any]]) -> None:
+        """
+        Records titles seen in TMDb discovery pages and search results.
+        Known details are only filled in, never replaced.
+
+        :param titles: (tmdb_id, title, year, runtime seconds) of each movie.
+                       Year and runtime may be None or 0 when unknown
+        :return:
+        """
+        rows: List[Tuple[str, int, str, Optional[int], Optional[int]]] = []
+        for tmdb_id, title, year, runtime in titles:
+            tmdb_id = cls._to_int(tmdb_id)
+            title_key: str = cls.get_title_key(title)
+            if tmdb_id is None or title_key is None:
+                continue
+            rows.append((str(tmdb_id), tmdb_id, title_key,
+                         cls._to_int(year) or None,
+                         cls._to_int(runtime) or None))
+        if not rows:
+            return
+
+        with cls.transaction() as connection:
+            connection.executemany(
+                f'''INSERT INTO movie (source, movie_id, tmdb_id, title_key,
+                                       year, runtime)
+                    VALUES ('{MovieField.TMDB_SOURCE}', ?, ?, ?, ?, ?)
+                    ON CONFLICT (source, movie_id) DO UPDATE SET
+                        title_key = COALESCE(title_key, excluded.title_key),
+                        year = COALESCE(year, excluded.year),
+                        runtime = COALESCE(runtime, excluded.runtime)''',
+                rows)
+
+    @classmethod
+    def get_movie_ids_for_tmdb_id(cls, tmdb_id: int) -> Dict[str, List[str]]:
+        """
+        :param tmdb_id:
+        :return: source -> ids of the movies from that source with tmdb_id
+        """
+        movie_ids: Dict[str, List[str]] = {}
+        for source, movie_id in cls._query(
+                'SELECT source, movie_id FROM movie WHERE tmdb_id = ?',
+                (cls._to_int(tmdb_id),)):
+            movie_ids.setdefault(source, []).append(movie_id)
+        return movie_ids
+
+    @classmethod
+    def find_tmdb_id(cls, title: str = None, year: int = None,
+                     youtube_id: str = None,
+                     runtime_seconds: int = 0) -> Optional[int]:
+        """
+        Finds the TMDb id of a movie from another source, without asking
+        TMDb. A movie with the same youtube trailer is preferred, otherwise
+        one with the same title from year - 1 to year + 1 (the same leeway
+        as TMDBUtils.get_tmdb_id_from_title_year). Without a year, the title
+        must identify exactly one TMDb movie, and its runtime must be known
+        and within RUNTIME_TOLERANCE_SECONDS of runtime_seconds: a catalog
+        holding only one of several movies of that title would otherwise
+        give its id to all of them.
+
+        :param title:
+        :param year:
+        :param youtube_id:
+        :param runtime_seconds: 0 when unknown
+        :return: TMDb id, or None if the catalog doesn't know
+        """
+        if youtube_id is not None:
+            rows: List[Tuple] = cls._query(
+                'SELECT tmdb_id FROM movie WHERE youtube_id = ? '
+                'AND tmdb_id IS NOT NULL LIMIT 1', (youtube_id,))
+            if rows:
+                return rows[0][0]
+
+        title_key: str = cls.get_title_key(title)
+        if title_key is None:
+            return None
+
+        year = cls._to_int(year) or None
+        if year is not None:
+            rows = cls._query(
+                'SELECT tmdb_id FROM movie WHERE title_key = ? '
+                'AND year BETWEEN ? AND ? AND tmdb_id IS NOT NULL '
+                'ORDER BY ABS(year - ?) LIMIT 1',
+                (title_key, year - 1, year + 1, year))
+            if rows:
+                return rows[0][0]
+            return None
+
+        runtime_seconds = cls._to_int(runtime_seconds) or 0
+        if runtime_seconds <= 0:
+            return None
+
+        rows = cls._query(
+            'SELECT tmdb_id, MAX(runtime) FROM movie WHERE title_key = ? '
+            'AND tmdb_id IS NOT NULL GROUP BY tmdb_id LIMIT 2', (title_key,))
+        if len(rows) != 1:
+            return None
+
+        tmdb_id, runtime = rows[0]
+        if (runtime is None
+                or abs(runtime - runtime_seconds) > cls.RUNTIME_TOLERANCE_SECONDS):
+            return None
+        return tmdb_id
+
+    # TMDb search results (TMDbSearchCache)
+
+    @classmethod
+    def get_search_result(cls, search_key: str
+                          ) -> Optional[Tuple[Optional[int], float, float]]:
+        """
+        :param search_key:
+        :return: (tmdb_id, time searched, time last used) or None if the
+                 search is not recorded. tmdb_id is None if TMDb found
+                 nothing
+        """
+        rows: List[Tuple] = cls._query(
+            'SELECT tmdb_id, searched, used FROM tmdb_search '
+            'WHERE search_key = ?', (search_key,))
+        if not rows:
+            return None
+        return rows[0]
+
+    @classmethod
+    def put_search_result(cls, search_key: str, tmdb_id: Optional[int],
+                          searched: float) -> None:
+        """
+        :param search_key:
+        :param tmdb_id: None if TMDb found nothing
+        :param searched: Time of the search, also its time of last use
+        :return:
+        """
+        with cls.transaction() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO tmdb_search '
+                '(search_key, tmdb_id, searched, used) VALUES (?, ?, ?, ?)',
+                (search_key, cls._to_int(tmdb_id), searched, searched))
+
+    @classmethod
+    def set_search_results_used(cls, used: Iterable[Tuple[str, float]]) -> None:
+        """
+        :param used: (search_key, time last used) of each used search
+        :return:
+        """
+        with cls.transaction() as connection:
+            connection.executemany(
+                'UPDATE tmdb_search SET used = ? WHERE search_key = ?',
+                ((when, search_key) for search_key, when in used))
+
+    @classmethod
+    def remove_search_results(cls, positive_before: float,
+                              not_found_before: float,
+                              maximum_entries: int) -> int:
+        """
+        Removes the expired searches, then the least recently used ones
+        beyond maximum_entries.
+
+        :param positive_before: Found ids searched before this are expired
+        :param not_found_before: Searches which found nothing before this
+                                 are expired
+        :param maximum_entries:
+        :return: Number of searches removed
+        """
+        with cls.transaction() as connection:
+            removed: int = connection.execute(
+                'DELETE FROM tmdb_search WHERE '
+                '(tmdb_id IS NOT NULL AND searched < ?) OR '
+                '(tmdb_id IS NULL AND searched < ?)',
+                (positive_before, not_found_before)).rowcount
+            excess: int = (connection.execute(
+                'SELECT COUNT(*) FROM tmdb_search').fetchone()[0]
+                           - maximum_entries)
+            if excess > 0:
+                removed += connection.execute(
+                    'DELETE FROM tmdb_search WHERE search_key IN '
+                    '(SELECT search_key FROM tmdb_search ORDER BY used LIMIT ?)',
+                    (excess,)).rowcount
+        return removed
+
+    @classmethod
+    def get_number_of_search_results(cls) -> int:
+        return cls._query('SELECT COUNT(*) FROM tmdb_search')[0][0]
+
+    # iTunes feature page trailers (ITunesDetailCache)
+
+    @classmethod
+    def get_itunes_details(cls) -> List[Tuple[str, str, str, float]]:
+        """
+        :return: (feature_url, fingerprint, trailers json, time fetched) of
+                 every cached feature page
+        """
+        return cls._query('SELECT feature_url, fingerprint, trailers, fetched '
+                          'FROM itunes_detail')
+
+    @classmethod
+    def put_itunes_details(cls, details: Iterable[Tuple[str, str, str, float]]
+                           ) -> None:
+        """
+        :param details: (feature_url, fingerprint, trailers json, time fetched)
+                        of each feature page
+        :return:
+        """
+        with cls.transaction() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO itunes_detail '
+                '(feature_url, fingerprint, trailers, fetched) VALUES (?, ?, ?, ?)',
+                details)
+
+    @classmethod
+    def remove_itunes_details(cls, fetched_before: float) -> int:
+        """
+        :param fetched_before: Feature pages fetched before this are removed
+        :return: Number of feature pages removed
+        """
+        with cls.transaction() as connection:
+            return connection.execute(
+                'DELETE FROM itunes_detail WHERE fetched < ?',
+                (fetched_before,)).rowcount
+
+    # Conversion of the json files used before the catalog
+
+    @classmethod
+    def read_legacy_file(cls, path: str) -> Dict[str, Any]:
+        """
+        Reads a json cache file written before the catalog. Remove it, with
+        remove_legacy_file, once its contents are in the catalog.
+
+        :param path:
+        :return: Contents of the file, or None if there is none
+        """
+        if not os.path.exists(path):
+            return None
+
+        contents: Dict[str, Any] = None
+        try:
+            with io.open(path, mode='rt', newline=None,
+                         encoding='utf-8') as legacy_file:
+                contents = json.load(legacy_file, encoding='utf-8')
+            if cls._logger.isEnabledFor(LazyLogger.DEBUG):
+                cls._logger.debug(f'Converting {len(contents)} entries from: '
+                                  f'{path}')
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception as e:
+            cls._logger.warning(f'Ignoring unreadable cache: {path} {e}')
+            contents = {}
+        return contents
+
+    @staticmethod
+    def remove_legacy_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+MovieCatalog.class_init()
@@ -0,0 +1,487 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Compact, persistent set of ids known NOT to have something (here: movies
+without a trailer), each of which is forgotten after a number of days.
+
+In memory, ids are kept in day buckets. Each bucket is a sorted array of
+64-bit ids (8 bytes per id instead of the ~100 bytes of a dict entry with
+its timestamp). A Bloom filter sits in front of the buckets, so that the
+common case, an id which is NOT in the set, is answered without searching
+any bucket. Ids added since the last compaction are kept in a small dict.
+
+On disk there are two files:
+
+    <name>.ids      Snapshot: header, Bloom filter bits, then every bucket's
+                    day and sorted ids
+    <name>.journal  Text lines '+ <id> <day>' appended for ids added since
+                    the snapshot was written
+
+Saving only appends the new ids to the journal. The snapshot is rewritten
+(compacted) when the journal has grown large, or when buckets have expired.
+Expiring a bucket drops all of its ids at once, no per-entry sweep is
+needed.
+"""
+import array
+import bisect
+import datetime
+import math
+import os
+import struct
+import sys
+import threading
+
+from common.exceptions import AbortException
+from common.imports import *
+from common.logger import LazyLogger
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+MASK_64: Final[int] = 0xFFFFFFFFFFFFFFFF
+
+
+class BloomFilter:
+    """
+    Bloom filter of integer keys. Uses double hashing of a 64-bit mix of the
+    key, so no hashlib call is needed per key.
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float,
+                 bits: bytearray = None, number_of_hashes: int = None) -> None:
+        """
+        :param capacity: Number of keys expected
+        :param false_positive_rate: Wanted false positive rate at capacity
+        :param bits: Previously saved bits (from get_bits). When given,
+                     number_of_hashes must be as well
+        :param number_of_hashes:
+        """
+        capacity = max(capacity, 1)
+        self._capacity: int = capacity
+        if bits is None:
+            bit_count: int = math.ceil(-capacity * math.log(false_positive_rate)
+                                       / (math.log(2) ** 2))
+            bits = bytearray((bit_count + 7) // 8)
+            number_of_hashes = max(1, round((len(bits) * 8 / capacity)
+                                            * math.log(2)))
+        self._bits: bytearray = bits
+        self._bit_count: int = len(bits) * 8
+        self._number_of_hashes: int = number_of_hashes
+
+    @staticmethod
+    def _mix(key: int) -> int:
+        """
+        splitmix64 finalizer
+
+        :param key:
+        :return: 64-bit hash of key
+        """
+        key &= MASK_64
+        key = ((key ^ (key >> 30)) * 0xbf58476d1ce4e5b9) & MASK_64
+        key = ((key ^ (key >> 27)) * 0x94d049bb133111eb) & MASK_64
+        return key ^ (key >> 31)
+
+    def add(self, key: int) -> None:
+        """
+        :param key:
+        :return:
+        """
+        hashed: int = self._mix(key)
+        position: int = hashed & 0xFFFFFFFF
+        step: int = (hashed >> 32) | 1
+        bits: bytearray = self._bits
+        bit_count: int = self._bit_count
+        for _ in range(self._number_of_hashes):
+            position %= bit_count
+            bits[position >> 3] |= 1 << (position & 7)
+            position += step
+
+    def might_contain(self, key: int) -> bool:
+        """
+        :param key:
+        :return: False if key was definitely never added
+        """
+        hashed: int = self._mix(key)
+        position: int = hashed & 0xFFFFFFFF
+        step: int = (hashed >> 32) | 1
+        bits: bytearray = self._bits
+        bit_count: int = self._bit_count
+        for _ in range(self._number_of_hashes):
+            position %= bit_count
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position += step
+        return True
+
+    def get_capacity(self) -> int:
+        return self._capacity
+
+    def get_number_of_hashes(self) -> int:
+        return self._number_of_hashes
+
+    def get_bits(self) -> bytearray:
+        return self._bits
+
+
+class NegativeIdCache:
+    """
+    Persistent set of ids, each remembered for expire_days days. Thread
+    safe.
+    """
+    # Snapshot header: magic, format, byte order of the ids, Bloom capacity,
+    # number of Bloom hashes, length of the Bloom bits, number of buckets
+
+    MAGIC: Final[bytes] = b'RTNC'
+    FORMAT: Final[int] = 1
+    HEADER: Final[struct.Struct] = struct.Struct('<4sIBQIQI')
+    BUCKET_HEADER: Final[struct.Struct] = struct.Struct('<qQ')
+
+    FALSE_POSITIVE_RATE: Final[float] = 0.01
+    MINIMUM_CAPACITY: Final[int] = 1024
+
+    # Compact once the journal holds this many ids, or a quarter of all ids,
+    # whichever is larger
+
+    COMPACT_MINIMUM_ENTRIES: Final[int] = 1000
+
+    ABSENT: Final[int] = 0          # Rejected by the Bloom filter
+    FALSE_POSITIVE: Final[int] = 1  # Passed the Bloom filter, but not present
+    PRESENT: Final[int] = 2
+
+    _logger: LazyLogger = None
+
+    @classmethod
+    def class_init(cls) -> None:
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+    def __init__(self, directory: str, name: str,
+                 get_expire_days: Callable[[], int]) -> None:
+        """
+        :param directory: Where the snapshot and journal are kept
+        :param name: Base name of the snapshot and journal
+        :param get_expire_days: Returns how many days ids are remembered.
+                                Called once a day, when buckets may have
+                                expired, so a changed setting takes effect.
+        """
+        self._name: str = name
+        self._snapshot_path: str = os.path.join(directory, f'{name}.ids')
+        self._journal_path: str = os.path.join(directory, f'{name}.journal')
+        self._get_expire_days: Callable[[], int] = get_expire_days
+        self._lock: threading.RLock = threading.RLock()
+        self._loaded: bool = False
+
+        # day ordinal -> sorted ids, as written to the snapshot
+
+        self._buckets: Dict[int, array.array] = {}
+        self._bucket_days: List[int] = []  # Newest first
+
+        # ids added since the snapshot: id -> day ordinal
+
+        self._recent: Dict[int, int] = {}
+        self._size: int = 0
+        self._bloom: BloomFilter = BloomFilter(self.MINIMUM_CAPACITY,
+                                               self.FALSE_POSITIVE_RATE)
+        self._unsaved: List[str] = []
+        self._journal_entries: int = 0
+        self._expired_before: int = 0
+        self._expired_on: int = 0
+        self._needs_compaction: bool = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get_unsaved_count(self) -> int:
+        """
+        :return: Number of ids added, but not yet written to the journal
+        """
+        return len(self._unsaved)
+
+    def needs_compaction(self) -> bool:
+        """
+        :return: True if the snapshot is out of date, e.g. because writing
+                 it failed
+        """
+        return self._needs_compaction
+
+    def load(self, legacy: Dict[int, datetime.date] = None) -> None:
+        """
+        Reads the snapshot and replays the journal. Only the first call does
+        anything.
+
+        :param legacy: ids (and the day they were added) from an older
+                       format. Only used when there is no snapshot yet.
+        :return:
+        """
+        clz = type(self)
+        with self._lock:
+            if self._loaded:
+                return
+
+            self._loaded = True
+            self._read_snapshot()
+            if legacy is not None and self._size == 0:
+                for key, day in legacy.items():
+                    self._add(key, day.toordinal())
+                self._needs_compaction = True
+            self._replay_journal()
+            self._expire(datetime.date.today().toordinal())
+            if self._needs_compaction:
+                self.save(compact=True)
+
+            if clz._logger.isEnabledFor(LazyLogger.DEBUG):
+                clz._logger.debug(f'{self._name}: {self._size} ids in '
+                                  f'{len(self._buckets)} buckets, '
+                                  f'{self._journal_entries} journaled')
+
+    def lookup(self, key: int) -> int:
+        """
+        :param key:
+        :return: ABSENT, FALSE_POSITIVE or PRESENT
+        """
+        with self._lock:
+            today: int = datetime.date.today().toordinal()
+            if today != self._expired_on:
+                self._expire(today)
+
+            if not self._bloom.might_contain(key):
+                return self.ABSENT
+
+            day: int = self._recent.get(key)
+            if day is not None and day >= self._expired_before:
+                return self.PRESENT
+
+            for bucket_day in self._bucket_days:
+                ids: array.array = self._buckets[bucket_day]
+                index: int = bisect.bisect_left(ids, key)
+                if index < len(ids) and ids[index] == key:
+                    return self.PRESENT
+
+            return self.FALSE_POSITIVE
+
+    def add(self, key: int) -> bool:
+        """
+        Remembers key from today
+
+        :param key:
+        :return: True if key was not already present
+        """
+        with self._lock:
+            if self.lookup(key) == self.PRESENT:
+                return False
+
+            day: int = datetime.date.today().toordinal()
+            self._add(key, day)
+            self._unsaved.append(f'+ {key} {day}\n')
+            return True
+
+    def _add(self, key: int, day: int) -> None:
+        if day < self._expired_before:
+            return
+
+        if key not in self._recent:
+            self._size += 1
+        self._recent[key] = day
+        if self._size > self._bloom.get_capacity():
+            self._rebuild_bloom()
+        else:
+            self._bloom.add(key)
+
+    def save(self, compact: bool = False) -> None:
+        """
+        Appends the unsaved ids to the journal, or rewrites the snapshot
+        when the journal is large, buckets have expired, or compact is True.
+
+        :param compact:
+        :return:
+        """
+        clz = type(self)
+        with self._lock:
+            if not self._loaded:
+                return
+
+            journal_limit: int = max(self.COMPACT_MINIMUM_ENTRIES,
+                                     self._size // 4)
+            if (compact or self._needs_compaction
+                    or self._journal_entries + len(self._unsaved) > journal_limit):
+                self._compact()
+                return
+
+            if not self._unsaved:
+                return
+
+            try:
+                os.makedirs(os.path.dirname(self._journal_path), exist_ok=True)
+                with open(self._journal_path, mode='at', encoding='ascii') as journal:
+                    journal.writelines(self._unsaved)
+                self._journal_entries += len(self._unsaved)
+                self._unsaved.clear()
+            except AbortException:
+                reraise(*sys.exc_info())
+            except Exception:
+                clz._logger.exception(f'Failed to append to {self._journal_path}')
+
+    def _compact(self) -> None:
+        """
+        Merges the recent ids into their buckets and replaces the snapshot.
+        The journal is then no longer needed. When the snapshot can not be
+        written, compaction is retried by the next save.
+
+        :return:
+        """
+        clz = type(self)
+        for key, day in self._recent.items():
+            if day < self._expired_before:
+                continue
+            bucket: array.array = self._buckets.get(day)
+            if bucket is None:
+                self._buckets[day] = array.array('q', (key,))
+            else:
+                bucket.append(key)
+        for day, bucket in self._buckets.items():
+            self._buckets[day] = array.array('q', sorted(set(bucket)))
+        self._recent.clear()
+        self._bucket_days = sorted(self._buckets, reverse=True)
+        self._size = sum(len(bucket) for bucket in self._buckets.values())
+
+        temp_path: str = f'{self._snapshot_path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self._snapshot_path), exist_ok=True)
+            bits: bytearray = self._bloom.get_bits()
+            with open(temp_path, mode='wb') as snapshot:
+                snapshot.write(self.HEADER.pack(
+                    self.MAGIC, self.FORMAT, sys.byteorder == 'little',
+                    self._bloom.get_capacity(),
+                    self._bloom.get_number_of_hashes(), len(bits),
+                    len(self._buckets)))
+                snapshot.write(bits)
+                for day in self._bucket_days:
+                    bucket = self._buckets[day]
+                    snapshot.write(self.BUCKET_HEADER.pack(day, len(bucket)))
+                    bucket.tofile(snapshot)
+            os.replace(temp_path, self._snapshot_path)
+            try:
+                os.remove(self._journal_path)
+            except FileNotFoundError:
+                pass
+            self._journal_entries = 0
+            self._unsaved.clear()
+            self._needs_compaction = False
+        except AbortException:
+            self._needs_compaction = True
+            reraise(*sys.exc_info())
+        except Exception:
+            self._needs_compaction = True
+            clz._logger.exception(f'Failed to write {self._snapshot_path}')
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def _read_snapshot(self) -> None:
+        clz = type(self)
+        try:
+            with open(self._snapshot_path, mode='rb') as snapshot:
+                (magic, file_format, little_endian, capacity, number_of_hashes,
+                 bits_length, bucket_count) = self.HEADER.unpack(
+                    snapshot.read(self.HEADER.size))
+                if magic != self.MAGIC or file_format != self.FORMAT:
+                    raise ValueError(f'Unknown format: {magic} {file_format}')
+
+                bits: bytearray = bytearray(snapshot.read(bits_length))
+                buckets: Dict[int, array.array] = {}
+                for _ in range(bucket_count):
+                    day, count = self.BUCKET_HEADER.unpack(
+                        snapshot.read(self.BUCKET_HEADER.size))
+                    bucket: array.array = array.array('q')
+                    bucket.fromfile(snapshot, count)
+                    if bool(little_endian) != (sys.byteorder == 'little'):
+                        bucket.byteswap()
+                    buckets[day] = bucket
+        except FileNotFoundError:
+            return
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception as e:
+            clz._logger.warning(f'Ignoring unreadable {self._snapshot_path}: {e}')
+            self._needs_compaction = True
+            return
+
+        self._buckets = buckets
+        self._bucket_days = sorted(buckets, reverse=True)
+        self._size = sum(len(bucket) for bucket in buckets.values())
+        self._bloom = BloomFilter(capacity, self.FALSE_POSITIVE_RATE,
+                                  bits=bits, number_of_hashes=number_of_hashes)
+
+    def _replay_journal(self) -> None:
+        clz = type(self)
+        try:
+            with open(self._journal_path, mode='rt', encoding='ascii') as journal:
+                for line in journal:
+                    fields: List[str] = line.split()
+
+                    # A line cut short by a crash is ignored
+
+                    if len(fields) != 3 or fields[0] != '+':
+                        continue
+                    try:
+                        self._add(int(fields[1]), int(fields[2]))
+                    except ValueError:
+                        continue
+                    self._journal_entries += 1
+        except FileNotFoundError:
+            pass
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception as e:
+            clz._logger.warning(f'Ignoring unreadable {self._journal_path}: {e}')
+            self._needs_compaction = True
+
+    def _expire(self, today: int) -> None:
+        """
+        Drops every bucket older than expire_days. The Bloom filter can't
+        forget ids, so it is rebuilt and the snapshot rewritten at the next
+        save.
+
+        :param today: Day ordinal
+        :return:
+        """
+        clz = type(self)
+        self._expired_on = today
+        self._expired_before = today - self._get_expire_days()
+        expired: List[int] = [day for day in self._buckets
+                              if day < self._expired_before]
+        expired_recent: bool = any(day < self._expired_before
+                                   for day in self._recent.values())
+        if not expired and not expired_recent:
+            return
+
+        for day in expired:
+            del self._buckets[day]
+        self._bucket_days = sorted(self._buckets, reverse=True)
+        self._recent = {key: day for key, day in self._recent.items()
+                        if day >= self._expired_before}
+        self._size = (sum(len(bucket) for bucket in self._buckets.values())
+                      + len(self._recent))
+        self._rebuild_bloom()
+        self._needs_compaction = True
+        if clz._logger.isEnabledFor(LazyLogger.DEBUG):
+            clz._logger.debug(f'{self._name}: expired {len(expired)} buckets, '
+                              f'{self._size} ids remain')
+
+    def _rebuild_bloom(self) -> None:
+        capacity: int = self.MINIMUM_CAPACITY
+        while capacity < self._size * 2:
+            capacity *= 2
+        bloom: BloomFilter = BloomFilter(capacity, self.FALSE_POSITIVE_RATE)
+        for bucket in self._buckets.values():
+            for key in bucket:
+                bloom.add(key)
+        for key in self._recent:
+            bloom.add(key)
+        self._bloom = bloom
+
+
+NegativeIdCache.class_init()
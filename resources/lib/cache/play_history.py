@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+"""
+from collections import OrderedDict
+from pathlib import Path
+
+import datetime
+import io
+import os
+import sys
+import threading
+import time
+
+import simplejson as json
+from simplejson import JSONDecodeError
+
+import xbmcvfs
+
+from common.constants import Constants
+from common.disk_utils import DiskUtils
+from common.exceptions import AbortException, reraise
+from common.imports import *
+from common.logger import LazyLogger
+from common.monitor import Monitor
+from common.movie import BaseMovie
+from common.settings import Settings
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+
+class PlayHistory:
+    """
+    Persistent record of when each trailer was last played, so that
+    repeats can be avoided across restarts of Kodi.
+
+    Entries are kept in an OrderedDict, least recently played first. This
+    gives O(1) membership, update (move_to_end) and eviction (popitem) while
+    bounding memory to MAX_ENTRIES movies. Each entry is:
+
+        key: <source>_<id> -> [epoch seconds last played, play count]
+
+    The history is persisted to <remote_db_cache>/index/play_history.json
+    using the same flush policy as the other index caches.
+    """
+    MAX_ENTRIES: Final[int] = 5000
+    LAST_PLAYED: Final[int] = 0
+    PLAY_COUNT: Final[int] = 1
+
+    _logger: LazyLogger = None
+    _lock: threading.RLock = threading.RLock()
+    _history: OrderedDict = OrderedDict()
+    _cache_loaded: bool = False
+    _cache_path: Path = None
+    _unsaved_changes: int = 0
+    _last_saved: datetime.datetime = datetime.datetime(year=1900, month=1, day=1)
+
+    @classmethod
+    def class_init(cls) -> None:
+        """
+        :return:
+        """
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+        cls._cache_path = Path(os.path.join(Settings.get_remote_db_cache_path(),
+                                            'index', 'play_history.json'))
+
+    @staticmethod
+    def get_key(movie: BaseMovie) -> str:
+        """
+        :param movie:
+        :return: Key unique across all movie sources
+        """
+        return PlayHistory.get_key_for(movie.get_source(), movie.get_id())
+
+    @staticmethod
+    def get_key_for(source: str, movie_id: str) -> str:
+        """
+        :param source:
+        :param movie_id:
+        :return: Key unique across all movie sources
+        """
+        return f'{source}_{movie_id}'
+
+    @classmethod
+    def record_play(cls, movie: BaseMovie, flush: bool = False) -> None:
+        """
+        Records that the trailer for the given movie is being played now.
+
+        :param movie:
+        :param flush:
+        :return:
+        """
+        key: str = cls.get_key(movie)
+        with cls._lock:
+            cls.load_cache_if_needed()
+            entry: List[Union[float, int]] = cls._history.pop(key, None)
+            if entry is None:
+                entry = [0.0, 0]
+            entry[cls.LAST_PLAYED] = time.time()
+            entry[cls.PLAY_COUNT] += 1
+            cls._history[key] = entry  # Now most recently played
+            while len(cls._history) > cls.MAX_ENTRIES:
+                cls._history.popitem(last=False)
+
+            cls._unsaved_changes += 1
+            cls.save_cache(flush=flush)
+
+    @classmethod
+    def get_play_count(cls, movie: BaseMovie) -> int:
+        """
+        :param movie:
+        :return: Number of times the trailer has been played, across sessions
+        """
+        return cls.get_play_count_for_key(cls.get_key(movie))
+
+    @classmethod
+    def get_play_count_for_key(cls, key: str) -> int:
+        """
+        :param key: From get_key
+        :return: Number of times the trailer has been played, across sessions
+        """
+        with cls._lock:
+            cls.load_cache_if_needed()
+            entry: List[Union[float, int]] = cls._history.get(key)
+            if entry is None:
+                return 0
+            return entry[cls.PLAY_COUNT]
+
+    @classmethod
+    def seconds_since_played(cls, movie: BaseMovie) -> Union[float, None]:
+        """
+        :param movie:
+        :return: Seconds since the trailer was last played, or None if not
+                 in the history
+        """
+        return cls.seconds_since_played_for_key(cls.get_key(movie))
+
+    @classmethod
+    def seconds_since_played_for_key(cls, key: str) -> Union[float, None]:
+        """
+        :param key: From get_key
+        :return: Seconds since the trailer was last played, or None if not
+                 in the history
+        """
+        with cls._lock:
+            cls.load_cache_if_needed()
+            entry: List[Union[float, int]] = cls._history.get(key)
+            if entry is None:
+                return None
+            return time.time() - entry[cls.LAST_PLAYED]
+
+    @classmethod
+    def is_in_no_repeat_window(cls, movie: BaseMovie) -> bool:
+        """
+        Determines whether the trailer for the given movie was played too
+        recently to be played again, as configured by the no_repeat_hours
+        setting.
+
+        :param movie:
+        :return: True if the trailer should not yet be repeated
+        """
+        return cls.is_key_in_no_repeat_window(cls.get_key(movie))
+
+    @classmethod
+    def is_key_in_no_repeat_window(cls, key: str) -> bool:
+        """
+        :param key: From get_key
+        :return: True if the trailer should not yet be repeated, see
+                 is_in_no_repeat_window
+        """
+        no_repeat_hours: int = Settings.get_no_repeat_hours()
+        if no_repeat_hours == 0:
+            return False
+
+        elapsed: float = cls.seconds_since_played_for_key(key)
+        if elapsed is None:
+            return False
+        return elapsed < no_repeat_hours * 3600
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        :return:
+        """
+        with cls._lock:
+            cls._history.clear()
+            cls._unsaved_changes += 1
+            cls.save_cache(flush=True)
+
+    @classmethod
+    def load_cache_if_needed(cls) -> None:
+        """
+        Reads the persisted history, once.
+
+        :return:
+        """
+        if cls._cache_loaded:
+            return
+
+        with cls._lock:
+            if cls._cache_loaded:
+                return
+            try:
+                parent_dir, file_name = os.path.split(cls._cache_path)
+                DiskUtils.create_path_if_needed(parent_dir)
+                history: OrderedDict = OrderedDict()
+                if os.path.exists(cls._cache_path):
+                    with io.open(cls._cache_path, mode='rt', newline=None,
+                                 encoding='utf-8') as cache_file:
+                        entries: List[List[Any]] = json.load(cache_file,
+                                                             encoding='utf-8')
+
+                    # Persisted oldest first, so simply appending restores
+                    # the order.
+
+                    for key, last_played, play_count in entries[-cls.MAX_ENTRIES:]:
+                        history[key] = [float(last_played), int(play_count)]
+
+                cls._history = history
+                cls._last_saved = datetime.datetime.now()
+                cls._unsaved_changes = 0
+                Monitor.throw_exception_if_abort_requested()
+            except AbortException:
+                reraise(*sys.exc_info())
+            except (JSONDecodeError, ValueError, TypeError):
+                cls._logger.exception(f'Discarding corrupt play history: '
+                                      f'{cls._cache_path}')
+                try:
+                    os.remove(cls._cache_path)
+                except OSError:
+                    pass
+            except Exception:
+                cls._logger.exception()
+
+            cls._cache_loaded = True
+
+    @classmethod
+    def save_cache(cls, flush: bool = False, ignore_shutdown: bool = False) -> None:
+        """
+        Persists the history when enough changes or time has accumulated.
+
+        :param flush: Save regardless of the number of unsaved changes
+        :param ignore_shutdown: Save even if Kodi is shutting down
+        :return:
+        """
+        with cls._lock:
+            if not cls._cache_loaded or cls._unsaved_changes == 0:
+                return
+
+            if (not flush and
+                    (cls._unsaved_changes <
+                     Constants.TRAILER_CACHE_FLUSH_UPDATES)
+                    and
+                    (datetime.datetime.now() - cls._last_saved) <
+                    datetime.timedelta(seconds=Constants.TRAILER_CACHE_FLUSH_SECONDS)):
+                return
+
+            try:
+                parent_dir, file_name = os.path.split(cls._cache_path)
+                DiskUtils.create_path_if_needed(parent_dir)
+                tmp_path: Path = Path(str(cls._cache_path) + '.tmp')
+                tmp_path = Path(xbmcvfs.validatePath(tmp_path.as_posix()))
+
+                # A list keeps the play order explicit in the file
+
+                entries: List[List[Any]] = []
+                for key, entry in cls._history.items():
+                    entries.append([key, entry[cls.LAST_PLAYED],
+                                    entry[cls.PLAY_COUNT]])
+
+                with io.open(tmp_path, mode='wt', newline=None,
+                             encoding='utf-8') as cache_file:
+                    json_text = json.dumps(entries, encoding='utf-8',
+                                           ensure_ascii=False)
+                    cache_file.write(json_text)
+                    cache_file.flush()
+
+                os.replace(tmp_path, cls._cache_path)
+                cls._last_saved = datetime.datetime.now()
+                cls._unsaved_changes = 0
+                if not ignore_shutdown:
+                    Monitor.throw_exception_if_abort_requested()
+            except AbortException:
+                reraise(*sys.exc_info())
+            except Exception:
+                cls._logger.exception(f'Failed to save play history: '
+                                      f'{cls._cache_path}')
+
+
+PlayHistory.class_init()
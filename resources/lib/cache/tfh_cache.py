@@ -35,10 +35,12 @@ class TFHCache:
     Trailers From Hell has an index of all of the trailers that they produce.
     We don't rely on the index being static. It is not really searchable.
     When this cache is determined to be expired, the entire index must be
-    retrieved and this list recreated.
+    retrieved and this list recreated. In between, the index is refreshed
+    by reading only the newest entries (see INDEX_REFRESH_TIME).
     """
     UNINITIALIZED_STATE = 'uninitialized_state'
     INDEX_CREATION_DATE = 'INDEX_CREATION_DATE'
+    INDEX_REFRESH_TIME = 'INDEX_REFRESH_TIME'
     CACHE_COMPLETE = "CACHE_COMPLETE"
     INCOMPLETE_CREATION_DATE_STR = '1900:01:01'
 
@@ -91,6 +93,10 @@ class TFHCache:
     _time_of_index_creation = datetime.datetime(2000, 1, 1)  # expired
     _cache_complete = False
 
+    # Time (time.time()) that the newest entries of the index were last read
+
+    _time_of_index_refresh: float = 0.0
+
     @classmethod
     def class_init(cls) -> None:
         """
@@ -115,7 +121,11 @@ class TFHCache:
     def save_cache(cls, flush: bool = False, complete: bool = None) -> None:
         """
         :param flush:
-        :param complete:
+        :param complete: True only when the entire index was just read
+               (rebuild). Marks the cache complete and sets its creation
+               date. False or None leave both alone, so that saves made by
+               a refresh (or while rebuilding) don't postpone the next
+               rebuild.
         :return:
 
         """
@@ -159,7 +169,7 @@ class TFHCache:
 
                     cls._logger.debug(f'complete: {complete} cache_complete: '
                                       f'{cls._cache_complete}')
-                    if (complete is None and cls._cache_complete) or complete:
+                    if complete:
                         cls._cache_complete = True
                         cls._logger.debug(f'complete2: {complete} cache_complete: '
                                           f'{cls._cache_complete}')
@@ -176,6 +186,8 @@ class TFHCache:
                     cls._logger.debug(f'complete3: {complete} cache_complete: '
                                       f'{cls._cache_complete}')
                     dummy_tfh_movie.set_property(cls.CACHE_COMPLETE, cls._cache_complete)
+                    dummy_tfh_movie.set_property(cls.INDEX_REFRESH_TIME,
+                                                 cls._time_of_index_refresh)
 
                     movie: TFHMovie
 
@@ -316,6 +328,8 @@ class TFHCache:
                 creation_date = creation_date_entry.get(cls.INDEX_CREATION_DATE,
                                                         None)
                 cls._cache_complete = creation_date_entry.get(cls.CACHE_COMPLETE, False)
+                cls._time_of_index_refresh = creation_date_entry.get(
+                    cls.INDEX_REFRESH_TIME, 0.0)
                 x = None
                 if creation_date is not None:
                     x = Utils.strptime(creation_date, '%Y:%m:%d')
@@ -354,6 +368,25 @@ class TFHCache:
     def is_complete(cls) -> bool:
         return cls._cache_complete
 
+    @classmethod
+    def get_refresh_time(cls) -> float:
+        """
+        :return: time.time() when the newest entries of the index were last
+                 read, 0.0 if never
+        """
+        return cls._time_of_index_refresh
+
+    @classmethod
+    def set_refresh_time(cls, refresh_time: float) -> None:
+        """
+        Saved with the cache's next save
+        :param refresh_time: time.time() when the newest entries of the index
+               were read
+        :return:
+        """
+        with cls.lock:
+            cls._time_of_index_refresh = refresh_time
+
     @classmethod
     def add_movies(cls, movies: Dict[str, TFHMovie],
                    total: int = None, flush: bool = False) -> None:
@@ -368,7 +401,8 @@ class TFHCache:
                     cls._tfh_json_cache.add_item(key, str(movie.get_tmdb_id()))
 
                 cls._unsaved_changes += 1
-                cls.save_cache(flush=flush)
+
+            cls.save_cache(flush=flush)
 
     @classmethod
     def add_movie(cls, movie: TFHMovie, total: int = None, flush=False) -> None:
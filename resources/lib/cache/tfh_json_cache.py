@@ -4,27 +4,25 @@ Created on 9/30/21
 
 @author: Frank Feuerbacher
 """
-import datetime
 import threading
 
 from common.imports import *
 
 from common.logger import LazyLogger
 from cache.base_reverse_index_cache import BaseReverseIndexCache
+from common.movie_constants import MovieField
 
 module_logger = LazyLogger.get_addon_module_logger(file_path=__file__)
 
 
 class TFHJsonCache(BaseReverseIndexCache):
 
+    SOURCE: str = MovieField.TFH_SOURCE
     CACHE_PATH: str
     _lock = threading.RLock()
-    _last_saved = datetime.datetime.now()
-    _unsaved_changes: int = 0
     _logger = None
 
-    _cache: Dict[str, str] = {}
-    _reverse_cache: Dict[str, str] = {}
+    _cache_loaded: bool = False
 
     @classmethod
     def class_init(cls, cache_name: str = None) -> None:
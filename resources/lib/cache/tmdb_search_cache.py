@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Remembers the outcome of TMDb title searches (TMDBUtils.get_tmdb_id_from_title_year)
+across restarts, so that the same title is not searched again by the next
+run, or by another source.
+
+A search is keyed by its normalized title, year and the configured
+language. TMDb often has several movies of a title, which the search tells
+apart by year, or without a year by runtime (TMDBMatcher). So a search
+without a year is also keyed by its runtime, rounded to
+RUNTIME_BUCKET_SECONDS, and is not kept at all when the runtime is unknown. Both found ids and "not found" are kept, the latter for less time
+since TMDb is still adding movies. The least recently used searches are
+evicted beyond MAXIMUM_ENTRIES.
+
+The searches are stored in the MovieCatalog database.
+"""
+import sys
+import time
+
+from cache.movie_catalog import MovieCatalog
+from common.exceptions import AbortException
+from common.imports import *
+from common.logger import LazyLogger
+from common.settings import Settings
+from diagnostics.statistics import Statistics
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+
+class TMDbSearchCache:
+    """
+    Process wide. Thread safe (through MovieCatalog).
+    """
+    SECONDS_PER_DAY: Final[int] = 24 * 60 * 60
+    FOUND_EXPIRE_DAYS: Final[int] = 180
+    NOT_FOUND_EXPIRE_DAYS: Final[int] = 14
+    MAXIMUM_ENTRIES: Final[int] = 50000
+
+    # Runtimes of different cuts (and sources) of the same movie differ
+
+    RUNTIME_BUCKET_SECONDS: Final[int] = 10 * 60
+
+    # Eviction runs on first use and after this many searches are added
+
+    ADDS_BETWEEN_EVICTIONS: Final[int] = 200
+
+    # The time of last use only orders eviction, recording it once a day
+    # keeps lookups from writing to the database
+
+    USE_RESOLUTION_SECONDS: Final[int] = SECONDS_PER_DAY
+
+    _logger: LazyLogger = None
+    _adds_until_eviction: int = 0
+
+    @classmethod
+    def class_init(cls) -> None:
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+    @classmethod
+    def get_search_key(cls, title: str, year: Union[int, str, None],
+                       runtime_seconds: int = 0) -> Optional[str]:
+        """
+        :param title:
+        :param year: None (or 0) when unknown
+        :param runtime_seconds: 0 when unknown. Only part of the key when
+               the year is unknown
+        :return: Key of the search, or None when the search is not to be
+                 cached: the title has nothing to search for, or neither
+                 year nor runtime is known
+        """
+        title_key: str = MovieCatalog.get_title_key(title)
+        if title_key is None:
+            return None
+
+        try:
+            year = int(year) or ''
+        except (TypeError, ValueError):
+            year = ''
+        if year == '':
+            if not runtime_seconds:
+                return None
+            runtime_bucket: int = int(
+                round(runtime_seconds / cls.RUNTIME_BUCKET_SECONDS))
+            return (f'{title_key}||{Settings.get_lang_iso_639_1()}'
+                    f'|{runtime_bucket}')
+        return f'{title_key}|{year}|{Settings.get_lang_iso_639_1()}'
+
+    @classmethod
+    def lookup(cls, title: str, year: Union[int, str, None],
+               runtime_seconds: int = 0) -> Tuple[bool, Optional[int]]:
+        """
+        :param title:
+        :param year:
+        :param runtime_seconds:
+        :return: (True, tmdb_id) when the search was recently made. tmdb_id
+                 is None when TMDb found nothing. (False, None) when TMDb
+                 must be searched
+        """
+        try:
+            cls._evict_if_due()
+            search_key: str = cls.get_search_key(title, year,
+                                                 runtime_seconds)
+            if search_key is None:
+                return False, None
+
+            entry: Optional[Tuple[Optional[int], float, float]]
+            entry = MovieCatalog.get_search_result(search_key)
+            now: float = time.time()
+            if entry is None or cls._is_expired(entry, now):
+                Statistics.add_tmdb_search_cache_miss()
+                return False, None
+
+            tmdb_id, _, used = entry
+            if now - used > cls.USE_RESOLUTION_SECONDS:
+                MovieCatalog.set_search_results_used(((search_key, now),))
+
+            if tmdb_id is None:
+                Statistics.add_tmdb_search_cache_not_found_hit()
+            else:
+                Statistics.add_tmdb_search_cache_hit()
+            return True, tmdb_id
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception:
+            cls._logger.exception(f'title: {title} year: {year}')
+        return False, None
+
+    @classmethod
+    def add(cls, title: str, year: Union[int, str, None],
+            tmdb_id: Optional[int], runtime_seconds: int = 0) -> None:
+        """
+        Records the outcome of a completed search. Searches which failed
+        (could not reach TMDb, etc.) must not be added.
+
+        :param title:
+        :param year: As given to the search
+        :param tmdb_id: None when TMDb found nothing
+        :param runtime_seconds: As given to the search
+        :return:
+        """
+        try:
+            search_key: str = cls.get_search_key(title, year,
+                                                 runtime_seconds)
+            if search_key is None:
+                return
+
+            MovieCatalog.put_search_result(search_key, tmdb_id, time.time())
+            cls._adds_until_eviction -= 1
+            cls._evict_if_due()
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception:
+            cls._logger.exception(f'title: {title} year: {year}')
+
+    @classmethod
+    def _is_expired(cls, entry: Tuple[Optional[int], float, float],
+                    now: float) -> bool:
+        tmdb_id, searched, _ = entry
+        expire_days: int = cls.FOUND_EXPIRE_DAYS
+        if tmdb_id is None:
+            expire_days = cls.NOT_FOUND_EXPIRE_DAYS
+        return now - searched > expire_days * cls.SECONDS_PER_DAY
+
+    @classmethod
+    def _evict_if_due(cls) -> None:
+        if cls._adds_until_eviction > 0:
+            return
+
+        cls._adds_until_eviction = cls.ADDS_BETWEEN_EVICTIONS
+        now: float = time.time()
+        removed: int = MovieCatalog.remove_search_results(
+            now - cls.FOUND_EXPIRE_DAYS * cls.SECONDS_PER_DAY,
+            now - cls.NOT_FOUND_EXPIRE_DAYS * cls.SECONDS_PER_DAY,
+            cls.MAXIMUM_ENTRIES)
+        if removed > 0 and cls._logger.isEnabledFor(LazyLogger.DEBUG):
+            cls._logger.debug(f'Evicted {removed} TMDb searches')
+
+
+TMDbSearchCache.class_init()
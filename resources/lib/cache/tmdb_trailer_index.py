@@ -4,13 +4,13 @@ Created on 9/30/21
 
 @author: Frank Feuerbacher
 """
-import datetime
 import threading
 from pathlib import Path
 
 from cache.base_trailer_index import BaseTrailerIndex
 from common.imports import *
 from common.logger import LazyLogger
+from common.movie_constants import MovieField
 from common.movie import TMDbMovieId, TMDbMovie, AbstractMovieId
 
 module_logger = LazyLogger.get_addon_module_logger(file_path=__file__)
@@ -19,11 +19,10 @@ module_logger = LazyLogger.get_addon_module_logger(file_path=__file__)
 class TMDbTrailerIndex(BaseTrailerIndex):
 
     CACHE_NAME: str = 'tmdb_trailer_index'
+    SOURCE: str = MovieField.TMDB_SOURCE
 
     _lock = threading.RLock()
-    _last_saved = datetime.datetime(year=1900, month=1, day=1)
     _parameters = None
-    _unsaved_changes: int = 0
     _logger: LazyLogger = None
 
     _cache: Dict[str, TMDbMovieId] = {}
@@ -58,11 +57,6 @@ class TMDbTrailerIndex(BaseTrailerIndex):
                                             f'{movie.has_local_trailer()} '
                                             f'trailer: {movie.get_has_trailer()}')
 
-        if isinstance(movie, TMDbMovie):
-            # cls._logger.debug(f'Converting to TMDBMovie')
-            movie = movie.get_as_movie_id_type()
-            # cls._logger.debug(f'Converted to: {type(movie)}')
-
         super().add(movie, flush)
 
     @classmethod
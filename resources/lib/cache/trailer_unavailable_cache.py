@@ -5,6 +5,7 @@ Created on Feb 10, 2019
 
 @author: fbacher
 """
+from cache.negative_id_cache import NegativeIdCache
 from cache.tmdb_cache_index import CacheIndex
 from common.imports import *
 
@@ -13,7 +14,6 @@ import dateutil.parser
 import io
 import simplejson as json
 from common.movie import MovieField
-from simplejson import JSONDecodeError
 import os
 import sys
 import threading
@@ -33,17 +33,19 @@ module_logger = LazyLogger.get_addon_module_logger(file_path=__file__)
 
 class TrailerUnavailableCache:
     """
+    Remembers which TMDb ids and library ids are known to NOT have a trailer
+    on TMDb, for Settings.get_expire_remote_db_trailer_check_days days.
 
+    Each set of ids is a NegativeIdCache: a Bloom filter in front of compact,
+    day bucketed id arrays, saved incrementally to a journal.
     """
     _logger = module_logger.getChild('TrailerUnavailableCache')
     _loaded = False
-    _all_missing_tmdb_trailers = dict()
-    _all_missing_library_trailers = dict()
+    _missing_tmdb_trailers: NegativeIdCache = None
+    _missing_library_trailers: NegativeIdCache = None
     lock = threading.RLock()
     library_last_save = datetime.datetime.now()
-    library_unsaved_changes = 0
     tmdb_last_save = datetime.datetime.now()
-    tmdb_unsaved_changes = 0
 
     @classmethod
     def add_missing_tmdb_trailer(cls,
@@ -66,20 +68,15 @@ class TrailerUnavailableCache:
             cls._logger.debug(f'tmdb_id is None title: {title} year: {year}')
             return
 
-        values = {MovieField.UNIQUE_ID_TMDB: tmdb_id,
-                  'timestamp': datetime.date.today()
-                  }
         if cls._logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
-            values[MovieField.MOVIEID] = library_id
-            values[MovieField.TITLE] = title
-            values[MovieField.YEAR] = year
-            values[MovieField.SOURCE] = source
+            cls._logger.debug_verbose(f'tmdb_id: {tmdb_id} library_id: '
+                                      f'{library_id} title: {title} year: '
+                                      f'{year} source: {source}')
 
         cls.abort_on_shutdown()
         with cls.lock:
             cls.load_cache_if_needed()
-            if tmdb_id not in cls._all_missing_tmdb_trailers:
-                cls._all_missing_tmdb_trailers[tmdb_id] = values
+            if cls._missing_tmdb_trailers.add(int(tmdb_id)):
                 cls.tmdb_cache_changed()
 
         CacheIndex.remove_unprocessed_movie(tmdb_id)
@@ -103,23 +100,19 @@ class TrailerUnavailableCache:
         :param source:
         :return:
         """
-
-        values = {
-            MovieField.MOVIEID: library_id,
-            'timestamp': datetime.date.today()
-        }
+        if library_id is None:
+            cls._logger.debug(f'library_id is None title: {title} year: {year}')
+            return
 
         if cls._logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
-            values[MovieField.UNIQUE_ID_TMDB] = tmdb_id
-            values[MovieField.TITLE] = title
-            values[MovieField.YEAR] = year
-            values[MovieField.SOURCE] = source
+            cls._logger.debug_verbose(f'library_id: {library_id} tmdb_id: '
+                                      f'{tmdb_id} title: {title} year: '
+                                      f'{year} source: {source}')
 
         cls.abort_on_shutdown()
         with cls.lock:
             cls.load_cache_if_needed()
-            if tmdb_id not in TrailerUnavailableCache._all_missing_library_trailers:
-                cls._all_missing_library_trailers[tmdb_id] = values
+            if cls._missing_library_trailers.add(int(library_id)):
                 cls.library_cache_changed()
                 Statistics.add_missing_library_trailer()
 
@@ -130,29 +123,24 @@ class TrailerUnavailableCache:
         Checks to see if the given library id is known to NOT have a TMDb trailer
 
         :param library_id:
-        :return: True if the given library_id is known to be missing a trailer from TMDb
-                 False if it is unknown if the library_id has a TMDb trailer
+        :return: True if it is unknown if the library_id has a TMDb trailer
+                    (so TMDb must be queried)
+                 False if the given library_id is known to be missing a
+                    trailer from TMDb
         """
         cls.abort_on_shutdown()
         with cls.lock:
             cls.load_cache_if_needed()
-            if library_id not in cls._all_missing_library_trailers:
-                entry = None
-            else:
-                entry = cls._all_missing_library_trailers[library_id]
-                elapsed = datetime.date.today() - entry['timestamp']
-                elapsed_days = elapsed.days
-                if elapsed_days > Settings.get_expire_remote_db_trailer_check_days():
-                    del cls._all_missing_library_trailers[library_id]
-                    entry = None
-                    cls.library_cache_changed()
-
-        if entry is None:
-            Statistics.add_missing_library_id_cache_miss()
-        else:
+            found: int = cls._missing_library_trailers.lookup(int(library_id))
+
+        if found == NegativeIdCache.PRESENT:
             Statistics.add_missing_library_id_cache_hit()
+        else:
+            Statistics.add_missing_library_id_cache_miss()
+            if found == NegativeIdCache.FALSE_POSITIVE:
+                Statistics.add_missing_library_id_cache_false_positive()
 
-        return entry is None
+        return found != NegativeIdCache.PRESENT
 
     @classmethod
     def library_cache_changed(cls, flush: bool = False) -> None:
@@ -160,45 +148,37 @@ class TrailerUnavailableCache:
 
         :return:
         """
-        cls.library_unsaved_changes += 1
-        if cls.library_last_save is None:
-            cls.library_last_save = datetime.datetime.now()
-
-        if flush or (cls.library_unsaved_changes >
-                     Constants.TRAILER_CACHE_FLUSH_UPDATES) or (
-                (datetime.datetime.now() - cls.library_last_save)
-                > datetime.timedelta(seconds=Constants.TRAILER_CACHE_FLUSH_SECONDS)):
-            cls.save_cache()
+        with cls.lock:
+            if flush or (cls._missing_library_trailers.get_unsaved_count() >
+                         Constants.TRAILER_CACHE_FLUSH_UPDATES) or (
+                    (datetime.datetime.now() - cls.library_last_save)
+                    > datetime.timedelta(seconds=Constants.TRAILER_CACHE_FLUSH_SECONDS)):
+                cls._missing_library_trailers.save()
+                cls.library_last_save = datetime.datetime.now()
 
     @classmethod
     def is_tmdb_id_missing_trailer(cls,
-                                   tmdb_id: int) -> None:
+                                   tmdb_id: int) -> bool:
         """
+        Checks to see if the given TMDb id is known to NOT have a trailer
 
         :param tmdb_id:
-        :return:
+        :return: True if the given tmdb_id is known to be missing a trailer
+                 False if it is unknown
         """
         cls.abort_on_shutdown()
-        tmdb_id_missing: bool = True
         with cls.lock:
             cls.load_cache_if_needed()
-            if tmdb_id not in cls._all_missing_tmdb_trailers:
-                tmdb_id_missing = False
-            else:
-                entry = cls._all_missing_tmdb_trailers[tmdb_id]
-                elapsed_time = datetime.date.today() - entry['timestamp']
-                elapsed_days = elapsed_time.days
-                if elapsed_days > Settings.get_expire_remote_db_trailer_check_days():
-                    del cls._all_missing_tmdb_trailers[tmdb_id]
-                    cls.tmdb_cache_changed()
-
-        if tmdb_id_missing:
-            Statistics.add_missing_tmdb_id_cache_miss()
-            CacheIndex.remove_unprocessed_movie(tmdb_id)
-        else:
+            found: int = cls._missing_tmdb_trailers.lookup(int(tmdb_id))
+
+        if found == NegativeIdCache.PRESENT:
             Statistics.add_missing_tmdb_cache_hit()
+        else:
+            Statistics.add_missing_tmdb_id_cache_miss()
+            if found == NegativeIdCache.FALSE_POSITIVE:
+                Statistics.add_missing_tmdb_id_cache_false_positive()
 
-        return
+        return found == NegativeIdCache.PRESENT
 
     @classmethod
     def tmdb_cache_changed(cls, flush: bool = False) -> None:
@@ -206,35 +186,13 @@ class TrailerUnavailableCache:
 
         :return:
         """
-        '''
-        TODO: There are several issues here:
-              tmdb_unsaved_changes and last save can be changed here, outside of
-              the lock, while save_cache is in process of writing cache. In which
-              save_cache will reset tmdb_unsaved_changes and tmdb_last_save AFTER
-              we have exited.
-         
-              Also there are issues with multiple threads waiting on lock during
-              a shutdown.
-         
-              Also, if the cache is large, it can take time to write AND it
-              is more vulnerable to corruption, particularly at shutdown.
-         
-              Problems likely in other cache modules.
-         
-              Suggest using object_hook argument on json operations coupled with
-              write to temp file, then rename.  See json_utils_basic.
-        '''
-
         with cls.lock:
-            cls.tmdb_unsaved_changes += 1
-            if cls.tmdb_last_save is None:
-                cls.tmdb_last_save = datetime.datetime.now()
-
-            if flush or (cls.tmdb_unsaved_changes >
+            if flush or (cls._missing_tmdb_trailers.get_unsaved_count() >
                          Constants.TRAILER_CACHE_FLUSH_UPDATES) or (
                     (datetime.datetime.now() - cls.tmdb_last_save)
                     > datetime.timedelta(seconds=Constants.TRAILER_CACHE_FLUSH_SECONDS)):
-                cls.save_cache()
+                cls._missing_tmdb_trailers.save()
+                cls.tmdb_last_save = datetime.datetime.now()
 
     @classmethod
     def abort_on_shutdown(cls, ignore_shutdown: bool = False) -> None:
@@ -245,178 +203,74 @@ class TrailerUnavailableCache:
     @classmethod
     def save_cache(cls, ignore_shutdown: bool = False) -> None:
         """
+        Appends any unsaved ids to the journals. Cheap when nothing changed.
 
         :return:
         """
         cls.abort_on_shutdown(ignore_shutdown=ignore_shutdown)
         with cls.lock:
             cls.load_cache_if_needed()
-            if cls.tmdb_unsaved_changes == 0 and cls.library_unsaved_changes == 0:
-                return
-            if cls.tmdb_unsaved_changes > 0:
-                entries_to_delete = []
-                for key, entry in cls._all_missing_tmdb_trailers.items():
-                    elapsed_time = datetime.date.today() - entry['timestamp']
-                    elapsed_days = elapsed_time.days
-                    if elapsed_days > Settings.get_expire_remote_db_trailer_check_days():
-                        if (entry[MovieField.UNIQUE_ID_TMDB] in
-                                cls._all_missing_tmdb_trailers):
-                            entries_to_delete.append(
-                                entry[MovieField.UNIQUE_ID_TMDB])
-                for entry_to_delete in entries_to_delete:
-                    del cls._all_missing_tmdb_trailers[entry_to_delete]
-
-                cls.abort_on_shutdown(ignore_shutdown=ignore_shutdown)
-                try:
-                    path = os.path.join(Settings.get_remote_db_cache_path(),
-                                        'index', 'missing_tmdb_trailers.json')
-                    temp_path = os.path.join(Settings.get_remote_db_cache_path(),
-                                             'index',
-                                             'missing_tmdb_trailers.json.temp')
-
-                    # path = path.encode('utf-8')
-                    path = xbmcvfs.validatePath(path)
-                    temp_path = xbmcvfs.validatePath(temp_path)
-
-                    parent_dir, file_name = os.path.split(temp_path)
-                    if not os.path.exists(parent_dir):
-                        DiskUtils.create_path_if_needed(parent_dir)
-
-                    with io.open(temp_path, mode='wt', newline=None,
-                                 encoding='utf-8', ) as cacheFile:
-                        json_text = \
-                            json.dumps(cls._all_missing_tmdb_trailers,
-                                       encoding='utf-8',
-                                       ensure_ascii=False,
-                                       default=TrailerUnavailableCache.handler,
-                                       indent=3, sort_keys=True)
-                        cacheFile.write(json_text)
-                        cacheFile.flush()
-                    try:
-                        os.replace(temp_path, path)
-                    except OSError:
-                        cls._logger.exception(f'Failed to replace index of movies'
-                                              f' missing trailers cache: {path}')
-
-                    cls.tmdb_last_save = datetime.datetime.now()
-                    cls.tmdb_unsaved_changes = 0
-                except AbortException:
-                    reraise(*sys.exc_info())
-                except IOError as e:
-                    cls._logger.exception('')
-                except Exception as e:
-                    cls._logger.exception('')
-                finally:
-                    try:
-                        os.remove(temp_path)
-                    except Exception:
-                        pass
-
+            cls._missing_tmdb_trailers.save()
+            cls.tmdb_last_save = datetime.datetime.now()
             cls.abort_on_shutdown(ignore_shutdown=ignore_shutdown)
-            if cls.library_unsaved_changes > 0:
-                entries_to_delete = []
-
-                for key, entry in cls._all_missing_library_trailers.items():
-                    elapsed_time = datetime.date.today() - entry['timestamp']
-                    elapsed_days = elapsed_time.days
-                    if elapsed_days > Settings.get_expire_remote_db_trailer_check_days():
-                        if (entry[MovieField.MOVIEID] in
-                                cls._all_missing_library_trailers):
-                            entries_to_delete.append(entry[MovieField.MOVIEID])
-
-                for entry_to_delete in entries_to_delete:
-                    del cls._all_missing_library_trailers[entry_to_delete]
-
-                cls.abort_on_shutdown(ignore_shutdown=ignore_shutdown)
-                try:
+            cls._missing_library_trailers.save()
+            cls.library_last_save = datetime.datetime.now()
 
-                    path = os.path.join(Settings.get_remote_db_cache_path(),
-                                        'index', 'missing_library_trailers.json')
-                    temp_path = os.path.join(Settings.get_remote_db_cache_path(),
-                                        'index', 'missing_library_trailers.json.temp')
-                    # path = path.encode('utf-8')
-                    path = xbmcvfs.validatePath(path)
-                    temp_path = xbmcvfs.validatePath(temp_path)
-
-                    parent_dir, file_name = os.path.split(path)
-                    if not os.path.exists(parent_dir):
-                        DiskUtils.create_path_if_needed(parent_dir)
-
-                    with io.open(temp_path, mode='wt', newline=None,
-                                 encoding='utf-8', ) as cacheFile:
-
-                        # TODO: Need ability to interrupt when ABORT. Object_handler
-                        # not a valid arg to dumps
-
-                        json_text = \
-                            json.dumps(cls._all_missing_library_trailers,
-                                       encoding='utf-8',
-                                       ensure_ascii=False,
-                                       default=TrailerUnavailableCache.handler,
-                                       indent=3, sort_keys=True)
-                        cacheFile.write(json_text)
-                        cacheFile.flush()
-
-                    try:
-                        os.replace(temp_path, path)
-                    except OSError:
-                        cls._logger.exception(f'Failed to replace missing trailer'
-                                              f' information cache: {path}')
-
-                    cls.library_last_save = datetime.datetime.now()
-                    cls.library_unsaved_changes = 0
-                except AbortException:
-                    reraise(*sys.exc_info())
-                except IOError as e:
-                    cls._logger.exception('')
-                except Exception as e:
-                    cls._logger.exception('')
-                finally:
-                    try:
-                        os.remove(temp_path)
-                    except Exception:
-                        pass
-
-    @staticmethod
-    def abort_checker(dct: Dict[str, Any]) -> Dict[str, Any]:
+    @classmethod
+    def get_cache_directory(cls) -> str:
         """
-
-        :param dct:
-        :return:
+        :return: Directory containing the snapshots and journals
         """
-        TrailerUnavailableCache.abort_on_shutdown()
-        return dct
+        path: str = os.path.join(Settings.get_remote_db_cache_path(), 'index')
+        return xbmcvfs.validatePath(path)
 
-    @staticmethod
-    def handler(obj: Any) -> Any:
+    @classmethod
+    def read_legacy_cache(cls, file_name: str,
+                          id_field: str) -> Dict[int, datetime.date]:
         """
+        Reads a cache written by older versions, which was a json dict of
+        entries containing the id and a timestamp.
 
-        :param obj:
-        :return:
+        :param file_name:
+        :param id_field: Entry field holding the id
+        :return: id -> day added. None if there is no such cache.
         """
-        if hasattr(obj, 'isoformat'):
-            return obj.isoformat()
-        # else:  # if isinstance(obj, ...):
-        #     return json.JSONEncoder.default(self, obj)
-        else:
-            raise TypeError('Object of type %s with value of %s is not JSON serializable' % (
-                type(obj), repr(obj)))
+        path: str = os.path.join(cls.get_cache_directory(), file_name)
+        if not os.path.exists(path):
+            return None
+
+        ids: Dict[int, datetime.date] = {}
+        try:
+            with io.open(path, mode='rt', newline=None,
+                         encoding='utf-8') as cacheFile:
+                entries: Dict[str, Dict[str, Any]] = json.load(cacheFile,
+                                                               encoding='utf-8')
+            for entry in entries.values():
+                cls.abort_on_shutdown()
+                try:
+                    timestamp = dateutil.parser.parse(entry['timestamp'])
+                    ids[int(entry[id_field])] = timestamp.date()
+                except (KeyError, TypeError, ValueError):
+                    pass
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception:
+            cls._logger.exception(f'Ignoring unreadable cache: {path}')
+
+        if cls._logger.isEnabledFor(LazyLogger.DEBUG):
+            cls._logger.debug(f'Converting {len(ids)} entries from: {path}')
+        return ids
 
-    @staticmethod
-    def datetime_parser(dct: Dict[Any, Any]) -> Dict[Any, Any]:
+    @classmethod
+    def remove_legacy_cache(cls, file_name: str) -> None:
         """
-
-        :param dct:
+        :param file_name:
         :return:
         """
-        TrailerUnavailableCache.abort_on_shutdown()
-        date_string = dct.get('timestamp', None)
-        if date_string is not None:
-            timestamp = dateutil.parser.parse(date_string)
-            dct['timestamp'] = timestamp.date()
-            return dct
-        else:
-            return dct
+        try:
+            os.remove(os.path.join(cls.get_cache_directory(), file_name))
+        except OSError:
+            pass
 
     @classmethod
     def load_cache_if_needed(cls) -> None:
@@ -424,58 +278,43 @@ class TrailerUnavailableCache:
 
         :return:
         """
-        path = os.path.join(Settings.get_remote_db_cache_path(),
-                            'index', 'missing_tmdb_trailers.json')
-        path = xbmcvfs.validatePath(path)
         cls.abort_on_shutdown()
         with cls.lock:
             if cls._loaded:
                 return
-            try:
-                parent_dir, file_name = os.path.split(path)
-                DiskUtils.create_path_if_needed(parent_dir)
-
-                if os.path.exists(path):
-                    with io.open(path, mode='rt',
-                                 newline=None,
-                                 encoding='utf-8') as cacheFile:
-                        cls._all_missing_tmdb_trailers = json.load(
-                            cacheFile, encoding='utf-8',
-                            object_hook=TrailerUnavailableCache.datetime_parser)
-                        size = len(cls._all_missing_tmdb_trailers)
-                        Statistics.missing_tmdb_trailers_initial_size(size)
-            except AbortException:
-                reraise(*sys.exc_info())
-            except IOError as e:
-                cls._logger.exception('')
-            except JSONDecodeError as e:
-                os.remove(path)
-            except Exception as e:
-                cls._logger.exception('')
 
-            cls.abort_on_shutdown()
-            path = os.path.join(Settings.get_remote_db_cache_path(),
-                                'index', 'missing_library_trailers.json')
-            path = xbmcvfs.validatePath(path)
+            directory: str = cls.get_cache_directory()
             try:
-                parent_dir, file_name = os.path.split(path)
-                DiskUtils.create_path_if_needed(parent_dir)
-                if os.path.exists(path):
-                    with io.open(path, mode='rt',
-                                           newline=None,
-                                           encoding='utf-8') as cacheFile:
-                        cls._all_missing_library_trailers = json.load(
-                            cacheFile, encoding='utf-8',
-                            object_hook=TrailerUnavailableCache.datetime_parser)
-                        size = len(cls._all_missing_library_trailers)
-                        Statistics.missing_library_trailers_initial_size(size)
+                DiskUtils.create_path_if_needed(directory)
             except AbortException:
                 reraise(*sys.exc_info())
-            except JSONDecodeError as e:
-                os.remove(path)
-            except IOError as e:
-                cls._logger.exception('')
-            except Exception as e:
+            except Exception:
                 cls._logger.exception('')
 
-        cls._loaded = True
+            get_expire_days: Callable[[], int] = \
+                Settings.get_expire_remote_db_trailer_check_days
+            cls._missing_tmdb_trailers = NegativeIdCache(
+                directory, 'missing_tmdb_trailers', get_expire_days)
+            cls._missing_library_trailers = NegativeIdCache(
+                directory, 'missing_library_trailers', get_expire_days)
+
+            # The library cache used to be keyed by tmdb_id, but the entries
+            # also hold the library id, which is what is looked up
+
+            for cache, legacy_file, id_field in (
+                    (cls._missing_tmdb_trailers, 'missing_tmdb_trailers.json',
+                     MovieField.UNIQUE_ID_TMDB),
+                    (cls._missing_library_trailers,
+                     'missing_library_trailers.json', MovieField.MOVIEID)):
+                cls.abort_on_shutdown()
+                legacy: Dict[int, datetime.date] = cls.read_legacy_cache(
+                    legacy_file, id_field)
+                cache.load(legacy=legacy)
+                if legacy is not None and not cache.needs_compaction():
+                    cls.remove_legacy_cache(legacy_file)
+
+            Statistics.missing_tmdb_trailers_initial_size(
+                len(cls._missing_tmdb_trailers))
+            Statistics.missing_library_trailers_initial_size(
+                len(cls._missing_library_trailers))
+            cls._loaded = True
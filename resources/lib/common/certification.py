@@ -10,11 +10,11 @@ import re
 import sys
 import threading
 from contextlib import closing
-import xmltodict
 import xbmcvfs
 
 from common.exceptions import AbortException
 from common.constants import Constants
+from common.definition_bundle import DefinitionBundle
 from common.imports import *
 from common.logger import LazyLogger
 from common.settings import Settings
@@ -32,6 +32,11 @@ class LoadCertificationDefinitions:
     _logger: ClassVar[LazyLogger] = None
 
     def __init__(self) -> None:
+        # xmltodict brings in urllib, which is slow to import and only
+        # needed once the definitions are first used
+
+        import xmltodict
+
         cls = type(self)
         if cls._logger is None:
             cls._logger = module_logger.getChild(cls.__name__)
@@ -197,9 +202,6 @@ class LoadCertificationDefinitions:
                                                        certifications)
 
 
-LoadCertificationDefinitions()
-
-
 class Certification:
     """
     Represents a single certification (i.e. 'G', General Admission). Includes
@@ -295,12 +297,16 @@ class Certifications:
 
     _logger: LazyLogger = None
 
-    def __init__(self, country_id: str, country_label: str,
-                 certification_label: str, certification_label_id: int) -> None:
-        cls = type(self)
+    @classmethod
+    def class_init(cls) -> None:
+        # Not done in __init__, instances loaded from the definition
+        # bundle are never initialized
+
         if cls._logger is None:
             cls._logger = module_logger.getChild(cls.__name__)
 
+    def __init__(self, country_id: str, country_label: str,
+                 certification_label: str, certification_label_id: int) -> None:
         self._country_id: str = country_id
         self._country_label: str = country_label
         self._label: str = certification_label
@@ -466,7 +472,20 @@ class WorldCertifications:
         with cls._lock:
             if not cls._initialized:
                 cls._initialized = True
+                path: str = os.path.join(Constants.ADDON_PATH,
+                                         'resources', 'certifications')
+                key: str = DefinitionBundle.get_key(path)
+                certifications_by_country: Dict[str, Certifications] = \
+                    DefinitionBundle.load('certifications', key)
+                if certifications_by_country is not None:
+                    cls._certifications_by_country.update(
+                        certifications_by_country)
+                    return
+
                 LoadCertificationDefinitions()
+                if len(cls._certifications_by_country) > 0:
+                    DefinitionBundle.save('certifications', key,
+                                          cls._certifications_by_country)
 
     @classmethod
     def add_certifications(cls, country_id: str,
@@ -567,6 +586,7 @@ class WorldCertifications:
         return certification.get_preferred_id()
 
 
+Certifications.class_init()
 WorldCertifications()
 
 '''
@@ -40,6 +40,10 @@ class Constants:
     SCRIPT_PATH: str = None
     YOUTUBE_DL_ADDON_LIB_PATH: str = None
     SAVE_MEMORY: bool = True
+    # Approximate bytes of fully populated movies kept in memory by discovery,
+    # across all movie sources. Least recently used movies beyond this are
+    # spilled to disk.
+    DISCOVERY_POOL_MEMORY_BUDGET: Final[int] = 32 * 1024 * 1024
     TRAILER_INFO_DISPLAY_SECONDS: Final[int] = 60
     TRAILER_INFO_DISPLAY_MILLISECONDS: Final[int] = 6000
     SECONDS_BEFORE_RESHUFFLE: Final[int] = 1 * 60
@@ -99,6 +103,11 @@ class Constants:
     TFH_GLOB_PATTERN: str = '**/*-movie.*'
 
     TMDB_GLOB_JSON_PATTERN: str = '**/tmdb_[0-9]*.json'
+
+    # Folder of incomplete trailer downloads (DownloadStaging). Never
+    # counted, or purged, as part of a cache
+
+    DOWNLOAD_STAGING_FOLDER: str = 'rt_staging'
     TMDB_ID_PATTERN: Pattern = re.compile(r'^tmdb_([0-9]+).json')
 
     # For Testing
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Build-once cache of objects built from the add-on's XML definition files
+(resources/genres, resources/certifications).
+
+Parsing the XML requires xmltodict (which drags in urllib) and building the
+definitions compiles every certification pattern. Instead, the fully built
+objects are pickled to <addon_data>/bundles/<name>.pickle, together with a
+key derived from the source files. The bundle is only used when the key
+still matches, so editing, adding or removing a definition file, upgrading
+the add-on or changing Python rebuilds it automatically.
+
+    key: str = DefinitionBundle.get_key(source_dir)
+    data = DefinitionBundle.load('genres', key)
+    if data is None:
+        data = build_from_xml()
+        DefinitionBundle.save('genres', key, data)
+"""
+import hashlib
+import os
+import pickle
+import sys
+
+from common.constants import Constants
+from common.exceptions import AbortException
+from common.imports import *
+from common.logger import LazyLogger
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+
+class DefinitionBundle:
+    """
+    Reads and writes pickled definition bundles
+    """
+    # Change whenever the pickled classes change incompatibly
+
+    BUNDLE_FORMAT: Final[int] = 1
+    SOURCE_SUFFIX: Final[str] = '.xml'
+
+    _logger: LazyLogger = None
+
+    @classmethod
+    def class_init(cls) -> None:
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+    @classmethod
+    def get_bundle_path(cls, name: str) -> str:
+        """
+        :param name: Bundle name, e.g. 'genres'
+        :return: Path of the bundle
+        """
+        return os.path.join(Constants.FRONTEND_DATA_PATH, 'bundles',
+                            f'{name}.pickle')
+
+    @classmethod
+    def get_key(cls, source_dir: str) -> str:
+        """
+        Hashes the name and contents of every definition file in source_dir,
+        along with everything else that can make a saved bundle unusable.
+
+        :param source_dir:
+        :return: Hex digest identifying this set of definitions, or None
+                 when the definitions can't be read (no bundle is used)
+        """
+        digest = hashlib.sha256()
+        digest.update(f'{cls.BUNDLE_FORMAT}|{sys.version}|'
+                      f'{Constants.ADDON.getAddonInfo("version")}'
+                      .encode('utf-8'))
+        try:
+            for file in sorted(os.listdir(source_dir)):
+                path: str = os.path.join(source_dir, file)
+                if file.endswith(cls.SOURCE_SUFFIX) and os.path.isfile(path):
+                    digest.update(file.encode('utf-8'))
+                    with open(path, 'rb') as source_file:
+                        digest.update(source_file.read())
+        except OSError as e:
+            cls._logger.warning(f'Can not read definitions: {source_dir} {e}')
+            return None
+
+        return digest.hexdigest()
+
+    @classmethod
+    def load(cls, name: str, key: str) -> Any:
+        """
+        :param name: Bundle name
+        :param key: Key of the current definitions, from get_key
+        :return: The bundled data, or None when the bundle is missing, stale
+                 or unreadable
+        """
+        if key is None:
+            return None
+
+        path: str = cls.get_bundle_path(name)
+        try:
+            with open(path, 'rb') as bundle_file:
+                bundle: Dict[str, Any] = pickle.load(bundle_file)
+        except FileNotFoundError:
+            return None
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception as e:
+            cls._logger.warning(f'Ignoring unreadable bundle: {path} {e}')
+            return None
+
+        if bundle.get('key') != key:
+            if cls._logger.isEnabledFor(LazyLogger.DEBUG):
+                cls._logger.debug(f'Bundle is stale: {path}')
+            return None
+
+        return bundle.get('data')
+
+    @classmethod
+    def save(cls, name: str, key: str, data: Any) -> None:
+        """
+        Replaces the bundle. Failures are logged, the bundle is only an
+        optimization.
+
+        :param name: Bundle name
+        :param key: Key of the definitions data was built from
+        :param data:
+        :return:
+        """
+        if key is None:
+            return
+
+        path: str = cls.get_bundle_path(name)
+
+        # Front and back end may both build at the same time
+
+        tmp_path: str = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as bundle_file:
+                pickle.dump({'key': key, 'data': data}, bundle_file,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception:
+            cls._logger.exception(f'Failed to write bundle: {path}')
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+DefinitionBundle.class_init()
@@ -18,6 +18,7 @@ import os
 import random
 import sys
 
+from common.constants import Constants
 from common.exceptions import AbortException
 from common.logger import LazyLogger
 from common.monitor import Monitor
@@ -471,6 +472,11 @@ class DiskUtils:
             path: Path
 
             for path in finder:
+                # Incomplete downloads are reclaimed by DownloadStaging
+
+                if Constants.DOWNLOAD_STAGING_FOLDER in path.parts:
+                    continue
+
                 for cache_name, (pattern, cache_type) in patterns.items():
                     delay.delay()  # Can throw AbortException
                     Monitor.throw_exception_if_abort_requested()
@@ -39,7 +39,7 @@ class FlexibleTimer(Thread):
         :param args:  Optional arguments to pass to function
         :param kwargs:  Optional arguments to pass to function
         """
-        super().__init__(self)
+        super().__init__()
         clz = type(self)
         if clz._logger is None:
             clz._logger = module_logger.getChild(self.__class__.__name__)
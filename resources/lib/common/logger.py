@@ -11,6 +11,7 @@ import io
 import inspect
 import logging
 import os
+import queue
 import sys
 import threading
 import traceback
@@ -34,14 +35,7 @@ if hasattr(sys, '_getframe'):
                          code, it will probably set to ignore 2 or more frames.
         :return:
         """
-        ignore_frames += 1
-        frame = None
-        try:
-            raise Exception
-        except:
-            frame = sys._getframe(ignore_frames)
-
-        return frame
+        return sys._getframe(ignore_frames + 1)
 else:
     def current_frame(ignore_frames: int = 0) -> traceback:
         """
@@ -62,6 +56,31 @@ else:
 #
 _srcfile = os.path.normcase(current_frame.__code__.co_filename)
 
+# Whether a code object belongs to this module, computed once per code
+# object rather than normalizing file names on every logged message.
+
+_is_logger_code: Dict[Any, bool] = {}
+
+
+def find_caller(frame: Any) -> Tuple[str, int, str]:
+    """
+    Finds the first frame, starting at frame, which is not in this module.
+
+    :param frame:
+    :return: (pathname, line number, function name) or an empty tuple
+    """
+    while frame is not None:
+        code = frame.f_code
+        in_logger: bool = _is_logger_code.get(code)
+        if in_logger is None:
+            in_logger = os.path.normcase(code.co_filename) == _srcfile
+            _is_logger_code[code] = in_logger
+        if not in_logger:
+            return code.co_filename, frame.f_lineno, code.co_name
+        frame = frame.f_back
+
+    return tuple()
+
 
 class Logger(logging.Logger):
     """
@@ -262,18 +281,7 @@ class Logger(logging.Logger):
                     start_frame = current_frame(ignore_frames=ignore_frames)
                 # On some versions of IronPython, current_frame() returns None if
                 # IronPython isn't run with -X:Frames.
-                if start_frame is not None:
-                    #     start_frame = start_frame.f_back
-                    rv = "(unknown file)", 0, "(unknown function)"
-                    while hasattr(start_frame, "f_code"):
-                        co = start_frame.f_code
-                        filename = os.path.normcase(co.co_filename)
-                        if filename == _srcfile:
-                            start_frame = start_frame.f_back
-                            continue
-                        start_file = (co.co_filename,
-                                      start_frame.f_lineno, co.co_name)
-                        break
+                start_file = find_caller(start_frame)
 
             log_level = kwargs['log_level']
             separator = kwargs['separator']
@@ -621,6 +629,17 @@ class Logger(logging.Logger):
         root_logger = Logger.get_root_logger()
         root_logger.setLevel(logging_level)
 
+    @staticmethod
+    def stop_background_writer() -> None:
+        """
+            Writes any log records still queued for the background writer.
+            Registered as an abort listener so that nothing is lost during
+            shutdown.
+
+        :return:
+        """
+        AsyncLogWriter.stop()
+
     @staticmethod
     def log_exception(exc_info: BaseException = None, msg: str = None) -> None:
         """
@@ -903,6 +922,9 @@ class LazyLogger(Logger):
         :param kwargs: str  Meant for Trace usage:
         :return:
         """
+        if not self.isEnabledFor(Logger.DEBUG):
+            return
+
         kwargs['log_level'] = Logger.DEBUG
         kwargs.setdefault('lazy_logger', True)
         kwargs.setdefault('ignore_frames', 0)
@@ -918,6 +940,9 @@ class LazyLogger(Logger):
         :param kwargs: str  Meant for Trace usage:
         :return:
         """
+        if not self.isEnabledFor(Logger.DEBUG_VERBOSE):
+            return
+
         kwargs['log_level'] = Logger.DEBUG_VERBOSE
         kwargs.setdefault('lazy_logger', True)
         kwargs.setdefault('ignore_frames', 0)
@@ -933,6 +958,9 @@ class LazyLogger(Logger):
         :param kwargs: str  Meant for Trace usage:
         :return:
         """
+        if not self.isEnabledFor(Logger.DEBUG_EXTRA_VERBOSE):
+            return
+
         kwargs['log_level'] = Logger.DEBUG_EXTRA_VERBOSE
         kwargs.setdefault('lazy_logger', True)
         kwargs.setdefault('ignore_frames', 0)
@@ -948,6 +976,9 @@ class LazyLogger(Logger):
         :param kwargs: str  Meant for Trace usage:
         :return:
         """
+        if not self.isEnabledFor(Logger.INFO):
+            return
+
         kwargs['log_level'] = Logger.INFO
         kwargs.setdefault('lazy_logger', True)
         kwargs.setdefault('ignore_frames', 0)
@@ -963,6 +994,9 @@ class LazyLogger(Logger):
         :param kwargs: str  Meant for Trace usage:
         :return:
         """
+        if not self.isEnabledFor(Logger.WARNING):
+            return
+
         kwargs['log_level'] = Logger.WARNING
         kwargs.setdefault('lazy_logger', True)
         kwargs.setdefault('ignore_frames', 0)
@@ -994,6 +1028,9 @@ class LazyLogger(Logger):
         :param kwargs: str  Meant for Trace usage:
         :return: None
         """
+        if not self.isEnabledFor(Logger.DEBUG):
+            return
+
         kwargs.setdefault('lazy_logger', True)
         kwargs.setdefault('ignore_frames', 0)
         ignore_frames = kwargs['ignore_frames'] + 1
@@ -1009,6 +1046,9 @@ class LazyLogger(Logger):
         :param kwargs: str  Meant for Trace usage:
         :return: None
         """
+        if not self.isEnabledFor(Logger.DEBUG):
+            return
+
         kwargs.setdefault('lazy_logger', True)
         kwargs.setdefault('ignore_frames', 0)
         ignore_frames = kwargs['ignore_frames'] + 1
@@ -1291,10 +1331,119 @@ class Trace(logging.Filter):
         return 0
 
 
+class AsyncLogWriter:
+    """
+    Formats log records and writes them to the Kodi log on a background
+    thread, so that the threads doing the logging (fetchers, the player
+    monitor, etc.) do not pay for formatting or xbmc.log. The message
+    (msg % args) and any traceback are rendered by the logging thread
+    before the record is queued (see MyHandler.emit), so only the layout
+    of the record is left to the writer.
+
+    Records are passed through a bounded queue. When the queue is full,
+    records below ERROR are dropped and counted; ERROR and above are written
+    by the calling thread instead. The number of dropped records is logged
+    once the writer catches up.
+    """
+    QUEUE_SIZE: Final[int] = 4096
+
+    _queue: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+    _lock: threading.RLock = threading.RLock()
+    _thread: threading.Thread = None
+    _stopped: bool = False
+    _written: int = 0
+    _dropped: int = 0
+    _reported_dropped: int = 0
+
+    @classmethod
+    def submit(cls, handler: 'MyHandler', record: logging.LogRecord) -> bool:
+        """
+        Queues a record for the writer thread
+
+        :param handler: Formats and writes the record
+        :param record:
+        :return: False if the caller must write the record itself
+        """
+        if cls._stopped:
+            return False
+
+        if cls._thread is None:
+            with cls._lock:
+                if cls._thread is None:
+                    cls._thread = threading.Thread(target=cls._run,
+                                                   name='AsyncLogWriter',
+                                                   daemon=True)
+                    cls._thread.start()
+        try:
+            cls._queue.put_nowait((handler, record))
+        except queue.Full:
+            if record.levelno >= Logger.ERROR:
+                return False
+            with cls._lock:
+                cls._dropped += 1
+        return True
+
+    @classmethod
+    def _run(cls) -> None:
+        """
+        Writer thread
+
+        :return:
+        """
+        while True:
+            item: Tuple['MyHandler', logging.LogRecord] = cls._queue.get()
+            if item is None:
+                break
+
+            handler, record = item
+            handler.write(record)
+            cls._written += 1
+            if cls._dropped != cls._reported_dropped and cls._queue.empty():
+                with cls._lock:
+                    dropped: int = cls._dropped - cls._reported_dropped
+                    cls._reported_dropped = cls._dropped
+                xbmc.log(f'{Constants.CURRENT_ADDON_SHORT_NAME}: '
+                         f'{dropped} log messages dropped, '
+                         f'total: {cls._reported_dropped}', xbmc.LOGWARNING)
+
+    @classmethod
+    def stop(cls, timeout: float = 2.0) -> None:
+        """
+        Writes whatever is queued and stops the writer thread. Subsequent
+        records are written by the logging thread.
+
+        :param timeout: Maximum seconds to wait for the queue to drain
+        :return:
+        """
+        with cls._lock:
+            cls._stopped = True
+            thread: threading.Thread = cls._thread
+        if thread is None:
+            return
+
+        try:
+            cls._queue.put(None, timeout=timeout)
+            thread.join(timeout=timeout)
+        except queue.Full:
+            pass
+
+    @classmethod
+    def get_statistics(cls) -> Dict[str, int]:
+        """
+        :return: Counts of records written, dropped and currently queued
+        """
+        return {'written': cls._written,
+                'dropped': cls._dropped,
+                'queued': cls._queue.qsize()}
+
+
 class MyHandler(logging.Handler):
     """
 
     """
+    # When True, records are formatted and written by AsyncLogWriter
+
+    ASYNC_WRITES: bool = True
 
     def __init__(self, level: int = logging.NOTSET,
                  trace: Set[str] = None) -> None:
@@ -1317,12 +1466,43 @@ class MyHandler(logging.Handler):
         """
 
         try:
-            kodi_level = Logger.get_kodi_level(record.levelno)
+            # The traceback must be captured while the frames are still
+            # live, so exceptions are always formatted here.
+
             if record.exc_info is not None:
                 ignore_frames = record.__dict__.get('ignore_frames', 0) + 4
                 msg = self.formatter.formatException(record.exc_info,
                                                      ignore_frames)
                 record.exc_text = msg
+                record.exc_info = None
+
+            # Likewise the message: args may change once the caller moves
+            # on, and a formatting error must be reported with the caller
+            # still on the stack.
+
+            if record.args:
+                try:
+                    record.msg = record.getMessage()
+                    record.args = None
+                except Exception:
+                    self.handleError(record)
+                    return
+
+            if not (MyHandler.ASYNC_WRITES
+                    and AsyncLogWriter.submit(self, record)):
+                self.write(record)
+        except Exception as e:
+            pass
+
+    def write(self, record: logging.LogRecord) -> None:
+        """
+        Formats the record and writes it to the Kodi log
+
+        :param record:
+        :return:
+        """
+        try:
+            kodi_level = Logger.get_kodi_level(record.levelno)
             msg = self.format(record)
             xbmc.log(msg, kodi_level)
         except Exception as e:
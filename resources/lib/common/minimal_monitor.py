@@ -33,6 +33,7 @@ class MinimalMonitor(xbmc.Monitor):
     _xbmc_monitor: xbmc.Monitor = None
     _abort_received: threading.Event = None
     _abort_callback: Callable[[], None]  = None
+    _settings_changed_callback: Callable[[], None] = None
 
     """
     xbmc wants to be called.
@@ -50,7 +51,10 @@ class MinimalMonitor(xbmc.Monitor):
             cls._initialized = True
             # Weird problems with recursion if we make requests to the super
 
-            cls._xbmc_monitor = xbmc.Monitor()
+            # An instance of this class, rather than a plain xbmc.Monitor,
+            # so that Kodi delivers onSettingsChanged to us.
+
+            cls._xbmc_monitor = MinimalMonitor()
             cls._abort_received = threading.Event()
 
     @classmethod
@@ -132,6 +136,23 @@ class MinimalMonitor(xbmc.Monitor):
     def register_abort_callback(cls, callback: Callable[[], None]) -> None:
         MinimalMonitor._abort_callback = callback
 
+    @classmethod
+    def register_settings_changed_callback(cls,
+                                           callback: Callable[[], None]) -> None:
+        MinimalMonitor._settings_changed_callback = callback
+
+    def onSettingsChanged(self) -> None:
+        """
+        Called by Kodi whenever this addon's settings have been saved.
+
+        Only relays the event. Monitor decides whether anything really
+        changed. Must return quickly, it runs on the thread which created
+        the monitor.
+        """
+        callback: Callable[[], None] = MinimalMonitor._settings_changed_callback
+        if callback is not None:
+            callback()
+
 
 # Initialize class:
 #
@@ -10,13 +10,10 @@ Created on Feb 19, 2019
 from common.imports import *
 
 import copy
-import datetime
-import os
 import threading
 
 import xbmc
 
-from common.constants import Constants
 from common.critical_settings import CriticalSettings
 from common.exceptions import AbortException
 from common.logger import (Logger, LazyLogger, Trace)
@@ -38,6 +35,9 @@ class Monitor(MinimalMonitor):
     _screen_saver_listeners: Dict[Callable[[None], None], str] = None
     _screen_saver_listener_lock: threading.RLock = None
     _settings_changed_listeners: Dict[Callable[[None], None], str] = None
+    _settings_changed_listener_keys: Dict[Callable[[None], None],
+                                          FrozenSet[str]] = None
+    _settings_changed_event: threading.Event = None
     _settings_changed_listener_lock: threading.RLock = None
     _abort_listeners: Dict[Callable[[None], None], str] = None
     _abort_listener_lock: threading.RLock = None
@@ -45,6 +45,10 @@ class Monitor(MinimalMonitor):
     _wait_return_count_map: Dict[str, int] = {}  # thread_id, returns from wait
     _wait_call_count_map: Dict[str, int] = {}  # thread_id, calls to wait
 
+    # Seconds without further changes before settings are re-read
+
+    SETTINGS_QUIET_SECONDS: Final[float] = 5.0
+
     """
       Can't get rid of __init__
     """
@@ -63,7 +67,9 @@ class Monitor(MinimalMonitor):
             cls._screen_saver_listeners = {}
             cls._screen_saver_listener_lock = threading.RLock()
             cls._settings_changed_listeners = {}
+            cls._settings_changed_listener_keys = {}
             cls._settings_changed_listener_lock = threading.RLock()
+            cls._settings_changed_event = threading.Event()
             cls._abort_listeners = {}
             cls._abort_listener_lock = threading.RLock()
             cls._abort_listeners_informed = False
@@ -82,6 +88,7 @@ class Monitor(MinimalMonitor):
 
             cls.startup_complete_event = threading.Event()
             super().register_abort_callback(cls._inform_abort_listeners)
+            super().register_settings_changed_callback(cls._settings_saved)
 
             cls._monitor_changes_in_settings_thread = threading.Thread(
                 target=cls._monitor_changes_in_settings,
@@ -91,72 +98,59 @@ class Monitor(MinimalMonitor):
     @classmethod
     def _monitor_changes_in_settings(cls) -> None:
         """
+            Waits for Kodi to report that settings were saved (relayed by
+            MinimalMonitor.onSettingsChanged). Once Kodi has been quiet for
+            SETTINGS_QUIET_SECONDS, all settings are re-read in one pass and
+            compared with the previous snapshot. Only listeners interested
+            in a changed setting are notified.
+
+            No files are polled. The thread sleeps until an event or an
+            abort occurs.
 
         :return:
         """
-
-        last_time_changed: datetime.datetime
-        settings_path = os.path.join(
-            Constants.FRONTEND_DATA_PATH, 'settings.xml')
-        try:
-            file_stat = os.stat(settings_path)
-            last_time_changed = datetime.datetime.fromtimestamp(file_stat.st_mtime)
-        except Exception as e:
-            cls._logger.debug("Failed to read settings.xml")
-            last_time_changed = datetime.datetime.now()
-
-        # It seems that if multiple xbmc.WaitForAborts are pending, xbmc
-        # Does not inform all of them when an abort occurs. So, instead
-        # of waiting for 60 seconds per iteration, we wait 0.1 seconds
-        # and act when 600 calls has been made. Not exactly 60 seconds, but
-        # close enough for this
+        from common.settings import Settings
 
         thread_name = CriticalSettings.get_plugin_name() + "_monitorSettingsChanges"
         threading.current_thread().setName(thread_name)
-        iterations: int = 600
-
-        # We know that settings have not changed when we first start up,
-        # so ignore first false change.
-
-        while not cls.wait_for_abort(timeout=0.1):
-            iterations -= 1
-            if iterations < 0:
-                iterations = 600
-                try:
-                    file_stat = os.stat(settings_path)
-                    mod_time: datetime.datetime = datetime.datetime.fromtimestamp(
-                        file_stat.st_mtime)
-                except Exception as e:
-                    cls._logger.debug("Failed to read settings.xml")
-                    mod_time: datetime.datetime = datetime.datetime.now()
-
-                # Wait at least a minute after settings changed, just in case there
-                # are multiple changes.
-                #
-                # Note that when settings are changed via kodi config that this
-                # will cause a second settings changed event a minute or two
-                # after the initial one. However, the Settings code should
-                # detect that nothing has actually changed and no harm should be
-                # done.
-
-                if last_time_changed == mod_time:
-                    continue
-
-                now: datetime.datetime = datetime.datetime.now()
-
-                #
-                # Was file modified at least a minute ago?
-                #
-
-                delta: datetime.timedelta = now - mod_time
-
-                if delta.total_seconds() > 60:
-                    if cls._logger.isEnabledFor(Logger.DEBUG_VERBOSE):
-                        cls._logger.debug_verbose('Settings Changed!')
-                    last_time_changed = mod_time
-                    cls.on_settings_changed()
-
-                    # Here we go again
+
+        # Baseline to compare the first change against
+
+        Settings.get_snapshot()
+        while not cls.is_abort_requested():
+            cls._settings_changed_event.wait()
+            if cls.is_abort_requested():
+                break
+
+            # Wait until there are no more changes for a while, in case the
+            # user is making several. A notification which changes nothing
+            # is harmless, the diff below will be empty.
+
+            while True:
+                cls._settings_changed_event.clear()
+                if cls.wait_for_abort(timeout=cls.SETTINGS_QUIET_SECONDS):
+                    return
+                if not cls._settings_changed_event.is_set():
+                    break
+
+            try:
+                changed: Set[str] = Settings.reload_settings()
+            except Exception:
+                cls._logger.exception()
+                continue
+
+            if len(changed) > 0:
+                if cls._logger.isEnabledFor(Logger.DEBUG_VERBOSE):
+                    cls._logger.debug_verbose('Settings Changed:',
+                                              ', '.join(sorted(changed)))
+                cls.on_settings_changed(changed)
+
+    @classmethod
+    def _settings_saved(cls) -> None:
+        """
+            Called by MinimalMonitor when Kodi reports saved settings
+        """
+        cls._settings_changed_event.set()
 
     @classmethod
     def get_listener_name(cls,
@@ -213,11 +207,16 @@ class Monitor(MinimalMonitor):
     @classmethod
     def register_settings_changed_listener(cls,
                                            listener: Callable[[None], None],
-                                           name: str = None) -> None:
+                                           name: str = None,
+                                           settings: Iterable[str] = None
+                                           ) -> None:
         """
 
         :param name:
         :param listener:
+        :param settings: Ids of the settings the listener cares about. The
+                         listener is only called when at least one of them
+                         changes. If None, it is called on any change.
         :return:
         """
         with cls._settings_changed_listener_lock:
@@ -226,6 +225,9 @@ class Monitor(MinimalMonitor):
                 listener_name = cls.get_listener_name(listener, name)
 
                 cls._settings_changed_listeners[listener] = listener_name
+                if settings is not None:
+                    cls._settings_changed_listener_keys[listener] = frozenset(
+                        settings)
 
     @classmethod
     def unregister_settings_changed_listener(cls,
@@ -239,6 +241,7 @@ class Monitor(MinimalMonitor):
             try:
                 if listener in cls._settings_changed_listeners:
                     del cls._settings_changed_listeners[listener]
+                cls._settings_changed_listener_keys.pop(listener, None)
             except ValueError:
                 pass
 
@@ -298,9 +301,11 @@ class Monitor(MinimalMonitor):
             thread.start()
 
         cls.startup_complete_event.set()
+        cls._settings_changed_event.set()  # Wake settings thread to exit
 
         with cls._settings_changed_listener_lock:
             cls._settings_changed_listeners.clear()
+            cls._settings_changed_listener_keys.clear()
 
         with cls._screen_saver_listener_lock:
             cls._screen_saver_listeners.clear()
@@ -311,17 +316,27 @@ class Monitor(MinimalMonitor):
             Debug.dump_all_threads(delay=0.50)
 
     @classmethod
-    def _inform_settings_changed_listeners(cls) -> None:
+    def _inform_settings_changed_listeners(cls,
+                                           changed: Set[str] = None) -> None:
         """
 
+        :param changed: ids of the settings which changed. If None, every
+                        listener is informed.
         :return:
         """
         with cls._settings_changed_listener_lock:
             listeners = copy.copy(cls._settings_changed_listeners)
+            listener_keys = copy.copy(cls._settings_changed_listener_keys)
             if cls.is_abort_requested():
                 cls._settings_changed_listeners.clear()
+                cls._settings_changed_listener_keys.clear()
 
         for listener, listener_name in listeners.items():
+            keys: FrozenSet[str] = listener_keys.get(listener)
+            if (changed is not None and keys is not None
+                    and keys.isdisjoint(changed)):
+                continue
+
             if cls._logger.isEnabledFor(Logger.DEBUG_VERBOSE):
                 cls._logger.debug_verbose(
                     'Notifying listener:', listener_name)
@@ -354,21 +369,18 @@ class Monitor(MinimalMonitor):
         """
         This method is called by xbmc when any settings have changed.
 
-        Don't rely on xbmc.onSettingsChanged because we want to avoid changes to
-        app settings based upon a user's incomplete changes. Instead, rely
-        on _monitor_changes_in_settings, which waits a minute after settings.xml
-        file is stable before notification.
-
-        Real settings changed notification caused by on_settings_changed method.
+        Kodi delivers this to the MinimalMonitor instance, which relays it to
+        _monitor_changes_in_settings. That thread waits for the changes to
+        settle, then notifies listeners of the settings which really changed
+        via on_settings_changed.
 
         :return:
         """
-        # type(self).on_settings_changed()
-        pass
+        type(self)._settings_saved()
 
     @classmethod
-    def on_settings_changed(cls) -> None:
-        cls._inform_settings_changed_listeners()
+    def on_settings_changed(cls, changed: Set[str] = None) -> None:
+        cls._inform_settings_changed_listeners(changed)
 
     def onScreensaverActivated(self) -> None:
         """
@@ -349,7 +349,11 @@ class TMDbMovieId(AbstractMovieId):
         #
         # To keep consistent with other AbstractMovieId's
         #
-        self.set_tmdb_id(int(movie_id))
+        # TMDbMoviePageData is created without an id, it is set once the
+        # page data is parsed.
+
+        if movie_id is not None:
+            self.set_tmdb_id(int(movie_id))
 
     @classmethod
     def class_init(cls):
@@ -544,6 +548,13 @@ class TMDbMoviePageData(TMDbMovieId):
     def get_as_movie_type(self) -> Dict[str, Any]:
         return self._movie_info
 
+    def get_as_movie_id_type(self) -> TMDbMovieId:
+        tmdb_movie_id: TMDbMovieId = TMDbMovieId(self.get_id())
+        tmdb_movie_id.set_library_id(self.get_library_id())
+        tmdb_movie_id.set_local_trailer(self.has_local_trailer())
+        tmdb_movie_id.set_has_trailer(self.get_has_trailer())
+        return tmdb_movie_id
+
     def serialize(self) -> Dict[str, Any]:
         data: Dict[str, Any] = self.get_as_movie_type().copy()
         data[MovieField.CLASS] = type(self).__name__
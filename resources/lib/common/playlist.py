@@ -13,7 +13,6 @@ import os
 import threading
 
 import xbmcvfs
-import xmltodict
 
 from common.imports import *
 from common.constants import Constants
@@ -137,6 +136,11 @@ class Playlist:
                 with io.open(self.path, mode='rt', newline=None,
                              encoding='utf-8') as playlist_file:
                     buffer = playlist_file.read()
+
+                    # Imported here since it is slow to import and playlists
+                    # are seldom written
+
+                    import xmltodict
                     playlist_dict = xmltodict.parse(buffer)
         except Exception as e:
             clz._logger.exception('')
@@ -177,6 +181,7 @@ class Playlist:
         rule_list.append(new_rule)
         playlist_dict['smartplaylist']['rule'] = rule_list
         try:
+            import xmltodict
             with io.open(self.path, mode='wt', buffering=1, newline=None,
                          encoding='utf-8') as file:
                 file.write(xmltodict.unparse(playlist_dict, pretty=True))
@@ -188,6 +193,7 @@ class Playlist:
     def write_playlist(self, playlist_dict: Dict[str, 'Playlist']) -> None:
         clz = type(self)
         try:
+            import xmltodict
             with io.open(self.path, mode=self.mode, buffering=1, newline=None,
                          encoding='utf-8') as file:
                 file.write(xmltodict.unparse(playlist_dict, pretty=True))
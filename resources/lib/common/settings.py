@@ -5,8 +5,11 @@ Created on Feb 10, 2019
 @author: Frank Feuerbacher
 """
 import datetime
+import functools
 import locale
 import os
+import threading
+import types
 
 import xbmc
 import xbmcvfs
@@ -22,13 +25,95 @@ from common.logger import (LazyLogger, Trace)
 module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
 
 
+class SettingsSnapshot:
+    """
+        An immutable copy of the raw (string) value of every setting, read
+        from Kodi in one pass.
+
+        Accessors in Settings are simple lookups in the current snapshot
+        rather than a round-trip to Kodi. Comparing two snapshots gives the
+        ids of the settings which changed between them.
+    """
+
+    def __init__(self, values: Dict[str, str]) -> None:
+        self._values: types.MappingProxyType = types.MappingProxyType(
+            dict(values))
+
+    def get(self, setting_id: str, default: str = None) -> str:
+        return self._values.get(setting_id, default)
+
+    def __contains__(self, setting_id: str) -> bool:
+        return setting_id in self._values
+
+    def keys(self) -> KeysView[str]:
+        return self._values.keys()
+
+    def as_dict(self) -> Dict[str, str]:
+        return dict(self._values)
+
+    def replace(self, setting_id: str, value: str) -> ForwardRef('SettingsSnapshot'):
+        """
+            Returns a copy of this snapshot with one setting changed.
+        """
+        values: Dict[str, str] = dict(self._values)
+        values[setting_id] = value
+        return SettingsSnapshot(values)
+
+    def diff(self,
+             previous: ForwardRef('SettingsSnapshot')) -> FrozenSet[str]:
+        """
+            Returns the ids of every setting whose value differs from the
+            previous snapshot. Every setting is considered changed when
+            there is no previous snapshot.
+        """
+        if previous is None:
+            return frozenset(self._values.keys())
+
+        setting_ids: Set[str] = set(self._values.keys())
+        setting_ids.update(previous.keys())
+        changed: FrozenSet[str] = frozenset(
+            setting_id for setting_id in setting_ids
+            if self._values.get(setting_id) != previous.get(setting_id))
+        return changed
+
+
+_NOT_MEMOIZED: Final[object] = object()
+
+
+def memoized_setting(accessor: Callable[[], Any]) -> Callable[[], Any]:
+    """
+        Decorator for a no-argument Settings accessor. The value is computed
+        (parsed) once per settings generation, afterwards a call costs a
+        single dictionary lookup.
+
+        Only use for accessors whose result depends solely upon settings.
+        Returned values are shared, so must not be modified.
+    """
+    name: str = accessor.__name__
+
+    @functools.wraps(accessor)
+    def memoized() -> Any:
+        memo: Dict[str, Any] = Settings._memo
+        value: Any = memo.get(name, _NOT_MEMOIZED)
+        if value is _NOT_MEMOIZED:
+            value = accessor()
+            memo[name] = value
+        return value
+
+    return memoized
+
+
 class Settings:
     """
 
     """
     _addon_singleton = None
     _logger: LazyLogger = module_logger.getChild('Settings')
-    _previous_settings: Dict[str, Any] = {}
+    _snapshot: SettingsSnapshot = None
+    _previous_snapshot: SettingsSnapshot = None
+    _snapshot_lock: threading.RLock = threading.RLock()
+    _generation: int = 0
+    _memo: Dict[str, Any] = {}  # Accessor name: value for current generation
     DEFAULT_ROTTEN_TOMATOES_API_KEY: str = 'ynyq3vsaps7u8rb9nk98rcr'
     DEFAULT_TMDB_API_KEY = '35f17ee61909355c4b5d5c4f2c967f6c'
 
@@ -38,6 +123,8 @@ class Settings:
     TMDB_VOTE_VALUE = 'tmdb_vote_value'
     DO_NOT_RATED = 'do_nr'
     DO_DEBUG = 'do_debug'
+    LOG_LEVEL = 'log_level'
+    DEBUG_INCLUDE_THREAD_INFO = 'debug_include_thread_info'
     FILTER_GENRES = 'do_genre'
     GENRE_ACTION = 'g_action'
     GENRE_ADVENTURE = 'g_adventure'
@@ -113,6 +200,7 @@ class Settings:
     REPORT_GENRE_STATS = 'report_genre_stats'
     MAXIMUM_TRAILER_PLAY_SECONDS = 'maximum_trailer_play_seconds'
     MINIMUM_DAYS_SINCE_WATCHED = 'watched_days'
+    NO_REPEAT_HOURS = 'no_repeat_hours'
     NORMALIZE_VOLUME_OF_DOWNLOADED_TRAILERS = 'normalize_volume_of_downloaded_trailers'
     NORMALIZE_VOLUME_OF_LOCAL_TRAILERS = 'normalize_volume_of_local_trailers'
     NUMBER_OF_TRAILERS_TO_PLAY = 'numberOfTrailersToPlay'
@@ -135,6 +223,8 @@ class Settings:
     TMDB_MAX_DOWNLOAD_MOVIES = 'tmdb_max_download_movies'
     ENABLE_TRACE = 'do_trace'
     ENABLE_TRACE_STATS = 'do_trace_stats'
+    WRITE_LATENCY_REPORT = 'write_latency_report'
+    ENABLE_SAMPLING_PROFILER = 'enable_sampling_profiler'
     ENABLE_REMOTE_DATA_CACHE = 'use_remote_data_cache'
     ENABLE_TRAILER_CACHE = 'use_trailer_cache'
     CACHE_EXPIRATION_DAYS = 'json_cache_expiration_days'
@@ -143,6 +233,10 @@ class Settings:
     EXPIRE_TRAILER_CACHE_DAYS = 'trailer_cache_expiration_days'
     CACHE_TRAILER_CHECK_DAYS = 'trailer_existence_cache_check_days'
     TRAILER_CACHE_PATH = 'trailer_cache_path'
+    WARM_POOL_SIZE_MB = 'warm_pool_size_mb'
+    LIMITED_BANDWIDTH = 'limited_bandwidth'
+    TRAILER_QUALITY = 'trailer_quality'
+    TRAILERS_PATH = 'path'
     CACHE_PATH = 'remote_db_cache_path'
     PLAYLIST_1 = "playlist_name_1"
     PLAYLIST_2 = "playlist_name_2"
@@ -163,6 +257,9 @@ class Settings:
 
     YOUTUBE_DL_COOKIE_PATH = 'youtube_dl_cookie_path'
     YOUTUBE_DL_CACHE_PATH = 'youtube_dl_cache_path'
+    YOUTUBE_DL_WORKERS = 'youtube_dl_workers'
+    YOUTUBE_DL_WORKER_MEMORY_MB = 'youtube_dl_worker_memory_mb'
+    YOUTUBE_DL_WORKER_PYTHON = 'youtube_dl_worker_python'
 
     ALL_SETTINGS: List[str] = [
         ADJUST_VOLUME,
@@ -171,6 +268,8 @@ class Settings:
         TMDB_VOTE_VALUE,
         DO_NOT_RATED,
         DO_DEBUG,
+        LOG_LEVEL,
+        DEBUG_INCLUDE_THREAD_INFO,
         FILTER_GENRES,
         GENRE_ACTION,
         GENRE_ADVENTURE,
@@ -223,6 +322,9 @@ class Settings:
         MAX_NUMBER_OF_CACHED_TRAILERS,
         TMDB_MAX_NUMBER_OF_TRAILERS,
         INCLUDE_TFH_TRAILERS,
+        MAX_TFH_TRAILERS,
+        TFH_CACHE_EXPIRATION_DAYS,
+        LICENSE_DISPLAY_SECONDS,
 
         LIMIT_SIZE_OF_CACHED_TRAILERS,
         MAX_SIZE_OF_CACHED_TRAILERS,
@@ -245,6 +347,7 @@ class Settings:
         REPORT_GENRE_STATS,
         MAXIMUM_TRAILER_PLAY_SECONDS,
         MINIMUM_DAYS_SINCE_WATCHED,
+        NO_REPEAT_HOURS,
         NORMALIZE_VOLUME_OF_DOWNLOADED_TRAILERS,
         NORMALIZE_VOLUME_OF_LOCAL_TRAILERS,
         NUMBER_OF_TRAILERS_TO_PLAY,
@@ -266,12 +369,18 @@ class Settings:
         TMDB_MAX_DOWNLOAD_MOVIES,
         ENABLE_TRACE,
         ENABLE_TRACE_STATS,
+        WRITE_LATENCY_REPORT,
+        ENABLE_SAMPLING_PROFILER,
         ENABLE_REMOTE_DATA_CACHE,
         ENABLE_TRAILER_CACHE,
         CACHE_EXPIRATION_DAYS,
         EXPIRE_TRAILER_CACHE_DAYS,
         CACHE_TRAILER_CHECK_DAYS,
         TRAILER_CACHE_PATH,
+        WARM_POOL_SIZE_MB,
+        LIMITED_BANDWIDTH,
+        TRAILER_QUALITY,
+        TRAILERS_PATH,
         CACHE_PATH,
         PLAYLIST_1,
         PLAYLIST_2,
@@ -288,6 +397,9 @@ class Settings:
         YOUTUBE_USE_NETRC,
         YOUTUBE_DL_COOKIE_PATH,
         YOUTUBE_DL_CACHE_PATH,
+        YOUTUBE_DL_WORKERS,
+        YOUTUBE_DL_WORKER_MEMORY_MB,
+        YOUTUBE_DL_WORKER_PYTHON,
     ]
 
     TRAILER_LOADING_SETTINGS: List[str] = [
@@ -423,6 +535,56 @@ class Settings:
         INCLUDE_TFH_TRAILERS,
         MAX_TFH_TRAILERS]
 
+    # Settings which can require discovery to be restarted
+
+    DISCOVERY_SETTINGS: FrozenSet[str] = frozenset(
+        TRAILER_LOADING_SETTINGS + ITUNES_SPECIFIC_SETTINGS
+        + LIBRARY_SPECIFIC_SETTINGS + TMDB_SPECIFIC_SETTINGS
+        + TFH_SPECIFIC_SETTINGS)
+
+    GENRE_SETTINGS: List[str] = [
+        FILTER_GENRES,
+        GENRE_ACTION,
+        GENRE_ADVENTURE,
+        GENRE_ANIMATION,
+        GENRE_BIOGRAPY,
+        GENRE_COMEDY,
+        GENRE_CRIME,
+        GENRE_DARK_COMEDY,
+        GENRE_DOCUMENTARY,
+        GENRE_DRAMA,
+        GENRE_EPIC,
+        GENRE_FAMILY,
+        GENRE_FANTASY,
+        GENRE_FILM_NOIR,
+        GENRE_FOREIGN,
+        GENRE_HISTORY,
+        GENRE_HORROR,
+        GENRE_MELODRAMA,
+        GENRE_MUSIC,
+        GENRE_MUSICAL,
+        GENRE_MYSTERY,
+        GENRE_PRE_CODE,
+        GENRE_ROMANCE,
+        GENRE_SATIRE,
+        GENRE_SCI_FI,
+        GENRE_SCREW_BALL,
+        GENRE_SWASH_BUCKLER,
+        GENRE_THRILLER,
+        GENRE_TV_MOVIE,
+        GENRE_WAR,
+        GENRE_WAR_DOCUMENTARY,
+        GENRE_WESTERN]
+
+    LOGGING_SETTINGS: List[str] = [
+        DO_DEBUG,
+        LOG_LEVEL,
+        DEBUG_INCLUDE_THREAD_INFO]
+
+    INSTRUMENTATION_SETTINGS: List[str] = [
+        WRITE_LATENCY_REPORT,
+        ENABLE_SAMPLING_PROFILER]
+
     @staticmethod
     def get_addon() -> Addon:
         """
@@ -443,74 +605,150 @@ class Settings:
         return Settings._addon_singleton
 
     @staticmethod
-    def on_settings_changed() -> None:
+    def on_settings_changed() -> Set[str]:
         """
+            Called when Kodi reports that settings have been saved.
 
-        :return:
+        :return: ids of the settings which actually changed
         """
-        Settings.save_settings()
-        Settings.reload_settings()
+        return Settings.reload_settings()
 
     @staticmethod
-    def reload_settings() -> None:
+    def reload_settings() -> Set[str]:
         """
+            Re-reads every setting from Kodi into a new snapshot and compares
+            it with the current one. When something changed, the current
+            snapshot becomes the previous one, so that
+            get_changed_settings reports what this reload changed.
 
-        :return:
+        :return: ids of the settings which changed
         """
-        Settings._addon_singleton = None
-        Settings.get_addon()
-        Settings.get_changed_settings(Settings.ALL_SETTINGS)
+        with Settings._snapshot_lock:
+            Settings._addon_singleton = None
+            current: SettingsSnapshot = Settings.get_snapshot()
+            latest: SettingsSnapshot = Settings._read_snapshot()
+            changed: FrozenSet[str] = latest.diff(current)
+            if len(changed) > 0:
+                Settings._previous_snapshot = current
+                Settings._set_snapshot(latest)
+
+        if Settings._logger.isEnabledFor(LazyLogger.DEBUG):
+            for setting in sorted(changed):
+                Settings._logger.debug('setting changed:', setting,
+                                       'previous_value:', current.get(setting),
+                                       'current_value:', latest.get(setting))
+        return set(changed)
 
     @staticmethod
     def save_settings() -> None:
         """
+            Reads a fresh snapshot and makes it the baseline against which
+            get_changed_settings compares.
 
         :return:
         """
-        try:
-            Settings._previous_settings.clear()
+        with Settings._snapshot_lock:
+            Settings._set_snapshot(Settings._read_snapshot())
+            Settings._previous_snapshot = Settings._snapshot
+
+    @staticmethod
+    def _read_snapshot() -> SettingsSnapshot:
+        """
+            Reads the raw value of every setting in one pass
+
+        :return:
+        """
+        values: Dict[str, str] = {}
+        addon: Addon = Settings.get_addon()
+        if addon is not None:
             for setting in Settings.ALL_SETTINGS:
-                Settings._previous_settings[setting] = Settings.get_addon(
-                ).setting(setting)
-        except Exception:
-            pass
+                try:
+                    values[setting] = addon.addon.getSetting(setting)
+                except Exception:
+                    pass
+
+        return SettingsSnapshot(values)
 
     @staticmethod
-    def get_saved_settings() -> Dict[str, str]:
+    def _set_snapshot(snapshot: SettingsSnapshot) -> None:
         """
+            Makes snapshot current and starts a new generation, discarding
+            every memoized accessor value.
+
+            The snapshot must be replaced before the memo. Otherwise a
+            reader could store a value from the old snapshot into the new
+            memo.
+        """
+        with Settings._snapshot_lock:
+            Settings._snapshot = snapshot
+            Settings._memo = {}
+            Settings._generation += 1
+
+    @staticmethod
+    def get_generation() -> int:
+        """
+            Returns a number which changes every time any setting changes.
+            Code which derives something expensive from settings can keep
+            the generation it was derived from and rebuild only when it
+            differs.
+        """
+        return Settings._generation
+
+    @staticmethod
+    def get_snapshot() -> SettingsSnapshot:
+        """
+            Returns the current settings snapshot, reading one if needed
 
         :return:
         """
-        return Settings._previous_settings
+        snapshot: SettingsSnapshot = Settings._snapshot
+        if snapshot is None:
+            with Settings._snapshot_lock:
+                if Settings._snapshot is None:
+                    Settings._set_snapshot(Settings._read_snapshot())
+                    Settings._previous_snapshot = Settings._snapshot
+                snapshot = Settings._snapshot
+        return snapshot
 
     @staticmethod
-    def get_changed_settings(settings_to_check: List[str]) -> List[str]:
+    def _get_raw(setting: str) -> str:
         """
+            Returns the raw string value of a setting from the current
+            snapshot. Settings not included in ALL_SETTINGS are read from
+            Kodi.
 
-        :param settings_to_check:
+        :param setting:
         :return:
         """
+        value: str = Settings.get_snapshot().get(setting)
+        if value is None:
+            value = Settings.get_addon().addon.getSetting(setting)
+        return value
 
-        Settings._logger.enter()
-        changed_settings = []
-        for setting in settings_to_check:
-            previous_value = Settings._previous_settings.get(setting, None)
-            try:
-                current_value = Settings.get_addon().setting(setting)
-            except Exception:
-                current_value = previous_value
+    @staticmethod
+    def get_saved_settings() -> Dict[str, str]:
+        """
 
-            if previous_value != current_value:
-                changed = True
-                if module_logger.isEnabledFor(LazyLogger.DEBUG):
-                    Settings._logger.debug('setting changed:', setting, 'previous_value:',
-                                           previous_value, 'current_value:', current_value)
-            else:
-                changed = False
+        :return:
+        """
+        snapshot: SettingsSnapshot = Settings._previous_snapshot
+        if snapshot is None:
+            return {}
+        return snapshot.as_dict()
 
-            if changed:
-                changed_settings.append(setting)
+    @staticmethod
+    def get_changed_settings(settings_to_check: List[str]) -> List[str]:
+        """
+            Returns the settings in settings_to_check which changed during
+            the most recent reload.
 
+        :param settings_to_check:
+        :return:
+        """
+        current: SettingsSnapshot = Settings.get_snapshot()
+        changed: FrozenSet[str] = current.diff(Settings._previous_snapshot)
+        changed_settings = [setting for setting in settings_to_check
+                            if setting in changed]
         return changed_settings
 
     @staticmethod
@@ -595,6 +833,7 @@ class Settings:
         return result
 
     @staticmethod
+    @memoized_setting
     def get_max_number_of_tfh_trailers() -> int:
         """
 
@@ -614,6 +853,7 @@ class Settings:
     '''
 
     @staticmethod
+    @memoized_setting
     def is_allow_foreign_languages() -> bool:
         """
 
@@ -624,6 +864,7 @@ class Settings:
         return allow_foreign_languages
 
     @staticmethod
+    @memoized_setting
     def get_tmdb_avg_vote_preference() -> (int, int):
         """
 
@@ -653,19 +894,21 @@ class Settings:
         :return:
         """
         playlist_id = f'playlist_name_{str(playlist_number)}'
-        playlist_name = Settings.get_addon().addon.getSetting(playlist_id)
+        playlist_name = Settings._get_raw(playlist_id)
         if playlist_name is None:
             playlist_name = ''
 
         return playlist_name
 
     @staticmethod
+    @memoized_setting
     def is_debug() -> bool:
 
         do_debug = Settings.get_setting_bool(Settings.DO_DEBUG)
         return do_debug
 
     @staticmethod
+    @memoized_setting
     def get_do_not_rated_setting() -> bool:
         """
 
@@ -675,6 +918,7 @@ class Settings:
         return do_nr
 
     @staticmethod
+    @memoized_setting
     def get_filter_genres() -> bool:
         """
 
@@ -701,6 +945,7 @@ class Settings:
         return value
 
     @staticmethod
+    @memoized_setting
     def get_genre_action() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -712,6 +957,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_ACTION)
 
     @staticmethod
+    @memoized_setting
     def get_genre_adventure() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -723,6 +969,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_ADVENTURE)
 
     @staticmethod
+    @memoized_setting
     def get_genre_animation() -> bool:
         """
 
@@ -731,6 +978,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_ANIMATION)
 
     @staticmethod
+    @memoized_setting
     def get_genre_biography() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -742,6 +990,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_BIOGRAPY)
 
     @staticmethod
+    @memoized_setting
     def get_genre_comedy() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -753,6 +1002,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_COMEDY)
 
     @staticmethod
+    @memoized_setting
     def get_genre_crime() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -764,6 +1014,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_CRIME)
 
     @staticmethod
+    @memoized_setting
     def get_genre_dark_comedy() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -775,6 +1026,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_DARK_COMEDY)
 
     @staticmethod
+    @memoized_setting
     def get_genre_documentary() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -786,6 +1038,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_DOCUMENTARY)
 
     @staticmethod
+    @memoized_setting
     def get_genre_drama() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -797,6 +1050,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_DRAMA)
 
     @staticmethod
+    @memoized_setting
     def get_genre_epic() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -808,6 +1062,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_EPIC)
 
     @staticmethod
+    @memoized_setting
     def get_genre_family() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -819,6 +1074,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_FAMILY)
 
     @staticmethod
+    @memoized_setting
     def get_genre_fantasy() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -830,6 +1086,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_FANTASY)
 
     @staticmethod
+    @memoized_setting
     def get_genre_film_noir() -> bool:
         """
 
@@ -839,6 +1096,7 @@ class Settings:
 
     # A number of non-English trailers are marked foreign
     @staticmethod
+    @memoized_setting
     def get_genre_foreign() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -850,6 +1108,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_FOREIGN)
 
     @staticmethod
+    @memoized_setting
     def get_genre_history() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -861,6 +1120,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_HISTORY)
 
     @staticmethod
+    @memoized_setting
     def get_genre_horror():
         # type: () -> bool
         """
@@ -870,6 +1130,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_HORROR)
 
     @staticmethod
+    @memoized_setting
     def get_genre_melodrama() -> bool:
         """
 
@@ -878,6 +1139,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_MELODRAMA)
 
     @staticmethod
+    @memoized_setting
     def get_genre_music() -> bool:
         """
 
@@ -886,6 +1148,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_MUSIC)
 
     @staticmethod
+    @memoized_setting
     def get_genre_musical() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -897,6 +1160,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_MUSICAL)
 
     @staticmethod
+    @memoized_setting
     def get_genre_mystery() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -908,6 +1172,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_MYSTERY)
 
     @staticmethod
+    @memoized_setting
     def get_genre_pre_code() -> bool:
         """
 
@@ -916,6 +1181,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_PRE_CODE)
 
     @staticmethod
+    @memoized_setting
     def get_genre_romance() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -927,6 +1193,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_ROMANCE)
 
     @staticmethod
+    @memoized_setting
     def get_genre_satire() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -938,6 +1205,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_SATIRE)
 
     @staticmethod
+    @memoized_setting
     def get_genre_sci_fi() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -949,6 +1217,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_SCI_FI)
 
     @staticmethod
+    @memoized_setting
     def get_genre_screw_ball() -> int:
         """
 
@@ -957,6 +1226,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_SCREW_BALL)
 
     @staticmethod
+    @memoized_setting
     def get_genre_swash_buckler() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -968,6 +1238,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_SWASH_BUCKLER)
 
     @staticmethod
+    @memoized_setting
     def get_genre_thriller() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -979,6 +1250,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_THRILLER)
 
     @staticmethod
+    @memoized_setting
     def get_genre_tv_movie() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -990,6 +1262,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_TV_MOVIE)
 
     @staticmethod
+    @memoized_setting
     def get_genre_war() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -1001,6 +1274,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_WAR)
 
     @staticmethod
+    @memoized_setting
     def get_genre_war_documentary() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -1012,6 +1286,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_WAR_DOCUMENTARY)
 
     @staticmethod
+    @memoized_setting
     def get_genre_western() -> int:
         """
             Returns an "enum' indicating whether to:
@@ -1023,6 +1298,7 @@ class Settings:
         return Settings.get_genre(Settings.GENRE_WESTERN)
 
     @staticmethod
+    @memoized_setting
     def is_group_trailers() -> bool:
         """
 
@@ -1035,6 +1311,7 @@ class Settings:
     '''
 
     @staticmethod
+    @memoized_setting
     def get_group_delay() -> int:
         """
 
@@ -1043,6 +1320,7 @@ class Settings:
         return Settings.get_setting_int(Settings.GROUP_DELAY) * 60
 
     @staticmethod
+    @memoized_setting
     def get_trailers_per_group() -> int:
         """
 
@@ -1051,6 +1329,7 @@ class Settings:
         return Settings.get_setting_int(Settings.TRAILERS_PER_GROUP)
 
     @staticmethod
+    @memoized_setting
     def get_hide_watched_movies() -> bool:
         """
 
@@ -1059,6 +1338,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.LIBRARY_HIDE_WATCHED_MOVIES)
 
     @staticmethod
+    @memoized_setting
     def get_include_clips() -> bool:
         """
 
@@ -1067,6 +1347,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.INCLUDE_CLIPS)
 
     @staticmethod
+    @memoized_setting
     def get_include_featurettes() -> bool:
         """
 
@@ -1095,6 +1376,7 @@ class Settings:
         return allowed_trailer_types
 
     @staticmethod
+    @memoized_setting
     def is_include_itunes_trailers() -> bool:
         """
 
@@ -1103,6 +1385,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.INCLUDE_ITUNES_TRAILERS)
 
     @staticmethod
+    @memoized_setting
     def get_include_itunes_trailer_type() -> int:
         """
 
@@ -1115,6 +1398,7 @@ class Settings:
         return trailer_type
 
     @staticmethod
+    @memoized_setting
     def is_include_library_no_trailer_info() -> bool:
         """
 
@@ -1124,6 +1408,7 @@ class Settings:
             Settings.INCLUDE_LIBRARY_ENTRIES_WITHOUT_TRAILER_INFO)
 
     @staticmethod
+    @memoized_setting
     def is_include_library_trailers() -> bool:
         """
 
@@ -1132,6 +1417,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.INCLUDE_LIBRARY_TRAILERS)
 
     @staticmethod
+    @memoized_setting
     def get_include_not_yet_rated_trailers() -> bool:
         """
 
@@ -1140,6 +1426,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.INCLUDE_NOT_YET_RATED)
 
     @staticmethod
+    @memoized_setting
     def is_include_library_remote_trailers() -> bool:
         """
 
@@ -1149,6 +1436,7 @@ class Settings:
             Settings.INCLUDE_LIBRARY_ENTRIES_WITH_REMOTE_TRAILERS)
 
     @staticmethod
+    @memoized_setting
     def is_include_tmdb_trailers() -> bool:
         """
 
@@ -1157,6 +1445,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.INCLUDE_TMDB_TRAILERS)
 
     @staticmethod
+    @memoized_setting
     def is_include_trailer_folders() -> bool:
         """
 
@@ -1165,6 +1454,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.INCLUDE_TRAILER_FOLDERS)
 
     @staticmethod
+    @memoized_setting
     def is_include_tfh_trailers() -> bool:
         """
 
@@ -1173,14 +1463,17 @@ class Settings:
         return Settings.get_setting_bool(Settings.INCLUDE_TFH_TRAILERS)
 
     @staticmethod
+    @memoized_setting
     def get_tfh_cache_expiration_days() -> int:
         return Settings.get_setting_int(Settings.TFH_CACHE_EXPIRATION_DAYS)
 
     @staticmethod
+    @memoized_setting
     def get_license_display_seconds() -> int:
         return Settings.get_setting_int(Settings.LICENSE_DISPLAY_SECONDS)
 
     @staticmethod
+    @memoized_setting
     def is_set_fullscreen_when_screensaver() -> bool:
         """
 
@@ -1244,6 +1537,7 @@ class Settings:
         return language_code
 
     @staticmethod
+    @memoized_setting
     def get_max_tmdb_trailers() -> int:
         """
 
@@ -1252,6 +1546,7 @@ class Settings:
         return Settings.get_setting_int(Settings.TMDB_MAX_NUMBER_OF_TRAILERS)
 
     @staticmethod
+    @memoized_setting
     def is_report_actor_stats() -> bool:
         """
 
@@ -1260,6 +1555,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.REPORT_ACTOR_STATS)
 
     @staticmethod
+    @memoized_setting
     def get_report_max_top_actors() -> int:
         """
 
@@ -1268,6 +1564,7 @@ class Settings:
         return Settings.get_setting_int(Settings.REPORT_MAXIMUM_NUMBER_OF_TOP_ACTORS)
 
     @staticmethod
+    @memoized_setting
     def is_enable_movie_stats() -> bool:
         """
 
@@ -1286,6 +1583,7 @@ class Settings:
         Settings.set_setting_bool(Settings.ENABLE_MOVIE_STATS, False)
 
     @staticmethod
+    @memoized_setting
     def is_report_genre_stats() -> bool:
         """
 
@@ -1294,6 +1592,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.REPORT_GENRE_STATS)
 
     @staticmethod
+    @memoized_setting
     def is_report_tag_stats() -> bool:
         """
 
@@ -1302,6 +1601,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.REPORT_TAG_STATS)
 
     @staticmethod
+    @memoized_setting
     def get_max_trailer_play_seconds() -> float:
         """
             Maximum seconds to play a trailer
@@ -1309,6 +1609,17 @@ class Settings:
         """
         return Settings.get_setting_float(Settings.MAXIMUM_TRAILER_PLAY_SECONDS)
 
+    @staticmethod
+    @memoized_setting
+    def get_no_repeat_hours() -> int:
+        """
+            Number of hours which must pass before a trailer may be played
+            again, even across restarts. 0 disables the restriction.
+        :return:
+        """
+        hours: int = Settings.get_setting_int(Settings.NO_REPEAT_HOURS)
+        return max(hours, 0)
+
     @staticmethod
     def get_media_path() -> str:
         """
@@ -1319,6 +1630,7 @@ class Settings:
             Settings.get_resources_path(), 'media'))
 
     @staticmethod
+    @memoized_setting
     def get_minimum_days_since_watched() -> int:
         """
 
@@ -1327,6 +1639,7 @@ class Settings:
         return Settings.get_setting_int(Settings.MINIMUM_DAYS_SINCE_WATCHED)
 
     @staticmethod
+    @memoized_setting
     def is_normalize_volume_of_downloaded_trailers() -> bool:
         """
 
@@ -1337,6 +1650,7 @@ class Settings:
         return normalize
 
     @staticmethod
+    @memoized_setting
     def is_normalize_volume_of_local_trailers() -> bool:
         """
 
@@ -1347,11 +1661,13 @@ class Settings:
         return normalize
 
     @staticmethod
+    @memoized_setting
     def get_ffmpeg_path() -> str:
         path = Settings.get_setting_str(Settings.FFMPEG_PATH)
         return path
 
     @staticmethod
+    @memoized_setting
     def get_number_of_trailers_to_play() -> int:
         """
 
@@ -1369,6 +1685,7 @@ class Settings:
             Settings.get_media_path(), 'CurtainOpeningSequence.flv'))
 
     @staticmethod
+    @memoized_setting
     def prompt_for_settings() -> bool:
         """
 
@@ -1389,6 +1706,7 @@ class Settings:
     '''
 
     @staticmethod
+    @memoized_setting
     def get_rating_limit_setting() -> int:
         """
         Gets the maximum (maturity) certification index configured
@@ -1402,19 +1720,23 @@ class Settings:
         return rating_limit
 
     @staticmethod
+    @memoized_setting
     def get_youtube_username() -> str:
         return Settings.get_setting_str(Settings.YOUTUBE_USERNAME)
 
 
     @staticmethod
+    @memoized_setting
     def get_youtube_password() -> str:
         return Settings.get_setting_str(Settings.YOUTUBE_PASSWORD)
 
     @staticmethod
+    @memoized_setting
     def is_youtube_use_netrc() -> bool:
         return Settings.get_setting_bool(Settings.YOUTUBE_USE_NETRC)
 
     @staticmethod
+    @memoized_setting
     def get_tmdb_trailer_preference() -> str:
         """
 
@@ -1452,6 +1774,7 @@ class Settings:
         return Settings.DEFAULT_ROTTEN_TOMATOES_API_KEY
 
     @staticmethod
+    @memoized_setting
     def is_tmdb_select_by_year_range() -> bool:
         """
 
@@ -1462,6 +1785,7 @@ class Settings:
         return select_by_year_range
 
     @staticmethod
+    @memoized_setting
     def get_tmdb_minimum_year() -> int:
         """
 
@@ -1482,6 +1806,7 @@ class Settings:
         return minimum_year
 
     @staticmethod
+    @memoized_setting
     def get_tmdb_maximum_year() -> int:
         """
 
@@ -1502,7 +1827,7 @@ class Settings:
 
     @staticmethod
     def get_setting_str(setting_name: str) -> str:
-        value = Settings.get_addon().setting(setting_name)
+        value = Settings._get_raw(setting_name)
         return value
 
     @staticmethod
@@ -1511,9 +1836,9 @@ class Settings:
 
         :return:
         """
-        # Kodi returns a bool as a -1 | 0
+        # Kodi returns a bool as 'true' | 'false'
         try:
-            value = Settings.get_addon().bool_setting(setting)
+            value = Settings._get_raw(setting) == 'true'
         except Exception:
             value = False
 
@@ -1528,6 +1853,9 @@ class Settings:
         """
         try:
             Settings.get_addon().addon.setSettingBool(setting, value)
+            with Settings._snapshot_lock:
+                Settings._set_snapshot(Settings.get_snapshot().replace(
+                    setting, 'true' if value else 'false'))
         except Exception:
             value = False
 
@@ -1540,7 +1868,7 @@ class Settings:
         :return:
         """
         try:
-            value = Settings.get_addon().addon.getSetting(setting)
+            value = Settings._get_raw(setting)
         except Exception as e:
             value = 1.0
         try:
@@ -1558,7 +1886,7 @@ class Settings:
         :return:
         """
         try:
-            value = Settings.get_addon().addon.getSetting(setting)
+            value = Settings._get_raw(setting)
         except Exception as e:
             value = 1
         try:
@@ -1570,6 +1898,7 @@ class Settings:
         return value
 
     @staticmethod
+    @memoized_setting
     def get_show_curtains() -> bool:
         """
 
@@ -1578,6 +1907,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.SHOW_CURTAINS)
 
     @staticmethod
+    @memoized_setting
     def get_show_movie_title() -> bool:
         """
 
@@ -1604,6 +1934,7 @@ class Settings:
     '''
 
     @staticmethod
+    @memoized_setting
     def get_time_to_display_detail_info() -> int:
         """
 
@@ -1612,13 +1943,14 @@ class Settings:
         return Settings.get_setting_int(Settings.TIME_TO_DISPLAY_DETAIL_INFO)
 
     @staticmethod
+    @memoized_setting
     def get_tmdb_api_key() -> str:
         """
 
         :return:
         """
         try:
-            tmdb_api_key = Settings.get_addon().setting(Settings.TMDB_API_KEY)
+            tmdb_api_key = Settings._get_raw(Settings.TMDB_API_KEY)
         except Exception as e:
             tmdb_api_key = None
 
@@ -1627,32 +1959,35 @@ class Settings:
         return tmdb_api_key
 
     @staticmethod
+    @memoized_setting
     def get_tmdb_trailer_type() -> str:
         """
 
         :return:
         """
         try:
-            trailer_type = Settings.get_addon().setting(Settings.TMDB_TRAILER_TYPE)
+            trailer_type = Settings._get_raw(Settings.TMDB_TRAILER_TYPE)
         except Exception as e:
             trailer_type = None
 
         return trailer_type
 
     @staticmethod
+    @memoized_setting
     def get_trailers_paths() -> str:
         """
 
         :return:
         """
         try:
-            trailer_path = Settings.get_addon().setting('path')
+            trailer_path = Settings._get_raw(Settings.TRAILERS_PATH)
         except Exception as e:
             trailer_path = None
 
         return trailer_path
 
     @staticmethod
+    @memoized_setting
     def get_update_tmdb_id() -> bool:
         """
 
@@ -1678,6 +2013,7 @@ class Settings:
     '''
 
     @staticmethod
+    @memoized_setting
     def get_tmdb_include_old_movie_trailers() -> bool:
         """
 
@@ -1686,6 +2022,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.TMDB_INCLUDE_OLD_MOVIE_TRAILERS)
 
     @staticmethod
+    @memoized_setting
     def get_tmdb_max_download_movies() -> int:
         """
         :return:
@@ -1693,6 +2030,7 @@ class Settings:
         return Settings.get_setting_int(Settings.TMDB_MAX_DOWNLOAD_MOVIES)
 
     @staticmethod
+    @memoized_setting
     def is_trace_enabled() -> bool:
         """
 
@@ -1701,6 +2039,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.ENABLE_TRACE)
 
     @staticmethod
+    @memoized_setting
     def is_trace_stats_enabled() -> bool:
         """
 
@@ -1709,6 +2048,27 @@ class Settings:
         return Settings.get_setting_bool(Settings.ENABLE_TRACE_STATS)
 
     @staticmethod
+    @memoized_setting
+    def is_write_latency_report() -> bool:
+        """
+            True when the user has asked for the latency histograms to be
+            written to disk. The setting is reset once the report is written.
+
+        :return:
+        """
+        return Settings.get_setting_bool(Settings.WRITE_LATENCY_REPORT)
+
+    @staticmethod
+    @memoized_setting
+    def is_sampling_profiler_enabled() -> bool:
+        """
+
+        :return:
+        """
+        return Settings.get_setting_bool(Settings.ENABLE_SAMPLING_PROFILER)
+
+    @staticmethod
+    @memoized_setting
     def is_use_tmdb_cache() -> bool:
         """
 
@@ -1717,6 +2077,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.ENABLE_REMOTE_DATA_CACHE)
 
     @staticmethod
+    @memoized_setting
     def is_use_trailer_cache() -> bool:
         """
 
@@ -1725,6 +2086,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.ENABLE_TRAILER_CACHE)
 
     @staticmethod
+    @memoized_setting
     def get_expire_remote_db_cache_entry_days() -> int:
         """
 
@@ -1734,6 +2096,7 @@ class Settings:
         return Settings.get_setting_int(Settings.CACHE_EXPIRATION_DAYS)
 
     @staticmethod
+    @memoized_setting
     def get_expire_remote_db_trailer_check_days() -> int:
         """
 
@@ -1742,6 +2105,7 @@ class Settings:
         return Settings.get_setting_int(Settings.CACHE_TRAILER_CHECK_DAYS)
 
     @staticmethod
+    @memoized_setting
     def get_expire_trailer_cache_days() -> int:
         """
 
@@ -1750,6 +2114,7 @@ class Settings:
         return Settings.get_setting_int(Settings.EXPIRE_TRAILER_CACHE_DAYS)
 
     @staticmethod
+    @memoized_setting
     def get_downloaded_trailer_cache_path() -> str:
         """
 
@@ -1757,13 +2122,51 @@ class Settings:
         """
         try:
             path = xbmcvfs.translatePath(
-                Settings.get_addon().setting(Settings.TRAILER_CACHE_PATH))
+                Settings._get_raw(Settings.TRAILER_CACHE_PATH))
         except Exception as e:
             path = None
 
         return path
 
     @staticmethod
+    @memoized_setting
+    def get_warm_pool_size_mb() -> int:
+        """
+            Disk space which may be used by downloaded trailers waiting to
+            be played. Each source may always keep the minimum
+            (TrailerWarmPool.MINIMUM_SIZE) ready.
+        :return:
+        """
+        size: int = Settings.get_setting_int(Settings.WARM_POOL_SIZE_MB)
+        return max(size, 0)
+
+    @staticmethod
+    @memoized_setting
+    def is_limited_bandwidth() -> bool:
+        """
+            True when downloading trailers ahead of play should wait while
+            a trailer is playing, so that it does not compete with the
+            player for bandwidth.
+        :return:
+        """
+        return Settings.get_setting_bool(Settings.LIMITED_BANDWIDTH)
+
+    @staticmethod
+    @memoized_setting
+    def get_trailer_quality() -> int:
+        """
+            Lines of resolution (height) that downloaded trailers should
+            have, if available. 0 for the best available.
+        :return:
+        """
+        quality_index: int = Settings.get_setting_int(Settings.TRAILER_QUALITY)
+        heights: List[int] = [480, 720, 1080, 0]
+        if 0 <= quality_index < len(heights):
+            return heights[quality_index]
+        return 0
+
+    @staticmethod
+    @memoized_setting
     def get_remote_db_cache_path() -> str:
         """
 
@@ -1771,7 +2174,7 @@ class Settings:
         """
         try:
             path = xbmcvfs.translatePath(
-                Settings.get_addon().setting(Settings.CACHE_PATH))
+                Settings._get_raw(Settings.CACHE_PATH))
         except Exception as e:
             path = None
             Settings._logger.exception()
@@ -1779,6 +2182,7 @@ class Settings:
         return path
 
     @staticmethod
+    @memoized_setting
     def is_limit_cached_trailers() -> bool:
         """
 
@@ -1787,6 +2191,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.LIMIT_CACHED_TRAILERS)
 
     @staticmethod
+    @memoized_setting
     def is_limit_number_of_cached_trailers() -> bool:
         """
 
@@ -1799,6 +2204,7 @@ class Settings:
         return value
 
     @staticmethod
+    @memoized_setting
     def get_max_number_of_cached_trailers() -> int:
         """
 
@@ -1811,6 +2217,7 @@ class Settings:
         return value
 
     @staticmethod
+    @memoized_setting
     def is_limit_size_of_cached_trailers() -> bool:
         """
 
@@ -1824,6 +2231,7 @@ class Settings:
         return value
 
     @staticmethod
+    @memoized_setting
     def get_max_size_of_cached_trailers_mb() -> int:
         """
 
@@ -1836,6 +2244,7 @@ class Settings:
         return value
 
     @staticmethod
+    @memoized_setting
     def is_limit_percent_of_cached_trailers() -> bool:
         """
 
@@ -1844,6 +2253,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.LIMIT_PERCENT_OF_CACHED_TRAILERS)
 
     @staticmethod
+    @memoized_setting
     def get_max_percent_of_cached_trailers() -> float:
         """
 
@@ -1856,6 +2266,7 @@ class Settings:
         return value
 
     @staticmethod
+    @memoized_setting
     def is_limit_cached_json() -> bool:
         """
 
@@ -1864,6 +2275,7 @@ class Settings:
         return Settings.get_setting_bool(Settings.LIMIT_CACHED_JSON)
 
     @staticmethod
+    @memoized_setting
     def is_limit_number_of_cached_json() -> bool:
         """
 
@@ -1876,6 +2288,7 @@ class Settings:
         return value
 
     @staticmethod
+    @memoized_setting
     def get_max_number_of_cached_json() -> int:
         """
 
@@ -1888,6 +2301,7 @@ class Settings:
         return value
 
     @staticmethod
+    @memoized_setting
     def is_limit_size_of_cached_json() -> bool:
         """
 
@@ -1900,6 +2314,7 @@ class Settings:
         return value
 
     @staticmethod
+    @memoized_setting
     def get_max_size_of_cached_json_mb() -> int:
         """
 
@@ -1912,6 +2327,7 @@ class Settings:
         return value
 
     @staticmethod
+    @memoized_setting
     def is_limit_percent_of_cached_json() -> bool:
         """
 
@@ -1924,6 +2340,7 @@ class Settings:
         return value
 
     @staticmethod
+    @memoized_setting
     def get_max_percent_of_cached_json() -> float:
         """
 
@@ -1940,13 +2357,49 @@ class Settings:
     '''
 
     @staticmethod
+    @memoized_setting
     def get_youtube_dl_cookie_path() -> str:
-        value = Settings.get_addon().addon.getSetting(Settings.YOUTUBE_DL_COOKIE_PATH)
+        value = Settings._get_raw(Settings.YOUTUBE_DL_COOKIE_PATH)
 
         return value
 
     @staticmethod
+    @memoized_setting
     def get_youtube_dl_cache_path() -> str:
-        value = Settings.get_addon().addon.getSetting(Settings.YOUTUBE_DL_CACHE_PATH)
+        value = Settings._get_raw(Settings.YOUTUBE_DL_CACHE_PATH)
+
+        return value
+
+    @staticmethod
+    @memoized_setting
+    def get_youtube_dl_workers() -> int:
+        """
+            Number of separate python processes which run youtube-dl.
+            0, the default, runs youtube-dl within the add-on's process.
+        :return:
+        """
+        workers: int = Settings.get_setting_int(Settings.YOUTUBE_DL_WORKERS)
+        return max(workers, 0)
+
+    @staticmethod
+    @memoized_setting
+    def get_youtube_dl_worker_memory_mb() -> int:
+        """
+            Memory a youtube-dl worker process may use before it is
+            restarted. 0 for no limit.
+        :return:
+        """
+        size: int = Settings.get_setting_int(Settings.YOUTUBE_DL_WORKER_MEMORY_MB)
+        return max(size, 0)
+
+    @staticmethod
+    @memoized_setting
+    def get_youtube_dl_worker_python() -> str:
+        """
+            Python interpreter to run youtube-dl workers with. Empty to find
+            one.
+        :return:
+        """
+        value = Settings._get_raw(Settings.YOUTUBE_DL_WORKER_PYTHON)
 
         return value
@@ -6,6 +6,7 @@ import os
 import threading
 import sys
 
+from cache.play_history import PlayHistory
 from common.constants import Constants
 from common.exceptions import AbortException
 from common.imports import *
@@ -63,30 +64,27 @@ class PlayStatistics:
         # if clz.logger.isEnabledFor(LazyLogger.DEBUG):
         # clz.logger.debug('movie:', movie[Movie.TITLE], 'source:',
         #                   movie[Movie.SOURCE])
-        key = cls.get_key(movie)
+
+        # Only played movies get an entry in _play_count, so that memory
+        # does not grow with the number of discovered movies
+
         with cls._lock:
-            cls._play_count.setdefault(key, 0)
             cls._number_of_added_movies += 1
 
     @classmethod
     def get_play_count(cls, movie: BaseMovie) -> int:
         """
+        The counts kept here only cover this session (for the report).
+        The persistent PlayHistory also counts plays of earlier sessions.
 
         :param movie:
-        :return:
+        :return: Number of times the trailer was played, across sessions
         """
         clz = PlayStatistics
 
-        count = None
-        try:
-            with cls._lock:
-                count = cls._play_count.get(cls.get_key(movie), 0)
-        except KeyError as e:
-            if clz.logger.isEnabledFor(LazyLogger.DEBUG):
-                clz.logger.debug(
-                    'Could not find entry for:', movie.get_title())
-
-        return count
+        with cls._lock:
+            session_count: int = cls._play_count.get(cls.get_key(movie), 0)
+        return max(session_count, PlayHistory.get_play_count(movie))
 
     @classmethod
     def increase_play_count(cls, movie: BaseMovie) -> None:
@@ -137,10 +135,17 @@ class PlayStatistics:
                 cls.report.write(f'Cumulative report for a Kodi session. {timestamp}\n\n')
                 movie_keys = sorted(cls._play_count, key=lambda key: cls._play_count[key],
                                     reverse=False)
+
+                # Movies which were added but never played have no entry
+
+                unplayed_count: int = max(cls._number_of_added_movies
+                                          - len(cls._play_count), 0)
+                cls.report.write(f'{unplayed_count} movies played: 0 times.\n')
+
                 # Number of times this set of movies were played
                 previous_play_count = -1
                 # Running count of number of discovered movies
-                movie_count = 0
+                movie_count = unplayed_count
                 movie_count_in_group = 0
                 # Total number of movies that were played
                 total_play_count = 0
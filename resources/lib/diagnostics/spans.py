@@ -0,0 +1,560 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Lightweight instrumentation for the hot paths of the addon: named spans
+which feed fixed-memory latency histograms, plus an optional sampling
+profiler. Both can be written to disk as json on demand (see the
+write_latency_report and enable_sampling_profiler settings).
+"""
+import functools
+import io
+import os
+import sys
+import threading
+import time
+
+import simplejson as json
+
+from common.constants import Constants
+from common.disk_utils import DiskUtils
+from common.imports import *
+from common.logger import LazyLogger
+from common.monitor import Monitor
+from common.settings import Settings
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+
+def write_json(path: str, data: Any) -> None:
+    """
+    Replaces the file at path with the json form of data
+
+    :param path:
+    :param data:
+    :return:
+    """
+    DiskUtils.create_path_if_needed(os.path.dirname(path))
+    tmp_path: str = path + '.tmp'
+    with io.open(tmp_path, mode='wt', newline=None,
+                 encoding='utf-8') as report_file:
+        report_file.write(json.dumps(data, ensure_ascii=False, indent=1))
+        report_file.flush()
+    os.replace(tmp_path, path)
+
+
+class LatencyHistogram:
+    """
+    Fixed memory histogram of durations in the style of HdrHistogram.
+
+    Durations are recorded in microseconds. Values below 2 * SUB_BUCKETS
+    are counted exactly. Larger values are grouped by their power of two
+    and then linearly into SUB_BUCKETS sub-buckets, so every bucket is
+    within 1 / SUB_BUCKETS (6.25%) of the values it counts. Values from
+    one microsecond to MAX_VALUE (roughly twelve days) fit in a single
+    array of BUCKET_COUNT counters.
+    """
+    SUB_BUCKET_BITS: Final[int] = 4
+    SUB_BUCKETS: Final[int] = 1 << SUB_BUCKET_BITS
+    LINEAR_LIMIT: Final[int] = SUB_BUCKETS * 2
+    MAX_SHIFT: Final[int] = 36
+    MAX_VALUE: Final[int] = (LINEAR_LIMIT << MAX_SHIFT) - 1
+    BUCKET_COUNT: Final[int] = LINEAR_LIMIT + MAX_SHIFT * SUB_BUCKETS
+
+    REPORTED_PERCENTILES: Final[Tuple[float, ...]] = (50.0, 90.0, 99.0, 99.9)
+
+    def __init__(self, name: str) -> None:
+        """
+        :param name:
+        :return:
+        """
+        self._name: Final[str] = name
+        self._lock: Final[threading.Lock] = threading.Lock()
+        self._counts: List[int] = [0] * LatencyHistogram.BUCKET_COUNT
+        self._count: int = 0
+        self._total: int = 0
+        self._min: int = LatencyHistogram.MAX_VALUE
+        self._max: int = 0
+
+    @staticmethod
+    def get_bucket_index(value: int) -> int:
+        """
+        :param value: microseconds, 0 <= value <= MAX_VALUE
+        :return: Index of the bucket which counts value
+        """
+        if value < LatencyHistogram.LINEAR_LIMIT:
+            return value
+
+        shift: int = value.bit_length() - (LatencyHistogram.SUB_BUCKET_BITS + 1)
+        sub_bucket: int = (value >> shift) - LatencyHistogram.SUB_BUCKETS
+        return (LatencyHistogram.LINEAR_LIMIT
+                + (shift - 1) * LatencyHistogram.SUB_BUCKETS + sub_bucket)
+
+    @staticmethod
+    def get_bucket_value(index: int) -> int:
+        """
+        :param index:
+        :return: The value (microseconds) at the middle of the bucket
+        """
+        if index < LatencyHistogram.LINEAR_LIMIT:
+            return index
+
+        index -= LatencyHistogram.LINEAR_LIMIT
+        shift: int = index // LatencyHistogram.SUB_BUCKETS + 1
+        sub_bucket: int = index % LatencyHistogram.SUB_BUCKETS
+        lowest: int = (LatencyHistogram.SUB_BUCKETS + sub_bucket) << shift
+        return lowest + (1 << (shift - 1))
+
+    def record(self, seconds: float) -> None:
+        """
+        :param seconds: Duration to record
+        :return:
+        """
+        value: int = int(seconds * 1000000.0)
+        if value < 0:
+            value = 0
+        elif value > LatencyHistogram.MAX_VALUE:
+            value = LatencyHistogram.MAX_VALUE
+
+        index: int = LatencyHistogram.get_bucket_index(value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._total += value
+            if value < self._min:
+                self._min = value
+            if value > self._max:
+                self._max = value
+
+    def get_count(self) -> int:
+        """
+        :return: Number of durations recorded
+        """
+        return self._count
+
+    def get_percentile(self, percentile: float) -> int:
+        """
+        :param percentile: 0.0 .. 100.0
+        :return: Approximate duration, in microseconds, which percentile
+                 per cent of the recorded durations do not exceed
+        """
+        with self._lock:
+            if self._count == 0:
+                return 0
+
+            rank: int = max(1, int((percentile / 100.0) * self._count + 0.5))
+            seen: int = 0
+            for index, count in enumerate(self._counts):
+                seen += count
+                if seen >= rank:
+                    return min(LatencyHistogram.get_bucket_value(index), self._max)
+            return self._max
+
+    def reset(self) -> None:
+        """
+        :return:
+        """
+        with self._lock:
+            self._counts = [0] * LatencyHistogram.BUCKET_COUNT
+            self._count = 0
+            self._total = 0
+            self._min = LatencyHistogram.MAX_VALUE
+            self._max = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        :return: Summary of the histogram, durations in microseconds. The
+                 non-empty buckets are included as [value, count] pairs.
+        """
+        summary: Dict[str, Any] = {'name': self._name}
+        for percentile in LatencyHistogram.REPORTED_PERCENTILES:
+            summary[f'p{percentile:g}'] = self.get_percentile(percentile)
+
+        with self._lock:
+            summary['count'] = self._count
+            summary['min'] = self._min if self._count > 0 else 0
+            summary['max'] = self._max
+            summary['mean'] = (self._total // self._count) if self._count > 0 else 0
+            summary['buckets'] = [[LatencyHistogram.get_bucket_value(index), count]
+                                  for index, count in enumerate(self._counts)
+                                  if count > 0]
+        return summary
+
+
+class _Span:
+    """
+    Context manager which records the time spent within it
+    """
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram: LatencyHistogram) -> None:
+        self._histogram: LatencyHistogram = histogram
+        self._start: float = 0.0
+
+    def __enter__(self) -> '_Span':
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        self._histogram.record(time.perf_counter() - self._start)
+        return False
+
+
+class Spans:
+    """
+    Registry of named latency histograms.
+
+    Usage:
+
+        with Spans.span('cache.read_tmdb'):
+            ...
+
+        @Spans.timed('video.download')
+        def get_video(...):
+
+    A span records its elapsed time whether it completes normally or by
+    exception. Histograms are created on first use and live for the
+    session, so memory is bounded by the number of span names.
+    """
+    REPORT_FILE_NAME: Final[str] = 'latency.json'
+
+    _logger: LazyLogger = None
+    _lock: threading.RLock = threading.RLock()
+    _histograms: Dict[str, LatencyHistogram] = {}
+    _started: float = time.time()
+
+    # name -> function returning a json friendly section of the report
+
+    _report_sections: Dict[str, Callable[[], Any]] = {}
+
+    @classmethod
+    def class_init(cls) -> None:
+        """
+        :return:
+        """
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+    @classmethod
+    def get_histogram(cls, name: str) -> LatencyHistogram:
+        """
+        :param name:
+        :return: The histogram for the named span, created if needed
+        """
+        histogram: LatencyHistogram = cls._histograms.get(name)
+        if histogram is None:
+            with cls._lock:
+                histogram = cls._histograms.get(name)
+                if histogram is None:
+                    histogram = LatencyHistogram(name)
+                    cls._histograms[name] = histogram
+        return histogram
+
+    @classmethod
+    def span(cls, name: str) -> _Span:
+        """
+        :param name:
+        :return: A context manager which times its body
+        """
+        return _Span(cls.get_histogram(name))
+
+    @classmethod
+    def timed(cls, name: str) -> Callable[[Callable], Callable]:
+        """
+        Decorator which times every call of the decorated function. When
+        used with @classmethod or @staticmethod, place it below them.
+
+        :param name: Span name
+        :return:
+        """
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Span(cls.get_histogram(name)):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @classmethod
+    def record(cls, name: str, seconds: float) -> None:
+        """
+        Records a duration which was measured by the caller
+
+        :param name:
+        :param seconds:
+        :return:
+        """
+        cls.get_histogram(name).record(seconds)
+
+    @classmethod
+    def register_report_section(cls, name: str,
+                                get_section: Callable[[], Any]) -> None:
+        """
+        Adds a section to the report, for figures which are not latencies
+
+        :param name: Of the section
+        :param get_section: Returns the section, in json friendly form
+        :return:
+        """
+        with cls._lock:
+            cls._report_sections[name] = get_section
+
+    @classmethod
+    def get_report(cls) -> Dict[str, Any]:
+        """
+        :return: Summary of every histogram, and the registered sections,
+                 in json friendly form
+        """
+        with cls._lock:
+            histograms: List[LatencyHistogram] = list(cls._histograms.values())
+            report_sections: Dict[str, Callable[[], Any]] = dict(
+                cls._report_sections)
+
+        report: Dict[str, Any] = {
+            'pid': os.getpid(),
+            'started': cls._started,
+            'written': time.time(),
+            'units': 'microseconds',
+            'spans': [histogram.as_dict() for histogram in histograms]}
+        for name, get_section in report_sections.items():
+            try:
+                report[name] = get_section()
+            except Exception:
+                cls._logger.exception(f'section: {name}')
+        return report
+
+    @classmethod
+    def get_report_path(cls) -> str:
+        """
+        :return:
+        """
+        return os.path.join(Constants.FRONTEND_DATA_PATH, 'debug',
+                            cls.REPORT_FILE_NAME)
+
+    @classmethod
+    def write_report(cls) -> None:
+        """
+        Writes the histograms to <addon_data>/debug/latency.json
+
+        :return:
+        """
+        try:
+            path: str = cls.get_report_path()
+            write_json(path, cls.get_report())
+            cls._logger.info(f'Wrote latency report: {path}')
+        except Exception:
+            cls._logger.exception()
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Clears every histogram
+
+        :return:
+        """
+        with cls._lock:
+            for histogram in cls._histograms.values():
+                histogram.reset()
+            cls._started = time.time()
+
+    @classmethod
+    def on_settings_changed(cls) -> None:
+        """
+        Writes the latency report when requested and starts or stops the
+        sampling profiler to match the settings.
+
+        :return:
+        """
+        if Settings.is_write_latency_report():
+            cls.write_report()
+
+            # Reset the toggle so that the next request is seen as a change
+
+            Settings.set_setting_bool(Settings.WRITE_LATENCY_REPORT, False)
+
+        if Settings.is_sampling_profiler_enabled():
+            SamplingProfiler.start()
+        else:
+            SamplingProfiler.stop()
+
+    @classmethod
+    def on_abort(cls) -> None:
+        """
+        Writes the final reports during shutdown. The latency report is
+        only written when statistics tracing (do_trace_stats) is enabled.
+
+        :return:
+        """
+        SamplingProfiler.stop()
+        if Settings.is_trace_stats_enabled():
+            cls.write_report()
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the whole process. A daemon thread captures
+    the stack of every other thread SAMPLES_PER_SECOND times a second and
+    counts identical stacks. The cost is independent of how much code
+    runs between samples, which makes it usable in a live Kodi session.
+
+    When stopped, two reports are written to <addon_data>/debug:
+        profile.json   the most frequent stacks and functions
+        profile.folded collapsed stacks, suitable for flamegraph.pl
+    """
+    SAMPLES_PER_SECOND: Final[int] = 100
+    MAX_DEPTH: Final[int] = 32
+    MAX_STACKS: Final[int] = 8192
+    REPORTED_ENTRIES: Final[int] = 100
+    OTHER_STACK: Final[str] = '<other>'
+
+    _logger: LazyLogger = None
+    _lock: threading.RLock = threading.RLock()
+    _thread: threading.Thread = None
+    _stop_event: threading.Event = None
+    _stacks: Dict[str, int] = {}
+    _functions: Dict[str, int] = {}
+    _samples: int = 0
+    _started: float = 0.0
+
+    @classmethod
+    def class_init(cls) -> None:
+        """
+        :return:
+        """
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+    @classmethod
+    def is_running(cls) -> bool:
+        """
+        :return:
+        """
+        return cls._thread is not None
+
+    @classmethod
+    def start(cls) -> None:
+        """
+        Starts sampling, discarding any previous samples
+
+        :return:
+        """
+        with cls._lock:
+            if cls._thread is not None or Monitor.is_abort_requested():
+                return
+
+            cls._stacks = {}
+            cls._functions = {}
+            cls._samples = 0
+            cls._started = time.time()
+            cls._stop_event = threading.Event()
+            cls._thread = threading.Thread(target=cls._run,
+                                           args=(cls._stop_event,),
+                                           name='SamplingProfiler',
+                                           daemon=True)
+            cls._thread.start()
+            cls._logger.info('Sampling profiler started')
+
+    @classmethod
+    def stop(cls) -> None:
+        """
+        Stops sampling and writes the reports
+
+        :return:
+        """
+        with cls._lock:
+            if cls._thread is None:
+                return
+
+            cls._stop_event.set()
+            cls._thread.join(timeout=1.0)
+            cls._thread = None
+            cls.write_report()
+
+    @classmethod
+    def _run(cls, stop_event: threading.Event) -> None:
+        """
+        :param stop_event:
+        :return:
+        """
+        interval: float = 1.0 / cls.SAMPLES_PER_SECOND
+        my_ident: int = threading.get_ident()
+        while not stop_event.wait(interval):
+            try:
+                cls._sample(my_ident)
+            except Exception:
+                cls._logger.exception()
+                return
+
+    @classmethod
+    def _sample(cls, my_ident: int) -> None:
+        """
+        :param my_ident: Thread id of the profiler, which is not sampled
+        :return:
+        """
+        thread_names: Dict[int, str] = {thread.ident: thread.name
+                                        for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        with cls._lock:
+            cls._samples += 1
+            for ident, frame in frames.items():
+                if ident == my_ident:
+                    continue
+
+                names: List[str] = []
+                while frame is not None and len(names) < cls.MAX_DEPTH:
+                    code = frame.f_code
+                    names.append(f'{os.path.basename(code.co_filename)}:'
+                                 f'{code.co_name}')
+                    frame = frame.f_back
+
+                if len(names) == 0:
+                    continue
+
+                leaf: str = names[0]
+                cls._functions[leaf] = cls._functions.get(leaf, 0) + 1
+
+                names.append(thread_names.get(ident, str(ident)))
+                names.reverse()
+                stack: str = ';'.join(names)
+                if stack not in cls._stacks and len(cls._stacks) >= cls.MAX_STACKS:
+                    stack = cls.OTHER_STACK
+                cls._stacks[stack] = cls._stacks.get(stack, 0) + 1
+
+    @classmethod
+    def write_report(cls) -> None:
+        """
+        :return:
+        """
+        try:
+            with cls._lock:
+                stacks: List[Tuple[str, int]] = sorted(cls._stacks.items(),
+                                                       key=lambda item: item[1],
+                                                       reverse=True)
+                functions: List[Tuple[str, int]] = sorted(cls._functions.items(),
+                                                          key=lambda item: item[1],
+                                                          reverse=True)
+                report: Dict[str, Any] = {
+                    'pid': os.getpid(),
+                    'started': cls._started,
+                    'stopped': time.time(),
+                    'samples_per_second': cls.SAMPLES_PER_SECOND,
+                    'samples': cls._samples,
+                    'functions': functions[:cls.REPORTED_ENTRIES],
+                    'stacks': stacks[:cls.REPORTED_ENTRIES]}
+
+            debug_dir: str = os.path.join(Constants.FRONTEND_DATA_PATH, 'debug')
+            write_json(os.path.join(debug_dir, 'profile.json'), report)
+            with io.open(os.path.join(debug_dir, 'profile.folded'), mode='wt',
+                         encoding='utf-8') as folded_file:
+                for stack, count in stacks:
+                    folded_file.write(f'{stack} {count}\n')
+            cls._logger.info(f'Wrote sampling profile: {debug_dir} '
+                             f'samples: {report["samples"]}')
+        except Exception:
+            cls._logger.exception()
+
+
+Spans.class_init()
+SamplingProfiler.class_init()
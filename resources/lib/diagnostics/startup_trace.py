@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Startup trace: how long each module took to import (and run its
+module-level class_init), how long each startup stage took and when
+milestones, such as the first trailer starting to play, were reached.
+
+Installed as the very first thing a service does, so apart from
+common.imports this module only imports from the standard library. Other
+add-on modules are imported when the trace is finished, by which time they
+are loaded anyway.
+
+    StartupTrace.install('frontend')
+    ...
+    with StartupTrace.stage('ui.import'):
+        from frontend import random_trailers_ui
+    ...
+    StartupTrace.finish('first_trailer')
+
+finish logs a summary and, when statistics tracing (do_trace_stats) is
+enabled, writes <addon_data>/debug/startup_<service>.json.
+"""
+import contextlib
+import os
+import sys
+import threading
+import time
+
+from common.imports import *
+
+
+class _ImportTimer:
+    """
+    Meta path finder which finds nothing itself. It asks the finders after
+    it for the module's spec and wraps the spec's loader, so that the time
+    spent executing the module is recorded.
+    """
+
+    def __init__(self) -> None:
+        self._local: threading.local = threading.local()
+
+    def find_spec(self, fullname: str, path: Any, target: Any = None) -> Any:
+        """
+        :param fullname:
+        :param path:
+        :param target:
+        :return: The spec found by the following finders, or None
+        """
+        if getattr(self._local, 'finding', False):
+            return None
+
+        self._local.finding = True
+        try:
+            spec = None
+            for finder in sys.meta_path:
+                find_spec = getattr(finder, 'find_spec', None)
+                if finder is self or find_spec is None:
+                    continue
+                spec = find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+        finally:
+            self._local.finding = False
+
+        if spec is None:
+            return None
+
+        # Built-in and frozen modules are loaded by classes shared by every
+        # such module, only per module loader instances are wrapped
+
+        loader = spec.loader
+        if (loader is None or isinstance(loader, type)
+                or not hasattr(loader, 'exec_module')):
+            return spec
+
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module: Any) -> None:
+            StartupTrace.enter_import(fullname)
+            try:
+                exec_module(module)
+            finally:
+                StartupTrace.exit_import(fullname)
+
+        try:
+            loader.exec_module = timed_exec_module
+        except AttributeError:
+            pass
+        return spec
+
+
+class StartupTrace:
+    """
+    Process wide startup trace. All times are milliseconds since install.
+    """
+    REPORTED_MODULES: Final[int] = 60
+
+    _lock: threading.RLock = threading.RLock()
+    _service: str = None
+    _start: float = 0.0
+    _timer: _ImportTimer = None
+    _finished: bool = False
+
+    # Per thread stack of [module name, start, time spent in nested imports]
+
+    _import_stacks: threading.local = threading.local()
+
+    # module name -> [self milliseconds, cumulative milliseconds, thread]
+
+    _modules: Dict[str, List[Any]] = {}
+    _stages: List[Dict[str, Any]] = []
+    _marks: Dict[str, float] = {}
+
+    @classmethod
+    def install(cls, service: str) -> None:
+        """
+        Starts the trace. Call before any other add-on module is imported.
+
+        :param service: Name of the service being started, used in the
+                        report's file name
+        :return:
+        """
+        with cls._lock:
+            if cls._timer is not None:
+                return
+
+            cls._service = service
+            cls._start = time.perf_counter()
+            cls._timer = _ImportTimer()
+            sys.meta_path.insert(0, cls._timer)
+
+    @classmethod
+    def is_active(cls) -> bool:
+        """
+        :return: True between install and finish
+        """
+        return cls._timer is not None and not cls._finished
+
+    @classmethod
+    def elapsed_ms(cls) -> float:
+        """
+        :return: Milliseconds since install
+        """
+        return (time.perf_counter() - cls._start) * 1000.0
+
+    @classmethod
+    def enter_import(cls, name: str) -> None:
+        """
+        Called by _ImportTimer before a module is executed
+
+        :param name:
+        :return:
+        """
+        stack: List[List[Any]] = getattr(cls._import_stacks, 'stack', None)
+        if stack is None:
+            stack = []
+            cls._import_stacks.stack = stack
+        stack.append([name, time.perf_counter(), 0.0])
+
+    @classmethod
+    def exit_import(cls, name: str) -> None:
+        """
+        Called by _ImportTimer after a module is executed
+
+        :param name:
+        :return:
+        """
+        stack: List[List[Any]] = getattr(cls._import_stacks, 'stack', None)
+        if not stack:
+            return
+
+        _, start, nested = stack.pop()
+        cumulative: float = time.perf_counter() - start
+        if stack:
+            stack[-1][2] += cumulative
+        with cls._lock:
+            cls._modules[name] = [(cumulative - nested) * 1000.0,
+                                  cumulative * 1000.0,
+                                  threading.current_thread().name]
+
+    @classmethod
+    @contextlib.contextmanager
+    def stage(cls, name: str) -> Iterator[None]:
+        """
+        Records the start and duration of a startup stage
+
+        :param name:
+        :return:
+        """
+        if not cls.is_active():
+            yield
+            return
+
+        start: float = cls.elapsed_ms()
+        try:
+            yield
+        finally:
+            with cls._lock:
+                cls._stages.append({'stage': name,
+                                    'thread': threading.current_thread().name,
+                                    'start_ms': start,
+                                    'duration_ms': cls.elapsed_ms() - start})
+
+    @classmethod
+    def mark(cls, name: str) -> None:
+        """
+        Records when a milestone was first reached
+
+        :param name:
+        :return:
+        """
+        if not cls.is_active():
+            return
+
+        with cls._lock:
+            cls._marks.setdefault(name, cls.elapsed_ms())
+
+    @classmethod
+    def get_report(cls) -> Dict[str, Any]:
+        """
+        :return:
+        """
+        with cls._lock:
+            modules: List[Tuple[str, List[Any]]] = sorted(
+                cls._modules.items(), key=lambda item: item[1][0], reverse=True)
+            return {'service': cls._service,
+                    'pid': os.getpid(),
+                    'units': 'milliseconds',
+                    'total_ms': cls.elapsed_ms(),
+                    'modules_imported': len(modules),
+                    'import_self_ms': sum(entry[0] for _, entry in modules),
+                    'marks': dict(cls._marks),
+                    'stages': list(cls._stages),
+                    'slowest_modules': [
+                        {'module': name, 'self_ms': entry[0],
+                         'cumulative_ms': entry[1], 'thread': entry[2]}
+                        for name, entry in modules[:cls.REPORTED_MODULES]]}
+
+    @classmethod
+    def finish(cls, milestone: str) -> None:
+        """
+        Stops tracing imports, logs a summary and writes the report when
+        statistics tracing is enabled. Only the first call has any effect.
+
+        :param milestone: Recorded as the final mark, e.g. 'first_trailer'
+        :return:
+        """
+        with cls._lock:
+            if not cls.is_active():
+                return
+
+            cls.mark(milestone)
+            cls._finished = True
+            try:
+                sys.meta_path.remove(cls._timer)
+            except ValueError:
+                pass
+            report: Dict[str, Any] = cls.get_report()
+
+        from common.logger import LazyLogger
+        from common.constants import Constants
+        from common.settings import Settings
+        from diagnostics.spans import write_json
+
+        logger: LazyLogger = LazyLogger.get_addon_module_logger(
+            file_path=__file__).getChild(cls.__name__)
+        try:
+            logger.info(f'{cls._service} startup: {milestone} after '
+                        f'{report["total_ms"]:.0f} ms, '
+                        f'{report["modules_imported"]} modules imported in '
+                        f'{report["import_self_ms"]:.0f} ms')
+            if logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
+                for stage in report['stages']:
+                    logger.debug_verbose(f'stage: {stage["stage"]} '
+                                         f'start: {stage["start_ms"]:.1f} ms '
+                                         f'duration: {stage["duration_ms"]:.1f} ms')
+
+            if Settings.is_trace_stats_enabled():
+                path: str = os.path.join(Constants.FRONTEND_DATA_PATH, 'debug',
+                                         f'startup_{cls._service}.json')
+                write_json(path, report)
+                logger.info(f'Wrote startup trace: {path}')
+        except Exception:
+            logger.exception()
@@ -36,11 +36,39 @@ class Statistics:
     _missing_library_id_in_cache: int = 0
     _missing_tmdb_id_not_in_cache: int = 0
     _missing_tmdb_id_in_cache: int = 0
+    _missing_library_id_false_positives: int = 0
+    _missing_tmdb_id_false_positives: int = 0
     _missing_tmdb_trailers_initial_size: int = 0
     _missing_library_trailers_initial_size: int = 0
     _missing_tmdb_trailers: int = 0
     _missing_library_trailers: int = 0
 
+    _tmdb_title_resolver_hits: int = 0
+    _tmdb_title_resolver_misses: int = 0
+    _tmdb_search_cache_hits: int = 0
+    _tmdb_search_cache_not_found_hits: int = 0
+    _tmdb_search_cache_misses: int = 0
+
+    _itunes_detail_cache_hits: int = 0
+    _itunes_detail_cache_misses: int = 0
+    _itunes_discoveries: int = 0
+    _itunes_discovery_seconds: float = 0.0
+    _itunes_discovery_feed_entries: int = 0
+    _itunes_discovery_fetches: int = 0
+
+    _resumed_downloads: int = 0
+    _resumed_download_bytes: int = 0
+    _reclaimed_partial_downloads: int = 0
+    _reclaimed_partial_download_bytes: int = 0
+
+    _tfh_index_refreshes: int = 0
+    _tfh_index_refresh_seconds: float = 0.0
+    _tfh_index_refresh_requests: int = 0
+    _tfh_index_refresh_new_movies: int = 0
+    _tfh_index_rebuilds: int = 0
+    _tfh_index_rebuild_seconds: float = 0.0
+    _tfh_index_rebuild_requests: int = 0
+
     _tmdb_movies: int = 0
     _tmdb_movies_filtered_out: int = 0
     _tmdb_movies_with_trailers: int = 0
@@ -379,6 +407,218 @@ class Statistics:
         """
         cls._missing_tmdb_id_in_cache += 1
 
+    @classmethod
+    def add_missing_library_id_cache_false_positive(cls) -> None:
+        """
+        The Bloom filter of the missing library trailer cache passed an id
+        which is not in the cache
+
+        :return:
+        """
+        cls._missing_library_id_false_positives += 1
+
+    @classmethod
+    def add_missing_tmdb_id_cache_false_positive(cls) -> None:
+        """
+        The Bloom filter of the missing TMDb trailer cache passed an id
+        which is not in the cache
+
+        :return:
+        """
+        cls._missing_tmdb_id_false_positives += 1
+
+    @classmethod
+    def get_missing_trailer_cache_counts(cls) -> Dict[str, int]:
+        """
+        :return: Lookup counts of the missing trailer caches
+        """
+        return {'tmdb_hits': cls._missing_tmdb_id_in_cache,
+                'tmdb_misses': cls._missing_tmdb_id_not_in_cache,
+                'tmdb_false_positives': cls._missing_tmdb_id_false_positives,
+                'library_hits': cls._missing_library_id_in_cache,
+                'library_misses': cls._missing_library_id_not_in_cache,
+                'library_false_positives':
+                    cls._missing_library_id_false_positives}
+
+    @classmethod
+    def add_tmdb_title_resolver_hit(cls) -> None:
+        """
+        A title was resolved to a TMDb id without searching TMDb
+
+        :return:
+        """
+        cls._tmdb_title_resolver_hits += 1
+
+    @classmethod
+    def add_tmdb_title_resolver_miss(cls) -> None:
+        """
+        The title was not found. TMDb is searched.
+
+        :return:
+        """
+        cls._tmdb_title_resolver_misses += 1
+
+    @classmethod
+    def get_tmdb_title_resolver_counts(cls) -> Dict[str, Any]:
+        """
+        :return: Outcomes of TMDbTitleResolver.resolve
+        """
+        lookups: int = (cls._tmdb_title_resolver_hits
+                        + cls._tmdb_title_resolver_misses)
+        hit_rate: float = 0.0
+        if lookups > 0:
+            hit_rate = cls._tmdb_title_resolver_hits / lookups
+        return {'hits': cls._tmdb_title_resolver_hits,
+                'misses': cls._tmdb_title_resolver_misses,
+                'hit_rate': hit_rate}
+
+    @classmethod
+    def add_tmdb_search_cache_hit(cls) -> None:
+        """
+        A TMDb title search was answered by TMDbSearchCache with an id
+
+        :return:
+        """
+        cls._tmdb_search_cache_hits += 1
+
+    @classmethod
+    def add_tmdb_search_cache_not_found_hit(cls) -> None:
+        """
+        TMDbSearchCache knows that a TMDb title search finds nothing
+
+        :return:
+        """
+        cls._tmdb_search_cache_not_found_hits += 1
+
+    @classmethod
+    def add_tmdb_search_cache_miss(cls) -> None:
+        cls._tmdb_search_cache_misses += 1
+
+    @classmethod
+    def get_tmdb_search_cache_counts(cls) -> Dict[str, int]:
+        """
+        :return: Outcomes of TMDbSearchCache.lookup
+        """
+        return {'hits': cls._tmdb_search_cache_hits,
+                'not_found_hits': cls._tmdb_search_cache_not_found_hits,
+                'misses': cls._tmdb_search_cache_misses}
+
+    @classmethod
+    def add_itunes_detail_cache_hit(cls) -> None:
+        """
+        An iTunes feature page was not fetched, since its feed entry is
+        unchanged
+
+        :return:
+        """
+        cls._itunes_detail_cache_hits += 1
+
+    @classmethod
+    def add_itunes_detail_cache_miss(cls) -> None:
+        cls._itunes_detail_cache_misses += 1
+
+    @classmethod
+    def get_itunes_detail_cache_counts(cls) -> Dict[str, int]:
+        """
+        :return: Outcomes of ITunesDetailCache.get_trailers
+        """
+        return {'hits': cls._itunes_detail_cache_hits,
+                'misses': cls._itunes_detail_cache_misses}
+
+    @classmethod
+    def add_itunes_discovery(cls, seconds: float, feed_entries: int,
+                             fetches: int) -> None:
+        """
+        A discovery of the entire iTunes feed
+
+        :param seconds: Wall time to fetch the feed and the feature pages
+        :param feed_entries: Entries in the feed
+        :param fetches: Number of feature pages fetched
+        :return:
+        """
+        cls._itunes_discoveries += 1
+        cls._itunes_discovery_seconds += seconds
+        cls._itunes_discovery_feed_entries += feed_entries
+        cls._itunes_discovery_fetches += fetches
+
+    @classmethod
+    def get_itunes_discovery_counts(cls) -> Dict[str, Union[int, float]]:
+        """
+        :return: Totals of the discoveries of the iTunes feed
+        """
+        return {'discoveries': cls._itunes_discoveries,
+                'seconds': cls._itunes_discovery_seconds,
+                'feed_entries': cls._itunes_discovery_feed_entries,
+                'fetches': cls._itunes_discovery_fetches}
+
+    @classmethod
+    def add_tfh_index_refresh(cls, seconds: float, requests: int,
+                              new_movies: int) -> None:
+        """
+        An incremental read of the TFH index, of only the newest entries
+
+        :param seconds: Wall time of the read
+        :param requests: Number of requests made to YouTube
+        :param new_movies: Number of entries not previously in TFHCache
+        :return:
+        """
+        cls._tfh_index_refreshes += 1
+        cls._tfh_index_refresh_seconds += seconds
+        cls._tfh_index_refresh_requests += requests
+        cls._tfh_index_refresh_new_movies += new_movies
+
+    @classmethod
+    def add_tfh_index_rebuild(cls, seconds: float, requests: int) -> None:
+        """
+        A read of the entire TFH index
+
+        :param seconds: Wall time of the read
+        :param requests: Number of requests made to YouTube
+        :return:
+        """
+        cls._tfh_index_rebuilds += 1
+        cls._tfh_index_rebuild_seconds += seconds
+        cls._tfh_index_rebuild_requests += requests
+
+    @classmethod
+    def get_tfh_index_counts(cls) -> Dict[str, Union[int, float]]:
+        """
+        :return: Totals of the reads of the TFH index
+        """
+        return {'refreshes': cls._tfh_index_refreshes,
+                'refresh_seconds': cls._tfh_index_refresh_seconds,
+                'refresh_requests': cls._tfh_index_refresh_requests,
+                'refresh_new_movies': cls._tfh_index_refresh_new_movies,
+                'rebuilds': cls._tfh_index_rebuilds,
+                'rebuild_seconds': cls._tfh_index_rebuild_seconds,
+                'rebuild_requests': cls._tfh_index_rebuild_requests}
+
+    @classmethod
+    def add_resumed_download(cls, resumed_bytes: int) -> None:
+        """
+        A trailer download continued from an earlier, interrupted, attempt
+
+        :param resumed_bytes: Bytes which were not downloaded again
+        :return:
+        """
+        cls._resumed_downloads += 1
+        cls._resumed_download_bytes += resumed_bytes
+
+    @classmethod
+    def add_reclaimed_partial_downloads(cls, files: int, reclaimed_bytes: int) -> None:
+        cls._reclaimed_partial_downloads += files
+        cls._reclaimed_partial_download_bytes += reclaimed_bytes
+
+    @classmethod
+    def get_download_staging_counts(cls) -> Dict[str, int]:
+        """
+        :return: Totals of resumed and reclaimed partial downloads
+        """
+        return {'resumed_downloads': cls._resumed_downloads,
+                'resumed_bytes': cls._resumed_download_bytes,
+                'reclaimed_files': cls._reclaimed_partial_downloads,
+                'reclaimed_bytes': cls._reclaimed_partial_download_bytes}
+
     @classmethod
     def add_json_read_time(cls, milliseconds: int) -> None:
         cls._json_io_time += milliseconds
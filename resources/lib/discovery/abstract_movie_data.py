@@ -10,10 +10,13 @@ Created on Feb 10, 2019
 import datetime
 import sys
 import threading
+from array import array
 from collections import OrderedDict
 
 import xbmc
 
+from cache.play_history import PlayHistory
+from common.constants import Constants
 from common.debug_utils import Debug
 from common.disk_utils import DiskUtils
 from common.exceptions import AbortException, DuplicateException
@@ -21,10 +24,13 @@ from common.imports import *
 from common.kodi_queue import (KodiQueue)
 from common.logger import (Trace, LazyLogger)
 from common.monitor import Monitor
-from common.movie import BaseMovie, AbstractMovieId, AbstractMovie
+from common.movie import (BaseMovie, AbstractMovieId, AbstractMovie,
+                          TMDbMoviePageData)
 from common.movie_constants import MovieField, MovieType
 from diagnostics.play_stats import PlayStatistics
 from discovery.trailer_fetcher_interface import TrailerFetcherInterface
+from discovery.utils.compact_index import CompactIndex
+from discovery.utils.movie_spill_store import MovieSpillStore
 
 module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
 
@@ -55,153 +61,351 @@ class MovieSourceData:
         self.movie_source: str = movie_source
 
 
-class UniqueQueue:
+class ShuffleBag:
     """
-
+    Incremental random permutation of movies (a shuffle bag).
+
+    Movies live in a list which is split into three regions: the movies
+    already drawn during the current round (before the cursor), those still
+    to be drawn (from the cursor up to the boundary) and those deferred
+    because they were found within the no-repeat window of the persistent
+    play history (from the boundary on). Drawing swaps a randomly chosen
+    remaining movie to the cursor and advances it (Fisher-Yates, one step
+    at a time), so a draw is O(1) and no full reshuffle is ever needed:
+
+        - put adds to the remaining movies, O(1)
+        - remove swaps the movie to the end of the list, O(1)
+        - rewind starts a new round by resetting the cursor and boundary,
+          O(1)
+
+    A movie sampled for a draw which is within the no-repeat window is
+    moved to the deferred region instead of being drawn. Deferred movies
+    are only drawn once no other movie remains this round, those played
+    longest ago first, so a movie is not repeated within no_repeat_hours
+    unless every movie of the bag is within it. Otherwise draws are biased
+    towards movies which have been played less often: a few random
+    remaining movies are sampled and the least played of them is chosen.
+
+    The list holds only the code (CompactIndex.get_code) of each movie, in
+    an array, and a CompactIndex gives each code's position. When the bag
+    is given a resolver (the owning MovieList's page_in), a drawn code is
+    turned back into its movie by the resolver, so the bag holds no movie
+    objects and a movie spilled to disk costs the bag a few dozen bytes.
+    Without a resolver the bag keeps the movies itself.
+
+    The public methods mirror the queue which this replaced, so that callers
+    can treat it as a queue which empties once per round.
     """
+    SAMPLES_PER_DRAW: Final[int] = 3
     logger: LazyLogger = None
 
-    def __init__(self, maxsize: int = 0, movie_source: str = '') -> None:
+    def __init__(self, movie_source: str = '',
+                 resolver: Callable[[int], Optional[BaseMovie]] = None) -> None:
         """
-        :param maxsize:
         :param movie_source:
+        :param resolver: Returns the movie for a code, None if it is gone
         :return:
         """
-        clz = UniqueQueue
-        if self.logger is None:
-            self.logger = module_logger.getChild(clz.__name__)
+        clz = ShuffleBag
+        if clz.logger is None:
+            clz.logger = module_logger.getChild(clz.__name__)
+
+        self._codes: array = array('q')
+        self._positions: CompactIndex = CompactIndex()
 
-        self._queue: Final[KodiQueue] = KodiQueue(maxsize)
-        self.duplicate_check: Final[Set] = set()
+        # Ids which are not recoverable from their code (see
+        # CompactIndex.get_movie_id). Only sources with few movies have them.
+
+        self._movie_ids: Dict[int, str] = {}
+        self._movies: Dict[int, BaseMovie] = {}
+        self._resolver: Callable[[int], Optional[BaseMovie]] = resolver
+        self._cursor: int = 0
+        self._boundary: int = 0  # Start of the deferred movies
         self._lock: Final[threading.RLock] = threading.RLock()
-        self.movie_source: Final[str] = movie_source
+        self.movie_source: str = movie_source
 
     def clear(self) -> None:
         """
+        Removes every movie from the bag
 
         :return:
         """
-        clz = UniqueQueue
-
         with self._lock:
-            self.duplicate_check.clear()
-            self._queue.clear()
+            self._codes = array('q')
+            self._positions.clear()
+            self._movie_ids.clear()
+            self._movies.clear()
+            self._cursor = 0
+            self._boundary = 0
+
+    def rewind(self) -> None:
+        """
+        Starts a new round: every movie in the bag may be drawn again.
 
-            assert len(self.duplicate_check) == 0
-            assert self._queue.empty()
+        :return:
+        """
+        with self._lock:
+            self._cursor = 0
+            self._boundary = len(self._codes)
 
     def put(self, movie: BaseMovie, block: bool = True,
-            timeout: float = None) -> None:
+            timeout: float = None, drawn: bool = False) -> None:
         """
+        Adds a movie to the bag
 
         :param movie:
-        :param block:
-        :param timeout:
+        :param block: Ignored, the bag is never full
+        :param timeout: Ignored
+        :param drawn: When True, the movie is treated as already drawn
+                      during the current round
         :return:
+        :raises DuplicateException: if the movie is already in the bag
         """
-        clz = UniqueQueue
-        key = self.get_key(movie)
-
-        # self.logger.debug(f'movie:{movie} source: {movie.get_source()} '
-        #                   f'key: {key}')
-        exception = None
+        movie_id: str = movie.get_id()
+        code: int = CompactIndex.get_code(movie_id)
         with self._lock:
-            if key in self.duplicate_check:
-                exception = DuplicateException()
-            else:
-                self._queue.put(movie, False)
-                self.duplicate_check.add(key)
-
-        if exception is not None:
-            if self.logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
-                self.logger.debug_verbose(f'Duplicate movie: {str(movie)} '
-                                          f'source: {movie.get_source()} ',
-                                          f'key: {key}')
-            raise exception
+            if code in self._positions:
+                if self.logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
+                    self.logger.debug_verbose(f'Duplicate movie: {str(movie)} '
+                                              f'source: {movie.get_source()} '
+                                              f'id: {movie_id}')
+                raise DuplicateException()
+
+            self.movie_source = movie.get_source()
+            if code < 0:
+                self._movie_ids[code] = movie_id
+            if self._resolver is None:
+                self._movies[code] = movie
+            self._positions.put(code, len(self._codes))
+            self._codes.append(code)
+
+            # Move from the end (deferred) to the end of the remaining movies
+
+            self._swap(self._boundary, len(self._codes) - 1)
+            self._boundary += 1
+            if drawn:
+                self._swap(self._cursor, self._boundary - 1)
+                self._cursor += 1
 
     def get(self, block: bool = True,
             timeout: float = None) -> BaseMovie:
         """
+        Draws the next movie for this round. The movie remains in the bag
+        for later rounds.
 
-        :param block:
-        :param timeout:
+        :param block: Ignored, an exhausted round never blocks
+        :param timeout: Ignored
         :return:
+        :raises KodiQueue.Empty: when every movie has been drawn this round
         """
-        clz = UniqueQueue
         with self._lock:
-            try:
-                movie: BaseMovie = None
-                movie = self._queue.get(block=block, timeout=timeout)
-                key = self.get_key(movie)
-                self.duplicate_check.remove(key)
-            except KeyError as e:
-                if self.logger.isEnabledFor(LazyLogger.DEBUG):
-                    self.logger.debug(f'movie: {str(movie)} key: {key}')
-                    self.logger.dump_stack(f'{str(movie)} '
-                                           f'movie not found in duplicate_check for '
-                                           f'',
-                                           heading='')
-        # if self.logger.isEnabledFor(LazyLogger.DEBUG):
-            # self.logger.debug('got movie:', item[Movie.TITLE], 'source:',
-            #                    item[Movie.SOURCE], 'key:', key)
-        return movie
+            while True:
+                if self._cursor >= len(self._codes):
+                    raise KodiQueue.Empty()
+
+                best_position: int
+                if self._boundary > self._cursor:
+                    best_position = self._sample_remaining()
+                    if best_position < 0:
+                        continue  # Every one sampled was deferred
+                else:
+                    best_position = self._sample_deferred()
+                    self._boundary += 1
+
+                self._swap(self._cursor, best_position)
+                code: int = self._codes[self._cursor]
+                self._cursor += 1
+                movie: BaseMovie
+                if self._resolver is None:
+                    movie = self._movies[code]
+                else:
+                    movie = self._resolver(code)
+                if movie is not None:
+                    return movie
 
-    def qsize(self) -> int:
+                # No longer known to the resolver
+
+                self._remove_code(code)
+
+    def remove(self, movie: BaseMovie) -> None:
         """
+        Removes a movie from the bag, if present.
 
+        :param movie:
         :return:
         """
+        code: int = CompactIndex.get_code(movie.get_id())
         with self._lock:
-            size: int = int(self._queue.qsize())
+            self._remove_code(code)
+
+    def _remove_code(self, code: int) -> None:
+        position: int = self._positions.get(code)
+        if position is None:
+            return
+
+        # Keep each region contiguous: move the movie to the last slot of
+        # its region and then into the next region, until it is last.
+
+        if position < self._cursor:
+            self._swap(position, self._cursor - 1)
+            self._cursor -= 1
+            position = self._cursor
 
-        # self.logger.exit('size:', size)
-        return size
+        if position < self._boundary:
+            self._swap(position, self._boundary - 1)
+            self._boundary -= 1
+            position = self._boundary
 
-    def get_key(self, movie: BaseMovie) -> str:
+        self._swap(position, len(self._codes) - 1)
+        self._codes.pop()
+        self._positions.pop(code)
+        self._movie_ids.pop(code, None)
+        self._movies.pop(code, None)
+
+    def replace(self, movie: BaseMovie) -> None:
         """
+        Replaces the movie with the same id (typically a movie id with a
+        fully discovered movie, or visa versa) without changing its place.
+        Only meaningful for a bag without a resolver.
 
         :param movie:
         :return:
         """
+        code: int = CompactIndex.get_code(movie.get_id())
+        with self._lock:
+            if code in self._movies:
+                self._movies[code] = movie
 
-        key: str = None
-        movie_source = movie.get_source()
-        key = movie_source + movie.get_id()
-
-        return key
+    def _swap(self, i: int, j: int) -> None:
+        if i == j:
+            return
+        codes: array = self._codes
+        codes[i], codes[j] = codes[j], codes[i]
+        self._positions.put(codes[i], i)
+        self._positions.put(codes[j], j)
+
+    def _sample_remaining(self) -> int:
+        """
+        Samples a few of the remaining movies, deferring any within the
+        no-repeat window.
+
+        :return: Position of the least played movie sampled, -1 if every
+                 movie sampled was deferred
+        """
+        best_code: int = 0
+        best_count: int = -1
+        samples: int = 0
+        while (samples < ShuffleBag.SAMPLES_PER_DRAW
+               and self._boundary > self._cursor):
+            position: int = self._cursor + DiskUtils.RandomGenerator.randrange(
+                self._boundary - self._cursor)
+            code: int = self._codes[position]
+            key: str = self._get_key(code)
+            if PlayHistory.is_key_in_no_repeat_window(key):
+                self._swap(position, self._boundary - 1)
+                self._boundary -= 1
+                continue
+
+            samples += 1
+            count: int = PlayHistory.get_play_count_for_key(key)
+            if best_count < 0 or count < best_count:
+                best_code = code
+                best_count = count
+
+        if best_count < 0:
+            return -1
+        return self._positions.get(best_code)
+
+    def _sample_deferred(self) -> int:
+        """
+        Samples a few of the deferred movies (only drawn when no other
+        movie remains).
+
+        :return: Position of the movie sampled which was played longest ago
+        """
+        best_position: int = -1
+        best_elapsed: float = -1.0
+        deferred: int = len(self._codes) - self._boundary
+        for _ in range(min(deferred, ShuffleBag.SAMPLES_PER_DRAW)):
+            position: int = self._boundary + \
+                DiskUtils.RandomGenerator.randrange(deferred)
+            elapsed: Optional[float] = PlayHistory.seconds_since_played_for_key(
+                self._get_key(self._codes[position]))
+            if elapsed is None:
+                elapsed = float('inf')
+            if elapsed > best_elapsed:
+                best_position = position
+                best_elapsed = elapsed
+        return best_position
+
+    def _get_key(self, code: int) -> str:
+        """
+        :param code:
+        :return: The PlayHistory key of the movie
+        """
+        movie_id: str = self._movie_ids.get(code)
+        if movie_id is None:
+            movie_id = CompactIndex.get_movie_id(code)
+        return PlayHistory.get_key_for(self.movie_source, movie_id)
+
+    def __contains__(self, movie: BaseMovie) -> bool:
+        code: int = CompactIndex.get_code(movie.get_id())
+        with self._lock:
+            return code in self._positions
 
-    def empty(self) -> bool:
+    def __len__(self) -> int:
         """
-
-        :return:
+        :return: Number of movies in the bag, drawn or not
         """
-        # self.logger = self.logger.get_methodlogger('empty')
+        with self._lock:
+            return len(self._codes)
 
+    def qsize(self) -> int:
+        """
+        :return: Number of movies not yet drawn this round
+        """
         with self._lock:
-            empty = self._queue.empty()
+            return len(self._codes) - self._cursor
 
-        # self.logger.exit('empty:', empty)
-        return empty
+    def empty(self) -> bool:
+        """
+        :return: True when every movie has been drawn this round
+        """
+        return self.qsize() == 0
 
     def full(self) -> bool:
         """
 
         :return:
         """
-        # self.logger = self.logger.get_methodlogger('full')
-
-        with self._lock:
-            full = self._queue.full()
-
-        # self.logger.exit('full:', full)
-        return full
+        return False
 
 
 class MovieList:
     """
-
+    The discovered movies for one movie source, by movie id.
+
+    Fully populated movies (those carrying their movie_info) are tracked
+    least recently used first. When the estimated size of the fully
+    populated movies of every source exceeds
+    Constants.DISCOVERY_POOL_MEMORY_BUDGET, the coldest of them are written
+    to a MovieSpillStore and dropped from memory: the store's CompactIndex
+    entry (the movie's code, record location and a few flags) is all that
+    remains of a spilled movie. A spilled movie is paged back in by page_in
+    when it is drawn from a ShuffleBag, picked while starving or looked up
+    by id.
+
+    Movies held in memory are keyed by their code (CompactIndex.get_code).
     """
     logger: LazyLogger = None
+    _pool_lock: threading.RLock = threading.RLock()
+    _pool_resident_bytes: int = 0
+
+    # Flags kept for spilled movies (see get_flags)
+
+    HAS_TRAILER: Final[int] = 0x1
+    HAS_LOCAL_TRAILER: Final[int] = 0x2
+    STARVATION_CANDIDATE: Final[int] = 0x4
 
     def __init__(self, movie_source: str) -> None:
         """
@@ -215,14 +419,21 @@ class MovieList:
 
         self._movie_source: str = movie_source
         self._total_removed: int = 0
-        self._play_count: Final[Dict[str, int]] = dict()
         self._lock: Final[threading.RLock] = threading.RLock()
-        self._changed: bool = False
         self._number_of_added_movies: int = 0
-        self._ordered_dict: OrderedDict = OrderedDict()
+        self._movies: Dict[int, BaseMovie] = {}
+
+        # code -> estimated size of each fully populated movie in memory,
+        # least recently used first
+
+        self._resident: OrderedDict = OrderedDict()
+        self._resident_bytes: int = 0
+        self._spill_store: MovieSpillStore = None
 
     def __sizeof__(self) -> int:
-        approx_size: int = Debug.total_size(self._ordered_dict)
+        approx_size: int = Debug.total_size(self._movies)
+        if self._spill_store is not None:
+            approx_size += self._spill_store.get_index_size()
         return approx_size
 
     def clear(self) -> None:
@@ -233,22 +444,22 @@ class MovieList:
         clz = MovieList
 
         with self._lock:
-            try:
-                while self._ordered_dict.popitem() is not None:
-                    pass
-            except KeyError:
-                pass
-            if len(self._ordered_dict.items()) != 0:
-                clz.logger.error('_ordered_dict not empty')
+            self._movies.clear()
             self._number_of_added_movies = 0
-
-        # clz.logger.exit()
+            self._release_resident(self._resident_bytes)
+            self._resident.clear()
+            self._resident_bytes = 0
+            if self._spill_store is not None:
+                self._spill_store.close()
+                self._spill_store = None
 
     def add(self, movie: BaseMovie) -> None:
         """
 
         :param movie:
         :return:
+        :raises DuplicateException: when a movie with the same id is
+                already present, in memory or spilled
         """
         clz = MovieList
 
@@ -257,45 +468,42 @@ class MovieList:
                                             f'type: {type(movie)} '
                                             f'source: {movie.get_source()}')
 
-        # Key is source + _ + id
-        # Therefore if keys are identical, so are sources
-        key = clz.get_key(movie)
-        new_movie: bool = True
-        dupe: bool = False
+        code: int = clz.get_code(movie)
         with self._lock:
-            if key in self._ordered_dict.keys():
-                current_value = self._ordered_dict.get(key)
-                dupe = True
-
-                # If movies are from same source then complain about
-                # duplicate, unless one is a movie id and the other
-                # is a movie.
-
-                if dupe:
-                    if self.logger.isEnabledFor(LazyLogger.DEBUG):
-                        self.logger.debug(f'dupe: movie: {movie.get_id()} '
-                                          f'type: {type(movie)} '
-                                          f'from type: {type(current_value)} '
-                                          f'source: {movie.get_source()}')
-                    # self.logger.dump_stack(heading='', xbmc_log_level=xbmc.LOGDEBUG)
-
-                        clz.logger.debug(f'Raising DuplicateException')
-                        clz.logger.debug(f'isinstance current_value AbstractMovieId: '
-                                         f'{isinstance(current_value, AbstractMovieId)}')
-                        clz.logger.debug(f'isinstance current_value AbstractMovie: '
-                                         f'{isinstance(current_value, AbstractMovie)}')
-                        clz.logger.debug(f'isinstance movie AbstractMovieId: '
-                                         f'{isinstance(movie, AbstractMovieId)}')
-                        clz.logger.debug(f'isinstance movie AbstractMovie: '
-                                         f'{isinstance(movie, AbstractMovie)}')
-                    raise DuplicateException()
-
-            # If we didn't raise Exception, then okay to add or replace
-            self._ordered_dict[key] = movie
+            current_value: BaseMovie = self._movies.get(code)
+            if current_value is not None or self._is_spilled(code):
+                if self.logger.isEnabledFor(LazyLogger.DEBUG):
+                    self.logger.debug(f'dupe: movie: {movie.get_id()} '
+                                      f'type: {type(movie)} '
+                                      f'from type: {type(current_value)} '
+                                      f'source: {movie.get_source()}')
+                raise DuplicateException()
+
+            self._movies[code] = movie
+            self._track(code, movie)
             self._number_of_added_movies += 1
 
             PlayStatistics.add(movie)
 
+    def replace(self, movie: BaseMovie) -> None:
+        """
+        Replaces an existing entry with the same id (typically a movie id
+        with a fully populated movie, or visa versa). A spilled entry is
+        discarded in favor of the given movie.
+
+        :param movie:
+        :return:
+        """
+        clz = MovieList
+        code: int = clz.get_code(movie)
+        with self._lock:
+            if code not in self._movies and not self._is_spilled(code):
+                return
+
+            self._untrack(code)
+            self._movies[code] = movie
+            self._track(code, movie)
+
     def get_by_id(self, source: str, movie_id: str) -> BaseMovie:
         """
 
@@ -304,27 +512,17 @@ class MovieList:
 
         :param movie_id: key appropriate for the movie source
                tmdb_id, tfh_id, itunes_id or library_id
-        :return:
+        :return: The movie, paged in if it was spilled. None if unknown
         """
-        clz = type(self)
-        key: str = source + str(movie_id)
-
-        with self._lock:
-            try:
-                movie: BaseMovie = None
-                movie = self._ordered_dict[key]
-
-            except AbortException:
-                reraise(*sys.exc_info())
-            except KeyError:
-                pass
-
-            return movie
+        return self.page_in(CompactIndex.get_code(str(movie_id)))
 
     def get_movies(self) -> List[BaseMovie]:
+        """
+        :return: The movies held in memory, not those spilled to disk
+        """
         with self._lock:
             movies: List[BaseMovie] = []
-            movies.extend(self._ordered_dict.values())
+            movies.extend(self._movies.values())
             return movies
 
     def remove(self, movie: BaseMovie) -> None:
@@ -332,6 +530,7 @@ class MovieList:
 
         :param movie:
         :return:
+        :raises KeyError: when the movie is not present
         """
         clz = MovieList
 
@@ -342,14 +541,14 @@ class MovieList:
             self.logger.debug(f'movie: {movie.get_id()} type: {type(movie)} '
                               f'source: {movie.get_source()}')
             self.logger.dump_stack(heading='')
+        code: int = clz.get_code(movie)
         with self._lock:
-            try:
-                del self._ordered_dict[clz.get_key(movie)]
-                self._total_removed += 1
+            if code not in self._movies and not self._is_spilled(code):
+                raise KeyError(movie.get_id())
 
-            except AbortException:
-                reraise(*sys.exc_info())
-            # except KeyError:  Let caller handle
+            self._movies.pop(code, None)
+            self._untrack(code)
+            self._total_removed += 1
 
     def len(self) -> int:
         """
@@ -357,7 +556,9 @@ class MovieList:
         :return:
         """
         with self._lock:
-            length = int(len(self._ordered_dict))
+            length = len(self._movies)
+            if self._spill_store is not None:
+                length += len(self._spill_store)
 
         return length
 
@@ -368,31 +569,241 @@ class MovieList:
         """
         return self.len()
 
-    def shuffle(self) -> None:
+    def __contains__(self, movie: BaseMovie) -> bool:
+        code: int = MovieList.get_code(movie)
+        with self._lock:
+            return code in self._movies or self._is_spilled(code)
+
+    @staticmethod
+    def get_key(movie: BaseMovie) -> str:
         """
 
+        :param movie:
         :return:
         """
-        clz = MovieList
 
-        # self.logger.dump_stack(heading='', xbmc_log_level=xbmc.LOGDEBUG)
+        key: str = movie.get_source() + '_' + str(movie.get_id())
+
+        return key
+
+    @staticmethod
+    def get_code(movie: BaseMovie) -> int:
+        """
+        :param movie:
+        :return: Identifies the movie within its source, see
+                 CompactIndex.get_code
+        """
+        return CompactIndex.get_code(movie.get_id())
+
+    @staticmethod
+    def get_flags(movie: BaseMovie) -> int:
+        """
+        :param movie:
+        :return: HAS_TRAILER, HAS_LOCAL_TRAILER and STARVATION_CANDIDATE,
+                 as they apply to the movie
+        """
+        clz = MovieList
+        flags: int = 0
+        if movie.get_has_trailer():
+            flags |= clz.HAS_TRAILER
+        if movie.has_local_trailer():
+            flags |= clz.HAS_LOCAL_TRAILER
+        if ((movie.get_discovery_state() >= MovieField.DISCOVERY_READY_TO_DISPLAY)
+                or movie.is_been_fully_discovered()
+                or movie.has_local_trailer()):
+            flags |= clz.STARVATION_CANDIDATE
+        return flags
+
+    def count(self, flags: int) -> int:
+        """
+        :param flags: HAS_TRAILER, etc.
+        :return: Number of movies, in memory or spilled, with at least one
+                 of the flags
+        """
+        clz = MovieList
+        with self._lock:
+            total: int = sum(1 for movie in self._movies.values()
+                             if (clz.get_flags(movie) & flags) != 0)
+            if self._spill_store is not None:
+                total += self._spill_store.count(flags)
+            return total
 
+    def get_candidates(self, flags: int) -> List[Union[BaseMovie, int]]:
+        """
+        :param flags: HAS_TRAILER, etc.
+        :return: The movies with at least one of the flags. Movies which are
+                 spilled are represented by their code, to be paged in by
+                 page_in when used.
+        """
+        clz = MovieList
         with self._lock:
-            items = list(self._ordered_dict.items())
-            DiskUtils.RandomGenerator.shuffle(items)
-            self._ordered_dict = OrderedDict(items)
+            candidates: List[Union[BaseMovie, int]] = [
+                movie for movie in self._movies.values()
+                if (clz.get_flags(movie) & flags) != 0]
+            if self._spill_store is not None:
+                candidates.extend(self._spill_store.get_codes(flags))
+            return candidates
 
     @staticmethod
-    def get_key(movie: BaseMovie) -> str:
+    def is_spillable(movie: BaseMovie) -> bool:
         """
+        :param movie:
+        :return: True if the movie carries movie_info which can be written to
+                 disk and read back
+        """
+        return (hasattr(movie, '_movie_info')
+                and hasattr(movie, 'get_as_movie_id_type'))
+
+    def _is_spilled(self, code: int) -> bool:
+        return self._spill_store is not None and code in self._spill_store
+
+    def _track(self, code: int, movie: BaseMovie) -> None:
+        """
+        Starts accounting for a newly stored movie. Must hold self._lock.
 
+        :param code:
         :param movie:
         :return:
         """
+        if not MovieList.is_spillable(movie):
+            return
 
-        key: str = movie.get_source() + '_' + str(movie.get_id())
+        size: int = Debug.total_size(movie.get_as_movie_type())
+        self._resident[code] = size
+        self._resident_bytes += size
+        with MovieList._pool_lock:
+            MovieList._pool_resident_bytes += size
 
-        return key
+    def _untrack(self, code: int) -> None:
+        """
+        Stops accounting for a movie which is being replaced or removed.
+        Must hold self._lock.
+
+        :param code:
+        :return:
+        """
+        size: int = self._resident.pop(code, None)
+        if size is not None:
+            self._resident_bytes -= size
+            self._release_resident(size)
+        if self._is_spilled(code):
+            self._spill_store.remove(code)
+
+    @staticmethod
+    def _release_resident(size: int) -> None:
+        with MovieList._pool_lock:
+            MovieList._pool_resident_bytes -= size
+
+    @staticmethod
+    def is_over_budget() -> bool:
+        """
+        :return: True when the fully populated movies of all sources exceed
+                 the memory budget
+        """
+        with MovieList._pool_lock:
+            return (MovieList._pool_resident_bytes >
+                    Constants.DISCOVERY_POOL_MEMORY_BUDGET)
+
+    def spill_cold_movies(self) -> int:
+        """
+        Spills least recently used, fully populated movies to disk until the
+        pool is within budget, or this list has nothing left to spill.
+
+        :return: Number of movies spilled
+        """
+        clz = MovieList
+        spilled: int = 0
+        with self._lock:
+            while len(self._resident) > 0 and clz.is_over_budget():
+                code, size = self._resident.popitem(last=False)
+                movie: BaseMovie = self._movies[code]
+                if self._spill_store is None:
+                    self._spill_store = MovieSpillStore(self._movie_source)
+
+                if isinstance(movie, AbstractMovie):
+                    data: Dict[str, Any] = movie.get_serializable()
+                else:
+                    data = movie.serialize()
+
+                # State which is not part of the serialized movie
+
+                record: Dict[str, Any] = {
+                    'movie': data,
+                    'library_id': movie.get_library_id(),
+                    'has_trailer': movie.get_has_trailer(),
+                    'has_local_trailer': movie.has_local_trailer()}
+                self._resident_bytes -= size
+                clz._release_resident(size)
+                if not self._spill_store.put(code, record, clz.get_flags(movie)):
+                    continue  # Too large to spill, left in memory untracked
+
+                del self._movies[code]
+                spilled += 1
+
+        if spilled > 0 and clz.logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
+            clz.logger.debug_verbose(f'source: {self._movie_source} '
+                                     f'spilled: {spilled} '
+                                     f'usage: {self.get_memory_usage()}')
+        return spilled
+
+    def page_in(self, code: int) -> Optional[BaseMovie]:
+        """
+        Returns a movie, reading it back if it was spilled to disk, and
+        marks it as most recently used.
+
+        :param code: See get_code
+        :return: The movie, None if not present
+        """
+        clz = MovieList
+        with self._lock:
+            movie: BaseMovie = self._movies.get(code)
+            if movie is not None:
+                if code in self._resident:
+                    self._resident.move_to_end(code)
+                return movie
+
+            if not self._is_spilled(code):
+                return None
+
+            record: Dict[str, Any] = self._spill_store.get(code)
+            self._spill_store.remove(code)
+            data: Dict[str, Any] = record['movie']
+            paged_movie: BaseMovie
+            if data.get(MovieField.CLASS) == TMDbMoviePageData.__name__:
+                paged_movie = TMDbMoviePageData.de_serialize(data)
+            else:
+                paged_movie = AbstractMovie.de_serialize(data)
+            if paged_movie is None:
+                return None
+
+            paged_movie.set_library_id(record['library_id'])
+            paged_movie.set_has_trailer(record['has_trailer'])
+            paged_movie.set_local_trailer(record['has_local_trailer'])
+            self._movies[code] = paged_movie
+            self._track(code, paged_movie)
+            return paged_movie
+
+    def get_memory_usage(self) -> Dict[str, int]:
+        """
+        :return: Counts of movies and approximate bytes held in memory and
+                 spilled to disk for this movie source
+        """
+        with self._lock:
+            spilled_movies: int = 0
+            spilled_bytes: int = 0
+            spill_index_bytes: int = 0
+            if self._spill_store is not None:
+                spilled_movies = len(self._spill_store)
+                spilled_bytes = self._spill_store.get_size_on_disk()
+                spill_index_bytes = self._spill_store.get_index_size()
+            return {
+                'movies': len(self._movies) + spilled_movies,
+                'resident_movies': len(self._resident),
+                'resident_bytes': self._resident_bytes,
+                'spilled_movies': spilled_movies,
+                'spilled_bytes': spilled_bytes,
+                'spill_index_bytes': spill_index_bytes
+            }
 
 
 class AbstractMovieData:
@@ -437,16 +848,19 @@ class AbstractMovieData:
         # structure is _discovered_movies).
         self._discovered_movies: MovieList = MovieList(movie_source)
 
-        # _discovered_movies_queue is filled up with movies (not copies of the
-        # movies) from _discovered_movies. Any change should be reflected in
-        # both places. When empty, or under other conditions,
-        # _discovered_movies_queue is emptied and then filled with all of the
-        # movies from _discovered_movies, after shuffling. Then, movies to
-        # display trailers for are drawn from _discovered_movies_queue until
-        # empty, or some other condition causes it to be refilled.
+        # Every movie in _discovered_movies is also in exactly one of the
+        # two shuffle bags below (the same movie instances, not copies).
+        # Movies are added to a bag as they are discovered and removed when
+        # they prove to have no trailer. Movies to display trailers for are
+        # drawn at random from the bags until every movie has been drawn,
+        # then the bags are rewound for another round. No reshuffling of
+        # _discovered_movies is needed.
+        #
+        # _discovered_movies_queue holds movies which have no known trailer
+        # yet and require more discovery.
 
-        self._discovered_movies_queue: UniqueQueue = UniqueQueue(
-            maxsize=0, movie_source=movie_source)
+        self._discovered_movies_queue: ShuffleBag = ShuffleBag(
+            movie_source=movie_source, resolver=self._resolve)
 
         # _previously_discovered_movies_queue contains movies which appear to
         # have been previously discovered. The assumption is that if they were
@@ -459,8 +873,8 @@ class AbstractMovieData:
         # discovered queue for every one (new) one from the _discovered_movies_queue.
         # This fits well since the capacity of the output queue is 3.
 
-        self._previously_discovered_movies_queue: UniqueQueue = UniqueQueue(
-            maxsize=0, movie_source=movie_source)
+        self._previously_discovered_movies_queue: ShuffleBag = ShuffleBag(
+            movie_source=movie_source, resolver=self._resolve)
         self._fetch_count: int = 0
 
         # _movies_to_fetch_queue is a small queue that has movies that
@@ -479,7 +893,6 @@ class AbstractMovieData:
                              f'{trailer_fetcher_class}')
         self._parent_trailer_fetcher: TrailerFetcherInterface = \
             trailer_fetcher_class(movie_data=self)
-        self._minimum_shuffle_seconds: int = 10
 
     def get_size_of(self) -> int:
         size_of_discovered_movies: int = Debug.total_size(self._discovered_movies,
@@ -590,7 +1003,6 @@ class AbstractMovieData:
         clz = type(self)
         movies: List[BaseMovie] = BaseMovie.convert_to_movie(movies)
 
-        movies_added: bool = False
         with self._discovered_movies_lock:
             #  if clz.logger.isEnabledFor(LazyLogger.DEBUG):
             #     clz.logger.debug('Have discovered_movies_lock')
@@ -612,37 +1024,17 @@ class AbstractMovieData:
                     #                        movie[Movie.TITLE])
                     continue
 
-                movies_added = True
                 self._number_of_added_movies += 1
                 movie.set_trailer_played(False)
+                try:
+                    self._get_shuffle_bag(movie).put(movie)
+                except DuplicateException:
+                    pass
 
             if self._discovered_movies.len() > 0:
                 self._movies_discovered_event.set()
 
-            seconds_since_last_shuffle: int = (
-                datetime.datetime.now() - self._last_shuffle_time).seconds
-
-        reshuffle: bool = False
-        # Reshuffle every minute or when there is a 20% change
-
-        last_shuffled_at_size = self._last_shuffled_size
-        current_size = len(self._discovered_movies)
-        if (movies_added
-                and (current_size > 25
-                     and current_size >= (last_shuffled_at_size * 2)
-                     or (seconds_since_last_shuffle >
-                         self.get_minimum_shuffle_seconds()))):
-            reshuffle = True
-
-        if reshuffle:
-            if clz.logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
-                clz.logger.debug_extra_verbose(
-                    f'seconds_since_last_shuffle: {seconds_since_last_shuffle} '
-                    f'current size: {current_size} '
-                    f'previous size: {last_shuffled_at_size}',
-                    trace=Trace.TRACE_DISCOVERY)
-
-            self.shuffle_discovered_movies(mark_unplayed=False)
+            self._enforce_memory_budget()
 
     def replace(self, movie: Union[BaseMovie, MovieType]) -> None:
         """
@@ -654,10 +1046,39 @@ class AbstractMovieData:
         """
         clz = type(self)
         with self._discovered_movies_lock:
-            try:
-                self._discovered_movies.add(movie)
-            except DuplicateException:
-                pass  # Expected
+            self._discovered_movies.replace(movie)
+            self._enforce_memory_budget()
+
+    def _enforce_memory_budget(self) -> None:
+        """
+        Spills the coldest fully populated movies of this source to disk
+        while the discovery pool of all sources is over its memory budget.
+        Must hold self._discovered_movies_lock.
+
+        :return:
+        """
+        if MovieList.is_over_budget():
+            self._discovered_movies.spill_cold_movies()
+
+    def _resolve(self, code: int) -> Optional[BaseMovie]:
+        """
+        Returns a movie drawn from a shuffle bag or the starvation queue,
+        paging it back in if it was spilled to disk.
+
+        :param code: See MovieList.get_code
+        :return: None if the movie is no longer discovered
+        """
+        with self._discovered_movies_lock:
+            movie: BaseMovie = self._discovered_movies.page_in(code)
+            self._enforce_memory_budget()
+            return movie
+
+    def get_memory_usage(self) -> Dict[str, int]:
+        """
+        :return: Counts of movies and approximate bytes held in memory and
+                 spilled to disk for this movie source
+        """
+        return self._discovered_movies.get_memory_usage()
 
     def purge_rediscoverable_data(self, movie: AbstractMovie) -> AbstractMovieId:
         #
@@ -676,69 +1097,55 @@ class AbstractMovieData:
         # clz.logger.debug(f'{self._movies_discovered_event.is_set()}')
         return self._movies_discovered_event.isSet()
 
+    @staticmethod
+    def is_likely_playable(movie: BaseMovie) -> bool:
+        """
+        When a movie has been previously discovered, it is likely much
+        easier/quicker to prepare it for viewing. By segregating movies
+        according to whether they are likely to be quick to ready for playing
+        we may be able to avoid long periods of not playing trailers while
+        we are finding a movie with a playable trailer.
+
+        :param movie:
+        :return:
+        """
+        return movie.has_local_trailer() or movie.get_has_trailer()
+
+    def _get_shuffle_bag(self, movie: BaseMovie) -> ShuffleBag:
+        """
+        :param movie:
+        :return: The shuffle bag which the movie belongs in, based upon what
+                 is currently known about its trailer
+        """
+        if self.is_likely_playable(movie):
+            return self._previously_discovered_movies_queue
+        return self._discovered_movies_queue
+
     def shuffle_discovered_movies(self, mark_unplayed: bool = False) -> None:
         """
+        Starts a new round of drawing movies from the shuffle bags.
+
+        The bags are already in random order, so this is O(1) regardless of
+        the number of discovered movies.
 
-        :param mark_unplayed:
+        :param mark_unplayed: When True, every movie may be drawn again,
+                              otherwise only the movies not yet drawn this
+                              round remain
         :return:
         """
         clz = type(self)
 
         Monitor.throw_exception_if_abort_requested()
-        # clz.logger.debug('before self.lock')
-
         with self._discovered_movies_lock:
-            # clz.logger.debug('Have discovered_movies_lock')
-
             if self._discovered_movies.len() == 0:
                 return
 
-            self._discovered_movies.shuffle()
             if mark_unplayed:
                 # Force starvation queue to be rebuilt
 
                 self._starvation_queue.clear()
-                for movie in self._discovered_movies.get_movies():
-                    movie.set_trailer_played(False)
-
-            # Drain anything previously in queue
-
-            self._discovered_movies_queue.clear()
-            self._previously_discovered_movies_queue.clear()
-
-            Monitor.throw_exception_if_abort_requested()
-            # clz.logger.debug('reloading _discovered_movies_queue')
-            movies_with_local_trailers: List[BaseMovie] = []
-            movies_with_remote_trailers: List[BaseMovie] = []
-            for movie in self._discovered_movies.get_movies():
-                if isinstance(movie, AbstractMovieId) or not movie.is_trailer_played():
-                    # if clz.logger.isEnabledFor(LazyLogger.DEBUG):
-                    #   clz.logger.debug('adding', movie[Movie.TITLE],
-                    #                      'id:', hex(id(movie)),
-                    #                      'to discovered_movies_queue',
-                    #                      'state:', movie[Movie.DISCOVERY_STATE])
-
-                    # When a movie has been previously played, then it is likely
-                    # much easier/quicker to prepare it for viewing. By segregating
-                    # movies according to whether they are likely to be quick to
-                    # ready them for playing a trailer for or not means that we may
-                    # be able to avoid long periods of not playing trailers while
-                    # we are finding a movie with a playable trailer.
-
-                    if movie.has_local_trailer():
-                        movies_with_local_trailers.append(movie)
-                    elif movie.get_has_trailer():
-                        movies_with_remote_trailers.append(movie)
-                    else:
-                        self._discovered_movies_queue.put(movie)
-
-            # To help out with startup, push the movies with local trailers
-            # first
-
-            for movie in movies_with_local_trailers:
-                self._previously_discovered_movies_queue.put(movie)
-            for movie in movies_with_remote_trailers:
-                self._previously_discovered_movies_queue.put(movie)
+                self._discovered_movies_queue.rewind()
+                self._previously_discovered_movies_queue.rewind()
 
             # See comment in get_candidate_movie
             self._fetch_count = 0
@@ -782,14 +1189,8 @@ class AbstractMovieData:
 
         :return:
         """
-        number_of_trailers: int = 0
         with self._discovered_movies_lock:
-            movie: BaseMovie
-            for movie in self._discovered_movies.get_movies():
-                if movie.get_has_trailer():
-                    number_of_trailers += 1
-
-        return number_of_trailers
+            return self._discovered_movies.count(MovieList.HAS_TRAILER)
 
     def get_playable_trailer_immediately(self) -> AbstractMovie:
         """
@@ -831,11 +1232,7 @@ class AbstractMovieData:
         clz = type(self)
 
         with self._discovered_movies_lock:
-            movie: BaseMovie
-            for movie in self._discovered_movies.get_movies():
-                if movie.has_local_trailer():
-                    return True
-        return False
+            return self._discovered_movies.count(MovieList.HAS_LOCAL_TRAILER) > 0
 
     def get_projected_number_of_trailers(self) -> int:
         """
@@ -892,21 +1289,16 @@ class AbstractMovieData:
         with self._discovered_movies_lock:
             # clz.logger.debug('Have discovered_movies_lock')
 
-            base_movie: BaseMovie = None
-            try:
-                source = movie.get_source()
-                movie_id = movie.get_id()
-                if clz.logger.isEnabledFor(LazyLogger.DEBUG):
-                    clz.logger.debug(f'Removing {source} {movie_id}')
-                base_movie = self._discovered_movies.get_by_id(source, movie_id)
-            except ValueError:  # Already deleted
-                if clz.logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
-                    clz.logger.debug_verbose(
-                        f'Movie appears to already be removed: {movie}')
+            if clz.logger.isEnabledFor(LazyLogger.DEBUG):
+                clz.logger.debug(f'Removing {movie.get_source()} {movie.get_id()}')
 
-            if base_movie is not None:
+            # Removed by id, a spilled movie need not be paged in
+
+            if movie in self._discovered_movies:
+                self._discovered_movies_queue.remove(movie)
+                self._previously_discovered_movies_queue.remove(movie)
                 try:
-                    self._discovered_movies.remove(base_movie)
+                    self._discovered_movies.remove(movie)
                     self._removed_trailers += 1
                     if clz.logger.isEnabledFor(LazyLogger.DISABLED):
                         clz.logger.debug(f' : {movie} '
@@ -916,16 +1308,6 @@ class AbstractMovieData:
                     # Already deleted
                     pass
 
-                if clz.logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
-                    try:
-                        key = self._discovered_movies_queue.get_key(base_movie)
-                        if key in self._discovered_movies_queue.duplicate_check:
-                            clz.logger.debug_extra_verbose(
-                                f'Deleted movie still in fetch queue. Movie: '
-                                f'{base_movie}')
-                    except ValueError:  # Already deleted
-                        pass
-
     def load_fetch_queue(self) -> None:
         """
             Load the _movies_to_fetch_queue from either _discovered_movies_queue
@@ -1283,12 +1665,14 @@ class AbstractMovieData:
                                          f'prev_discovered movie: {movie} '
                                          f'{movie.get_id}')
                     self._fetch_count += 1
+                    self._reclassify(movie, self._previously_discovered_movies_queue)
                 else:
                     movie = self._discovered_movies_queue.get(timeout=0.25)
                     if clz.logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
                         clz.logger.debug(f'fetch_count: {self._fetch_count} '
                                          f'discovered movie: {movie}')
                     self._fetch_count += 1
+                    self._reclassify(movie, self._discovered_movies_queue)
 
             # if clz.logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
             #     clz.logger.debug_extra_verbose(f'Got {movieget_title()} '
@@ -1298,6 +1682,26 @@ class AbstractMovieData:
 
         return movie
 
+    def _reclassify(self, movie: BaseMovie, drawn_from: ShuffleBag) -> None:
+        """
+        Discovery may have learned whether a movie has a trailer since it
+        was put in a shuffle bag. Move a just drawn movie to the bag where
+        it now belongs, keeping it marked as drawn for this round.
+
+        :param movie:
+        :param drawn_from:
+        :return:
+        """
+        shuffle_bag: ShuffleBag = self._get_shuffle_bag(movie)
+        if shuffle_bag is drawn_from:
+            return
+
+        drawn_from.remove(movie)
+        try:
+            shuffle_bag.put(movie, drawn=True)
+        except DuplicateException:
+            pass
+
     def get_from_fetch_queue(self, player_starving: bool = False) -> BaseMovie:
         """
 
@@ -1352,23 +1756,26 @@ class AbstractMovieData:
                 with self._discovered_movies_lock:
                     # clz.logger.debug('Have discovered_movies_lock')
 
-                    starvation_list: List[BaseMovie] = []
-                    for movie in self._discovered_movies.get_movies():
-                        if ((movie.get_discovery_state() >=
-                             MovieField.DISCOVERY_READY_TO_DISPLAY)
-                                or movie.is_been_fully_discovered()
-                                or movie.has_local_trailer()):
-                            starvation_list.append(movie)
+                    # Spilled movies are queued by code and paged in
+                    # when drawn
+
+                    starvation_list: List[Union[BaseMovie, int]]
+                    starvation_list = self._discovered_movies.get_candidates(
+                        MovieList.STARVATION_CANDIDATE)
                     DiskUtils.RandomGenerator.shuffle(starvation_list)
-                    for movie in starvation_list:
+                    for candidate in starvation_list:
                         # Should not block, but if it does, KodiQueue.Full exception
                         # will be thrown so we will know about it and not
                         # hang.
-                        self._starvation_queue.put(movie, timeout=0.25)
+                        self._starvation_queue.put(candidate, timeout=0.25)
 
             movie = None
-            if not self._starvation_queue.empty():
-                movie = self._starvation_queue.get()
+            while movie is None and not self._starvation_queue.empty():
+                candidate: Union[BaseMovie, int] = self._starvation_queue.get()
+                if isinstance(candidate, int):
+                    movie = self._resolve(candidate)
+                else:
+                    movie = candidate
 
         except AbortException:
             reraise(*sys.exc_info())
@@ -1418,6 +1825,7 @@ class AbstractMovieData:
         # (well, they do come from the library database or TMDb or from
         # the local cache, but as far as this application, the primary data
         # structure is _discovered_movies).
+        self._discovered_movies.clear()  # Releases memory budget and spill file
         self._discovered_movies = MovieList(self._movie_source)
 
         # _discovered_movies_queue is filled up with movies (not copies of the
@@ -1429,6 +1837,7 @@ class AbstractMovieData:
         # empty, or some other condition causes it to be refilled.
 
         self._discovered_movies_queue.clear()
+        self._previously_discovered_movies_queue.clear()
         self._movies_to_fetch_queue.clear()
         self._starvation_queue.clear()
         # self._movies_to_fetch_queueLock
@@ -1446,10 +1855,3 @@ class AbstractMovieData:
         :return:
         """
         PlayStatistics.increase_play_count(movie)
-
-    def get_minimum_shuffle_seconds(self) -> int:
-        seconds: int = self._minimum_shuffle_seconds
-        if self._minimum_shuffle_seconds < 60:
-            self._minimum_shuffle_seconds += self._minimum_shuffle_seconds
-
-        return seconds
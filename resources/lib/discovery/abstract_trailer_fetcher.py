@@ -10,6 +10,7 @@ import datetime
 import glob
 import os
 import sys
+import time
 
 from backend import ffmpeg_normalize
 from backend.movie_entry_utils import MovieEntryUtils
@@ -17,6 +18,8 @@ from backend.tmdb_utils import TMDBUtils
 from backend.video_downloader import VideoDownloader
 from cache.cache import Cache
 from cache.library_trailer_index import LibraryTrailerIndex
+from cache.movie_catalog import MovieCatalog
+from cache.play_history import PlayHistory
 from cache.tfh_cache import TFHCache
 from cache.tmdb_cache_index import CacheIndex
 from cache.tmdb_trailer_index import TMDbTrailerIndex
@@ -29,6 +32,7 @@ from common.garbage_collector import GarbageCollector
 from common.imports import *
 from common.logger import Trace, LazyLogger
 from common.monitor import Monitor
+from diagnostics.spans import Spans
 from common.movie import (BaseMovie, AbstractMovieId, AbstractMovie, FolderMovie,
                           ITunesMovie, LibraryMovie, TFHMovie, TMDbMovie, TMDbMovieId)
 from common.movie_constants import MovieField
@@ -41,6 +45,7 @@ from discovery.playable_trailers_container_interface import \
 from discovery.restart_discovery_exception import StopDiscoveryException
 from discovery.tmdb_movie_downloader import TMDbMovieDownloader
 from discovery.trailer_fetcher_interface import TrailerFetcherInterface
+from discovery.trailer_warm_pool import TrailerWarmPool
 from discovery.utils.tmdb_filter import TMDbFilter
 
 module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
@@ -166,6 +171,7 @@ class AbstractTrailerFetcher(TrailerFetcherInterface):
                                           f'id: {trailer_fetcher.ident}')
 
         TrailerUnavailableCache.save_cache(ignore_shutdown=True)
+        PlayHistory.save_cache(flush=True, ignore_shutdown=True)
         del self._child_trailer_fetchers[:]
         self._movie_data = None
 
@@ -176,6 +182,7 @@ class AbstractTrailerFetcher(TrailerFetcherInterface):
         """
         try:
             TrailerUnavailableCache.save_cache(ignore_shutdown=True)
+            PlayHistory.save_cache(flush=True, ignore_shutdown=True)
             self._playable_trailers.clear()
         except Exception as e:
             pass  # plugin shutting down, who cares.
@@ -184,8 +191,8 @@ class AbstractTrailerFetcher(TrailerFetcherInterface):
         """
             Thread which processes movies from the discovery queue and puts
             successfully processed movies into the playable_trailers_queue.
-            Activity is blocked when the playable_trailers_queue is full
-            (holds 3 movies).
+            Activity is blocked while the playable_trailers_queue holds as
+            many movies as TrailerWarmPool wants ready.
         :return:
         """
         clz = type(self)
@@ -226,6 +233,10 @@ class AbstractTrailerFetcher(TrailerFetcherInterface):
         self.throw_exception_on_forced_to_stop(timeout=1.0)
         self._movie_data.shuffle_discovered_movies(mark_unplayed=False)
 
+        # Time spent fetching since a trailer was last made ready to play
+
+        source: str = self._movie_data.get_movie_source()
+        preparation_seconds: float = 0.0
         while True:
             try:
                 self.throw_exception_on_forced_to_stop()
@@ -237,16 +248,30 @@ class AbstractTrailerFetcher(TrailerFetcherInterface):
                                           'due to no movies after discovery complete.')
                     break
 
+                # Keep only as many trailers ready to play as TrailerWarmPool
+                # wants
+
+                while not TrailerWarmPool.is_room(
+                        source, self._playable_trailers.get_number_of_playable_movies()):
+                    self.throw_exception_on_forced_to_stop(timeout=0.5)
+
                 player_starving = self._playable_trailers.is_starving()
                 movie: BaseMovie = self._movie_data.get_from_fetch_queue(
                     player_starving)
+                added: int = self._playable_trailers.get_number_of_added_trailers()
+                start: float = time.perf_counter()
                 self.fetch_trailer_to_play(movie)
+                preparation_seconds += time.perf_counter() - start
+                if self._playable_trailers.get_number_of_added_trailers() > added:
+                    TrailerWarmPool.record_preparation(source, preparation_seconds)
+                    preparation_seconds = 0.0
             except (AbortException, StopDiscoveryException) as e:
                 reraise(*sys.exc_info())
             except Exception as e:
                 clz._logger.exception('')
         return
 
+    @Spans.timed('discovery.fetch_trailer_to_play')
     def fetch_trailer_to_play(self,
                               base_movie: BaseMovie
                               ) -> None:
@@ -606,8 +631,11 @@ class AbstractTrailerFetcher(TrailerFetcherInterface):
                         tmdb_id: Union[
                             int, str, None]
 
-                        tmdb_id = TMDBUtils.get_tmdb_id_from_title_year(
-                            movie.get_title(), year, runtime_seconds=movie.get_runtime())
+                        tmdb_id = self.find_tmdb_id_in_catalog(movie, year)
+                        if tmdb_id is None:
+                            tmdb_id = TMDBUtils.get_tmdb_id_from_title_year(
+                                movie.get_title(), year,
+                                runtime_seconds=movie.get_runtime())
 
                         if tmdb_id is None:
                             if clz._logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
@@ -787,6 +815,28 @@ class AbstractTrailerFetcher(TrailerFetcherInterface):
 
         return keep_new_trailer
 
+    def find_tmdb_id_in_catalog(self, movie: AbstractMovie,
+                                year: Union[int, str, None]) -> Optional[int]:
+        """
+        Looks for a movie from another source with the same youtube trailer,
+        or title and year, before asking TMDb. Without a year the title is
+        only trusted when the runtime agrees.
+
+        :param movie: iTunes or TFH movie
+        :param year: None for TFH movies, whose year is unreliable
+        :return: TMDb id, or None if no other source knows the movie
+        """
+        clz = type(self)
+        tmdb_id: Optional[int] = MovieCatalog.find_tmdb_id(
+            title=movie.get_title(), year=year,
+            youtube_id=MovieCatalog.get_youtube_id(movie.get_trailer_path()),
+            runtime_seconds=movie.get_runtime())
+        if tmdb_id is not None and clz._logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
+            clz._logger.debug_verbose(f'Found tmdb_id: {tmdb_id} in catalog for '
+                                      f'{movie.get_source()} movie: '
+                                      f'{movie.get_title()}')
+        return tmdb_id
+
     def find_and_update_tmdb_id(self, movie: AbstractMovie) -> Union[int, None]:
         clz = type(self)
         tmdb_id: Optional[int] = MovieEntryUtils.get_tmdb_id(movie)
@@ -801,9 +851,11 @@ class AbstractTrailerFetcher(TrailerFetcherInterface):
             else:
                 year = movie.get_year()
             try:
-                tmdb_id = TMDBUtils.get_tmdb_id_from_title_year(
-                    movie.get_title(), year,
-                    runtime_seconds=movie.get_runtime())
+                tmdb_id = self.find_tmdb_id_in_catalog(movie, year)
+                if tmdb_id is None:
+                    tmdb_id = TMDBUtils.get_tmdb_id_from_title_year(
+                        movie.get_title(), year,
+                        runtime_seconds=movie.get_runtime())
                 if tmdb_id is None:
                     movie.set_tmdb_id_findable(False)
                     if isinstance(movie, TFHMovie):
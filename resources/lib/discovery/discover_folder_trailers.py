@@ -7,7 +7,6 @@ Created on Apr 14, 2019
 
 import datetime
 import os
-import requests
 import sys
 
 import xbmcvfs
@@ -128,6 +127,8 @@ class DiscoverFolderTrailers(BaseDiscoverMovies):
             folders: List[str] = []
             if str(path).startswith('multipath://'):
                 # get all paths from the multipath
+                import requests
+
                 paths: List[str] = path[12:-1].split('/')
                 for item in paths:
                     folders.append(requests.utils.unquote_unreserved(item))
@@ -9,10 +9,13 @@ import datetime
 import simplejson as json
 import re
 import sys
+import threading
+import time
 
 # from cache.itunes_cache_index import ItunesCacheIndex
 from backend.backend_constants import APPLE_URL_PREFIX
 from cache.base_cache import BaseCache
+from cache.itunes_detail_cache import ITunesDetailCache
 from backend.backend_constants import iTunes
 from common.disk_utils import DiskUtils
 from common.debug_utils import Debug
@@ -20,15 +23,18 @@ from common.exceptions import AbortException, reraise
 from common.imports import *
 from common.monitor import Monitor
 from common.movie import ITunesMovie, RawMovie
-from common.movie_constants import MovieField
+from common.movie_constants import MovieField, MovieType
 from common.logger import LazyLogger, Trace
 from common.settings import Settings
 from common.utils import Utils
+from diagnostics.spans import Spans
+from diagnostics.statistics import Statistics
 from discovery.utils.itunes_filter import ITunesFilter
 
 from discovery.restart_discovery_exception import StopDiscoveryException
 from backend.genreutils import GenreUtils
 from backend.json_utils_basic import JsonUtilsBasic, JsonReturnCode, Result
+from backend.trailer_format_policy import TrailerFormatPolicy
 from backend.video_downloader import VideoDownloader
 
 from discovery.base_discover_movies import BaseDiscoverMovies
@@ -47,6 +53,11 @@ class DiscoverItunesMovies(BaseDiscoverMovies):
     """
     logger: ClassVar[LazyLogger] = None
 
+    # Feature pages are fetched by this many threads at once. Requests to
+    # iTunes are still spaced apart (VideoDownloader.delay_between_transactions)
+
+    DETAIL_FETCH_THREADS: Final[int] = 4
+
     def __init__(self) -> None:
         """
 
@@ -67,6 +78,9 @@ class DiscoverItunesMovies(BaseDiscoverMovies):
         # Early checking of for duplicates before we query external databases
         self._duplicate_check: Set = set()
 
+        # Set when a fetch thread must stop discovery (abort, etc.)
+        self._fetch_exc_info: Optional[Tuple] = None
+
     def discover_basic_information(self) -> None:
         """
 
@@ -262,6 +276,7 @@ class DiscoverItunesMovies(BaseDiscoverMovies):
         """
         clz = type(self)
         Monitor.throw_exception_if_abort_requested()
+        start: float = time.perf_counter()
 
         self._selected_genre_ids: List[str] = []
         self._excluded_genre_ids: List[str] = []
@@ -373,6 +388,10 @@ class DiscoverItunesMovies(BaseDiscoverMovies):
         #   clz.logger.debug('Itunes parsed_content type:',
         #                type(parsed_content).__name__)
 
+        # Movies to look for trailers on their feature pages:
+        # (movie, feature_url, release_date, fingerprint of feed entry)
+
+        features: List[Tuple[ITunesMovie, str, datetime.date, str]] = []
         itunes_movie: Dict[str, Any]
         for itunes_movie in parsed_content:
             try:
@@ -381,11 +400,13 @@ class DiscoverItunesMovies(BaseDiscoverMovies):
                 movie_id: str = itunes_parser.parse_itunes_id()
                 title: str = itunes_parser.parse_title()
 
+                '''
                 raw_movie = RawMovie(movie_info=itunes_movie,
                                      source=MovieField.ITUNES_SOURCE)
                 raw_movie.set_id(movie_id)
                 raw_movie.set_property(MovieField.TITLE, title)
                 BaseCache.write_cache_json(raw_movie)
+                '''
 
                 release_date: datetime.date = itunes_parser.parse_release_date()
                 year: int = itunes_parser.parse_year()
@@ -423,33 +444,159 @@ class DiscoverItunesMovies(BaseDiscoverMovies):
                 #  data and opportunities to filter
 
                 feature_url = f'{iTunes.TRAILER_BASE_URL}{location}'
-                Monitor.throw_exception_if_abort_requested()
-                rc: int
-                movie: ITunesMovie
-
-                # See if we can download the trailer
-
-                rc = self.get_detailed_trailer_information(feature_url,
-                                                           movie=movie,
-                                                           release_date=release_date)
-
-                if rc == 0 and movie is not None:
-                    if clz.logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
-                        Debug.validate_basic_movie_properties(
-                            movie)
-                    self.add_to_discovered_movies(movie)
-                    # ItunesCacheIndex.cache_movie(movie)
+                features.append((movie, feature_url, release_date,
+                                 ITunesDetailCache.get_fingerprint(itunes_movie)))
 
             except AbortException:
                 reraise(*sys.exc_info())
             except Exception as e:
                 clz.logger.exception('')
+
+        fetches: int = self.discover_features(features)
+        ITunesDetailCache.flush()
+
+        elapsed: float = time.perf_counter() - start
+        Spans.record('itunes.discover_feed', elapsed)
+        Statistics.add_itunes_discovery(elapsed, len(parsed_content), fetches)
+        if clz.logger.isEnabledFor(LazyLogger.DEBUG):
+            clz.logger.debug(f'Discovered iTunes feed: {len(parsed_content)} '
+                             f'entries {len(features)} features '
+                             f'{fetches} fetched {elapsed:.1f} seconds')
         return
 
+    def discover_features(self,
+                          features: List[Tuple[ITunesMovie, str,
+                                               datetime.date, str]]) -> int:
+        """
+        Chooses the trailer of each movie from its feature page. Pages
+        whose feed entry is unchanged since they were last fetched come
+        from ITunesDetailCache, the others are fetched by
+        DETAIL_FETCH_THREADS threads.
+
+        :param features: (movie, feature_url, release_date, fingerprint of
+                         the movie's feed entry)
+        :return: Number of feature pages fetched
+        """
+        clz = type(self)
+        unfetched: List[Tuple[ITunesMovie, str, datetime.date, str]] = []
+        for feature in features:
+            movie, feature_url, release_date, fingerprint = feature
+            downloadable_trailers: Optional[List[MovieType]]
+            downloadable_trailers = ITunesDetailCache.get_trailers(feature_url,
+                                                                   fingerprint)
+            if downloadable_trailers is None:
+                unfetched.append(feature)
+            else:
+                self.discover_feature(movie, feature_url, release_date,
+                                      downloadable_trailers)
+
+        if len(unfetched) == 0:
+            return 0
+
+        self._fetch_exc_info = None
+        remaining: Iterator[Tuple[ITunesMovie, str, datetime.date, str]]
+        remaining = iter(unfetched)
+        remaining_lock: threading.Lock = threading.Lock()
+        fetch_threads: List[threading.Thread] = []
+        for thread_number in range(min(clz.DETAIL_FETCH_THREADS,
+                                       len(unfetched))):
+            fetch_thread = threading.Thread(target=self.fetch_features,
+                                            args=(remaining, remaining_lock),
+                                            name=f'iTunes details {thread_number}',
+                                            daemon=True)
+            fetch_thread.start()
+            fetch_threads.append(fetch_thread)
+
+        for fetch_thread in fetch_threads:
+            fetch_thread.join()
+
+        if self._fetch_exc_info is not None:
+            reraise(*self._fetch_exc_info)
+        return len(unfetched)
+
+    def fetch_features(self,
+                       remaining: Iterator[Tuple[ITunesMovie, str,
+                                                 datetime.date, str]],
+                       remaining_lock: threading.Lock) -> None:
+        """
+        Fetch thread of discover_features. Fetches the feature pages from
+        remaining until none are left.
+
+        :param remaining: Shared by the fetch threads
+        :param remaining_lock: Guards remaining
+        :return:
+        """
+        clz = type(self)
+        try:
+            while True:
+                with remaining_lock:
+                    if self._fetch_exc_info is not None:
+                        return
+                    feature = next(remaining, None)
+                if feature is None:
+                    return
+
+                movie, feature_url, release_date, fingerprint = feature
+                try:
+                    rc: int
+                    downloadable_trailers: List[MovieType]
+                    rc, downloadable_trailers = self.fetch_downloadable_trailers(
+                        feature_url)
+                    if rc == 0:
+                        ITunesDetailCache.add_trailers(feature_url, fingerprint,
+                                                       downloadable_trailers)
+                    self.discover_feature(movie, feature_url, release_date,
+                                          downloadable_trailers)
+                except (AbortException, StopDiscoveryException):
+                    reraise(*sys.exc_info())
+                except Exception:
+                    clz.logger.exception(f'feature_url: {feature_url}')
+        except (AbortException, StopDiscoveryException):
+            with remaining_lock:
+                self._fetch_exc_info = sys.exc_info()
+
+    def discover_feature(self, movie: ITunesMovie, feature_url: str,
+                         release_date: datetime.date,
+                         downloadable_trailers: List[MovieType]) -> None:
+        """
+        Adds the movie to the discovered movies, if its feature page has an
+        acceptable trailer
+
+        :param movie:
+        :param feature_url:
+        :param release_date:
+        :param downloadable_trailers: Trailers on the feature page
+        :return:
+        """
+        clz = type(self)
+        rc: int = self.get_detailed_trailer_information(
+            feature_url, movie=movie, release_date=release_date,
+            downloadable_trailers=downloadable_trailers)
+
+        if rc == 0 and movie is not None:
+            if clz.logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
+                Debug.validate_basic_movie_properties(movie)
+            self.add_to_discovered_movies(movie)
+            # ItunesCacheIndex.cache_movie(movie)
+
+    def fetch_downloadable_trailers(self, feature_url: str
+                                    ) -> Tuple[int, List[MovieType]]:
+        """
+        :param feature_url:
+        :return: rc of VideoDownloader.get_info and the trailers on the
+                 feature page
+        """
+        Monitor.throw_exception_if_abort_requested()
+        video_downloader = VideoDownloader()
+        return video_downloader.get_info(feature_url, MovieField.ITUNES_SOURCE,
+                                         block=True)
+
     def get_detailed_trailer_information(self,
                                          feature_url: str,
                                          movie: ITunesMovie,
-                                         release_date: datetime.date = None
+                                         release_date: datetime.date = None,
+                                         downloadable_trailers:
+                                         Optional[List[MovieType]] = None
                                          ) -> int:
 
         """ Get additional trailer and movie information by making a second
@@ -459,6 +606,8 @@ class DiscoverItunesMovies(BaseDiscoverMovies):
             :param feature_url:
             :param movie:
             :param release_date:
+            :param downloadable_trailers: Trailers on the feature page, when
+                   already known. Otherwise, the page is fetched
 
         """
 
@@ -468,11 +617,10 @@ class DiscoverItunesMovies(BaseDiscoverMovies):
 
         try:
             Monitor.throw_exception_if_abort_requested()
-            video_downloader = VideoDownloader()
             title: str = movie.get_title()
-            rc: int
-            rc, downloadable_trailers = video_downloader.get_info(
-                feature_url, MovieField.ITUNES_SOURCE, block=True)
+            if downloadable_trailers is None:
+                rc, downloadable_trailers = self.fetch_downloadable_trailers(
+                    feature_url)
 
             '''
             # Have a series of released promotions for a movie.
@@ -680,15 +828,12 @@ class DiscoverItunesMovies(BaseDiscoverMovies):
                     best_promotions.append(promotion)
 
             promotions = best_promotions
-            best_promotions = []
-            # Get best resolution
-            best_height = 0
-            for promotion in promotions:
-                if promotion['height'] > best_height:
-                    best_height = promotion['height']
-                    del best_promotions[:]
-                if promotion['height'] == best_height:
-                    best_promotions.append(promotion)
+            # Get the resolution TrailerFormatPolicy prefers
+
+            chosen_height: int = TrailerFormatPolicy.select_height(
+                promotion['height'] for promotion in promotions)
+            best_promotions = [promotion for promotion in promotions
+                               if promotion['height'] == chosen_height]
 
             if len(best_promotions) > 0:
                 chosen_promotion = best_promotions[0]
@@ -73,7 +73,7 @@ class DiscoverLibraryMovies(BaseDiscoverMovies):
             kwargs = {}
         kwargs[MovieField.SOURCE] = MovieField.LIBRARY_SOURCE
         super().__init__(group=None, target=None, thread_name=thread_name,
-                         args=(), kwargs=None)
+                         args=(), kwargs=kwargs)
 
         self._movie_data: LibraryMovieData = None
         if Settings.is_include_library_trailers():
@@ -335,9 +335,11 @@ class DiscoverLibraryMovies(BaseDiscoverMovies):
                 reraise(*sys.exc_info())
             except StopIteration:
                 try:
+                    # Flush whatever is left over from the last, partial batch
+
                     self.add_movies_to_discovery_queues(library_movies, library_url_movies,
                                                         library_no_trailer_movies,
-                                                        batch_size)
+                                                        batch_size=1)
                 except AbortException:
                     reraise(*sys.exc_info())
                 except Exception:
@@ -439,7 +441,7 @@ class DiscoverLibraryURLTrailerMovies(BaseDiscoverMovies):
         kwargs = {}
         kwargs[MovieField.SOURCE] = MovieField.LIBRARY_URL_TRAILER
         super().__init__(group=None, target=None, thread_name=thread_name,
-                         args=(), kwargs=None)
+                         args=(), kwargs=kwargs)
         self._movie_data = LibraryURLMovieData()
 
     @classmethod
@@ -528,7 +530,7 @@ class DiscoverLibraryNoTrailerMovies(BaseDiscoverMovies):
         kwargs = {}
         kwargs[MovieField.SOURCE] = MovieField.LIBRARY_NO_TRAILER
         super().__init__(group=None, target=None, thread_name=thread_name,
-                         args=(), kwargs=None)
+                         args=(), kwargs=kwargs)
         self._movie_data = LibraryNoTrailerMovieData()
 
     @classmethod
@@ -8,6 +8,7 @@ Created on Apr 14, 2019
 import datetime
 import re
 import sys
+import time
 
 from backend.backend_constants import TFHConstants
 from cache.tfh_cache import TFHCache
@@ -21,6 +22,8 @@ from common.monitor import Monitor
 from common.movie import TFHMovie
 from common.movie_constants import MovieField, MovieType
 from common.settings import Settings
+from diagnostics.spans import Spans
+from diagnostics.statistics import Statistics
 
 from discovery.base_discover_movies import BaseDiscoverMovies
 from discovery.restart_discovery_exception import StopDiscoveryException
@@ -38,6 +41,17 @@ class DiscoverTFHMovies(BaseDiscoverMovies):
     """
     FORCE_TFH_REDISCOVERY: Final[bool] = False  # For development use
 
+    # The newest entries of the TFH index are read this often. The entire
+    # index is only read when TFHCache expires
+    # (Settings.get_tfh_cache_expiration_days) or is incomplete.
+
+    INDEX_REFRESH_HOURS: Final[int] = 24
+
+    # Fewer entries than this from a read of the entire index means that
+    # YouTube did not return all of it.
+
+    MINIMUM_INDEX_ENTRIES: Final[int] = 1400
+
     _singleton_instance = None
     logger: LazyLogger = None
 
@@ -55,6 +69,8 @@ class DiscoverTFHMovies(BaseDiscoverMovies):
                          args=(), kwargs=kwargs)
         self._movie_data = TFHMovieData()
         self._unique_trailer_ids = set()
+        self._new_movies: Dict[str, TFHMovie] = {}
+        self._known_movie_reached: bool = False
         self.number_of_trailers_on_site = 0
 
     def discover_basic_information(self) -> None:
@@ -261,14 +277,15 @@ class DiscoverTFHMovies(BaseDiscoverMovies):
         cache_expiration_time = datetime.timedelta(
             float(Settings.get_tfh_cache_expiration_days()))
         cache_expiration_time = datetime.datetime.now() - cache_expiration_time
-        if TFHCache.get_creation_date() > cache_expiration_time:
-            cached_trailers = TFHCache.get_cached_movies()
-            clz.logger.debug(f'Trailers {len(cached_trailers)} '
-                             f'Using tfh cache creation_date:'
-                             f' {TFHCache.get_creation_date():%Y-%m-%d %H:%M} '
-                             f'expiration: {cache_expiration_time:%Y-%m-%d %H:%M}')
-        else:
-            cached_trailers: Dict[str, TFHMovie] = {}
+
+        # Even when expired, what is cached is offered while the index
+        # is read again in the background.
+
+        cached_trailers: Dict[str, TFHMovie] = TFHCache.get_cached_movies()
+        clz.logger.debug(f'Trailers {len(cached_trailers)} '
+                         f'Using tfh cache creation_date:'
+                         f' {TFHCache.get_creation_date():%Y-%m-%d %H:%M} '
+                         f'expiration: {cache_expiration_time:%Y-%m-%d %H:%M}')
 
         max_trailers = Settings.get_max_number_of_tfh_trailers()
         trailer_list = list(cached_trailers.values())
@@ -313,32 +330,107 @@ class DiscoverTFHMovies(BaseDiscoverMovies):
         self.add_to_discovered_movies(trailer_list)
 
         # Entire TFH index is read, so only re-do if the cache was not
-        # completely built, or expired
+        # completely built, or expired. Otherwise, only read what has
+        # been added since the last refresh.
 
         rc: int = 0
         if (TFHCache.get_creation_date() < cache_expiration_time
                 or not TFHCache.is_complete()):
-            clz.logger.debug_verbose(f'Rediscovering TFH Index')
-            video_downloader = VideoDownloader()
-            url = TFHConstants.TFH_TRAILER_PLAYLIST_URL
+            rc = self.rebuild_index()
+        elif (time.time() - TFHCache.get_refresh_time()
+              > clz.INDEX_REFRESH_HOURS * 60 * 60):
+            rc = self.refresh_index()
 
-            # trailer_handler is a callback, so adds entries to the cache
+        clz.logger.debug(f'TFH Discovery Complete rc: {rc}')
 
-            finished = False
-            while not finished:
-                rc = video_downloader.get_tfh_index(
-                    url, self.trailer_handler, block=True)
-                if rc != Constants.HTTP_TOO_MANY_REQUESTS:  # Last entry read failed
-                    complete: bool = False
-                    if len(TFHCache.get_cached_movies()) > 1400:
-                        # Sanity check. Sometimes Youtube gets crankie and doesn't
-                        # return any entries.
-                        complete = True
-
-                    TFHCache.save_cache(flush=True, complete=complete)
-                    finished = True
+    def rebuild_index(self) -> int:
+        """
+        Reads the entire TFH index. Entries not yet in TFHCache are added
+        to it. Once all of the index is read, cached entries no longer in
+        the index are removed.
 
-        clz.logger.debug(f'TFH Discovery Complete rc: {rc}')
+        :return: rc of VideoDownloader.get_tfh_index
+        """
+        clz = type(self)
+        clz.logger.debug_verbose(f'Rediscovering TFH Index')
+        start: float = time.perf_counter()
+        refresh_time: float = time.time()
+        video_downloader = VideoDownloader()
+        url = TFHConstants.TFH_TRAILER_PLAYLIST_URL
+        self._unique_trailer_ids = set()
+        requests: int = 0
+
+        # trailer_handler is a callback, so adds entries to the cache
+
+        rc: int = 0
+        finished = False
+        while not finished:
+            rc = video_downloader.get_tfh_index(
+                url, self.trailer_handler, block=True)
+            requests += video_downloader.get_number_of_index_requests()
+            if rc != Constants.HTTP_TOO_MANY_REQUESTS:  # Last entry read failed
+                complete: bool = False
+                if len(self._unique_trailer_ids) > clz.MINIMUM_INDEX_ENTRIES:
+                    # Sanity check. Sometimes Youtube gets crankie and doesn't
+                    # return any entries.
+                    complete = True
+                    removed: List[str] = [
+                        movie_id for movie_id in TFHCache.get_cached_movies()
+                        if movie_id not in self._unique_trailer_ids]
+                    if len(removed) > 0:
+                        TFHCache.remove_movies(removed)
+                    TFHCache.set_refresh_time(refresh_time)
+
+                TFHCache.save_cache(flush=True, complete=complete)
+                finished = True
+
+        elapsed: float = time.perf_counter() - start
+        Spans.record('tfh.index.rebuild', elapsed)
+        Statistics.add_tfh_index_rebuild(elapsed, requests)
+        clz.logger.debug(f'Read entire TFH index: '
+                         f'{len(self._unique_trailer_ids)} entries '
+                         f'{requests} requests {elapsed:.1f} seconds rc: {rc}')
+        return rc
+
+    def refresh_index(self) -> int:
+        """
+        Reads the TFH index newest first, stopping at the first entry
+        already in TFHCache. The new entries are merged into TFHCache.
+        If no cached entry is reached, then the entire index is read.
+
+        :return: rc of VideoDownloader.get_tfh_index
+        """
+        clz = type(self)
+        start: float = time.perf_counter()
+        refresh_time: float = time.time()
+        video_downloader = VideoDownloader()
+        url = TFHConstants.TFH_TRAILER_PLAYLIST_URL
+        self._new_movies = {}
+        self._known_movie_reached = False
+
+        rc: int = video_downloader.get_tfh_index(
+            url, self.refresh_handler, block=True, incremental=True)
+        requests: int = video_downloader.get_number_of_index_requests()
+        if rc == 0 and self._known_movie_reached:
+            TFHCache.set_refresh_time(refresh_time)
+
+        # Saves the refresh time, even when nothing is new
+
+        TFHCache.add_movies(self._new_movies, flush=True)
+
+        elapsed: float = time.perf_counter() - start
+        Spans.record('tfh.index.refresh', elapsed)
+        Statistics.add_tfh_index_refresh(elapsed, requests,
+                                         len(self._new_movies))
+        clz.logger.debug(f'Refreshed TFH index: {len(self._new_movies)} new '
+                         f'entries {requests} requests {elapsed:.1f} seconds '
+                         f'rc: {rc}')
+
+        if rc == 0 and not self._known_movie_reached:
+            clz.logger.debug(f'No cached entries among the newest '
+                             f'{VideoDownloader.TFH_INCREMENTAL_ENTRIES}')
+            rc = self.rebuild_index()
+        return rc
 
     def fix_title(self, tfh_movie: TFHMovie) -> (str, int):
         clz = type(self)
@@ -476,11 +568,13 @@ class DiscoverTFHMovies(BaseDiscoverMovies):
 
         return movie_title, year
 
-    def trailer_handler(self, tfh_trailer: MovieType) -> None:
+    def trailer_handler(self, tfh_trailers: List[MovieType]) -> bool:
         """
+        Handles entries of the TFH index during rebuild_index. The entries
+        are added to TFHCache and discovered together.
 
-        :param tfh_trailer:
-        :return:
+        :param tfh_trailers:
+        :return: False, every entry of the index is wanted
         """
         clz = DiscoverTFHMovies
 
@@ -488,7 +582,7 @@ class DiscoverTFHMovies(BaseDiscoverMovies):
 
         """
         
-            Handle entry for one movie
+            Each entry is for one movie
             
                    "_type": "url_transparent",
                   "ie_key": "Youtube",
@@ -503,49 +597,99 @@ class DiscoverTFHMovies(BaseDiscoverMovies):
             
         """
 
-        parser = ParseTFH(tfh_trailer, -1)
-        tfh_id: str = parser.parse_id()
+        new_movies: Dict[str, TFHMovie] = {}
+        movies: List[TFHMovie] = []
+        for tfh_trailer in tfh_trailers:
+            parser = ParseTFH(tfh_trailer, -1)
+            tfh_id: str = parser.parse_id()
+            if tfh_id in self._unique_trailer_ids:
+                continue
 
-        if tfh_id not in self._unique_trailer_ids:
             self._unique_trailer_ids.add(tfh_id)
 
-            # The movie's title is embedded within the TFH title
-            # The title will be extracted from it, but save the original
-
-            title: str = parser.parse_title()
-            parser.parse_tfh_title()
-            parser.parse_trailer_type()
-            parser.parse_trailer_path()
-            parser.parse_discovery_state()
-
-            # The following are most likely all junk and set to default
-            # values.
-
-            # Bogus value of unrated. Replace with value from TMDb, if
-            # movie can be found there.
-
-            parser.parse_certification()
-            parser.parse_thumbnail()
-            parser.parse_plot()
-            parser.parse_rating()
-            parser.parse_year()
-            parser.parse_runtime()
-
-            #  TODO: parse fields which optionally come from TMDb discovery
-
-            movie: TFHMovie = parser.get_movie()
-            title, year = self.fix_title(movie)
-            movie.set_title(title)
-            movie.set_year(year)
-
-            # if (Settings.get_max_number_of_tfh_trailers()
-            #        <= len(TFHCache.get_cached_trailers())):
-            #    return True
-            # else:
-            TFHCache.add_movie(movie, flush=False)
-            self.add_to_discovered_movies(movie)
-            self.number_of_trailers_on_site += 1
-            return
+            # Keep what was learned about cached movies (TMDb id, etc.)
+
+            movie: TFHMovie = TFHCache.get_cached_movie(tfh_id)
+            if movie is None:
+                movie = self.parse_trailer(parser)
+                new_movies[movie.get_id()] = movie
+            movies.append(movie)
+
+        if len(new_movies) > 0:
+            TFHCache.add_movies(new_movies, flush=False)
+        if len(movies) > 0:
+            self.add_to_discovered_movies(movies)
+            self.number_of_trailers_on_site += len(movies)
+        return False
+
+    def refresh_handler(self, tfh_trailers: List[MovieType]) -> bool:
+        """
+        Handles entries of the TFH index during refresh_index
+
+        :param tfh_trailers:
+        :return: True when an entry is already cached, since the entries
+                 are newest first, no more are needed
+        """
+        clz = DiscoverTFHMovies
+
+        Monitor.throw_exception_if_abort_requested()
+        movies: List[TFHMovie] = []
+        for tfh_trailer in tfh_trailers:
+            parser = ParseTFH(tfh_trailer, -1)
+            tfh_id: str = parser.parse_id()
+            if TFHCache.get_cached_movie(tfh_id) is not None:
+                self._known_movie_reached = True
+                break
+
+            if tfh_id not in self._unique_trailer_ids:
+                self._unique_trailer_ids.add(tfh_id)
+                movie: TFHMovie = self.parse_trailer(parser)
+                if clz.logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
+                    clz.logger.debug_verbose(f'New TFH entry: {tfh_id} '
+                                             f'{movie.get_title()}')
+                self._new_movies[tfh_id] = movie
+                movies.append(movie)
+
+        if len(movies) > 0:
+            self.add_to_discovered_movies(movies)
+            self.number_of_trailers_on_site += len(movies)
+        return self._known_movie_reached
+
+    def parse_trailer(self, parser: ParseTFH) -> TFHMovie:
+        """
+        :param parser: Parser of a TFH index entry, with the id already parsed
+        :return: TFHMovie for the entry
+        """
+
+        # The movie's title is embedded within the TFH title
+        # The title will be extracted from it, but save the original
+
+        parser.parse_title()
+        parser.parse_tfh_title()
+        parser.parse_trailer_type()
+        parser.parse_trailer_path()
+        parser.parse_discovery_state()
+
+        # The following are most likely all junk and set to default
+        # values.
+
+        # Bogus value of unrated. Replace with value from TMDb, if
+        # movie can be found there.
+
+        parser.parse_certification()
+        parser.parse_thumbnail()
+        parser.parse_plot()
+        parser.parse_rating()
+        parser.parse_year()
+        parser.parse_runtime()
+
+        #  TODO: parse fields which optionally come from TMDb discovery
+
+        movie: TFHMovie = parser.get_movie()
+        title, year = self.fix_title(movie)
+        movie.set_title(title)
+        movie.set_year(year)
+        return movie
 
     def needs_restart(self) -> bool:
         """
@@ -16,6 +16,7 @@ import xbmcvfs
 from backend.backend_constants import TMDbConstants
 from cache.cache import Cache
 from cache.json_cache_helper import JsonCacheHelper
+from cache.movie_catalog import MovieCatalog
 from cache.tmdb_cache_index import (CachedPage, CacheIndex, CacheParameters,
                                     CachedPagesData)
 # from cache.unprocessed_tmdb_page_data import UnprocessedTMDbPages
@@ -144,7 +145,8 @@ class DiscoverTmdbMovies(BaseDiscoverMovies):
 
                         used_memory: int = self._movie_data.get_size_of()
                         used_mb: float = float(used_memory) / 1000000.0
-                        self.logger.debug(f'movie_data size: {used_memory} MB: {used_mb}')
+                        self.logger.debug(f'movie_data size: {used_memory} MB: {used_mb} '
+                                          f'usage: {self._movie_data.get_memory_usage()}')
                 except StopDiscoveryException:
                     if clz.logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
                         clz.logger.debug_verbose('Stopping discovery')
@@ -1911,6 +1913,10 @@ class DiscoverTmdbMovies(BaseDiscoverMovies):
         '''
         clz = type(self)
         movies: List[TMDbMoviePageData] = []
+
+        # Every title on the page, for TMDbTitleResolver
+
+        titles: List[Tuple[int, str, Optional[int], None]] = []
         try:
             page: int = page_data.get('page', 1)
             total_pages: int = page_data.get('total_pages', -1)
@@ -1949,6 +1955,8 @@ class DiscoverTmdbMovies(BaseDiscoverMovies):
                                 'Processing:', movie_title)
 
                         year: int = movie_summary_parser.parse_year()
+                        if movie_entry.get('release_date'):
+                            titles.append((movie_id, movie_title, year, None))
                         popularity: float = movie_summary_parser.parse_popularity()
                         original_title = movie_summary_parser.parse_original_title()
                         #  backdrop_path = movie_entry.get('backdrop_path', '')
@@ -1973,6 +1981,8 @@ class DiscoverTmdbMovies(BaseDiscoverMovies):
                     except Exception as e:
                         clz.logger.exception()
 
+                MovieCatalog.add_tmdb_titles(titles)
+
         except (AbortException, StopDiscoveryException):
             reraise(*sys.exc_info())
         except Exception as e:
@@ -20,6 +20,7 @@ from common.logger import Trace, LazyLogger
 from common.movie import AbstractMovie
 from common.movie_constants import MovieField
 
+from diagnostics.spans import Spans
 from diagnostics.statistics import Statistics
 from diagnostics.play_stats import PlayStatistics
 
@@ -80,6 +81,7 @@ class PlayableTrailerService:
         """
         return self
 
+    @Spans.timed('service.next')
     def next(self) -> AbstractMovie:
         """
 
@@ -11,6 +11,7 @@ import threading
 import queue
 
 from cache.library_trailer_index import LibraryTrailerIndex
+from cache.play_history import PlayHistory
 from cache.tmdb_trailer_index import TMDbTrailerIndex
 from cache.trailer_cache import TrailerCache
 from common.constants import Constants
@@ -29,6 +30,7 @@ from discovery.library_movie_data import LibraryMovieData
 from discovery.playable_trailers_container_interface import \
     PlayableTrailersContainerInterface
 from discovery.tmdb_movie_data import TMDbMovieData
+from discovery.trailer_warm_pool import TrailerWarmPool
 from discovery.utils.recently_played_trailers import RecentlyPlayedTrailers
 
 module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
@@ -71,8 +73,11 @@ class PlayableTrailersContainer(PlayableTrailersContainerInterface):
         PlayableTrailersContainer._instances[source] = self
         self._source = source
         self._movie_data: AbstractMovieData = None
+
+        # How many trailers are kept ready is decided by TrailerWarmPool
+
         self._ready_to_play_queue: queue.Queue = queue.Queue(
-                maxsize=PlayableTrailersContainer.READY_TO_PLAY_QUEUE_SIZE)
+                maxsize=TrailerWarmPool.MAXIMUM_SIZE)
         self._number_of_added_trailers: int = 0
         self._starving: bool = False
         self._starve_check_timer: threading.Timer = None
@@ -161,6 +166,7 @@ class PlayableTrailersContainer(PlayableTrailersContainerInterface):
 
                 finished = True
                 self._number_of_added_trailers += 1
+                TrailerWarmPool.record_ready(movie)
             except queue.Full:
                 waited += 1
 
@@ -226,6 +232,8 @@ class PlayableTrailersContainer(PlayableTrailersContainerInterface):
             # self.logger.debug(f'Got movie: {movie.get_title()}')
 
             PlayStatistics.increase_play_count(movie)
+            PlayHistory.record_play(movie)
+            TrailerWarmPool.record_play(movie)
             if self.logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
                 self.logger.exit(f'movie: {movie.get_title()}')
         elif self.is_starving():
@@ -233,7 +241,8 @@ class PlayableTrailersContainer(PlayableTrailersContainerInterface):
             if self.logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
                 self.logger.exit('No movie in queue')
             movie = RecentlyPlayedTrailers.get_recently_played()
-            movie.set_starving(True)
+            if movie is not None:
+                movie.set_starving(True)
         else:
             if self.logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
                 self.logger.exit('No movie in queue. Starving not set')
@@ -354,3 +363,4 @@ class PlayableTrailersContainer(PlayableTrailersContainerInterface):
         self._movie_data = None
         while not self._ready_to_play_queue.empty():
             self._ready_to_play_queue.get_nowait()
+        TrailerWarmPool.clear(self._source)
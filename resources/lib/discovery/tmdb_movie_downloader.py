@@ -23,6 +23,7 @@ from common.logger import LazyLogger
 from cache.cache import Cache
 from cache.tmdb_cache_index import CacheIndex
 from cache.trailer_unavailable_cache import (TrailerUnavailableCache)
+from diagnostics.spans import Spans
 from diagnostics.statistics import Statistics
 from discovery.utils.parse_tmdb import ParseTMDb
 
@@ -37,6 +38,7 @@ class TMDbMovieDownloader:
         cls._logger = module_logger.getChild(cls.__name__)
 
     @classmethod
+    @Spans.timed('tmdb.get_tmdb_movie')
     def get_tmdb_movie(cls,
                        movie: Union[AbstractMovie, AbstractMovieId],
                        ignore_failures: bool = False
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Decides how many ready to play trailers each source's trailer fetcher keeps
+ahead of the player.
+
+The trailer fetchers download (and normalize) a remote trailer as it is
+fetched, so the trailers waiting in a PlayableTrailersContainer are the
+warm pool: they play without waiting on youtube-dl. Keeping a fixed three
+of them is too few when downloads are slow compared to how quickly
+trailers are played, and wastes disk when they are fast.
+
+The size of each source's pool (K) is the number of its trailers played
+while one of its trailers is being prepared, plus one spare:
+
+    K = ceil(preparation latency / interval between plays) + 1
+
+The interval between plays of a source is a moving average. The
+preparation latency is a high percentile of the measured time to make one
+trailer ready (download, normalize, fetch details, including rejected
+movies), so that slow downloads are covered.
+
+Beyond MINIMUM_SIZE, the pool only grows while the downloaded trailers
+waiting in it fit in the warm_pool_size_mb setting. With the
+limited_bandwidth setting, remote trailers are not fetched while a trailer
+is playing, unless the source has nothing ready.
+"""
+import math
+import os
+import sys
+import threading
+import time
+
+import xbmc
+
+from common.exceptions import AbortException
+from common.imports import *
+from common.logger import LazyLogger
+from common.movie import BaseMovie
+from common.movie_constants import MovieField
+from common.settings import Settings
+from diagnostics.spans import Spans
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+
+class TrailerWarmPool:
+    """
+    Process wide. Thread safe.
+    """
+    MINIMUM_SIZE: Final[int] = 2
+
+    # Size used until enough has been measured. Same as the original, fixed,
+    # size of the ready to play queue
+
+    DEFAULT_SIZE: Final[int] = 3
+    MAXIMUM_SIZE: Final[int] = 10
+    MINIMUM_SAMPLES: Final[int] = 3
+    LATENCY_PERCENTILE: Final[float] = 99.0
+
+    # Weight of the newest interval in the moving average of play intervals.
+    # Longer gaps between plays are idle time (screensaver not active, etc.)
+    # and are not counted.
+
+    PLAY_INTERVAL_WEIGHT: Final[float] = 0.25
+    MAXIMUM_PLAY_INTERVAL: Final[float] = 30.0 * 60.0
+    BYTES_PER_MB: Final[int] = 1024 * 1024
+
+    REMOTE_SOURCES: Final[Tuple[str, ...]] = (MovieField.TMDB_SOURCE,
+                                              MovieField.ITUNES_SOURCE,
+                                              MovieField.TFH_SOURCE)
+
+    _logger: LazyLogger = None
+    _lock: threading.RLock = threading.RLock()
+    _player: xbmc.Player = None
+
+    # source -> time of last play, moving average of seconds between plays
+    # and number of intervals averaged
+
+    _last_play: Dict[str, float] = {}
+    _play_interval: Dict[str, float] = {}
+    _play_intervals: Dict[str, int] = {}
+
+    # source -> (movie key -> bytes of its downloaded trailer)
+
+    _pooled: Dict[str, Dict[str, int]] = {}
+    _pooled_bytes: int = 0
+
+    @classmethod
+    def class_init(cls) -> None:
+        if cls._logger is None:
+            cls._logger = module_logger.getChild(cls.__name__)
+
+    @staticmethod
+    def get_key(movie: BaseMovie) -> str:
+        """
+        :param movie:
+        :return: Key unique across all movie sources
+        """
+        return f'{movie.get_source()}_{movie.get_id()}'
+
+    @staticmethod
+    def get_span_name(source: str) -> str:
+        """
+        :param source:
+        :return: Name of the Spans histogram of preparation latencies
+        """
+        return f'warm_pool.prepare.{source}'
+
+    @classmethod
+    def record_preparation(cls, source: str, seconds: float) -> None:
+        """
+        Records the time spent making one trailer of the source ready to
+        play, including time spent on movies rejected along the way.
+
+        :param source:
+        :param seconds:
+        :return:
+        """
+        Spans.record(cls.get_span_name(source), seconds)
+
+    @classmethod
+    def record_ready(cls, movie: BaseMovie) -> None:
+        """
+        Records that the movie was added to its source's pool
+
+        :param movie:
+        :return:
+        """
+        try:
+            path: str = ''
+            if movie.has_normalized_trailer():
+                path = movie.get_normalized_trailer_path()
+            elif movie.has_cached_trailer():
+                path = movie.get_cached_trailer()
+            if path == '' or not os.path.exists(path):
+                return
+
+            size: int = os.path.getsize(path)
+            with cls._lock:
+                pool: Dict[str, int] = cls._pooled.setdefault(movie.get_source(), {})
+                cls._pooled_bytes += size - pool.get(cls.get_key(movie), 0)
+                pool[cls.get_key(movie)] = size
+        except AbortException:
+            reraise(*sys.exc_info())
+        except Exception:
+            cls._logger.exception(f'movie: {movie.get_title()}')
+
+    @classmethod
+    def record_play(cls, movie: BaseMovie, now: float = None) -> None:
+        """
+        Records that the movie was taken from its source's pool to be played
+
+        :param movie:
+        :param now: time.time()
+        :return:
+        """
+        if now is None:
+            now = time.time()
+        source: str = movie.get_source()
+        with cls._lock:
+            pool: Dict[str, int] = cls._pooled.get(source, {})
+            cls._pooled_bytes -= pool.pop(cls.get_key(movie), 0)
+
+            last_play: float = cls._last_play.get(source)
+            cls._last_play[source] = now
+            if last_play is None:
+                return
+
+            interval: float = now - last_play
+            if interval > cls.MAXIMUM_PLAY_INTERVAL:
+                return
+
+            average: float = cls._play_interval.get(source)
+            if average is None:
+                average = interval
+            else:
+                average += cls.PLAY_INTERVAL_WEIGHT * (interval - average)
+            cls._play_interval[source] = average
+            cls._play_intervals[source] = cls._play_intervals.get(source, 0) + 1
+
+    @classmethod
+    def clear(cls, source: str) -> None:
+        """
+        Forgets the movies pooled for the source, after its pool is emptied
+
+        :param source:
+        :return:
+        """
+        with cls._lock:
+            pool: Dict[str, int] = cls._pooled.pop(source, {})
+            cls._pooled_bytes -= sum(pool.values())
+
+    @classmethod
+    def get_target_size(cls, source: str) -> int:
+        """
+        :param source:
+        :return: Number of ready to play trailers to keep for the source
+        """
+        with cls._lock:
+            intervals: int = cls._play_intervals.get(source, 0)
+            play_interval: float = cls._play_interval.get(source, 0.0)
+
+        histogram = Spans.get_histogram(cls.get_span_name(source))
+        if (intervals < cls.MINIMUM_SAMPLES
+                or histogram.get_count() < cls.MINIMUM_SAMPLES
+                or play_interval <= 0.0):
+            return cls.DEFAULT_SIZE
+
+        latency: float = histogram.get_percentile(cls.LATENCY_PERCENTILE) / 1000000.0
+        size: int = math.ceil(latency / play_interval) + 1
+        return min(max(size, cls.MINIMUM_SIZE), cls.MAXIMUM_SIZE)
+
+    @classmethod
+    def get_pooled_bytes(cls) -> int:
+        """
+        :return: Disk used by the downloaded trailers waiting in every pool
+        """
+        return cls._pooled_bytes
+
+    @classmethod
+    def is_room(cls, source: str, ready: int) -> bool:
+        """
+        :param source:
+        :param ready: Number of trailers of the source ready to play
+        :return: True when the source's trailer fetcher should prepare
+                 another trailer now
+        """
+        if ready == 0:
+            return True
+
+        if ready >= cls.get_target_size(source):
+            return False
+
+        if (ready >= cls.MINIMUM_SIZE
+                and cls._pooled_bytes >= Settings.get_warm_pool_size_mb() * cls.BYTES_PER_MB):
+            return False
+
+        if (source in cls.REMOTE_SOURCES and Settings.is_limited_bandwidth()
+                and cls.is_trailer_playing()):
+            return False
+
+        return True
+
+    @classmethod
+    def is_trailer_playing(cls) -> bool:
+        """
+        :return: True when Kodi is playing a video
+        """
+        if cls._player is None:
+            cls._player = xbmc.Player()
+        return cls._player.isPlayingVideo()
+
+    @classmethod
+    def get_report(cls) -> Dict[str, Any]:
+        """
+        :return: Pool size and measurements of every source
+        """
+        with cls._lock:
+            sources: List[str] = list(cls._play_interval.keys())
+            report: Dict[str, Any] = {'pooled_bytes': cls._pooled_bytes}
+            for source, pool in cls._pooled.items():
+                report.setdefault(source, {})['pooled'] = len(pool)
+                if source not in sources:
+                    sources.append(source)
+
+        for source in sources:
+            histogram = Spans.get_histogram(cls.get_span_name(source))
+            entry: Dict[str, Any] = report.setdefault(source, {})
+            entry['target_size'] = cls.get_target_size(source)
+            entry['play_interval'] = cls._play_interval.get(source, 0.0)
+            entry['preparation_seconds'] = (
+                histogram.get_percentile(cls.LATENCY_PERCENTILE) / 1000000.0)
+        return report
+
+
+TrailerWarmPool.class_init()
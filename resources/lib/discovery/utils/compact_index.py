@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+"""
+import hashlib
+from array import array
+
+from common.imports import *
+
+
+class CompactIndex:
+    """
+    Map of 64 bit integer codes to 64 bit integer values, held in two
+    arrays (open addressing, linear probing) instead of a dict. An entry
+    costs 16 bytes per slot, a few dozen bytes with the spare slots, where a
+    dict of str keys and tuple values costs several hundred. Used for the
+    movies which discovery holds only by id, so memory stays bounded as
+    the number of discovered movies grows.
+
+    Movie ids are turned into codes by get_code.
+
+    Not thread safe, callers hold their own lock.
+    """
+    EMPTY: Final[int] = -(1 << 63)
+    DELETED: Final[int] = EMPTY + 1
+    MINIMUM_CAPACITY: Final[int] = 8
+
+    # Fibonacci hashing spreads sequential ids (TMDb, library) evenly
+
+    MULTIPLIER: Final[int] = 0x9E3779B97F4A7C15
+    MASK_64: Final[int] = (1 << 64) - 1
+
+    def __init__(self) -> None:
+        self._codes: array = None
+        self._values: array = None
+        self._shift: int = 0
+        self._size: int = 0
+        self._used: int = 0  # Entries and deleted slots
+        self._allocate(CompactIndex.MINIMUM_CAPACITY)
+
+    @staticmethod
+    def get_code(movie_id: str) -> int:
+        """
+        :param movie_id:
+        :return: A code unique to movie_id (within one movie source). The
+                 id itself when it is a number, as TMDb and library ids
+                 are, so that it can be recovered with get_movie_id.
+                 Otherwise a negative hash of the id.
+        """
+        if (movie_id.isdigit() and len(movie_id) < 19
+                and (movie_id[0] != '0' or movie_id == '0')):
+            return int(movie_id)
+
+        digest: bytes = hashlib.blake2b(movie_id.encode('utf-8'),
+                                        digest_size=8).digest()
+        return -(int.from_bytes(digest, 'big') >> 2) - 1
+
+    @staticmethod
+    def get_movie_id(code: int) -> Optional[str]:
+        """
+        :param code:
+        :return: The movie id which get_code converted to code, None when
+                 the code is a hash
+        """
+        if code < 0:
+            return None
+        return str(code)
+
+    def _allocate(self, capacity: int) -> None:
+        self._codes = array('q', [CompactIndex.EMPTY]) * capacity
+        self._values = array('q', bytes(8 * capacity))
+        self._shift = 64 - (capacity.bit_length() - 1)
+        self._used = self._size
+
+    def _get_slot(self, code: int) -> int:
+        return ((code * CompactIndex.MULTIPLIER) & CompactIndex.MASK_64) >> self._shift
+
+    def _find(self, code: int) -> int:
+        """
+        :param code:
+        :return: The slot holding code, -1 if absent
+        """
+        codes: array = self._codes
+        mask: int = len(codes) - 1
+        slot: int = self._get_slot(code)
+        while True:
+            slot_code: int = codes[slot]
+            if slot_code == code:
+                return slot
+            if slot_code == CompactIndex.EMPTY:
+                return -1
+            slot = (slot + 1) & mask
+
+    def get(self, code: int, default: Optional[int] = None) -> Optional[int]:
+        slot: int = self._find(code)
+        if slot < 0:
+            return default
+        return self._values[slot]
+
+    def put(self, code: int, value: int) -> None:
+        codes: array = self._codes
+        mask: int = len(codes) - 1
+        slot: int = self._get_slot(code)
+        free_slot: int = -1
+        while True:
+            slot_code: int = codes[slot]
+            if slot_code == code:
+                self._values[slot] = value
+                return
+            if slot_code == CompactIndex.EMPTY:
+                break
+            if slot_code == CompactIndex.DELETED and free_slot < 0:
+                free_slot = slot
+            slot = (slot + 1) & mask
+
+        if free_slot < 0:
+            free_slot = slot
+            self._used += 1
+        codes[free_slot] = code
+        self._values[free_slot] = value
+        self._size += 1
+        if self._used * 3 > len(codes) * 2:
+            self._resize()
+
+    def pop(self, code: int, default: Optional[int] = None) -> Optional[int]:
+        slot: int = self._find(code)
+        if slot < 0:
+            return default
+
+        value: int = self._values[slot]
+        self._codes[slot] = CompactIndex.DELETED
+        self._size -= 1
+        if (len(self._codes) > CompactIndex.MINIMUM_CAPACITY
+                and self._size * 8 < len(self._codes)):
+            self._resize()
+        return value
+
+    def _resize(self) -> None:
+        """
+        Rehashes into a table sized for the live entries, dropping deleted
+        slots
+
+        :return:
+        """
+        capacity: int = CompactIndex.MINIMUM_CAPACITY
+        while capacity * 2 < self._size * 3 + 3:
+            capacity *= 2
+        codes: array = self._codes
+        values: array = self._values
+        self._size = 0
+        self._allocate(capacity)
+        for slot, code in enumerate(codes):
+            if code != CompactIndex.EMPTY and code != CompactIndex.DELETED:
+                self.put(code, values[slot])
+
+    def clear(self) -> None:
+        self._size = 0
+        self._allocate(CompactIndex.MINIMUM_CAPACITY)
+
+    def items(self) -> Iterator[Tuple[int, int]]:
+        """
+        :return: The (code, value) of every entry. The index must not be
+                 changed while iterating
+        """
+        values: array = self._values
+        for slot, code in enumerate(self._codes):
+            if code != CompactIndex.EMPTY and code != CompactIndex.DELETED:
+                yield code, values[slot]
+
+    def __contains__(self, code: int) -> bool:
+        return self._find(code) >= 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __sizeof__(self) -> int:
+        return (object.__sizeof__(self) + self._codes.buffer_info()[1] * 8
+                + self._values.buffer_info()[1] * 8)
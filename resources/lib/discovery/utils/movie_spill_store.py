@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+"""
+import io
+import os
+import threading
+
+import simplejson as json
+
+from common.constants import Constants
+from common.disk_utils import DiskUtils
+from common.imports import *
+from common.logger import LazyLogger
+from discovery.utils.compact_index import CompactIndex
+
+module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
+
+
+class MovieSpillStore:
+    """
+    On-disk keyed store for the serialized form of discovered movies which
+    have been evicted from memory (see MovieList).
+
+    The contents are only meaningful for the current session: the file is
+    truncated when the store is created. Records are appended as single
+    lines of json. A CompactIndex maps the code (CompactIndex.get_code) of
+    each movie to the offset and length of its most recent record, along
+    with a few flags describing the movie, so that nothing else about a
+    spilled movie is kept in memory. Replaced and removed records are left
+    in place until they outweigh the live ones, at which time the file is
+    compacted.
+    """
+    MINIMUM_COMPACT_BYTES: Final[int] = 1024 * 1024
+
+    # Index values are offset << OFFSET_SHIFT | length << LENGTH_SHIFT | flags
+
+    FLAG_BITS: Final[int] = 4
+    LENGTH_SHIFT: Final[int] = FLAG_BITS
+    OFFSET_SHIFT: Final[int] = 28
+    MAXIMUM_RECORD_LENGTH: Final[int] = (1 << (OFFSET_SHIFT - LENGTH_SHIFT)) - 1
+
+    _logger: LazyLogger = None
+
+    def __init__(self, movie_source: str) -> None:
+        """
+        :param movie_source:
+        :return:
+        """
+        clz = type(self)
+        if clz._logger is None:
+            clz._logger = module_logger.getChild(clz.__name__)
+
+        self._lock: Final[threading.RLock] = threading.RLock()
+        self._movie_source: Final[str] = movie_source
+        self._index: CompactIndex = CompactIndex()
+        self._live_bytes: int = 0
+        self._dead_bytes: int = 0
+        self._path: str = os.path.join(Constants.FRONTEND_DATA_PATH, 'spill',
+                                       f'{movie_source}.jsonl')
+        DiskUtils.create_path_if_needed(os.path.dirname(self._path))
+        self._file: io.BufferedRandom = io.open(self._path, mode='w+b')
+
+    def put(self, code: int, data: Dict[str, Any], flags: int = 0) -> bool:
+        """
+        Stores (or replaces) the serialized movie for the given code
+
+        :param code: From CompactIndex.get_code
+        :param data: Serialized movie
+        :param flags: Small integer (FLAG_BITS) describing the movie, see
+                      get_codes
+        :return: False if the record is too large to store
+        """
+        clz = type(self)
+        record: bytes = json.dumps(data, ensure_ascii=False).encode('utf-8') + b'\n'
+        if len(record) > clz.MAXIMUM_RECORD_LENGTH:
+            return False
+
+        with self._lock:
+            self._discard(code)
+            self._file.seek(0, io.SEEK_END)
+            offset: int = self._file.tell()
+            self._file.write(record)
+            self._index.put(code, (offset << clz.OFFSET_SHIFT)
+                            | (len(record) << clz.LENGTH_SHIFT) | flags)
+            self._live_bytes += len(record)
+        return True
+
+    def get(self, code: int) -> Union[Dict[str, Any], None]:
+        """
+        :param code:
+        :return: The serialized movie stored for code, or None
+        """
+        with self._lock:
+            location: int = self._index.get(code)
+            if location is None:
+                return None
+
+            offset, length, _ = self._unpack(location)
+            self._file.seek(offset)
+            record: bytes = self._file.read(length)
+
+        return json.loads(record.decode('utf-8'))
+
+    def get_flags(self, code: int) -> Optional[int]:
+        """
+        :param code:
+        :return: The flags stored with the movie, None when not stored
+        """
+        with self._lock:
+            location: int = self._index.get(code)
+            if location is None:
+                return None
+            return self._unpack(location)[2]
+
+    def get_codes(self, flags: int = 0) -> List[int]:
+        """
+        :param flags: Only movies stored with at least one of these flags,
+                      0 for all
+        :return: Codes of the stored movies
+        """
+        mask: int = (1 << MovieSpillStore.FLAG_BITS) - 1
+        with self._lock:
+            return [code for code, location in self._index.items()
+                    if flags == 0 or (location & mask & flags) != 0]
+
+    def count(self, flags: int) -> int:
+        """
+        :param flags:
+        :return: Number of movies stored with at least one of the flags
+        """
+        mask: int = (1 << MovieSpillStore.FLAG_BITS) - 1
+        with self._lock:
+            return sum(1 for _, location in self._index.items()
+                       if (location & mask & flags) != 0)
+
+    def remove(self, code: int) -> None:
+        """
+        :param code:
+        :return:
+        """
+        with self._lock:
+            self._discard(code)
+            if (self._dead_bytes > self._live_bytes
+                    and self._dead_bytes > MovieSpillStore.MINIMUM_COMPACT_BYTES):
+                self.compact()
+
+    @staticmethod
+    def _unpack(location: int) -> Tuple[int, int, int]:
+        """
+        :param location: Index value
+        :return: offset, length and flags
+        """
+        clz = MovieSpillStore
+        return (location >> clz.OFFSET_SHIFT,
+                (location >> clz.LENGTH_SHIFT) & clz.MAXIMUM_RECORD_LENGTH,
+                location & ((1 << clz.FLAG_BITS) - 1))
+
+    def _discard(self, code: int) -> None:
+        location: int = self._index.pop(code)
+        if location is not None:
+            length: int = self._unpack(location)[1]
+            self._live_bytes -= length
+            self._dead_bytes += length
+
+    def compact(self) -> None:
+        """
+        Rewrites the file with only the live records
+
+        :return:
+        """
+        clz = type(self)
+        with self._lock:
+            tmp_path: str = self._path + '.tmp'
+            new_index: CompactIndex = CompactIndex()
+            with io.open(tmp_path, mode='wb') as tmp_file:
+                for code, location in self._index.items():
+                    offset, length, flags = self._unpack(location)
+                    self._file.seek(offset)
+                    new_index.put(code, (tmp_file.tell() << clz.OFFSET_SHIFT)
+                                  | (length << clz.LENGTH_SHIFT) | flags)
+                    tmp_file.write(self._file.read(length))
+
+            self._file.close()
+            os.replace(tmp_path, self._path)
+            self._file = io.open(self._path, mode='r+b')
+            self._index = new_index
+            self._dead_bytes = 0
+            if clz._logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
+                clz._logger.debug_verbose(f'source: {self._movie_source} '
+                                          f'movies: {len(self._index)} '
+                                          f'bytes: {self._live_bytes}')
+
+    def clear(self) -> None:
+        """
+        Discards every record
+
+        :return:
+        """
+        with self._lock:
+            self._index.clear()
+            self._live_bytes = 0
+            self._dead_bytes = 0
+            self._file.seek(0)
+            self._file.truncate()
+
+    def close(self) -> None:
+        """
+        Discards every record and removes the file
+
+        :return:
+        """
+        with self._lock:
+            self._index.clear()
+            self._live_bytes = 0
+            self._dead_bytes = 0
+            try:
+                self._file.close()
+                os.remove(self._path)
+            except OSError:
+                pass
+
+    def __contains__(self, code: int) -> bool:
+        with self._lock:
+            return code in self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index)
+
+    def get_size_on_disk(self) -> int:
+        """
+        :return: Number of bytes used by live records
+        """
+        with self._lock:
+            return self._live_bytes
+
+    def get_index_size(self) -> int:
+        """
+        :return: Bytes of memory used by the index
+        """
+        with self._lock:
+            return self._index.__sizeof__()
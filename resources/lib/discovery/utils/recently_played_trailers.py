@@ -4,33 +4,62 @@ Created on 6/2/21
 
 @author: Frank Feuerbacher
 """
+from collections import deque
+from pathlib import Path
+from typing import Deque
+
+import io
+import os
 import random
+import sys
 import threading
 
+import simplejson as json
+from simplejson import JSONDecodeError
+
+import xbmcvfs
+
+from common.disk_utils import DiskUtils
+from common.exceptions import AbortException
 from common.imports import *
 from common.logger import LazyLogger
-from common.movie import AbstractMovie
+from common.movie import AbstractMovie, RawMovie
+from common.settings import Settings
 
 
 module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
 
 
 class RecentTrailerHistory:
-
+    """
+    The last few trailers handed to the front end, replayed when discovery
+    can not keep up.
+
+    The trailers are persisted to <remote_db_cache>/index/recent_trailers.json
+    on every change (there are only MAXIMUM_HISTORY of them, changing once
+    per play), so that something can be played while discovery restarts
+    after Kodi does. Only trailers which are still playable, a url or an
+    existing file, are read back.
+    """
     MAXIMUM_HISTORY: Final[int] = 20
 
     logger: LazyLogger = None
 
-    _trailer_history: Final[List[AbstractMovie]] = []
+    _trailer_history: Final[Deque[AbstractMovie]] = deque(maxlen=MAXIMUM_HISTORY)
     _lock: Final[threading.RLock] = threading.RLock()
+    _cache_loaded: bool = False
+    _cache_path: Path = None
 
     @classmethod
     def __class_init__(cls) -> None:
         cls.logger = module_logger.getChild(f'{cls.__name__}')
+        cls._cache_path = Path(os.path.join(Settings.get_remote_db_cache_path(),
+                                            'index', 'recent_trailers.json'))
 
     @classmethod
     def get_trailer(cls) -> AbstractMovie:
         with cls._lock:
+            cls.load_cache_if_needed()
             if len(cls._trailer_history) == 0:
                 return None
 
@@ -43,18 +72,98 @@ class RecentTrailerHistory:
     @classmethod
     def add_trailer(cls, movie: AbstractMovie) -> None:
         with cls._lock:
+            cls.load_cache_if_needed()
+
+            # The deque's maxlen drops the oldest trailer
+
             cls._trailer_history.append(movie)
             if cls.logger.isEnabledFor(LazyLogger.DISABLED):
                 cls.logger.debug_extra_verbose(f'adding: {movie.get_title()}')
-            if len(cls._trailer_history) > cls.MAXIMUM_HISTORY:
-                del cls._trailer_history[0]
-                if cls.logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
-                    cls.logger.debug_extra_verbose(f'history[0]:'
-                                                   f'{cls._trailer_history[0].get_title()}')
+            cls.save_cache()
 
     @classmethod
     def get_number_of_trailers(cls) -> int:
-        return len(cls._trailer_history)
+        with cls._lock:
+            cls.load_cache_if_needed()
+            return len(cls._trailer_history)
+
+    @staticmethod
+    def is_playable(movie: AbstractMovie) -> bool:
+        """
+        :param movie:
+        :return: True when the movie's trailer is a url or an existing file
+        """
+        _, _, trailer_path = movie.get_optimal_trailer_path()
+        if trailer_path is None or trailer_path == '':
+            return False
+        if trailer_path.startswith('plugin://') or trailer_path.startswith('http'):
+            return True
+        return os.path.exists(trailer_path)
+
+    @classmethod
+    def load_cache_if_needed(cls) -> None:
+        """
+        Reads the trailers persisted by a previous session, once.
+
+        :return:
+        """
+        with cls._lock:
+            if cls._cache_loaded:
+                return
+
+            cls._cache_loaded = True
+            try:
+                if not os.path.exists(cls._cache_path):
+                    return
+
+                with io.open(cls._cache_path, mode='rt', newline=None,
+                             encoding='utf-8') as cache_file:
+                    entries: List[Dict[str, Any]] = json.load(cache_file,
+                                                              encoding='utf-8')
+                for entry in entries:
+                    movie: AbstractMovie = RawMovie.de_serialize(entry)
+                    if movie is not None and cls.is_playable(movie):
+                        cls._trailer_history.append(movie)
+            except AbortException:
+                reraise(*sys.exc_info())
+            except (JSONDecodeError, ValueError, TypeError):
+                cls.logger.exception(f'Discarding corrupt recent trailers: '
+                                     f'{cls._cache_path}')
+                try:
+                    os.remove(cls._cache_path)
+                except OSError:
+                    pass
+            except Exception:
+                cls.logger.exception()
+
+    @classmethod
+    def save_cache(cls) -> None:
+        """
+        Persists the trailers, oldest first.
+
+        :return:
+        """
+        with cls._lock:
+            try:
+                parent_dir, file_name = os.path.split(cls._cache_path)
+                DiskUtils.create_path_if_needed(parent_dir)
+                tmp_path: Path = Path(str(cls._cache_path) + '.tmp')
+                tmp_path = Path(xbmcvfs.validatePath(tmp_path.as_posix()))
+                entries: List[Dict[str, Any]] = [movie.serialize()
+                                                 for movie in cls._trailer_history]
+                with io.open(tmp_path, mode='wt', newline=None,
+                             encoding='utf-8') as cache_file:
+                    json_text = json.dumps(entries, encoding='utf-8',
+                                           ensure_ascii=False)
+                    cache_file.write(json_text)
+                    cache_file.flush()
+
+                os.replace(tmp_path, cls._cache_path)
+            except AbortException:
+                reraise(*sys.exc_info())
+            except Exception:
+                cls.logger.exception(f'Failed to save recent trailers: '
+                                     f'{cls._cache_path}')
 
 
 class RecentlyPlayedTrailers:
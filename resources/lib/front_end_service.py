@@ -5,6 +5,8 @@ Created on Feb 12, 2019
 
 @author: Frank Feuerbacher
 '''
+from diagnostics.startup_trace import StartupTrace
+StartupTrace.install('frontend')
 
 from common.python_debugger import PythonDebugger
 from common.critical_settings import CriticalSettings
@@ -28,8 +30,6 @@ from common.settings import Settings
 from frontend.front_end_bridge import FrontendBridge
 from common.logger import (LazyLogger, Trace)
 
-from frontend import random_trailers_ui
-
 
 module_logger = LazyLogger.get_addon_module_logger(file_path=__file__)
 
@@ -82,7 +82,8 @@ class MainThreadLoop:
         :return:
         """
 
-        FrontendBridge()  # Initialize
+        with StartupTrace.stage('FrontendBridge'):
+            FrontendBridge()  # Initialize
         if not cls._is_screensaver and Settings.prompt_for_settings():
             cls.configure_settings()
         try:
@@ -141,6 +142,11 @@ class MainThreadLoop:
     @classmethod
     def ui_thread_runner(cls):
         try:
+            # The UI modules are imported here, rather than by this module,
+            # so that the main thread is already polling Kodi while they load
+
+            with StartupTrace.stage('random_trailers_ui.import'):
+                from frontend import random_trailers_ui
             cls._start_ui = random_trailers_ui.StartUI(cls._is_screensaver)
             cls._start_ui.start()
         except AbortException:
@@ -188,11 +194,13 @@ def bootstrap_random_trailers(screensaver: bool) -> None:
     :return:
     """
     try:
-        Monitor.register_settings_changed_listener(
-            Settings.on_settings_changed, 'Settings.on_settings_changed')
+        # Monitor reloads Settings itself before informing listeners
 
         Monitor.register_settings_changed_listener(
-            LazyLogger.on_settings_changed, 'LazyLogger.on_settings_changed')
+            LazyLogger.on_settings_changed, 'LazyLogger.on_settings_changed',
+            settings=Settings.LOGGING_SETTINGS)
+        Monitor.register_abort_listener(LazyLogger.stop_background_writer,
+                                       'LazyLogger.stop_background_writer')
 
         MainThreadLoop.class_init(screensaver)
         MainThreadLoop.startup()
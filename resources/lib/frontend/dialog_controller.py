@@ -20,6 +20,8 @@ from common.logger import LazyLogger, Trace
 from common.messages import Messages
 from common.monitor import Monitor
 from common.settings import Settings
+from diagnostics.spans import Spans
+from diagnostics.startup_trace import StartupTrace
 from frontend.dialog_utils import (MovieDetailsTimer, NotificationTimer,
                                    TrailerStatus, TrailerTimer)
 from frontend.front_end_exceptions import (SkipMovieException, StopPlayingGroup,
@@ -167,6 +169,10 @@ class TaskQueue(deque):
     instance: ForwardRef('TaskQueue') = None
     lock: threading.RLock = threading.RLock()
 
+    # Notified when tasks are added, so TaskLoop does not have to poll
+
+    task_added: threading.Condition = threading.Condition(lock)
+
     @classmethod
     def class_init(cls):
         if cls._logger is None:
@@ -252,6 +258,11 @@ class TaskLoop(threading.Thread):
 
         self._trailer_almost_playing: bool = False
 
+        # When the last trailer finished, or the details display ended.
+        # Used to measure the time until the next trailer plays.
+
+        self._transition_started: float = None
+
     @classmethod
     def start_playing_trailers(cls):
         cls._logger.enter()
@@ -355,6 +366,8 @@ class TaskLoop(threading.Thread):
                     cls._logger.debug_extra_verbose(f'adding task: {task}')
                 TaskQueue.instance.append(task)
 
+            TaskQueue.task_added.notify_all()
+
     def run(self) -> None:
         clz = type(self)
         clz._logger.enter()
@@ -368,7 +381,14 @@ class TaskLoop(threading.Thread):
                     # Shut her down
                     return
 
-                Monitor.throw_exception_if_abort_requested(0.1)
+                # Wait for a task, but no more than a tenth of a second
+                # since the loop also checks for trailers to queue
+
+                Monitor.throw_exception_if_abort_requested()
+                with TaskQueue.lock:
+                    if len(TaskQueue.instance) == 0:
+                        TaskQueue.task_added.wait(timeout=0.1)
+
                 self._dialog_state = DialogState.NORMAL
                 arg = None
                 task:Task = None
@@ -408,7 +428,8 @@ class TaskLoop(threading.Thread):
                     elif task == Task.GET_TRAILER:
                         try:
                             skip_movie = False
-                            self._get_trailer()
+                            with Spans.span('ui.get_trailer'):
+                                self._get_trailer()
                         except (HistoryEmpty, SkipMovieException):
                             skip_movie = True
 
@@ -484,6 +505,7 @@ class TaskLoop(threading.Thread):
                         self._show_details()
 
                     elif task == Task.SHOW_DETAILS_FINISHED:
+                        self._transition_started = time.perf_counter()
                         self.set_trailer_playing(about_to_play=True,
                                                  playing=False)
                         if not self.is_trailer_playing(actively_playing=True):
@@ -761,6 +783,12 @@ class TaskLoop(threading.Thread):
         show_movie_details = (not missing_movie_details and
                               detail_info_display_seconds > 0)
         if show_movie_details:
+            if self._transition_started is not None:
+                if self._future_details_timed:
+                    Spans.record('ui.details_transition',
+                                 time.perf_counter() - self._transition_started)
+                self._transition_started = None
+
             scroll_plot = not self._movie.is_tfh()
             clz._logger.debug_extra_verbose(f'About to show details for:'
                                             f' {self._movie.get_title()}')
@@ -836,7 +864,9 @@ class TaskLoop(threading.Thread):
                                                 trace=Trace.TRACE_UI_CONTROLLER)
 
             is_normalized, is_cached, trailer_path = movie.get_optimal_trailer_path()
+            play_requested: float = time.perf_counter()
             clz.get_player().play_trailer(trailer_path, movie)
+            StartupTrace.finish('first_trailer')
 
             if clz._logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
                 clz._logger.debug_extra_verbose(f'wait for trailer to _start playing: '
@@ -851,6 +881,12 @@ class TaskLoop(threading.Thread):
                     clz._logger.debug_extra_verbose('Timed out Waiting for Player.',
                                                     trace=Trace.TRACE_UI_CONTROLLER)
             else:
+                playing: float = time.perf_counter()
+                Spans.record('ui.play_start', playing - play_requested)
+                if self._transition_started is not None:
+                    Spans.record('ui.trailer_transition',
+                                 playing - self._transition_started)
+                    self._transition_started = None
 
                 # Kick off the timer which will limit how long the trailer plays
 
@@ -860,12 +896,18 @@ class TaskLoop(threading.Thread):
                                          debug_label=self._movie.get_title(),
                                          callback_on_stop=callback)
 
+                # While this trailer plays, get the next one ready (off this
+                # thread: it touches the disk)
+
+                clz._movie_manager.start_preload_next_trailer()
+
                 if clz._logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
                     clz._logger.debug_extra_verbose(f'Waiting for trailer to stop playing')
 
                 # Wait until trailer completes, or is killed by the timer
 
                 clz.get_player().wait_for_is_not_playing_video(path=trailer_path)
+                self._transition_started = time.perf_counter()
                 if clz._logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
                     clz._logger.debug_extra_verbose(f'Finished playing trailer:'
                                                     f' {movie.get_title()}',
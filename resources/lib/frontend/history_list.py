@@ -5,6 +5,9 @@ Created on May 25, 2019
 
 @author: Frank Feuerbacher
 '''
+from collections import deque
+from typing import Deque
+
 import sys
 import random
 
@@ -19,11 +22,18 @@ module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file_
 
 class HistoryList:
     """
+    The trailers played during this session, for moving back and forth
+    among them. Plays across sessions are kept by the back end's
+    PlayHistory.
 
+    _buffer is a bounded deque, so dropping the oldest trailer is O(1).
+    _keys counts the entries of each (title, year) in _buffer, for an O(1)
+    duplicate check.
     """
     MAX_HISTORY: int = 20
     logger: LazyLogger = None
-    _buffer: List[AbstractMovie] = []
+    _buffer: Deque[AbstractMovie] = deque()
+    _keys: Dict[Tuple[str, int], int] = {}
     _cursor: int = -1
     _previous_trailer_was_duplicate: bool = False
     _starving: bool = False
@@ -34,9 +44,33 @@ class HistoryList:
 
         """
         cls.logger = module_logger.getChild(cls.__class__.__name__)
-        cls._buffer: List[AbstractMovie] = []
+        cls._buffer: Deque[AbstractMovie] = deque()
+        cls._keys: Dict[Tuple[str, int], int] = {}
         cls._cursor: int = -1
 
+    @staticmethod
+    def get_key(movie: AbstractMovie) -> Tuple[str, int]:
+        """
+        :param movie:
+        :return: Trailers with the same key are duplicates
+        """
+        return movie.get_title(), movie.get_year()
+
+    @classmethod
+    def _forget(cls, movie: AbstractMovie) -> None:
+        """
+        Updates _keys for a movie removed from _buffer
+
+        :param movie:
+        :return:
+        """
+        key: Tuple[str, int] = cls.get_key(movie)
+        count: int = cls._keys.get(key, 0) - 1
+        if count > 0:
+            cls._keys[key] = count
+        else:
+            cls._keys.pop(key, None)
+
     @classmethod
     def append(cls, movie: AbstractMovie) -> None:
         """
@@ -48,15 +82,8 @@ class HistoryList:
             cls.logger.enter(f'Adding movie: {movie.get_title()} '
                              f'len: '
                              f'{len(cls._buffer)} cursor: {cls._cursor}')
-        duplicate = False
-        a_movie: AbstractMovie
-        for a_movie in cls._buffer:
-            if ((a_movie.get_title() == movie.get_title())
-                    and (a_movie.get_year() == movie.get_year())):
-                duplicate = True
-                break
-
-        if duplicate:
+        key: Tuple[str, int] = cls.get_key(movie)
+        if key in cls._keys:
             # Most likely a duplicate is sent by back-end when it is starving.
             # We fetch one trailer ahead so normally we can afford to wait a
             # bit for the back-end to recover. But, if the user is choosing to
@@ -90,11 +117,12 @@ class HistoryList:
             cls._previous_trailer_was_duplicate = False
 
         cls._buffer.append(movie)
+        cls._keys[key] = cls._keys.get(key, 0) + 1
 
         # If buffer is over-full, correct
         if len(cls._buffer) > HistoryList.MAX_HISTORY:
             # Delete oldest entry
-            del cls._buffer[0]
+            cls._forget(cls._buffer.popleft())
             # Adjust cursor index
             # Note that even if other events have altered cursor before we
             # have chance to adjust, it will still point to whatever trailer
@@ -207,8 +235,8 @@ class HistoryList:
     @classmethod
     def remove(cls, movie: AbstractMovie) -> None:
         try:
-            i = cls._buffer.index(movie)
-            del cls._buffer[i]
+            cls._buffer.remove(movie)
+            cls._forget(movie)
             if cls._cursor > len(cls._buffer) - 1:
                 cls._cursor = len(cls._buffer) - 1
         except Exception as e:
@@ -10,8 +10,12 @@ import queue
 import sys
 import os
 import threading
+from contextlib import closing
+
+import xbmcvfs
 
 from common.debug_utils import Debug
+from common.disk_utils import DiskUtils
 from common.exceptions import AbortException, LogicError
 from common.imports import *
 from common.logger import LazyLogger
@@ -44,6 +48,11 @@ class MovieManager:
     OPEN_CURTAIN: Final[bool] = True
     CLOSE_CURTAIN: Final[bool] = False
 
+    # Bytes of the next trailer read while the current one plays, so that the
+    # player does not have to wait on a sleeping disk or network share
+
+    PRELOAD_BYTES: Final[int] = 1024 * 1024
+
     _logger: LazyLogger = None
     instance: ForwardRef('MovieManager') = None
 
@@ -60,6 +69,13 @@ class MovieManager:
         self._thread = None
         self._queuedMovie = None
         self._pre_fetched_trailer_queue: queue.Queue = queue.Queue(2)
+
+        # Next trailer from _pre_fetched_trailer_queue, already validated by
+        # preload_next_trailer
+
+        self._preload_lock: threading.RLock = threading.RLock()
+        self._preloaded_trailer: AbstractMovie = None
+        self._preload_thread: threading.Thread = None
         self.fetched_event: threading.Event = threading.Event()
         self.pre_fetch_trailer()
         self._play_state: TrailerPlayState = TrailerPlayState.NOTHING
@@ -138,34 +154,33 @@ class MovieManager:
 
                 while trailer is None and countdown >= 0 and not self._changed:
                     countdown -= 1
-                    if not self._pre_fetched_trailer_queue.empty():
-                        trailer = self._pre_fetched_trailer_queue.get(timeout=0.5)
-                        if trailer is not None:
-                            title = trailer.get_title()
-
-                            # HistoryList.append does not add trailers that
-                            # are in it's recent history. However, when
-                            # the back-end is having trouble getting trailers
-                            # to us, it can send duplicates. Therefore, if,
-                            # a few lines down, HistoryList.get_next_trailer
-                            # doesn't return anything, we can return this
-                            # trailer, if it is marked as starving.
-
-                            HistoryList.append(trailer)
-
-                            # Force go get from history to make sure history cursor
-                            # is in sync what was just appended, otherwise, if user
-                            # presses next/prev movie rapidly, the history will
-                            # diverge from what is returned here.
-
-                            next_trailer = HistoryList.get_next_trailer()
-                            if next_trailer is not None:
-                                trailer = next_trailer
-                            elif not trailer.is_starving(reset=False):
-
-                                # If trailer is not marked as starving, then
-                                # don't force it to be played.
-                                trailer = None
+                    trailer = self._take_pre_fetched_trailer()
+                    if trailer is not None:
+                        title = trailer.get_title()
+
+                        # HistoryList.append does not add trailers that
+                        # are in it's recent history. However, when
+                        # the back-end is having trouble getting trailers
+                        # to us, it can send duplicates. Therefore, if,
+                        # a few lines down, HistoryList.get_next_trailer
+                        # doesn't return anything, we can return this
+                        # trailer, if it is marked as starving.
+
+                        HistoryList.append(trailer)
+
+                        # Force go get from history to make sure history cursor
+                        # is in sync what was just appended, otherwise, if user
+                        # presses next/prev movie rapidly, the history will
+                        # diverge from what is returned here.
+
+                        next_trailer = HistoryList.get_next_trailer()
+                        if next_trailer is not None:
+                            trailer = next_trailer
+                        elif not trailer.is_starving(reset=False):
+
+                            # If trailer is not marked as starving, then
+                            # don't force it to be played.
+                            trailer = None
 
                     Monitor.throw_exception_if_abort_requested(timeout=0.0)
 
@@ -234,6 +249,85 @@ class MovieManager:
                 trailer_path = None
         return trailer_path is None
 
+    def start_preload_next_trailer(self) -> None:
+        """
+        Runs preload_next_trailer on its own thread, so that a slow disk or
+        network share does not hold up the caller (the playing of the
+        current trailer).
+
+        :return:
+        """
+        if self._preload_thread is not None and self._preload_thread.is_alive():
+            return
+
+        self._preload_thread = threading.Thread(
+            target=self._preload_next_trailer, name='Preload trailer')
+        self._preload_thread.start()
+
+    def _preload_next_trailer(self) -> None:
+        clz = type(self)
+        try:
+            self.preload_next_trailer()
+        except AbortException:
+            pass  # In thread, let die
+        except Exception as e:
+            clz._logger.exception(e)
+
+    def preload_next_trailer(self) -> None:
+        """
+        Called while a trailer plays. Takes the next trailer from the
+        pre-fetch queue, checks that its trailer files still exist and reads
+        the start of its file, so that when the current trailer finishes,
+        get_next_trailer and the player have less to do.
+
+        :return:
+        """
+        clz = type(self)
+        with self._preload_lock:
+            if self._preloaded_trailer is not None:
+                return
+            try:
+                trailer: AbstractMovie = self._pre_fetched_trailer_queue.get_nowait()
+            except queue.Empty:
+                return
+
+            if self.purge_removed_cached_trailers(trailer):
+                # No trailer at all to play
+
+                return
+
+            trailer.validate_local_trailer()
+            self._preloaded_trailer = trailer
+
+        _, _, trailer_path = trailer.get_optimal_trailer_path()
+        if trailer_path and not DiskUtils.is_url(trailer_path):
+            try:
+                with closing(xbmcvfs.File(trailer_path)) as trailer_file:
+                    trailer_file.readBytes(clz.PRELOAD_BYTES)
+            except AbortException:
+                reraise(*sys.exc_info())
+            except Exception as e:
+                if clz._logger.isEnabledFor(LazyLogger.DEBUG):
+                    clz._logger.debug(f'Can not preload {trailer_path}: {e}')
+
+        if clz._logger.isEnabledFor(LazyLogger.DEBUG_VERBOSE):
+            clz._logger.debug_verbose(f'Preloaded: {trailer.get_title()}')
+
+    def _take_pre_fetched_trailer(self) -> AbstractMovie:
+        """
+        :return: The preloaded trailer, else the next trailer from the
+                 pre-fetch queue, else None
+        """
+        with self._preload_lock:
+            trailer: AbstractMovie = self._preloaded_trailer
+            self._preloaded_trailer = None
+        if trailer is None:
+            try:
+                trailer = self._pre_fetched_trailer_queue.get_nowait()
+            except queue.Empty:
+                pass
+        return trailer
+
     def pre_fetch_trailer(self) -> None:
         self._thread = threading.Thread(
             target=self._pre_fetch_trailer, name='Pre-Fetch trailer')
@@ -10,6 +10,7 @@ from common.monitor import Monitor
 
 class PlayerState:
     STATE_STOPPED = 'stopped'
+    STATE_STARTING = 'starting'  # play requested, waiting for onAVStarted
     STATE_PLAYING = 'playing'
     STATE_PAUSED = 'paused'
 
@@ -220,13 +221,15 @@ class AbstractPlayer(ABC):
         return
 
     @abstractmethod
-    def wait_for_is_playing_video(self, timeout: float = None) -> bool:
+    def wait_for_is_playing_video(self, path: str = None,
+                                  timeout: float = None) -> bool:
 
         Monitor.throw_exception_if_abort_requested()
         return False
 
     @abstractmethod
     def wait_for_is_not_playing_video(self,
+                                      path: str = None,
                                       timeout: float = None,
                                       trace: str = None) -> bool:
         Monitor.throw_exception_if_abort_requested()
@@ -1,25 +1,35 @@
 # -*- coding: utf-8 -*-
 import datetime
 import threading
+import time
 from abc import ABC
 
 import xbmc
 import xbmcgui
 from xbmc import PlayList, InfoTagVideo, InfoTagMusic, InfoTagRadioRDS
 
+from common.exceptions import AbortException
 from common.imports import *
 from common.logger import LazyLogger, Trace
 from common.monitor import Monitor
-from player.abstract_player import AbstractPlayer
+from player.abstract_player import AbstractPlayer, PlayerState
 
 module_logger: LazyLogger = LazyLogger.get_addon_module_logger(file_path=__file__)
 DEBUG_PLAYER: int = LazyLogger.DEBUG
 
 class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
     """
+    Tracks the play state from Kodi's player events (onAVStarted,
+    onPlayBackEnded, etc.). Threads waiting for a video to start or stop
+    wait on _state_changed and are woken by the event.
 
+    Kodi does not reliably send onPlayBackEnded, so waiters also check
+    Kodi's actual state every WATCHDOG_SECONDS.
     """
     DEBUG_MONITOR: Final[bool] = True
+    WATCHDOG_SECONDS: Final[float] = 1.0
+    PLAYING_STATES: Final[Tuple[str, ...]] = (PlayerState.STATE_PLAYING,
+                                              PlayerState.STATE_PAUSED)
     _logger: LazyLogger = None
 
     def __init__(self):
@@ -46,6 +56,17 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
         self._call_back_on_show_info: Callable[[Any], Any] = None
         self.started: bool = False
 
+        # Guards _play_state, _is_playing, _is_paused, _play_started and
+        # _playing_path. Notified on every change.
+
+        self._state_changed: threading.Condition = threading.Condition()
+        self._play_state: str = PlayerState.STATE_STOPPED
+        try:
+            Monitor.register_abort_listener(self._on_abort,
+                                            name='AdvancedPlayer:abort')
+        except AbortException:
+            pass  # Waits return immediately
+
     def set_callbacks(self,
                       on_video_window_opened: Callable[[Any], Any] = None,
                       on_video_window_closed: Callable[[Any], Any] = None,
@@ -112,6 +133,93 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
         return play_state
     '''
 
+    @property
+    def play_state(self) -> str:
+        return self._play_state
+
+    def _set_play_state(self, play_state: str,
+                        playing_path: str = None) -> None:
+        """
+        Records a play state change and wakes any waiting threads
+
+        :param play_state: One of the PlayerState values
+        :param playing_path: Path now playing, None leaves it unchanged
+        :return:
+        """
+        with self._state_changed:
+            self._play_state = play_state
+            self._is_playing = play_state in AdvancedPlayer.PLAYING_STATES
+            self._is_paused = play_state == PlayerState.STATE_PAUSED
+            self._play_started = play_state != PlayerState.STATE_STOPPED
+            if play_state == PlayerState.STATE_STOPPED:
+                self._playing_path = ''
+            elif playing_path is not None:
+                self._playing_path = playing_path
+            self._state_changed.notify_all()
+
+    def _on_abort(self) -> None:
+        with self._state_changed:
+            self._state_changed.notify_all()
+
+    def _check_play_state(self) -> None:
+        """
+        Watchdog. Corrects the play state when Kodi did not send an event.
+
+        :return:
+        """
+        clz = AdvancedPlayer
+        try:
+            playing_path: str = super().getPlayingFile()
+        except Exception:
+            playing_path = ''
+
+        with self._state_changed:
+            if playing_path == '':
+                if self._play_state in clz.PLAYING_STATES:
+                    if clz._logger.isEnabledFor(DEBUG_PLAYER):
+                        clz._logger.debug(f'Missed end of play: '
+                                          f'{self._playing_path}')
+                    self._set_play_state(PlayerState.STATE_STOPPED)
+            elif (self._play_state != PlayerState.STATE_PAUSED
+                  and (self._play_state != PlayerState.STATE_PLAYING
+                       or playing_path != self._playing_path)):
+                if clz._logger.isEnabledFor(DEBUG_PLAYER):
+                    clz._logger.debug(f'Missed start of play: {playing_path}')
+                self._set_play_state(PlayerState.STATE_PLAYING, playing_path)
+
+    def _wait_for_play_state(self, is_done: Callable[[], Optional[bool]],
+                             timeout: float) -> Optional[bool]:
+        """
+        Waits for Kodi's player events until is_done returns True or False
+
+        :param is_done: Called with _state_changed held. Returns None to keep
+                        waiting
+        :param timeout: Seconds
+        :return: Value returned by is_done, None on timeout or abort
+        """
+        clz = AdvancedPlayer
+        deadline: float = time.monotonic() + timeout
+        while not Monitor.is_abort_requested():
+            with self._state_changed:
+                result: Optional[bool] = is_done()
+                if result is not None:
+                    return result
+
+                remaining: float = deadline - time.monotonic()
+                if remaining <= 0.0:
+                    return None
+
+                if self._state_changed.wait(
+                        timeout=min(remaining, clz.WATCHDOG_SECONDS)):
+                    continue
+
+            # No event for a while. Don't call Kodi while holding the lock,
+            # Kodi's callbacks need it.
+
+            self._check_play_state()
+
+        return None
+
     def is_video_fullscreen(self) -> bool:
         is_fullscreen = bool(xbmc.getCondVisibility('VideoPlayer.IsFullscreen'))
         return is_fullscreen
@@ -151,9 +259,13 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
 
         if type(self).DEBUG_MONITOR:
             clz._logger.enter()
+
+        # Before super().play, Kodi can deliver onAVStarted before play
+        # returns
+
+        self._set_play_state(PlayerState.STATE_STARTING)
         super().play(item, listitem, windowed, startpos)
         self.enable_advanced_monitoring()
-        self._play_started = True
 
     # Defined in xbmc.Player
     def stop(self) -> None:
@@ -165,9 +277,7 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
         if (type(self).DEBUG_MONITOR and
                 clz._logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE)):
             clz._logger.enter()
-        self._is_playing = False
-        self._play_started = False
-        self._is_paused = False
+        self._set_play_state(PlayerState.STATE_STOPPED)
         super().stop()
 
     # Defined in xbmc.Player
@@ -194,12 +304,11 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
             clz._logger.debug_extra_verbose(f'is_playing: {self._is_playing} '
                                                     f'is_paused: {self._is_paused}')
         if not self._is_playing:
-            self._is_paused = False
             return
 
         if not self._is_paused:
             self.pause() # Toggle
-            self._is_paused = True
+            self._set_play_state(PlayerState.STATE_PAUSED)
 
     def resume_play(self) -> None:
         clz = AdvancedPlayer
@@ -209,12 +318,11 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
             clz._logger.debug_extra_verbose(f'is_playing: {self._is_playing} '
                                                     f'is_paused: {self._is_paused}')
         if not self._is_playing:
-            self._is_paused = False
             return
 
         if self._is_paused:
             self.pause() # Toggle
-            self._is_paused = False
+            self._set_play_state(PlayerState.STATE_PLAYING)
 
     # Defined in xbmc.Player
     def playnext(self) -> None:
@@ -301,8 +409,8 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
 
         is_playing_video: bool = super().isPlayingVideo()
         if self._is_playing != is_playing_video:
-            clz.error(f'internal play state != xbmc play state')
-            self._is_playing = is_playing_video
+            clz._logger.error(f'internal play state != xbmc play state')
+            self._check_play_state()
 
         #  Does not take pause into account!
 
@@ -365,13 +473,12 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
             # Exception thrown if Kodi has not played any file
 
             playing_file = super().getPlayingFile()
-            self._is_playing = True
 
             if clz._logger.isEnabledFor(LazyLogger.DISABLED):
                 clz._logger.debug_extra_verbose('playing_file: ' + playing_file)
         except Exception as e:
             # clz._logger.exception()
-            self._is_playing = False
+            pass
         finally:
             return playing_file
 
@@ -662,10 +769,8 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
         if not self._is_finished:
             xbmc.executebuiltin('PlayerControl(Stop)')
 
-        self._is_playing = False
-        self._is_paused = False
         self._is_finished = True
-        self._play_started = False
+        self._set_play_state(PlayerState.STATE_STOPPED)
     '''
     def on_preplay_started(self) -> None:
         pass
@@ -708,85 +813,44 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
             except RuntimeError:
                 clz._logger.debug_verbose('Movie info not yet available')
 
-        self._is_playing = True
-        self._is_paused = False
-        self._play_started = True
-        self._playing_path = self.getPlayingFile()
+        self._set_play_state(PlayerState.STATE_PLAYING, self.getPlayingFile())
 
         # self._dump_state()  # TODO: remove
 
-    def wait_for_is_playing_video(self, path:str = None,
+    def wait_for_is_playing_video(self, path: str = None,
                                   timeout: float = None) -> bool:
         """
             Waits until a video is playing (or paused).
 
-        :param: timeout: Maximum amount of time to wait, in seconds.
+        :param path: Wait for this video. None waits for any video
+        :param timeout: Maximum amount of time to wait, in seconds.
                 Defaults to an hour if None or <= 0
         :return: True if playing a video
-                 False if no video was played within timeout seconds
-
+                 False if no video was played within timeout seconds, or
+                 if play was never started, or failed
         """
-        '''
-              This is a mess.
-
-              The preferred way to deal with this is to monitor onPlayBackStarted/
-              onPlayBackEnded events, but onPlayBackEnded is not reliably sent.
-              So, poll isPlayingVideo, which is True prior to the video actually
-              being played, so some method calls can throw exceptions until
-              onPlayBackStarted is issued. Sigh
-
-              Perhaps rely on onVidowWindowOpened/Closed, but that depends upon
-              the actual dialog opening/closing. Not good
-
-              :param: timeout: Maximum amount of time to wait, in seconds
-              '''
         clz = AdvancedPlayer
         if timeout is None or timeout <= 0.0:
             timeout = 3600.0  # An hour, insane
 
-        timeout_ms: int = int(timeout * 1000.0)
-
-        # TODO: Add check for failures: onPlabackFailed/Ended/Error
-        while not Monitor.wait_for_abort(0.250):
-            playing_path = self.getPlayingFile()
+        def is_playing() -> Optional[bool]:
             if clz._logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
                 clz._logger.debug_extra_verbose(f'is_playing: {path} '
-                                                        f'playing path: '
-                                                        f'{playing_path} '
-                                                        f'paused: {self._is_paused} '
-                                                        f'playing: '
-                                                        f'{self._is_playing} '
-                                                        f'play_started: '
-                                                        f'{self._play_started}')
-            if playing_path == path:
-                break
+                                                f'playing path: '
+                                                f'{self._playing_path} '
+                                                f'state: {self._play_state}')
+            if self._play_state in clz.PLAYING_STATES:
+                if path is None or self._playing_path == path:
+                    return True
 
-            # if self.getPlayingFile() == path and self._is_playing:
-                # Success!
-            #     break
-            # If no attempt has been made to even start playing, we may as well
-            # give up.
+            # If no attempt has been made to even start playing, or it
+            # failed, we may as well give up.
 
-            if not self._play_started:
+            if self._play_state == PlayerState.STATE_STOPPED:
                 return False
+            return None
 
-            timeout_ms -= 250
-
-        '''
-        while (not Monitor.wait_for_abort(0.250)
-               and not self._player_window_open
-               and timeout_ms > 0):
-            if self.is_paused():
-                break
-            timeout_ms -= 250
-
-        if timeout_ms <= 0:
-            return False
-        '''
-
-        if timeout_ms <= 0:
-            return False
-        return True
+        return bool(self._wait_for_play_state(is_playing, timeout))
 
     def wait_for_is_not_playing_video(self,
                                       path: str = None,
@@ -796,35 +860,31 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
           Waits until a video is NOT playing (or paused).
 
           :param: path: Wait until the given video path is no longer playing.
+                        None waits until nothing is playing.
           :param: timeout: Maximum amount of time to wait, in seconds.
                   Defaults to an hour if None or <= 0
           :return: True if video is not playing (or paused)
                    False if a video was playing (or paused) for
                    entire timeout period of seconds
-
         """
-        #  This is a mess. See wait_for_is_playing_video
-
         clz = AdvancedPlayer
-        if path is None:
-            path = ''
-
         if timeout is None or timeout <= 0:
             timeout = 3600.0
 
-        timeout_ms: int = int(timeout * 1000.0)
-        while not Monitor.wait_for_abort(0.250) and timeout_ms > 0:
-            playing_path = self.getPlayingFile()
-            # We are finished when not playing anything or when not playing
-            # the given path
-            if playing_path == '' or (path != playing_path):
-                break
-            timeout_ms -= 250
+        def is_not_playing() -> Optional[bool]:
+            if self._play_state not in clz.PLAYING_STATES:
+                return True
+            if path and self._playing_path != path:
+                return True
+            return None
 
-        if timeout_ms > 0:
-            return True
+        result: Optional[bool] = self._wait_for_play_state(is_not_playing,
+                                                           timeout)
+        if result is None:
+            # Nothing will be playing once shut down
 
-        return False
+            return Monitor.is_abort_requested()
+        return result
 
     # Defined in xbmc.Player
     def onAVChange(self) -> None:
@@ -858,10 +918,7 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
             Will be called when Kodi stops playing a file.
         """
         clz = AdvancedPlayer
-        self._is_playing = False
-        self._is_paused = False
-        self._play_started = False
-        self._playing_path = ''
+        self._set_play_state(PlayerState.STATE_STOPPED)
 
         try:
             clz._logger.debug(f'onPlayBackEnded path: {self.getPlayingFile()}')
@@ -875,10 +932,7 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
         Will be called when user stops Kodi playing a file.
         """
         clz = AdvancedPlayer
-        self._is_playing = False
-        self._is_paused = False
-        self._play_started = False
-        self._playing_path = ''
+        self._set_play_state(PlayerState.STATE_STOPPED)
         # self._dump_state()  # TODO: remove
         try:
             clz._logger.debug(f'onPlayBackStopped path: {self.getPlayingFile()}')
@@ -891,10 +945,7 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
             Will be called when playback stops due to an error.
         """
         clz = AdvancedPlayer
-        self._is_playing = False
-        self._is_paused = False
-        self._play_started = False
-        self._playing_path = ''
+        self._set_play_state(PlayerState.STATE_STOPPED)
         try:
             clz._logger.debug(f'onPlayBackError path: {self.getPlayingFile()}')
         except Exception:
@@ -907,9 +958,9 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
         """
 
         clz = AdvancedPlayer
-        self._is_paused = True
         if not self._is_playing:
             clz._logger.error(f'Paused and not Playing!')
+        self._set_play_state(PlayerState.STATE_PAUSED)
 
         try:
             if clz._logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
@@ -930,9 +981,9 @@ class AdvancedPlayer(xbmc.Player, AbstractPlayer, ABC):
         if clz._logger.isEnabledFor(LazyLogger.DEBUG_EXTRA_VERBOSE):
             clz._logger.debug_extra_verbose(self.get_playing_title(),
                                             trace=Trace.TRACE)
-        self._is_paused = False
         if not self._is_playing:
             clz._logger.error(f'Not Paused and not Playing!')
+        self._set_play_state(PlayerState.STATE_PLAYING)
 
         try:
             clz._logger.debug(f'onPlayBackResumed path: {self.getPlayingFile()}')
@@ -167,12 +167,14 @@ class DummyPlayer(AbstractPlayer):
     def onAVStarted(self) -> None:
         return
 
-    def wait_for_is_playing_video(self, timeout: float = None) -> bool:
+    def wait_for_is_playing_video(self, path: str = None,
+                                  timeout: float = None) -> bool:
 
         Monitor.throw_exception_if_abort_requested()
         return False
 
     def wait_for_is_not_playing_video(self,
+                                  path: str = None,
                                   timeout: float = None,
                                   trace: str = None) -> bool:
         Monitor.throw_exception_if_abort_requested()
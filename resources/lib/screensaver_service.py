@@ -4,6 +4,9 @@ Created on Feb 12, 2019
 
 @author: Frank Feuerbacher
 """
+from diagnostics.startup_trace import StartupTrace
+StartupTrace.install('screensaver')
+
 from common.critical_settings import CriticalSettings
 from common.minimal_monitor import MinimalMonitor
 from common.python_debugger import PythonDebugger
@@ -51,8 +54,12 @@ try:
         # If this is not done, then Kodi will get constipated
         # sending/receiving events to plugins.
 
+        # Don't wait before launching the front-end, that only delays the
+        # first trailer.
+
         timeout: float = CriticalSettings.LONG_POLL_DELAY
-        _monitor.throw_exception_if_abort_requested(timeout=timeout)
+        if _monitor.real_waitForAbort(timeout=0.0):
+            raise AbortException()
 
         message_received = False
         if not message_received:
@@ -63,6 +70,7 @@ try:
                 "params": {"addonid": "script.video.randomtrailers",\
                 "params": "screensaver" }, "id": 1}'
             json_text = xbmc.executeJSONRPC(cmd)
+            StartupTrace.finish('frontend_launched')
             _monitor.throw_exception_if_abort_requested(timeout=timeout)
 
     MinimalMonitor.abort_requested()
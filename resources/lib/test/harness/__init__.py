@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Headless harness which runs the add-on outside of Kodi, for reproducible
+benchmarks on a plain Linux box.
+
+    cd resources/lib
+    python -m test.harness --help
+
+kodi_stubs/ holds stand-ins for the modules Kodi provides (xbmc, xbmcvfs,
+xbmcgui, xbmcaddon, kutils and youtube_dl). It is placed on sys.path when
+this package is imported, so the harness must be imported before any
+add-on module. It is never on sys.path when running inside Kodi.
+"""
+import os
+import sys
+
+STUBS_PATH: str = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               'kodi_stubs')
+if STUBS_PATH not in sys.path:
+    sys.path.insert(0, STUBS_PATH)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Runs the headless benchmarks and prints (or writes) the results as json:
+
+    cd resources/lib
+    python -m test.harness --micro
+    python -m test.harness --pipeline --movies 5000 --sources library,tmdb
+    python -m test.harness --caches --movies 50000
+    python -m test.harness --suite 5k,50k,200k --output results.json
+    python -m test.harness --startup 5
+"""
+import argparse
+import json
+import platform
+import sys
+from typing import Any, Dict, List
+
+import kodi_harness_state
+
+from test.harness.kodi_environment import KodiEnvironment
+
+SOURCE_SETTINGS: Dict[str, str] = {'library': 'do_library',
+                                   'tmdb': 'do_tmdb',
+                                   'itunes': 'do_itunes',
+                                   'tfh': 'include_tfh_trailers'}
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m test.harness',
+                                     description='Headless Random Trailers '
+                                                 'benchmarks')
+    parser.add_argument('--micro', action='store_true',
+                        help='Run the micro benchmarks (settings, logging, '
+                             'shuffle bag, spans, warm pool, download scheduler, '
+                             'download resume, youtube-dl pool, trailer formats)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Run discovery -> fetch -> PlayableTrailerService')
+    parser.add_argument('--caches', action='store_true',
+                        help='Generate the persistent caches for --movies '
+                             'movies and time their load, save and garbage '
+                             'collection. Not with --pipeline')
+    parser.add_argument('--tmdb-memory', type=int, default=0, metavar='MOVIES',
+                        help='Memory used by TMDb discovery of this many '
+                             'movies')
+    parser.add_argument('--suite', default=None, metavar='SCALES',
+                        help='Run --caches and --pipeline, each in its own '
+                             'process, for every comma separated library '
+                             'size, e.g. 5k,50k,200k')
+    parser.add_argument('--startup', type=int, default=0, metavar='RUNS',
+                        help='Time loading the genre and certification '
+                             'definitions with and without their bundle, '
+                             'each in RUNS new processes')
+    parser.add_argument('--definitions', default=None,
+                        choices=('bundle', 'no-bundle'),
+                        help='Time loading the definitions in this process '
+                             '(one step of --startup)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiplier for the micro benchmark sizes')
+    parser.add_argument('--movies', type=int, default=1000,
+                        help='Size of the synthetic catalog')
+    parser.add_argument('--trailers', type=int, default=100,
+                        help='Trailers to fetch after the first')
+    parser.add_argument('--sources', default='library',
+                        help='Comma separated: ' + ','.join(SOURCE_SETTINGS))
+    parser.add_argument('--remote-latency', type=float, default=0.0,
+                        help='Seconds added to every fake TMDb/iTunes request')
+    parser.add_argument('--timeout', type=float, default=600.0,
+                        help='Abort the pipeline after this many seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--home', default=None,
+                        help='Fake Kodi home (default: temporary directory)')
+    parser.add_argument('--output', default=None,
+                        help='Write the json results here instead of stdout')
+    args: argparse.Namespace = parser.parse_args(argv)
+
+    # The cache benchmarks leave the caches and discovery state (of the
+    # add-on's process wide classes) in a state the pipeline can not start
+    # from
+
+    if args.caches and args.pipeline:
+        parser.error('--caches and --pipeline must run in separate processes '
+                     '(--suite does so)')
+    return args
+
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    if args.suite is not None:
+        from test.harness.scale_suite import run_suite
+
+        results: List[Dict[str, Any]] = run_suite(
+            args.suite.split(','), trailers=args.trailers, seed=args.seed,
+            timeout=args.timeout,
+            tmdb_memory_movies=args.tmdb_memory if args.tmdb_memory > 0 else None)
+        write_report(args, results)
+        return 0
+
+    if args.startup > 0:
+        from test.harness.scale_suite import run_startup
+
+        write_report(args, run_startup(args.startup, timeout=args.timeout))
+        return 0
+
+    if not (args.micro or args.pipeline or args.caches or args.tmdb_memory
+            or args.definitions):
+        args.micro = True
+
+    if args.pipeline:
+        # Safe to import before the environment is installed, and must be
+        # installed before the add-on's modules are imported
+
+        from diagnostics.startup_trace import StartupTrace
+        StartupTrace.install('harness')
+
+    sources: List[str] = [source.strip() for source in args.sources.split(',')
+                          if source.strip()]
+    settings: Dict[str, Any] = {setting: source in sources
+                                for source, setting in SOURCE_SETTINGS.items()}
+    environment: KodiEnvironment = KodiEnvironment(home=args.home,
+                                                   settings=settings).install()
+
+    # Only now may add-on modules be imported
+
+    from test.harness import benchmarks, cache_benchmarks
+    from test.harness.synthetic import SyntheticMovies
+
+    results = []
+    try:
+        if args.definitions is not None:
+            # First, before other benchmarks load the definitions
+
+            results.append(benchmarks.benchmark_definition_loading(
+                args.definitions == 'bundle'))
+        if args.micro:
+            results.extend(benchmarks.run_micro_benchmarks(args.scale))
+        if args.caches:
+            results.extend(cache_benchmarks.run_cache_benchmarks(
+                SyntheticMovies(args.movies, seed=args.seed)))
+        if args.tmdb_memory > 0:
+            results.append(cache_benchmarks.benchmark_tmdb_discovery_memory(
+                SyntheticMovies(args.tmdb_memory, seed=args.seed)))
+        if args.pipeline:
+            pipeline = benchmarks.PipelineBenchmark(
+                environment, SyntheticMovies(args.movies, seed=args.seed),
+                remote_latency_seconds=args.remote_latency)
+            try:
+                results.append(pipeline.run(trailers=args.trailers,
+                                            timeout=args.timeout))
+            finally:
+                pipeline.stop()
+    finally:
+        environment.close()
+
+    write_report(args, results)
+    return 0
+
+
+def write_report(args: argparse.Namespace, results: List[Dict[str, Any]]) -> None:
+    report: Dict[str, Any] = {
+        'addon_version': kodi_harness_state.get_addon_versions().get(
+            kodi_harness_state.ADDON_ID),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'arguments': vars(args),
+        'results': results}
+    text: str = json.dumps(report, indent=2, sort_keys=True)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'wt', encoding='utf-8') as output:
+            output.write(text)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
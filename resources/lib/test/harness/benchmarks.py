@@ -0,0 +1,924 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Benchmarks which run against the real add-on code inside a KodiEnvironment.
+
+Each benchmark returns a flat dict of results, so runs can be compared by
+machine. Durations are in seconds unless the key says otherwise.
+"""
+import datetime
+import gc
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import kodi_harness_state
+import xbmc
+
+from test.harness.fake_json_rpc import FakeJsonRpc
+from test.harness.fake_remote_server import FakeRemoteServer
+from test.harness.kodi_environment import KodiEnvironment
+from test.harness.synthetic import SyntheticMovies, TFH_PLAYLIST_URL
+
+Result = Dict[str, Any]
+
+
+def get_rss_bytes() -> int:
+    """
+    :return: Current resident set size of this process, 0 if unknown
+    """
+    try:
+        with open('/proc/self/statm', 'rt') as statm:
+            resident_pages: int = int(statm.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def get_peak_rss_bytes() -> int:
+    """
+    :return: Peak resident set size of this process
+    """
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def time_operations(name: str, operation: Callable[[], Any], count: int,
+                    **extra: Any) -> Result:
+    """
+    Times count calls of operation
+
+    :param name: Benchmark name
+    :param operation:
+    :param count:
+    :param extra: Additional values for the result
+    :return:
+    """
+    gc.collect()
+    start: float = time.perf_counter()
+    for _ in range(count):
+        operation()
+    elapsed: float = time.perf_counter() - start
+    result: Result = {'benchmark': name,
+                      'operations': count,
+                      'seconds': elapsed,
+                      'ops_per_second': count / elapsed if elapsed > 0 else 0.0,
+                      'microseconds_per_op': elapsed * 1000000.0 / count}
+    result.update(extra)
+    return result
+
+
+def benchmark_settings_reads(count: int = 200000) -> List[Result]:
+    """
+    Memoized typed setting reads, and raw reads for comparison
+
+    :param count:
+    :return:
+    """
+    from common.settings import Settings
+
+    return [time_operations('settings.memoized_read', Settings.get_no_repeat_hours,
+                            count),
+            time_operations('settings.raw_read',
+                            lambda: Settings.get_setting_int(Settings.NO_REPEAT_HOURS),
+                            count)]
+
+
+def benchmark_logging(count: int = 100000) -> List[Result]:
+    """
+    Cost of a disabled debug call, and throughput of enabled records through
+    the background writer to xbmc.log
+
+    :param count:
+    :return:
+    """
+    from common.logger import AsyncLogWriter, LazyLogger, Logger
+
+    logger: LazyLogger = LazyLogger.get_addon_module_logger(
+        file_path=__file__).getChild('benchmark')
+    results: List[Result] = [
+        time_operations('logging.disabled_debug_call',
+                        lambda: logger.debug_extra_verbose('not logged', 42),
+                        count)]
+
+    # Enable info both in the add-on's logger and in the xbmc.log stand-in
+
+    root_logger = Logger.get_root_logger()
+    saved_logger_level: int = root_logger.level
+    saved_level: int = kodi_harness_state.log_level
+    root_logger.setLevel(LazyLogger.INFO)
+    kodi_harness_state.log_level = xbmc.LOGDEBUG
+    try:
+        before: Dict[str, int] = AsyncLogWriter.get_statistics()
+        result: Result = time_operations('logging.enabled_info_call',
+                                         lambda: logger.info('benchmark record', 42),
+                                         count)
+
+        # Include the time for the background writer to drain
+
+        start: float = time.perf_counter()
+        while AsyncLogWriter.get_statistics()['queued'] > 0:
+            time.sleep(0.001)
+        drain_seconds: float = time.perf_counter() - start
+        after: Dict[str, int] = AsyncLogWriter.get_statistics()
+        result['drain_seconds'] = drain_seconds
+        result['records_written'] = after['written'] - before['written']
+        result['records_dropped'] = after['dropped'] - before['dropped']
+        result['written_per_second'] = (result['records_written']
+                                        / (result['seconds'] + drain_seconds))
+        results.append(result)
+    finally:
+        kodi_harness_state.log_level = saved_level
+        root_logger.setLevel(saved_logger_level)
+    return results
+
+
+def benchmark_shuffle_bag(movie_count: int = 50000) -> List[Result]:
+    """
+    Filling, drawing a full round from and rewinding a ShuffleBag
+
+    :param movie_count:
+    :return:
+    """
+    from common.movie import LibraryMovieId
+    from discovery.abstract_movie_data import ShuffleBag
+
+    movies: List[LibraryMovieId] = [LibraryMovieId(str(index))
+                                    for index in range(movie_count)]
+    bag: ShuffleBag = ShuffleBag('benchmark')
+    iterator = iter(movies)
+    results: List[Result] = [time_operations(
+        'shuffle_bag.put', lambda: bag.put(next(iterator)), movie_count)]
+    results.append(time_operations('shuffle_bag.get', lambda: bag.get(block=False),
+                                   movie_count))
+    results.append(time_operations('shuffle_bag.rewind', bag.rewind, 1000))
+    return results
+
+
+def benchmark_latency_histogram(count: int = 200000) -> List[Result]:
+    """
+    Overhead added to every instrumented call
+
+    :param count:
+    :return:
+    """
+    from diagnostics.spans import Spans
+
+    def span() -> None:
+        with Spans.span('benchmark.empty_span'):
+            pass
+
+    return [time_operations('spans.empty_span', span, count)]
+
+
+def simulate_warm_pool(policy: str, plays: int, play_seconds: float,
+                       median_latency: float, sigma: float,
+                       seed: int) -> Result:
+    """
+    Discrete event simulation of one source: the player plays a trailer
+    every play_seconds, while a single fetcher prepares trailers, each
+    taking a log-normally distributed time, whenever the policy allows.
+
+    :param policy: 'fixed' keeps the original three trailers ready,
+                   'warm_pool' asks TrailerWarmPool
+    :param plays:
+    :param play_seconds:
+    :param median_latency: Median seconds to prepare a trailer
+    :param sigma: Of the log of the preparation time
+    :param seed:
+    :return:
+    """
+    from diagnostics.spans import Spans
+    from discovery.trailer_warm_pool import TrailerWarmPool
+    from common.movie import LibraryMovieId
+
+    movie: LibraryMovieId = LibraryMovieId('1')
+    source: str = movie.get_source()
+    Spans.get_histogram(TrailerWarmPool.get_span_name(source)).reset()
+    for state in (TrailerWarmPool._last_play, TrailerWarmPool._play_interval,
+                  TrailerWarmPool._play_intervals):
+        state.pop(source, None)
+
+    def is_room(ready_count: int) -> bool:
+        if policy == 'fixed':
+            return ready_count < TrailerWarmPool.DEFAULT_SIZE
+        return TrailerWarmPool.is_room(source, ready_count)
+
+    rng: random.Random = random.Random(seed)
+    now: float = 0.0
+    ready: int = 0
+    prepared_at: float = -1.0     # When the trailer being prepared is ready
+    next_play: float = 0.0
+    stalls: int = 0
+    stall_seconds: float = 0.0
+    ready_seconds: float = 0.0    # Integral of ready trailers over time
+    played: int = 0
+    while played < plays:
+        if prepared_at < 0.0 and is_room(ready):
+            latency: float = rng.lognormvariate(0.0, sigma) * median_latency
+            prepared_at = now + latency
+            TrailerWarmPool.record_preparation(source, latency)
+
+        # Next event: a trailer becomes ready, or a play is due
+
+        event: float = next_play
+        if 0.0 <= prepared_at <= next_play:
+            event = prepared_at
+        ready_seconds += ready * (event - now)
+        now = event
+        if now == prepared_at:
+            ready += 1
+            prepared_at = -1.0
+        if now == next_play:
+            if ready == 0:
+                stalls += 1
+                wait: float = prepared_at - now
+                stall_seconds += wait
+                ready_seconds += ready * wait
+                now = prepared_at
+                ready += 1
+                prepared_at = -1.0
+            ready -= 1
+            played += 1
+            TrailerWarmPool.record_play(movie, now=now)
+            next_play = now + play_seconds
+
+    return {'benchmark': f'warm_pool.{policy}',
+            'plays': plays,
+            'play_seconds': play_seconds,
+            'median_latency': median_latency,
+            'stalls': stalls,
+            'stall_seconds': stall_seconds,
+            'mean_ready': ready_seconds / now if now > 0.0 else 0.0,
+            'target_size': (TrailerWarmPool.get_target_size(source)
+                            if policy == 'warm_pool'
+                            else TrailerWarmPool.DEFAULT_SIZE)}
+
+
+def benchmark_warm_pool(plays: int = 500, seed: int = 1) -> List[Result]:
+    """
+    Stalls (player waiting on a download) and trailers kept ready, with the
+    original fixed pool and with TrailerWarmPool, for slow and fast
+    downloads
+
+    :param plays:
+    :param seed:
+    :return:
+    """
+    results: List[Result] = []
+    for median_latency, sigma in ((70.0, 1.0), (45.0, 0.8), (5.0, 0.5)):
+        for policy in ('fixed', 'warm_pool'):
+            results.append(simulate_warm_pool(policy, plays, play_seconds=120.0,
+                                              median_latency=median_latency,
+                                              sigma=sigma, seed=seed))
+    return results
+
+
+def benchmark_download_scheduler(downloads: int = 40, threads: int = 4,
+                                 download_seconds: float = 0.1,
+                                 site_capacity: int = 3) -> List[Result]:
+    """
+    Trailer downloads by several fetcher threads (VideoDownloader.get_video
+    against the youtube_dl stand-in), from a site which answers 429 beyond
+    site_capacity concurrent downloads: one at a time, as before
+    DownloadScheduler, then with the limit learned from nothing, then
+    starting from the persisted limit.
+
+    :param downloads:
+    :param threads:
+    :param download_seconds: Simulated time of each download
+    :param site_capacity:
+    :return:
+    """
+    import youtube_dl
+    import backend.video_downloader as video_downloader
+    from backend.download_scheduler import DownloadScheduler
+    from backend.video_downloader import VideoDownloader
+    from common.movie_constants import MovieField
+
+    source: str = MovieField.TMDB_SOURCE
+    site: str = DownloadScheduler.get_site(source)
+    folder: str = os.path.join(kodi_harness_state.translate_path('special://temp'),
+                               'downloads')
+    os.makedirs(folder, exist_ok=True)
+    delays = video_downloader.DOWNLOAD_VIDEO_DELAY_BY_SOURCE
+    saved_delay = delays[source]
+    saved_maximum: float = DownloadScheduler.MAXIMUM_SLOTS
+    saved_seconds: float = youtube_dl.YoutubeDL.download_seconds
+    saved_capacity: int = youtube_dl.YoutubeDL.max_concurrent_downloads
+    delays[source] = (0.0, 0.0)
+    youtube_dl.YoutubeDL.download_seconds = download_seconds
+    youtube_dl.YoutubeDL.max_concurrent_downloads = site_capacity
+
+    def run(name: str) -> Result:
+        remaining: List[int] = list(range(downloads))
+        lock: threading.Lock = threading.Lock()
+        failed: List[int] = []
+
+        def worker() -> None:
+            while True:
+                with lock:
+                    if len(remaining) == 0:
+                        return
+                    index: int = remaining.pop()
+                rc, _ = VideoDownloader().get_video(
+                    f'https://www.youtube.com/watch?v=sched{name}{index:05d}',
+                    folder, f'sched_{name}_{index}', f'Trailer {index}', source)
+                if rc != 0:
+                    with lock:
+                        failed.append(index)
+
+        too_many_before: int = youtube_dl.YoutubeDL.too_many_requests
+        workers: List[threading.Thread] = [threading.Thread(target=worker)
+                                           for _ in range(threads)]
+        start: float = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed: float = time.perf_counter() - start
+        VideoDownloader._too_many_requests_resume_time = datetime.datetime.min
+        VideoDownloader._retry_attempts = 0
+        return {'benchmark': f'download_scheduler.{name}',
+                'downloads': downloads,
+                'threads': threads,
+                'site_capacity': site_capacity,
+                'seconds': elapsed,
+                'downloads_per_second': downloads / elapsed,
+                'too_many_requests': (youtube_dl.YoutubeDL.too_many_requests
+                                      - too_many_before),
+                'failed': len(failed),
+                'limit': DownloadScheduler.get_limit(source)}
+
+    results: List[Result] = []
+    try:
+        DownloadScheduler._limits.pop(site, None)
+        DownloadScheduler.MAXIMUM_SLOTS = DownloadScheduler.MINIMUM_SLOTS
+        results.append(run('serial'))
+        DownloadScheduler.MAXIMUM_SLOTS = saved_maximum
+        DownloadScheduler._limits.pop(site, None)
+        DownloadScheduler._last_decrease.pop(site, None)
+        results.append(run('first'))
+        DownloadScheduler.save_limits()
+        DownloadScheduler._limits.clear()
+        DownloadScheduler._limits_loaded = False
+        results.append(run('second'))
+    finally:
+        DownloadScheduler.MAXIMUM_SLOTS = saved_maximum
+        delays[source] = saved_delay
+        youtube_dl.YoutubeDL.download_seconds = saved_seconds
+        youtube_dl.YoutubeDL.max_concurrent_downloads = saved_capacity
+    results[-1]['bytes_per_second'] = DownloadScheduler.get_throughput(source)
+    return results
+
+
+
+def benchmark_download_resume(trailers: int = 10,
+                              download_bytes: int = 4 * 1024 * 1024,
+                              interrupted_fraction: float = 0.6) -> List[Result]:
+    """
+    Trailer downloads (VideoDownloader.get_video against the youtube_dl
+    stand-in) which are each interrupted after interrupted_fraction of the
+    trailer, then attempted again: bytes transferred when the second attempt
+    resumes from the staging folder, against starting over. Again with the
+    trailer_quality setting (and so the format TrailerFormatPolicy chooses)
+    changed between the attempts. Then the cost of reclaiming stale partial
+    downloads.
+
+    :param trailers:
+    :param download_bytes: Size of each trailer
+    :param interrupted_fraction:
+    :return:
+    """
+    import youtube_dl
+    import backend.video_downloader as video_downloader
+    from backend.download_staging import DownloadStaging
+    from backend.video_downloader import VideoDownloader
+    from common.movie_constants import MovieField
+    from common.settings import Settings
+
+    source: str = MovieField.TMDB_SOURCE
+    addon = Settings.get_addon().addon
+    saved_quality: str = addon.getSetting(Settings.TRAILER_QUALITY)
+    folder: str = os.path.join(kodi_harness_state.translate_path('special://temp'),
+                               'resume')
+    os.makedirs(folder, exist_ok=True)
+    delays = video_downloader.DOWNLOAD_VIDEO_DELAY_BY_SOURCE
+    saved_delay = delays[source]
+    saved_bytes: int = youtube_dl.YoutubeDL.download_bytes
+    saved_seconds: float = youtube_dl.YoutubeDL.download_seconds
+    delays[source] = (0.0, 0.0)
+    youtube_dl.YoutubeDL.download_bytes = download_bytes
+    youtube_dl.YoutubeDL.download_seconds = 0.0
+    interrupted_bytes: int = int(download_bytes * interrupted_fraction)
+
+    def set_quality(quality: str) -> None:
+        addon.setSetting(Settings.TRAILER_QUALITY, quality)
+        Settings.reload_settings()
+
+    def run(name: str, quality_on_retry: Optional[str]) -> Result:
+        transferred_before: int = youtube_dl.YoutubeDL.transferred_bytes
+        not_interrupted: int = 0
+        completed: int = 0
+        restart_bytes: int = 0
+        start: float = time.perf_counter()
+        for index in range(trailers):
+            url: str = f'https://www.youtube.com/watch?v={name}{index:05d}'
+            movie_id: str = f'{name}_{index}'
+            youtube_dl.YoutubeDL.interrupt_after_bytes = interrupted_bytes
+            set_quality(saved_quality)
+            rc, _ = VideoDownloader().get_video(url, folder, movie_id,
+                                                f'Trailer {index}', source)
+            if rc == 0:
+                not_interrupted += 1
+            if quality_on_retry is not None:
+                set_quality(quality_on_retry)
+            rc, movie = VideoDownloader().get_video(url, folder, movie_id,
+                                                    f'Trailer {index}', source)
+            if rc == 0 and movie is not None:
+                completed += 1
+                size: int = os.path.getsize(movie[MovieField.TRAILER])
+                restart_bytes += min(interrupted_bytes, size) + size
+                os.remove(movie[MovieField.TRAILER])
+        elapsed: float = time.perf_counter() - start
+        transferred: int = youtube_dl.YoutubeDL.transferred_bytes - transferred_before
+        return {'benchmark': f'download_resume.{name}',
+                'trailers': trailers,
+                'completed': completed,
+                'not_interrupted': not_interrupted,
+                'seconds': elapsed,
+                'transferred_bytes': transferred,
+                'restart_bytes': restart_bytes,
+                'saved_fraction': 1.0 - transferred / max(restart_bytes, 1)}
+
+    results: List[Result] = []
+    try:
+        results.append(run('resume', None))
+
+        # 480p rather than the best available
+
+        results.append(run('format_changed', '0'))
+
+        # Stale partial downloads, among ones still being attempted
+
+        staging_folder: str = DownloadStaging.get_staging_folder(folder)
+        for index in range(trailers * 10):
+            movie_id: str = f'stale_{index}'
+            DownloadStaging.begin(staging_folder, movie_id, f'stale{index}')
+            part_path: str = os.path.join(
+                staging_folder,
+                f'{DownloadStaging.get_file_prefix(movie_id)}Trailer.mp4.part')
+            with open(part_path, 'wb') as part_file:
+                part_file.write(b'\0' * 1024)
+        start = time.perf_counter()
+        reclaimed: int = DownloadStaging.reclaim(
+            folder, now=time.time() + (DownloadStaging.STALE_DAYS + 1)
+            * DownloadStaging.SECONDS_PER_DAY)
+        results.append({'benchmark': 'download_resume.reclaim',
+                        'partial_downloads': trailers * 10,
+                        'seconds': time.perf_counter() - start,
+                        'reclaimed_bytes': reclaimed,
+                        'remaining_files': len(os.listdir(staging_folder))})
+    finally:
+        delays[source] = saved_delay
+        youtube_dl.YoutubeDL.download_bytes = saved_bytes
+        youtube_dl.YoutubeDL.download_seconds = saved_seconds
+        youtube_dl.YoutubeDL.interrupt_after_bytes = 0
+        set_quality(saved_quality)
+    return results
+
+
+def benchmark_youtube_dl_pool(jobs: int = 24, threads: int = 4,
+                              cpu_seconds: float = 0.05,
+                              workers: int = 2) -> List[Result]:
+    """
+    Video information requests (YoutubeDLPool.EXTRACT_INFO against the
+    youtube_dl stand-in, each spending cpu_seconds in python, as
+    extraction does) from several threads, while another thread does small
+    steps of python work, as discovery does: with youtube-dl in-process,
+    then in worker processes. Reports job latency and how long the
+    'discovery' thread was stalled.
+
+    :param jobs:
+    :param threads: Threads requesting information
+    :param cpu_seconds: CPU spent extracting each video's information
+    :param workers: Worker processes
+    :return:
+    """
+    import json
+    import youtube_dl
+    from backend.youtube_dl_pool import YoutubeDLPool
+    from common.settings import Settings
+    from diagnostics.spans import LatencyHistogram
+
+    saved_cpu_seconds: float = youtube_dl.YoutubeDL.info_cpu_seconds
+    saved_environment: str = os.environ.get('RT_HARNESS_YOUTUBE_DL')
+    youtube_dl.YoutubeDL.info_cpu_seconds = cpu_seconds
+    os.environ['RT_HARNESS_YOUTUBE_DL'] = json.dumps(
+        {'info_cpu_seconds': cpu_seconds})
+
+    def set_workers(count: int) -> None:
+        Settings.get_addon().addon.setSetting(Settings.YOUTUBE_DL_WORKERS,
+                                              str(count))
+        Settings.reload_settings()
+
+    def run(name: str) -> Result:
+        remaining: List[int] = list(range(jobs))
+        lock: threading.Lock = threading.Lock()
+        latency: LatencyHistogram = LatencyHistogram(name)
+        failed: List[int] = []
+        done: threading.Event = threading.Event()
+        stalls: List[float] = []
+
+        def request() -> None:
+            while True:
+                with lock:
+                    if len(remaining) == 0:
+                        return
+                    index: int = remaining.pop()
+                start: float = time.perf_counter()
+                try:
+                    YoutubeDLPool.run(YoutubeDLPool.EXTRACT_INFO,
+                                      f'https://www.youtube.com/watch?v=pool{index:05d}',
+                                      {'skip_download': True})
+                except Exception:
+                    with lock:
+                        failed.append(index)
+                latency.record(time.perf_counter() - start)
+
+        def discovery() -> None:
+            last: float = time.perf_counter()
+            while not done.is_set():
+                sum(range(1000))
+                now: float = time.perf_counter()
+                stalls.append(now - last)
+                last = now
+
+        # Start the workers before measuring
+
+        remaining[:] = [-1] * workers
+        requesters: List[threading.Thread] = [threading.Thread(target=request)
+                                              for _ in range(workers)]
+        for thread in requesters:
+            thread.start()
+        for thread in requesters:
+            thread.join()
+        remaining[:] = list(range(jobs))
+        latency.reset()
+
+        ticker: threading.Thread = threading.Thread(target=discovery)
+        requesters = [threading.Thread(target=request) for _ in range(threads)]
+        start: float = time.perf_counter()
+        ticker.start()
+        for thread in requesters:
+            thread.start()
+        for thread in requesters:
+            thread.join()
+        elapsed: float = time.perf_counter() - start
+        done.set()
+        ticker.join()
+        stalls.sort()
+        return {'benchmark': f'youtube_dl_pool.{name}',
+                'jobs': jobs,
+                'threads': threads,
+                'cpu_seconds': cpu_seconds,
+                'seconds': elapsed,
+                'jobs_per_second': jobs / elapsed,
+                'failed': len(failed),
+                'latency_p50_seconds': latency.get_percentile(50.0) / 1000000.0,
+                'latency_p99_seconds': latency.get_percentile(99.0) / 1000000.0,
+                'discovery_steps_per_second': len(stalls) / elapsed,
+                'discovery_p99_stall_seconds':
+                    stalls[int(len(stalls) * 0.99)] if len(stalls) > 0 else 0.0,
+                'discovery_max_stall_seconds': stalls[-1] if len(stalls) > 0 else 0.0}
+
+    results: List[Result] = []
+    try:
+        set_workers(0)
+        results.append(run('in_process'))
+        set_workers(workers)
+        results.append(run('workers'))
+        for key, value in YoutubeDLPool.get_report().items():
+            results[-1][f'pool_{key}'] = value
+    finally:
+        YoutubeDLPool.shutdown()
+        YoutubeDLPool._closed = False
+        set_workers(0)
+        youtube_dl.YoutubeDL.info_cpu_seconds = saved_cpu_seconds
+        if saved_environment is None:
+            os.environ.pop('RT_HARNESS_YOUTUBE_DL', None)
+        else:
+            os.environ['RT_HARNESS_YOUTUBE_DL'] = saved_environment
+    return results
+
+
+def benchmark_trailer_formats(trailers: int = 10,
+                              download_bytes: int = 8 * 1024 * 1024,
+                              download_seconds: float = 0.05) -> List[Result]:
+    """
+    Trailer downloads (VideoDownloader.get_video against the youtube_dl
+    stand-in, which offers 360p to 1080p formats as YouTube does,
+    download_bytes being the size of the 1080p one) under several
+    trailer_quality settings, display heights and trailer cache sizes, with
+    and without ffmpeg to merge video and audio. Reports bytes and download
+    time per trailer, how many trailers fit in a GB of cache and how many
+    exceeded their share of the cache.
+
+    :param trailers: Downloaded for each scenario
+    :param download_bytes: Size of the 1080p format
+    :param download_seconds: Time to download the 1080p format
+    :return:
+    """
+    import youtube_dl
+    import backend.video_downloader as video_downloader
+    from backend.trailer_format_policy import TrailerFormatPolicy
+    from backend.video_downloader import VideoDownloader
+    from common.movie_constants import MovieField
+    from common.settings import Settings
+    from diagnostics.spans import Spans
+
+    source: str = MovieField.TMDB_SOURCE
+    folder: str = os.path.join(kodi_harness_state.translate_path('special://temp'),
+                               'formats')
+    os.makedirs(folder, exist_ok=True)
+    delays = video_downloader.DOWNLOAD_VIDEO_DELAY_BY_SOURCE
+    saved_delay = delays[source]
+    saved_bytes: int = youtube_dl.YoutubeDL.download_bytes
+    saved_seconds: float = youtube_dl.YoutubeDL.download_seconds
+    saved_audio_bytes: int = TrailerFormatPolicy.AUDIO_BYTES
+    delays[source] = (0.0, 0.0)
+    youtube_dl.YoutubeDL.download_bytes = download_bytes
+    youtube_dl.YoutubeDL.download_seconds = download_seconds
+
+    # The stand-in's formats are smaller than YouTube's, so is its audio
+
+    TrailerFormatPolicy.AUDIO_BYTES = (download_bytes
+                                       // youtube_dl.YoutubeDL.AUDIO_FRACTION)
+
+    # name, trailer_quality index (see Settings.get_trailer_quality),
+    # display height, MB of trailer cache (0 for no cache), its limit of
+    # trailers (0 for none), whether ffmpeg is installed
+
+    scenarios = (('best_available', 3, '', 0, 0, True),
+                 ('quality_720p', 1, '', 0, 0, True),
+                 ('quality_480p', 0, '', 0, 0, True),
+                 ('best_on_720p_display', 3, '720', 0, 0, True),
+                 ('1080p_in_2gb_cache', 2, '', 2048, 0, True),
+                 ('1080p_in_2gb_cache_of_500', 2, '', 2048, 500, True),
+                 ('1080p_in_2gb_cache_of_1000', 2, '', 2048, 1000, True),
+                 # 720p video alone fits its share, with its audio it doesn't
+                 ('720p_in_2gb_cache_of_560', 1, '', 2048, 560, True),
+                 ('quality_720p_without_ffmpeg', 1, '', 0, 0, False))
+    settings: Dict[str, str] = {
+        Settings.TRAILER_QUALITY: '',
+        Settings.ENABLE_TRAILER_CACHE: 'false',
+        Settings.LIMIT_CACHED_TRAILERS: 'true',
+        Settings.LIMIT_SIZE_OF_CACHED_TRAILERS: 'true',
+        Settings.MAX_SIZE_OF_CACHED_TRAILERS: '',
+        Settings.LIMIT_PERCENT_OF_CACHED_TRAILERS: 'false',
+        Settings.LIMIT_NUMBER_OF_CACHED_TRAILERS: 'false',
+        Settings.MAX_NUMBER_OF_CACHED_TRAILERS: ''}
+    addon = Settings.get_addon().addon
+    saved_settings: Dict[str, str] = {name: addon.getSetting(name)
+                                      for name in settings}
+
+    results: List[Result] = []
+    try:
+        for (name, quality, display_height, cache_mb, cache_trailers,
+             merge) in scenarios:
+            youtube_dl.YoutubeDL.merger_available = merge
+            TrailerFormatPolicy.clear()
+            settings[Settings.TRAILER_QUALITY] = str(quality)
+            settings[Settings.ENABLE_TRAILER_CACHE] = str(cache_mb > 0).lower()
+            settings[Settings.MAX_SIZE_OF_CACHED_TRAILERS] = str(cache_mb)
+            settings[Settings.LIMIT_NUMBER_OF_CACHED_TRAILERS] = str(
+                cache_trailers > 0).lower()
+            settings[Settings.MAX_NUMBER_OF_CACHED_TRAILERS] = str(cache_trailers)
+            for setting, value in settings.items():
+                addon.setSetting(setting, value)
+            Settings.reload_settings()
+            kodi_harness_state.info_labels['System.ScreenHeight'] = display_height
+
+            transferred_before: int = youtube_dl.YoutubeDL.transferred_bytes
+            sizes: List[int] = []
+            start: float = time.perf_counter()
+            for index in range(trailers):
+                url: str = f'https://www.youtube.com/watch?v=format{index:05d}'
+                rc, movie = VideoDownloader().get_video(
+                    url, folder, f'{name}_{index}', f'Trailer {index}', source)
+                if rc == 0 and movie is not None:
+                    sizes.append(os.path.getsize(movie[MovieField.TRAILER]))
+                    os.remove(movie[MovieField.TRAILER])
+            elapsed: float = time.perf_counter() - start
+            transferred: int = youtube_dl.YoutubeDL.transferred_bytes - transferred_before
+            bytes_per_trailer: int = sum(sizes) // max(len(sizes), 1)
+            cache_budget: int = TrailerFormatPolicy.get_cache_budget()
+            results.append({'benchmark': f'trailer_formats.{name}',
+                            'trailers': trailers,
+                            'completed': len(sizes),
+                            'target_height': TrailerFormatPolicy.get_target_height(),
+                            'cache_budget': cache_budget,
+                            'over_budget': sum(1 for size in sizes
+                                               if 0 < cache_budget < size),
+                            'format': TrailerFormatPolicy.get_format(source),
+                            'seconds': elapsed,
+                            'seconds_per_trailer': elapsed / trailers,
+                            'transferred_bytes': transferred,
+                            'bytes_per_trailer': bytes_per_trailer,
+                            'trailers_per_gb': (1024 * 1024 * 1024 // bytes_per_trailer
+                                                if bytes_per_trailer > 0 else 0)})
+        results.append({'benchmark': 'trailer_formats.report',
+                        'formats': Spans.get_report()['trailer_formats']['formats']})
+    finally:
+        for setting, value in saved_settings.items():
+            addon.setSetting(setting, value)
+        Settings.reload_settings()
+        kodi_harness_state.info_labels.pop('System.ScreenHeight', None)
+        youtube_dl.YoutubeDL.merger_available = True
+        TrailerFormatPolicy.clear()
+        delays[source] = saved_delay
+        youtube_dl.YoutubeDL.download_bytes = saved_bytes
+        youtube_dl.YoutubeDL.download_seconds = saved_seconds
+        TrailerFormatPolicy.AUDIO_BYTES = saved_audio_bytes
+    return results
+
+
+def benchmark_definition_loading(bundle: bool) -> Result:
+    """
+    Startup cost of the genre and certification definitions: importing
+    their modules and loading them, as the add-on does on first use. Only
+    meaningful in a fresh process (see scale_suite.run_startup), as they
+    are loaded once per process.
+
+    :param bundle: When False, the definition bundles are removed first,
+                   so the definitions are built from their XML (and the
+                   bundles written again), as on the first start
+    :return:
+    """
+    from common.definition_bundle import DefinitionBundle
+
+    names: Tuple[str, ...] = ('certifications', 'genres')
+    if not bundle:
+        for name in names:
+            try:
+                os.remove(DefinitionBundle.get_bundle_path(name))
+            except FileNotFoundError:
+                pass
+    bundled: bool = all(os.path.exists(DefinitionBundle.get_bundle_path(name))
+                        for name in names)
+
+    start: float = time.perf_counter()
+    from backend.genreutils import GenreUtils
+    from common.certification import WorldCertifications
+
+    certifications = WorldCertifications.get_certifications()
+    genres: List[Any] = GenreUtils.get_all_genres()
+    seconds: float = time.perf_counter() - start
+    return {'benchmark': 'startup.definitions',
+            'bundle': bundled,
+            'seconds': seconds,
+            'xmltodict_imported': 'xmltodict' in sys.modules,
+            'certifications_found': certifications is not None,
+            'genres': len(genres)}
+
+
+def run_micro_benchmarks(scale: float = 1.0) -> List[Result]:
+    """
+    :param scale: Multiplies the number of operations of every benchmark
+    :return:
+    """
+    results: List[Result] = []
+    results.extend(benchmark_settings_reads(int(200000 * scale)))
+    results.extend(benchmark_logging(int(100000 * scale)))
+    results.extend(benchmark_shuffle_bag(int(50000 * scale)))
+    results.extend(benchmark_latency_histogram(int(200000 * scale)))
+    results.extend(benchmark_warm_pool(max(int(500 * scale), 10)))
+    results.extend(benchmark_download_scheduler(max(int(40 * scale), 8)))
+    results.extend(benchmark_download_resume(max(int(10 * scale), 2)))
+    results.extend(benchmark_youtube_dl_pool(max(int(24 * scale), 8)))
+    results.extend(benchmark_trailer_formats(max(int(10 * scale), 2)))
+    return results
+
+
+class PipelineBenchmark:
+    """
+    Drives the real pipeline: DiscoveryManager starts the configured
+    discoverers, which feed the fetchers, which fill the playable trailer
+    queues read by PlayableTrailerService.next().
+
+    The library is served by FakeJsonRpc, TMDb and iTunes by a
+    FakeRemoteServer and youtube_dl by the stand-in in kodi_stubs.
+    """
+
+    def __init__(self, environment: KodiEnvironment, movies: SyntheticMovies,
+                 remote_latency_seconds: float = 0.0) -> None:
+        """
+        :param environment: Installed, but the add-on not yet imported
+        :param movies:
+        :param remote_latency_seconds: Simulated round trip for TMDb/iTunes
+        """
+        self._environment: KodiEnvironment = environment
+        self._movies: SyntheticMovies = movies
+        self._server: FakeRemoteServer = FakeRemoteServer(
+            movies, latency_seconds=remote_latency_seconds)
+        self._json_rpc: FakeJsonRpc = None
+        self._started: bool = False
+
+    def start(self) -> None:
+        """
+        Serves the synthetic data, then starts the back end the way
+        back_end_service does
+
+        :return:
+        """
+        trailer_dir: str = os.path.join(self._environment.home, 'trailers')
+        self._movies.write_local_trailers(trailer_dir)
+        self._json_rpc = FakeJsonRpc(self._movies.get_library_movies(trailer_dir))
+        self._environment.set_json_rpc_handler(self._json_rpc)
+        self._environment.redirect_remote_urls(self._server.start())
+
+        import youtube_dl
+        youtube_dl.YoutubeDL.playlists[TFH_PLAYLIST_URL] = \
+            self._movies.get_tfh_playlist()
+
+        self._environment.start_main_loop()
+        import backend_service_worker
+        threading.Thread(target=backend_service_worker.startup_non_main_thread,
+                         name='back_end_service.startup_non_main_thread',
+                         daemon=True).start()
+        self._started = True
+
+    def run(self, trailers: int = 100, timeout: float = 600.0) -> Result:
+        """
+        :param trailers: Number of trailers to fetch after the first one
+        :param timeout: Abort (and report what was measured) after this many
+                        seconds
+        :return:
+        """
+        from common.exceptions import AbortException
+        from diagnostics.spans import LatencyHistogram
+        from diagnostics.startup_trace import StartupTrace
+        from discovery.playable_trailer_service import PlayableTrailerService
+
+        watchdog = threading.Timer(timeout, self._environment.request_abort)
+        watchdog.daemon = True
+        watchdog.start()
+
+        start: float = time.perf_counter()
+        if not self._started:
+            self.start()
+
+        service: PlayableTrailerService = PlayableTrailerService()
+        histogram: LatencyHistogram = LatencyHistogram('next')
+        first_trailer_seconds: float = -1.0
+        fetched: int = 0
+        sources: Dict[str, int] = {}
+        aborted: bool = False
+        steady_start: float = 0.0
+        try:
+            movie = service.next()
+            first_trailer_seconds = time.perf_counter() - start
+            steady_start = time.perf_counter()
+            while fetched < trailers:
+                call_start: float = time.perf_counter()
+                movie = service.next()
+                histogram.record(time.perf_counter() - call_start)
+                fetched += 1
+                source: str = movie.get_source() if movie is not None else 'none'
+                sources[source] = sources.get(source, 0) + 1
+        except AbortException:
+            aborted = True
+        finally:
+            watchdog.cancel()
+
+        steady_seconds: float = (time.perf_counter() - steady_start
+                                 if steady_start > 0.0 else 0.0)
+        latency: Dict[str, Any] = histogram.as_dict()
+        latency.pop('buckets')
+        return {'benchmark': 'pipeline',
+                'library_movies': len(self._movies),
+                'first_trailer_seconds': first_trailer_seconds,
+                'trailers': fetched,
+                'trailers_per_second': (fetched / steady_seconds
+                                        if steady_seconds > 0.0 else 0.0),
+                'next_latency_microseconds': latency,
+                'sources': sources,
+                'json_rpc_calls': dict(self._json_rpc.calls),
+                'remote_requests': dict(self._server.requests),
+                'rss_bytes': get_rss_bytes(),
+                'peak_rss_bytes': get_peak_rss_bytes(),
+                'startup': StartupTrace.get_report(),
+                'aborted': aborted}
+
+    def stop(self) -> None:
+        self._environment.request_abort()
+        self._server.stop()
@@ -0,0 +1,992 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Generates the add-on's persistent caches from a SyntheticMovies catalog,
+using the add-on's own classes so the files have exactly the format the
+add-on reads, and times saving and loading each of them.
+
+The files are left in place, so a later run with the same Kodi home
+starts with populated caches.
+"""
+import datetime
+import os
+import random
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from test.harness.benchmarks import (get_peak_rss_bytes, get_rss_bytes,
+                                     Result)
+from test.harness.synthetic import SyntheticMovies
+
+# Full TMDb detail caches are one file per movie. Reading every one back
+# would dominate the run, a random sample gives the per file cost.
+
+DETAIL_LOAD_SAMPLE: int = 2000
+
+
+def get_file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def time_cache(name: str, populate: Callable[[], int], save: Callable[[], None],
+               unload: Callable[[], None], load: Callable[[], int],
+               path: str) -> Result:
+    """
+    Times one index cache. The caches are class singletons, so populating,
+    unloading and loading work on their class state directly.
+
+    :param name: Benchmark name
+    :param populate: Fills the in-memory cache, returns number of entries
+    :param save: Writes the cache
+    :param unload: Forgets the in-memory cache so that load reads the file
+    :param load: Reads the cache, returns number of entries loaded
+    :param path: Of the cache file
+    :return:
+    """
+    start: float = time.perf_counter()
+    entries: int = populate()
+    populate_seconds: float = time.perf_counter() - start
+
+    start = time.perf_counter()
+    save()
+    save_seconds: float = time.perf_counter() - start
+
+    unload()
+    start = time.perf_counter()
+    loaded: int = load()
+    load_seconds: float = time.perf_counter() - start
+    return {'benchmark': f'cache.{name}',
+            'entries': entries,
+            'loaded_entries': loaded,
+            'file_bytes': get_file_size(path),
+            'populate_seconds': populate_seconds,
+            'save_seconds': save_seconds,
+            'load_seconds': load_seconds}
+
+
+def benchmark_tmdb_details(movies: SyntheticMovies, count: int,
+                           seed: int = 1) -> Result:
+    """
+    Writes a TMDb detail cache file for each of the first count movies,
+    the way TMDbMovieDownloader does after a TMDb query, then reads a
+    sample of them back.
+
+    :param movies:
+    :param count: Number of detail files
+    :param seed: For the choice of the load sample
+    :return:
+    """
+    from cache.cache import Cache
+    from discovery.tmdb_movie_downloader import TMDbMovieDownloader
+
+    count = min(count, len(movies))
+    parse_seconds: float = 0.0
+    save_seconds: float = 0.0
+    detail_bytes: int = 0
+    for index in range(count):
+        tmdb_id: int = movies.get_tmdb_id(index)
+        start: float = time.perf_counter()
+        tmdb_movie = TMDbMovieDownloader.parse_tmdb_movie(
+            movies.get_tmdb_details(tmdb_id), library_id=None)
+        parse_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        Cache.write_tmdb_cache_json(tmdb_movie, library_id=None)
+        save_seconds += time.perf_counter() - start
+
+    sample: List[int] = random.Random(seed).sample(
+        range(count), k=min(count, DETAIL_LOAD_SAMPLE))
+    load_seconds: float = 0.0
+    loaded: int = 0
+    for index in sample:
+        tmdb_id = movies.get_tmdb_id(index)
+        detail_bytes += get_file_size(
+            Cache.get_json_cache_file_path_for_movie_id(tmdb_id))
+        start = time.perf_counter()
+        if Cache.read_tmdb_cache_json(tmdb_id) is not None:
+            loaded += 1
+        load_seconds += time.perf_counter() - start
+
+    return {'benchmark': 'cache.tmdb_details',
+            'entries': count,
+            'loaded_entries': loaded,
+            'file_bytes': (detail_bytes * count // len(sample)
+                           if len(sample) > 0 else 0),
+            'parse_seconds': parse_seconds,
+            'save_seconds': save_seconds,
+            'save_microseconds_per_file': (save_seconds * 1000000.0 / count
+                                           if count > 0 else 0.0),
+            'load_sample': len(sample),
+            'load_microseconds_per_file': (load_seconds * 1000000.0 / len(sample)
+                                           if len(sample) > 0 else 0.0)}
+
+
+def benchmark_trailer_indexes(movies: SyntheticMovies,
+                              tfh_count: int) -> List[Result]:
+    """
+    TMDb, library and TFH trailer indexes
+
+    :param movies:
+    :param tfh_count: Number of TFH trailers
+    :return:
+    """
+    from cache.base_trailer_index import BaseTrailerIndex
+    from cache.library_trailer_index import LibraryTrailerIndex
+    from cache.tfh_trailer_index import TFHTrailerIndex
+    from cache.tmdb_trailer_index import TMDbTrailerIndex
+    from common.movie import LibraryMovieId, TFHMovieId, TMDbMovieId
+
+    def make_ids(index_class: Any) -> List[Any]:
+        ids: List[Any] = []
+        stop: int = tfh_count if index_class is TFHTrailerIndex else None
+        for movie in movies.get_movies(0, stop):
+            index: int = movie['index']
+            if index_class is TMDbTrailerIndex:
+                movie_id = TMDbMovieId(str(movies.get_tmdb_id(index)))
+            elif index_class is LibraryTrailerIndex:
+                movie_id = LibraryMovieId(str(index + 1))
+            else:
+                movie_id = TFHMovieId(f'tfh{index:08d}')
+            movie_id.set_tmdb_id(movies.get_tmdb_id(index))
+            movie_id.set_has_trailer(movie['has_trailer'])
+            ids.append(movie_id)
+        return ids
+
+    from cache.movie_catalog import MovieCatalog
+
+    results: List[Result] = []
+    for name, index_class in (('tmdb_trailer_index', TMDbTrailerIndex),
+                              ('library_trailer_index', LibraryTrailerIndex),
+                              ('tfh_trailer_index', TFHTrailerIndex)):
+        index_class: BaseTrailerIndex
+        movie_ids: List[Any] = make_ids(index_class)
+
+        # Each add is its own transaction, time a sample of them and add the
+        # rest in one transaction
+
+        sample: int = min(len(movie_ids), 1000)
+        add_seconds: List[float] = []
+
+        def populate() -> int:
+            index_class.load_cache()
+            for movie_id in movie_ids[:sample]:
+                start: float = time.perf_counter()
+                index_class.add(movie_id)
+                add_seconds.append(time.perf_counter() - start)
+            with MovieCatalog.transaction():
+                for movie_id in movie_ids[sample:]:
+                    index_class.add(movie_id)
+            return len(index_class._cache)
+
+        def unload() -> None:
+            with index_class._lock:
+                index_class._cache = {}
+                index_class._cache_loaded = False
+
+        def load() -> int:
+            index_class.load_cache()
+            return len(index_class._cache)
+
+        result: Result = time_cache(name, populate,
+                                    lambda: index_class.save_cache(flush=True),
+                                    unload, load, MovieCatalog.get_catalog_path())
+        result['add_seconds_mean'] = sum(add_seconds) / max(len(add_seconds), 1)
+        results.append(result)
+    return results
+
+
+def benchmark_tfh_index(movies: SyntheticMovies, tfh_count: int) -> Result:
+    """
+    The TFH index (tfh_trailers.json), built from the TFH playlist the way
+    DiscoverTFHMovies does
+
+    :param movies:
+    :param tfh_count:
+    :return:
+    """
+    from cache.tfh_cache import TFHCache
+    from common.movie import TFHMovie
+    from common.movie_constants import MovieField
+    from common.settings import Settings
+    from discovery.utils.parse_tfh import ParseTFH
+
+    def populate() -> int:
+        TFHCache.load_cache()  # Marks TFHCache initialized
+        tfh_movies: Dict[str, TFHMovie] = {}
+        for entry in movies.get_tfh_playlist(limit=tfh_count):
+            # What VideoDownloader's TfhIndexLogger hands to
+            # DiscoverTFHMovies for each playlist entry
+
+            tfh_trailer: Dict[str, Any] = {
+                MovieField.SOURCE: MovieField.TFH_SOURCE,
+                MovieField.YOUTUBE_ID: entry['id'],
+                MovieField.TITLE: entry['title'],
+                MovieField.YEAR: 0,
+                MovieField.TRAILER: f'https://youtu.be/{entry["id"]}',
+                MovieField.DISCOVERY_STATE: MovieField.NOT_FULLY_DISCOVERED}
+            parser = ParseTFH(tfh_trailer, -1)
+            tfh_id: str = parser.parse_id()
+            parser.parse_title()
+            parser.parse_tfh_title()
+            parser.parse_trailer_type()
+            parser.parse_trailer_path()
+            parser.parse_discovery_state()
+            parser.parse_certification()
+            parser.parse_thumbnail()
+            parser.parse_plot()
+            parser.parse_rating()
+            parser.parse_year()
+            parser.parse_runtime()
+            tfh_movies[tfh_id] = parser.get_movie()
+        TFHCache.add_movies(tfh_movies, total=len(tfh_movies))
+        return len(TFHCache.get_cached_movies())
+
+    def unload() -> None:
+        TFHCache._cached_movies = {}
+
+    def load() -> int:
+        TFHCache.load_cache()
+        return len(TFHCache.get_cached_movies())
+
+    return time_cache('tfh_index', populate,
+                      lambda: TFHCache.save_cache(flush=True, complete=True),
+                      unload, load,
+                      os.path.join(Settings.get_remote_db_cache_path(), 'index',
+                                   'tfh_trailers.json'))
+
+
+def benchmark_tfh_index_refresh(movies: SyntheticMovies, tfh_count: int,
+                                new_entries: int = 12,
+                                page_seconds: float = 0.05) -> Result:
+    """
+    Reads the whole TFH playlist the way DiscoverTFHMovies.rebuild_index
+    does, then, after new_entries are published at the head of the
+    playlist, reads only the new ones the way refresh_index does.
+
+    :param movies:
+    :param tfh_count: Entries in the playlist
+    :param new_entries: Entries published between the reads
+    :param page_seconds: Simulated time to fetch a page of the playlist
+    :return:
+    """
+    import youtube_dl
+    from backend.video_downloader import VideoDownloader
+    from common.movie_constants import MovieField, MovieType
+    from test.harness.synthetic import TFH_PLAYLIST_URL
+
+    playlist: List[Dict[str, Any]] = movies.get_tfh_playlist(limit=tfh_count)
+    known_ids: set = set()
+    found_ids: List[str] = []
+
+    def rebuild_handler(tfh_trailers: List[MovieType]) -> bool:
+        for tfh_trailer in tfh_trailers:
+            known_ids.add(tfh_trailer[MovieField.YOUTUBE_ID])
+        return False
+
+    def refresh_handler(tfh_trailers: List[MovieType]) -> bool:
+        for tfh_trailer in tfh_trailers:
+            tfh_id: str = tfh_trailer[MovieField.YOUTUBE_ID]
+            if tfh_id in known_ids:
+                return True
+            found_ids.append(tfh_id)
+        return False
+
+    def read(handler: Callable[[List[MovieType]], bool],
+             incremental: bool) -> Tuple[float, int]:
+        # Don't time the delay between YouTube requests
+        VideoDownloader._last_youtube_request_timestamp = datetime.datetime(
+            1990, 1, 1)
+        pages_before: int = youtube_dl.YoutubeDL.page_requests
+        downloader: VideoDownloader = VideoDownloader()
+        start: float = time.perf_counter()
+        downloader.get_tfh_index(TFH_PLAYLIST_URL, handler, block=True,
+                                 incremental=incremental)
+        return (time.perf_counter() - start,
+                youtube_dl.YoutubeDL.page_requests - pages_before)
+
+    saved_playlist: List[Dict[str, Any]] = youtube_dl.YoutubeDL.playlists.get(
+        TFH_PLAYLIST_URL)
+    saved_info_seconds: float = youtube_dl.YoutubeDL.info_seconds
+    youtube_dl.YoutubeDL.info_seconds = page_seconds
+    try:
+        youtube_dl.YoutubeDL.playlists[TFH_PLAYLIST_URL] = playlist
+        rebuild_seconds, rebuild_requests = read(rebuild_handler, False)
+
+        published: List[Dict[str, Any]] = []
+        for index in range(new_entries):
+            entry: Dict[str, Any] = dict(playlist[index % len(playlist)])
+            entry['id'] = entry['url'] = f'tfhnew{index:05d}'
+            published.append(entry)
+        youtube_dl.YoutubeDL.playlists[TFH_PLAYLIST_URL] = published + playlist
+        refresh_seconds, refresh_requests = read(refresh_handler, True)
+    finally:
+        youtube_dl.YoutubeDL.info_seconds = saved_info_seconds
+        if saved_playlist is None:
+            del youtube_dl.YoutubeDL.playlists[TFH_PLAYLIST_URL]
+        else:
+            youtube_dl.YoutubeDL.playlists[TFH_PLAYLIST_URL] = saved_playlist
+
+    return {'benchmark': 'tfh.index_refresh',
+            'entries': len(playlist),
+            'new_entries': new_entries,
+            'rebuild_seconds': rebuild_seconds,
+            'rebuild_requests': rebuild_requests,
+            'rebuild_entries': len(known_ids),
+            'refresh_seconds': refresh_seconds,
+            'refresh_requests': refresh_requests,
+            'refresh_entries': len(found_ids),
+            'refresh_correct': found_ids == [entry['id'] for entry in published]}
+
+
+def benchmark_tfh_index_parse(movies: SyntheticMovies,
+                              tfh_count: int) -> Result:
+    """
+    Cost of turning the TFH playlist, as read by youtube-dl, into the
+    MovieTypes handed to DiscoverTFHMovies: a full get_tfh_index with
+    no simulated network time and a handler which does nothing. Memory is
+    the peak of Python allocations during the read (tracemalloc).
+
+    :param movies:
+    :param tfh_count: Entries in the playlist
+    :return:
+    """
+    import youtube_dl
+    from backend.video_downloader import VideoDownloader
+    from common.movie_constants import MovieType
+    from test.harness.synthetic import TFH_PLAYLIST_URL
+
+    playlist: List[Dict[str, Any]] = movies.get_tfh_playlist(limit=tfh_count)
+    entries: int = 0
+    batches: int = 0
+
+    def handler(tfh_trailers: List[MovieType]) -> bool:
+        nonlocal entries, batches
+        entries += len(tfh_trailers)
+        batches += 1
+        return False
+
+    saved_playlist: List[Dict[str, Any]] = youtube_dl.YoutubeDL.playlists.get(
+        TFH_PLAYLIST_URL)
+    saved_info_seconds: float = youtube_dl.YoutubeDL.info_seconds
+    youtube_dl.YoutubeDL.info_seconds = 0.0
+    try:
+        youtube_dl.YoutubeDL.playlists[TFH_PLAYLIST_URL] = playlist
+        VideoDownloader._last_youtube_request_timestamp = datetime.datetime(
+            1990, 1, 1)
+        tracemalloc.start()
+        start: float = time.perf_counter()
+        VideoDownloader().get_tfh_index(TFH_PLAYLIST_URL, handler, block=True)
+        elapsed: float = time.perf_counter() - start
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        youtube_dl.YoutubeDL.info_seconds = saved_info_seconds
+        if saved_playlist is None:
+            del youtube_dl.YoutubeDL.playlists[TFH_PLAYLIST_URL]
+        else:
+            youtube_dl.YoutubeDL.playlists[TFH_PLAYLIST_URL] = saved_playlist
+
+    return {'benchmark': 'tfh.index_parse',
+            'entries': len(playlist),
+            'handled_entries': entries,
+            'batches': batches,
+            'seconds': elapsed,
+            'entries_per_second': entries / elapsed if elapsed > 0.0 else 0.0,
+            'peak_traced_bytes': peak_traced}
+
+
+def benchmark_reverse_indexes(movies: SyntheticMovies) -> List[Result]:
+    """
+    library id -> TMDb id and TFH id -> TMDb id reverse indexes
+
+    :param movies:
+    :return:
+    """
+    from cache.library_json_cache import LibraryJsonCache
+    from cache.tmdb_json_cache import TMDbJsonCache
+
+    from cache.movie_catalog import MovieCatalog
+
+    results: List[Result] = []
+    for name, cache_class in (('tmdb_json_cache', TMDbJsonCache),
+                              ('library_json_cache', LibraryJsonCache)):
+
+        def populate() -> int:
+            with MovieCatalog.transaction():
+                for index in range(len(movies)):
+                    cache_class.add_item(str(index + 1),
+                                         str(movies.get_tmdb_id(index)))
+            return len(cache_class.get_all_ids())
+
+        def unload() -> None:
+            with cache_class._lock:
+                cache_class._cache_loaded = False
+
+        def load() -> int:
+            return len(cache_class.get_all_ids())
+
+        results.append(time_cache(name, populate,
+                                  lambda: cache_class.save_cache(flush=True),
+                                  unload, load, MovieCatalog.get_catalog_path()))
+    return results
+
+
+def benchmark_catalog_lookups(movies: SyntheticMovies,
+                              lookups: int = 10000) -> Result:
+    """
+    Cross-source lookups in the MovieCatalog, after the trailer and reverse
+    index benchmarks have filled it: every source's entry for a TMDb id,
+    and a TMDb id from title and year.
+
+    :param movies:
+    :param lookups:
+    :return:
+    """
+    from cache.movie_catalog import MovieCatalog
+    from common.movie import TMDbMovie
+
+    lookups = min(lookups, len(movies))
+    with MovieCatalog.transaction():
+        for movie in movies.get_movies(0, lookups):
+            tmdb_movie: TMDbMovie = TMDbMovie()
+            tmdb_movie.set_id(str(movies.get_tmdb_id(movie['index'])))
+            tmdb_movie.set_title(movie['title'])
+            tmdb_movie.set_year(movie['year'])
+            MovieCatalog.update_details(tmdb_movie)
+
+    start: float = time.perf_counter()
+    sources: int = 0
+    for index in range(lookups):
+        sources += len(MovieCatalog.get_movie_ids_for_tmdb_id(
+            movies.get_tmdb_id(index)))
+    by_tmdb_id_seconds: float = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found: int = 0
+    for movie in movies.get_movies(0, lookups):
+        if MovieCatalog.find_tmdb_id(title=movie['title'],
+                                     year=movie['year']) is not None:
+            found += 1
+    by_title_seconds: float = time.perf_counter() - start
+    return {'benchmark': 'cache.catalog_lookups',
+            'lookups': lookups,
+            'sources_per_tmdb_id': sources / max(lookups, 1),
+            'by_tmdb_id_seconds': by_tmdb_id_seconds,
+            'titles_found': found,
+            'by_title_year_seconds': by_title_seconds,
+            'file_bytes': get_file_size(MovieCatalog.get_catalog_path())}
+
+
+def benchmark_title_resolver(movies: SyntheticMovies,
+                             lookups: int = 10000) -> Result:
+    """
+    TMDbTitleResolver: recording TMDb titles in the catalog and resolving
+    titles as TFH, iTunes and library movies without ids present them:
+    exact, with the year off by one, without a year (but with a runtime),
+    punctuated, and titles TMDb has not been asked about: with another
+    word, a sequel number or an added leading article with no year (which
+    must not resolve).
+
+    :param movies:
+    :param lookups:
+    :return:
+    """
+    from backend.tmdb_title_resolver import TMDbTitleResolver
+    from cache.movie_catalog import MovieCatalog
+    from diagnostics.statistics import Statistics
+
+    start: float = time.perf_counter()
+    MovieCatalog.add_tmdb_titles(
+        (movies.get_tmdb_id(movie['index']), movie['title'], movie['year'],
+         movie['runtime']) for movie in movies.get_movies())
+    record_seconds: float = time.perf_counter() - start
+
+    rng: random.Random = random.Random(movies.seed)
+    queries: List[Tuple[str, Any, int, Any]] = []
+    for i in range(min(lookups, len(movies))):
+        movie: Dict[str, Any] = movies.get_movie(rng.randrange(len(movies)))
+        tmdb_id: int = movies.get_tmdb_id(movie['index'])
+        variant: int = i % 7
+        if variant == 0:
+            queries.append((movie['title'], movie['year'], movie['runtime'],
+                            tmdb_id))
+        elif variant == 1:
+            queries.append((movie['title'], movie['year'] + 1, 0, tmdb_id))
+        elif variant == 2:
+            queries.append((movie['title'], None, movie['runtime'], tmdb_id))
+        elif variant == 3:
+            queries.append((movie['title'].replace(' ', ': ', 1).upper(),
+                            movie['year'], movie['runtime'], tmdb_id))
+        elif variant == 4:
+            queries.append((f'{movie["title"]} Returns', movie['year'], 0,
+                            None))
+        elif variant == 5:
+            queries.append((f'{movie["title"]} III', movie['year'], 0, None))
+        else:
+            queries.append((f'The {movie["title"]}', None, movie['runtime'],
+                            None))
+
+    before: Dict[str, Any] = Statistics.get_tmdb_title_resolver_counts()
+    wrong: int = 0
+    start = time.perf_counter()
+    for title, year, runtime, expected in queries:
+        tmdb_id = TMDbTitleResolver.resolve(title, year, runtime)
+        if tmdb_id is not None and tmdb_id != expected:
+            wrong += 1
+    resolve_seconds: float = time.perf_counter() - start
+    after: Dict[str, Any] = Statistics.get_tmdb_title_resolver_counts()
+
+    hits: int = after['hits'] - before['hits']
+    return {'benchmark': 'cache.tmdb_title_resolver',
+            'titles': len(movies),
+            'record_seconds': record_seconds,
+            'lookups': len(queries),
+            'hits': hits,
+            'misses': after['misses'] - before['misses'],
+            'hit_rate': hits / max(len(queries), 1),
+            'wrong': wrong,
+            'resolve_seconds_mean': resolve_seconds / max(len(queries), 1)}
+
+
+def benchmark_tmdb_search_cache(movies: SyntheticMovies, searches: int = 45,
+                                entries: int = 60000) -> Result:
+    """
+    TMDbSearchCache: TMDb title searches made by
+    TMDBUtils.get_tmdb_id_from_title_year against a FakeRemoteServer, for
+    titles TMDb has and has not, then the same lookups again as after a
+    restart. Then the time to evict the least recently used searches beyond
+    MAXIMUM_ENTRIES.
+
+    The fake server scans its whole catalog for each search, so the
+    searches are made against a small catalog of its own. Its titles differ
+    from those of movies, which TMDbTitleResolver would otherwise answer.
+
+    :param movies:
+    :param searches:
+    :param entries: Searches recorded before eviction
+    :return:
+    """
+    from backend.tmdb_utils import TMDBUtils
+    from cache.movie_catalog import MovieCatalog
+    from cache.tmdb_search_cache import TMDbSearchCache
+    from test.harness.fake_remote_server import FakeRemoteServer
+    from test.harness.kodi_environment import KodiEnvironment
+
+    remote: SyntheticMovies = SyntheticMovies(1000, seed=movies.seed + 7919)
+    server: FakeRemoteServer = FakeRemoteServer(remote)
+    KodiEnvironment.redirect_remote_urls(server.start())
+    try:
+        # Two thirds are on TMDb
+
+        queries: List[Tuple[str, int]] = []
+        for index in range(searches):
+            movie: Dict[str, Any] = remote.get_movie(index)
+            title: str = movie['title']
+            if index % 3 == 2:
+                title = f'{title} Unreleased'
+            queries.append((title, movie['year']))
+
+        MovieCatalog.remove_search_results(float('inf'), float('inf'), 0)
+        runs: List[Dict[str, Any]] = []
+        for run in ('first', 'second'):
+            searched_before: int = server.requests.get('/3/search/movie', 0)
+            found: int = 0
+            start: float = time.perf_counter()
+            for title, year in queries:
+                if TMDBUtils.get_tmdb_id_from_title_year(title, year) is not None:
+                    found += 1
+            runs.append({'run': run,
+                         'found': found,
+                         'tmdb_searches': (server.requests.get('/3/search/movie', 0)
+                                           - searched_before),
+                         'seconds_mean': (time.perf_counter() - start)
+                                         / max(len(queries), 1)})
+    finally:
+        server.stop()
+
+    with MovieCatalog.transaction():
+        now: float = time.time()
+        for index in range(entries):
+            MovieCatalog.put_search_result(f'title {index}||en',
+                                           index if index % 3 else None,
+                                           now - entries + index)
+    start = time.perf_counter()
+    evicted: int = MovieCatalog.remove_search_results(
+        now - TMDbSearchCache.FOUND_EXPIRE_DAYS * TMDbSearchCache.SECONDS_PER_DAY,
+        now - TMDbSearchCache.NOT_FOUND_EXPIRE_DAYS * TMDbSearchCache.SECONDS_PER_DAY,
+        TMDbSearchCache.MAXIMUM_ENTRIES)
+    evict_seconds: float = time.perf_counter() - start
+
+    return {'benchmark': 'cache.tmdb_search_cache',
+            'queries': len(queries),
+            'runs': runs,
+            'evicted': evicted,
+            'remaining': MovieCatalog.get_number_of_search_results(),
+            'evict_seconds': evict_seconds}
+
+
+def benchmark_itunes_discovery(movies: SyntheticMovies,
+                               page_seconds: float = 0.5,
+                               request_spacing: float = 0.1) -> Result:
+    """
+    DiscoverItunesMovies.run_worker against a FakeRemoteServer's iTunes
+    feed: first with no feature pages cached, then again with the feed
+    unchanged.
+
+    :param movies:
+    :param page_seconds: Simulated time for youtube-dl to fetch a feature
+                         page
+    :param request_spacing: Seconds between iTunes requests, instead of
+                            the add-on's (randomized) delay
+    :return:
+    """
+    import youtube_dl
+    import backend.video_downloader as video_downloader
+    from cache.itunes_detail_cache import ITunesDetailCache
+    from cache.movie_catalog import MovieCatalog
+    from common.movie_constants import MovieField
+    from discovery.discover_itunes_movies import DiscoverItunesMovies
+    from test.harness.fake_remote_server import FakeRemoteServer
+    from test.harness.kodi_environment import KodiEnvironment
+
+    server: FakeRemoteServer = FakeRemoteServer(movies)
+    KodiEnvironment.redirect_remote_urls(server.start())
+    delays: Dict[str, Tuple[float, float]] = video_downloader.DOWNLOAD_INFO_DELAY_BY_SOURCE
+    saved_delay: Tuple[float, float] = delays[MovieField.ITUNES_SOURCE]
+    saved_info_seconds: float = youtube_dl.YoutubeDL.info_seconds
+    delays[MovieField.ITUNES_SOURCE] = (request_spacing, request_spacing)
+    youtube_dl.YoutubeDL.info_seconds = page_seconds
+    result: Result = {'benchmark': 'itunes.discovery',
+                      'page_seconds': page_seconds,
+                      'request_spacing': request_spacing,
+                      'fetch_threads': DiscoverItunesMovies.DETAIL_FETCH_THREADS}
+    try:
+        MovieCatalog.remove_itunes_details(float('inf'))
+        ITunesDetailCache._details = None
+        for run in ('first', 'second'):
+            discoverer: DiscoverItunesMovies = DiscoverItunesMovies()
+            fetched_before: int = youtube_dl.YoutubeDL.info_requests
+            start: float = time.perf_counter()
+            discoverer.run_worker()
+            result[f'{run}_seconds'] = time.perf_counter() - start
+            result[f'{run}_page_fetches'] = (youtube_dl.YoutubeDL.info_requests
+                                             - fetched_before)
+            result[f'{run}_discovered'] = \
+                discoverer._movie_data.get_number_of_movies()
+    finally:
+        delays[MovieField.ITUNES_SOURCE] = saved_delay
+        youtube_dl.YoutubeDL.info_seconds = saved_info_seconds
+        server.stop()
+    return result
+
+
+def benchmark_tmdb_id_sets(movies: SyntheticMovies) -> List[Result]:
+    """
+    TMDb ids known to have trailers and TMDb ids discovered, but not yet
+    fully processed (CacheIndex)
+
+    :param movies:
+    :return:
+    """
+    from cache.tmdb_cache_index import CacheIndex
+    from common.settings import Settings
+
+    index_path: str = os.path.join(Settings.get_remote_db_cache_path(), 'index')
+    with_trailers: List[int] = []
+    unprocessed: List[int] = []
+    for movie in movies.get_movies():
+        tmdb_id: int = movies.get_tmdb_id(movie['index'])
+        if movie['has_trailer']:
+            with_trailers.append(tmdb_id)
+        elif movie['index'] % 2 == 0:
+            unprocessed.append(tmdb_id)
+
+    def populate_found() -> int:
+        with CacheIndex.lock:
+            CacheIndex._found_tmdb_trailer_ids = set(with_trailers)
+            CacheIndex._unsaved_movie_changes = len(with_trailers)
+            return len(CacheIndex._found_tmdb_trailer_ids)
+
+    def unload_found() -> None:
+        CacheIndex._found_tmdb_trailer_ids = set()
+
+    def load_found() -> int:
+        CacheIndex.load_tmdb_ids_with_trailers()
+        return len(CacheIndex._found_tmdb_trailer_ids)
+
+    def populate_unprocessed() -> int:
+        with CacheIndex.lock:
+            CacheIndex._unprocessed_tmdb_trailer_ids = set(unprocessed)
+            CacheIndex._unprocesseed_movie_changes = len(unprocessed)
+            return len(CacheIndex._unprocessed_tmdb_trailer_ids)
+
+    def unload_unprocessed() -> None:
+        CacheIndex._unprocessed_tmdb_trailer_ids = set()
+
+    def load_unprocessed() -> int:
+        CacheIndex.load_unprocessed_movies_cache()
+        return CacheIndex.get_number_of_unprocessed_movies()
+
+    return [time_cache('tmdb_found_trailers', populate_found,
+                       lambda: CacheIndex.save_tmdb_ids_with_trailers(flush=True),
+                       unload_found, load_found,
+                       os.path.join(index_path, 'tmdb_found_trailers.json')),
+            time_cache('tmdb_unprocessed_movies', populate_unprocessed,
+                       lambda: CacheIndex.save_unprocessed_movies_cache(flush=True),
+                       unload_unprocessed, load_unprocessed,
+                       os.path.join(index_path, 'tmdb_unprocessed_movies.json'))]
+
+
+def benchmark_missing_trailers(movies: SyntheticMovies) -> Result:
+    """
+    TMDb ids known NOT to have trailers (TrailerUnavailableCache). Also
+    times looking up every movie, the way TMDb discovery does for every
+    unprocessed movie.
+
+    :param movies:
+    :return:
+    """
+    from cache.trailer_unavailable_cache import TrailerUnavailableCache
+    from common.settings import Settings
+    from diagnostics.statistics import Statistics
+
+    def populate() -> int:
+        TrailerUnavailableCache.load_cache_if_needed()
+        with TrailerUnavailableCache.lock:
+            for movie in movies.get_movies():
+                if not movie['has_trailer']:
+                    TrailerUnavailableCache._missing_tmdb_trailers.add(
+                        movies.get_tmdb_id(movie['index']))
+            return len(TrailerUnavailableCache._missing_tmdb_trailers)
+
+    def unload() -> None:
+        with TrailerUnavailableCache.lock:
+            TrailerUnavailableCache._missing_tmdb_trailers = None
+            TrailerUnavailableCache._missing_library_trailers = None
+            TrailerUnavailableCache._loaded = False
+
+    def load() -> int:
+        TrailerUnavailableCache.load_cache_if_needed()
+        return len(TrailerUnavailableCache._missing_tmdb_trailers)
+
+    result: Result = time_cache(
+        'missing_tmdb_trailers', populate, TrailerUnavailableCache.save_cache,
+        unload, load, os.path.join(Settings.get_remote_db_cache_path(), 'index',
+                                   'missing_tmdb_trailers.ids'))
+
+    before: Dict[str, int] = Statistics.get_missing_trailer_cache_counts()
+    start: float = time.perf_counter()
+    for index in range(len(movies)):
+        TrailerUnavailableCache.is_tmdb_id_missing_trailer(
+            movies.get_tmdb_id(index))
+    lookup_seconds: float = time.perf_counter() - start
+    after: Dict[str, int] = Statistics.get_missing_trailer_cache_counts()
+
+    result['lookups'] = len(movies)
+    result['lookup_seconds'] = lookup_seconds
+    for counter in ('tmdb_hits', 'tmdb_misses', 'tmdb_false_positives'):
+        result[counter] = after[counter] - before[counter]
+    return result
+
+
+def benchmark_play_history(movies: SyntheticMovies) -> Result:
+    """
+    Play history, which is bounded to PlayHistory.MAX_ENTRIES
+
+    :param movies:
+    :return:
+    """
+    from cache.play_history import PlayHistory
+    from common.movie import LibraryMovieId
+
+    def populate() -> int:
+        for index in range(min(len(movies), PlayHistory.MAX_ENTRIES)):
+            PlayHistory.record_play(LibraryMovieId(str(index + 1)))
+
+        # record_play saved every TRAILER_CACHE_FLUSH_UPDATES plays, make
+        # the timed save write everything
+
+        PlayHistory._unsaved_changes = len(PlayHistory._history)
+        return len(PlayHistory._history)
+
+    def unload() -> None:
+        with PlayHistory._lock:
+            PlayHistory._history.clear()
+            PlayHistory._cache_loaded = False
+
+    def load() -> int:
+        PlayHistory.load_cache_if_needed()
+        return len(PlayHistory._history)
+
+    return time_cache('play_history', populate,
+                      lambda: PlayHistory.save_cache(flush=True), unload, load,
+                      str(PlayHistory._cache_path))
+
+
+def benchmark_garbage_collection() -> Result:
+    """
+    One pass of CacheManager's garbage collection: scanning the trailer and
+    json caches, then applying the configured limits.
+
+    The scan deliberately sleeps one second for every file and pattern,
+    and FindFiles waits 0.1 seconds for every file it hands out, so that
+    the scan stays in the background. At these sizes that is hours, so the
+    sleeps and waits are added up rather than taken: scan_seconds is the
+    work done, throttle_seconds and wait_seconds the time they would have
+    added.
+
+    :return:
+    """
+    from cache.cache_manager import CacheData, CacheManager
+    from common import disk_utils
+    from common.monitor import Monitor
+    from common.utils import Delay
+
+    throttle: Dict[str, float] = {'delays': 0, 'delay_seconds': 0.0,
+                                  'wait_seconds': 0.0}
+
+    class CountingDelay(Delay):
+        def __init__(self, bias: float = 0.0, call_scale_factor: float = 1.0,
+                     scale_factor: float = 1.0) -> None:
+            super().__init__(bias=0.0, call_scale_factor=0.0, scale_factor=0.0)
+            self._throttle_bias: float = bias
+
+        def delay(self, bias: float = None, call_scale_factor: float = None,
+                  scale_factor: float = None, timeout: float = None) -> float:
+            throttle['delays'] += 1
+            throttle['delay_seconds'] += self._throttle_bias
+            return super().delay(timeout=0.0)
+
+    class CountingMonitor(Monitor):
+        @classmethod
+        def throw_exception_if_abort_requested(cls, timeout: float = 0) -> None:
+            # FindFiles' own thread spins instead of waiting for room in
+            # its queue, that is not time the scan would have taken
+
+            if timeout and threading.current_thread() is scan_thread:
+                throttle['wait_seconds'] += timeout
+            super().throw_exception_if_abort_requested(timeout=0)
+
+    scan_thread: threading.Thread = threading.current_thread()
+    saved_delay = disk_utils.Delay
+    saved_monitor = disk_utils.Monitor
+    disk_utils.Delay = CountingDelay
+    disk_utils.Monitor = CountingMonitor
+    try:
+        start: float = time.perf_counter()
+        usage_data_map = CacheManager.get_instance().get_stats_for_caches()
+        scan_seconds: float = time.perf_counter() - start
+    finally:
+        disk_utils.Delay = saved_delay
+        disk_utils.Monitor = saved_monitor
+
+    start = time.perf_counter()
+    for cache_type, is_trailer_cache in (('trailer', True), ('json', False)):
+        cache_data: CacheData = CacheData(trailer_cache=is_trailer_cache)
+        cache_data.add_usage_data(usage_data_map[cache_type])
+        cache_data.report_status()
+        cache_data.collect_garbage()
+    sweep_seconds: float = time.perf_counter() - start
+
+    return {'benchmark': 'cache.garbage_collection',
+            'json_files': usage_data_map['json'].get_number_of_files(),
+            'trailer_files': usage_data_map['trailer'].get_number_of_files(),
+            'json_deleted': usage_data_map['json'].get_number_of_deleted_files(),
+            'scan_seconds': scan_seconds,
+            'throttle_delays': throttle['delays'],
+            'throttle_seconds': throttle['delay_seconds'],
+            'wait_seconds': throttle['wait_seconds'],
+            'sweep_seconds': sweep_seconds}
+
+
+def run_cache_benchmarks(movies: SyntheticMovies, tmdb_details: int = None,
+                         tfh_count: int = 3000) -> List[Result]:
+    """
+    :param movies:
+    :param tmdb_details: Number of TMDb detail cache files, default one per
+                         movie
+    :param tfh_count: TFH has a few thousand trailers, regardless of library
+                      size
+    :return:
+    """
+    if tmdb_details is None:
+        tmdb_details = len(movies)
+    tfh_count = min(tfh_count, len(movies))
+    results: List[Result] = [benchmark_tmdb_details(movies, tmdb_details,
+                                                    seed=movies.seed)]
+    results.extend(benchmark_trailer_indexes(movies, tfh_count))
+    results.append(benchmark_tfh_index(movies, tfh_count))
+    results.append(benchmark_tfh_index_refresh(movies, tfh_count))
+    results.append(benchmark_tfh_index_parse(movies, tfh_count))
+    results.extend(benchmark_reverse_indexes(movies))
+    results.append(benchmark_catalog_lookups(movies))
+    results.append(benchmark_title_resolver(movies))
+    results.append(benchmark_tmdb_search_cache(movies))
+    results.append(benchmark_itunes_discovery(movies))
+    results.extend(benchmark_tmdb_id_sets(movies))
+    results.append(benchmark_missing_trailers(movies))
+    results.append(benchmark_play_history(movies))
+    results.append(benchmark_garbage_collection())
+    for result in results:
+        result['movies'] = len(movies)
+    return results
+
+
+def benchmark_tmdb_discovery_memory(movies: SyntheticMovies,
+                                    batch_size: int = 20) -> Result:
+    """
+    Feeds every movie, as TMDb discover page data, into TMDbMovieData the
+    way DiscoverTmdbMovies does, then reports the memory used and how much
+    of the discovery pool was spilled to disk.
+
+    :param movies:
+    :param batch_size: Movies per discover page
+    :return:
+    """
+    from common.movie import TMDbMoviePageData
+    from discovery.tmdb_movie_data import TMDbMovieData
+    from discovery.utils.parse_tmdb_page_data import ParseTMDbPageData
+
+    rss_before: int = get_rss_bytes()
+    start: float = time.perf_counter()
+    movie_data: TMDbMovieData = TMDbMovieData()
+    pages: int = (len(movies) + batch_size - 1) // batch_size
+    for page in range(1, pages + 1):
+        page_movies: List[TMDbMoviePageData] = []
+        page_data: Dict[str, Any] = movies.get_tmdb_discover_page(page, batch_size)
+        for movie_entry in page_data['results']:
+            parser: ParseTMDbPageData = ParseTMDbPageData(movie_entry)
+            parser.parse_tmdb_id()
+            parser.parse_title()
+            parser.parse_year()
+            parser.parse_popularity()
+            parser.parse_original_title()
+            parser.parse_votes()
+            parser.parse_certification()
+            parser.parse_vote_average()
+            parser.parse_genre_ids()
+            parser.parse_original_language()
+            movie: TMDbMoviePageData = parser.get_movie()
+            movie.set_buffer_number(page)
+            movie.set_total_pages(pages)
+            page_movies.append(movie)
+        movie_data.add_to_discovered_movies(page_movies)
+
+    seconds: float = time.perf_counter() - start
+    result: Result = {'benchmark': 'discovery.tmdb_memory',
+                      'movies': len(movies),
+                      'seconds': seconds,
+                      'rss_before_bytes': rss_before,
+                      'rss_bytes': get_rss_bytes(),
+                      'peak_rss_bytes': get_peak_rss_bytes(),
+                      'rss_growth_bytes': get_rss_bytes() - rss_before}
+    result.update(movie_data.get_memory_usage())
+    return result
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+In-process stand-in for Kodi's JSON-RPC library methods, installed as the
+handler for xbmc.executeJSONRPC.
+"""
+import json
+import threading
+from typing import Any, Callable, Dict, List
+
+import kodi_harness_state
+
+from test.harness.synthetic import GENRES
+
+
+class FakeJsonRpc:
+    """
+    Answers the VideoLibrary queries made by the add-on from an in-memory
+    list of movies. Supports the properties, limits and filter parameters
+    (and/or of field rules with the operators is, isnot, contains,
+    doesnotcontain, greaterthan and lessthan).
+    """
+
+    def __init__(self, movies: List[Dict[str, Any]],
+                 latency_seconds: float = 0.0) -> None:
+        """
+        :param movies: Movies with every property, see SyntheticMovies
+        :param latency_seconds: Simulated time for each query
+        """
+        self._movies: List[Dict[str, Any]] = movies
+        self._by_id: Dict[int, Dict[str, Any]] = {movie['movieid']: movie
+                                                  for movie in movies}
+        self._latency_seconds: float = latency_seconds
+        self._lock: threading.Lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self._methods: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            'VideoLibrary.GetMovies': self.get_movies,
+            'VideoLibrary.GetMovieDetails': self.get_movie_details,
+            'VideoLibrary.SetMovieDetails': self.set_movie_details,
+            'VideoLibrary.GetGenres': self.get_genres,
+            'VideoLibrary.GetTags': self.get_tags,
+            'JSONRPC.Ping': lambda params: 'pong'}
+
+    def __call__(self, query: str) -> str:
+        """
+        :param query: JSON-RPC request text
+        :return: JSON-RPC response text
+        """
+        request: Dict[str, Any] = json.loads(query)
+        method: str = request.get('method', '')
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+        if self._latency_seconds > 0.0:
+            kodi_harness_state.abort_event.wait(self._latency_seconds)
+
+        handler = self._methods.get(method)
+        response: Dict[str, Any] = {'id': request.get('id', 1), 'jsonrpc': '2.0'}
+        if handler is None:
+            response['result'] = 'OK'
+        else:
+            try:
+                response['result'] = handler(request.get('params', {}))
+            except KeyError as e:
+                response['error'] = {'code': -32602, 'message': f'Invalid params: {e}'}
+        return json.dumps(response)
+
+    @staticmethod
+    def _project(movie: Dict[str, Any], properties: List[str]) -> Dict[str, Any]:
+        projected: Dict[str, Any] = {'movieid': movie['movieid'],
+                                     'label': movie['label']}
+        for prop in properties:
+            if prop in movie:
+                projected[prop] = movie[prop]
+        return projected
+
+    @classmethod
+    def _matches(cls, movie: Dict[str, Any], rule: Dict[str, Any]) -> bool:
+        if 'and' in rule:
+            return all(cls._matches(movie, sub_rule) for sub_rule in rule['and'])
+        if 'or' in rule:
+            return any(cls._matches(movie, sub_rule) for sub_rule in rule['or'])
+
+        field: str = rule.get('field', '')
+        operator: str = rule.get('operator', 'is')
+        values = rule.get('value', [])
+        if not isinstance(values, list):
+            values = [values]
+        values = [str(value).lower() for value in values]
+
+        actual = movie.get(field, '')
+        actual_values: List[str]
+        if isinstance(actual, list):
+            actual_values = [str(value).lower() for value in actual]
+        else:
+            actual_values = [str(actual).lower()]
+
+        if operator == 'is':
+            return any(value in actual_values for value in values)
+        if operator == 'isnot':
+            return not any(value in actual_values for value in values)
+        if operator == 'contains':
+            return any(value in actual_value for value in values
+                       for actual_value in actual_values)
+        if operator == 'doesnotcontain':
+            return not any(value in actual_value for value in values
+                           for actual_value in actual_values)
+        if operator in ('greaterthan', 'lessthan'):
+            try:
+                number: float = float(actual_values[0])
+                limit: float = float(values[0])
+            except (ValueError, IndexError):
+                return False
+            return number > limit if operator == 'greaterthan' else number < limit
+        return True
+
+    def get_movies(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        properties: List[str] = params.get('properties', [])
+        movie_filter: Dict[str, Any] = params.get('filter')
+        movies: List[Dict[str, Any]] = self._movies
+        if movie_filter is not None:
+            movies = [movie for movie in movies if self._matches(movie, movie_filter)]
+
+        total: int = len(movies)
+        limits: Dict[str, int] = params.get('limits', {})
+        start: int = limits.get('start', 0)
+        end: int = limits.get('end', total)
+        if end < 0:
+            end = total
+        movies = movies[start:end]
+        return {'limits': {'start': start, 'end': start + len(movies),
+                           'total': total},
+                'movies': [self._project(movie, properties) for movie in movies]}
+
+    def get_movie_details(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        movie: Dict[str, Any] = self._by_id[params['movieid']]
+        return {'moviedetails': self._project(movie, params.get('properties', []))}
+
+    def set_movie_details(self, params: Dict[str, Any]) -> str:
+        movie: Dict[str, Any] = self._by_id[params['movieid']]
+        for key, value in params.items():
+            if key != 'movieid':
+                movie[key] = value
+        return 'OK'
+
+    @staticmethod
+    def get_genres(params: Dict[str, Any]) -> Dict[str, Any]:
+        genres: List[Dict[str, Any]] = [{'genreid': index + 1, 'label': genre}
+                                        for index, genre in enumerate(GENRES)]
+        return {'limits': {'start': 0, 'end': len(genres), 'total': len(genres)},
+                'genres': genres}
+
+    @staticmethod
+    def get_tags(params: Dict[str, Any]) -> Dict[str, Any]:
+        return {'limits': {'start': 0, 'end': 1, 'total': 1},
+                'tags': [{'tagid': 1, 'label': 'synthetic'}]}
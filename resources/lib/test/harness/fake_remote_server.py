@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Local HTTP server which impersonates the TMDb api and the iTunes trailer
+feeds, so that remote discovery can be benchmarked without a network or an
+api key.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from test.harness.synthetic import SyntheticMovies
+
+# Discover and the movie lists (popular, top_rated, ...) share a page format
+
+TMDB_LIST_PATHS: Tuple[str, ...] = ('/3/discover/movie', '/3/movie/popular',
+                                    '/3/movie/top_rated', '/3/movie/upcoming',
+                                    '/3/movie/now_playing')
+TMDB_DETAIL_PATTERN = re.compile(r'^/3/movie/(\d+)$')
+
+# Paths are prefixed with the name of the service being impersonated, so
+# that urls still identify their destination (JsonUtilsBasic applies
+# different rate limits to TMDb and iTunes).
+
+TMDB_PREFIX: str = '/themoviedb'
+ITUNES_PREFIX: str = '/apple'
+
+
+class FakeRemoteServer:
+    """
+    Serves, from a SyntheticMovies catalog (paths below TMDB_PREFIX or
+    ITUNES_PREFIX):
+
+        /3/discover/movie?page=N           TMDb discover (and list) pages
+        /3/movie/<tmdb_id>                 TMDb details (404 if unknown)
+        /3/search/movie?query=..&year=..   TMDb title search
+        /trailers/home/feeds/*.json        iTunes feeds
+
+    Every response may be delayed by latency_seconds, and every
+    rate_limit_every'th request answered with 429, to exercise the retry
+    logic.
+    """
+
+    def __init__(self, movies: SyntheticMovies, latency_seconds: float = 0.0,
+                 rate_limit_every: int = 0) -> None:
+        """
+        :param movies:
+        :param latency_seconds: Simulated round trip time
+        :param rate_limit_every: 0 disables simulated 429 responses
+        """
+        self.movies: SyntheticMovies = movies
+        self.latency_seconds: float = latency_seconds
+        self.rate_limit_every: int = rate_limit_every
+        self.requests: Dict[str, int] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self._server: ThreadingHTTPServer = None
+        self._thread: threading.Thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> str:
+        """
+        Starts serving on an ephemeral localhost port
+
+        :return: base url of the server
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                status, body = server.respond(self.path)
+                payload: bytes = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json;charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                if status == 429:
+                    self.send_header('Retry-After', '1')
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='FakeRemoteServer', daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def respond(self, raw_path: str) -> Tuple[int, Any]:
+        """
+        :param raw_path: Request path, with query
+        :return: http status, json body
+        """
+        url = urlparse(raw_path)
+        path: str = url.path
+        for prefix in (TMDB_PREFIX, ITUNES_PREFIX):
+            if path.startswith(prefix):
+                path = path[len(prefix):]
+        query: Dict[str, str] = {key: values[0]
+                                 for key, values in parse_qs(url.query).items()}
+        with self._lock:
+            count: int = self.requests.get(path, 0) + 1
+            self.requests[path] = count
+            total: int = sum(self.requests.values())
+
+        if self.latency_seconds > 0.0:
+            time.sleep(self.latency_seconds)
+
+        if self.rate_limit_every > 0 and total % self.rate_limit_every == 0:
+            return 429, {'status_code': 25,
+                         'status_message': 'Your request count is over the '
+                                           'allowed limit'}
+
+        if path in TMDB_LIST_PATHS:
+            return 200, self.movies.get_tmdb_discover_page(int(query.get('page', 1)))
+
+        match = TMDB_DETAIL_PATTERN.match(path)
+        if match is not None:
+            details: Dict[str, Any] = self.movies.get_tmdb_details(int(match.group(1)))
+            if details is None:
+                return 404, {'status_code': 34,
+                             'status_message': 'The resource you requested '
+                                               'could not be found.'}
+            return 200, details
+
+        if path == '/3/search/movie':
+            return 200, self.search(query.get('query', ''), query.get('year'))
+
+        if path.startswith('/trailers/home/feeds/'):
+            return 200, self.movies.get_itunes_feed()
+
+        return 404, {'status_code': 34, 'status_message': 'Not found'}
+
+    def search(self, title: str, year: str = None) -> Dict[str, Any]:
+        """
+        :param title:
+        :param year:
+        :return: A /3/search/movie response
+        """
+        title = title.lower()
+        results = []
+        for index in range(len(self.movies)):
+            movie: Dict[str, Any] = self.movies.get_movie(index)
+            if movie['title'].lower() != title:
+                continue
+            if year is not None and str(movie['year']) != str(year):
+                continue
+            results.append({'id': self.movies.get_tmdb_id(index),
+                            'title': movie['title'],
+                            'release_date': f'{movie["year"]:04d}-01-01'})
+        return {'page': 1, 'total_pages': 1, 'total_results': len(results),
+                'results': results}
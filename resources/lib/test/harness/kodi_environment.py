@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from typing import Any, Callable, Dict
+
+import kodi_harness_state as state
+import xbmc
+
+# Settings which make the add-on self-contained: only the library is
+# discovered, nothing is cached or normalized and no dialogs are shown.
+# Paths are filled in by KodiEnvironment.
+#
+# Constants.DISABLE_LIBRARY_TRAILERS drops local library trailers, so the
+# library's playable trailers are its trailer urls, served by the youtube_dl
+# stand-in.
+
+HEADLESS_SETTINGS: Dict[str, Any] = {
+    'do_library': True,
+    'do_library_remote_trailers': True,
+    'do_library_no_trailer_info': False,
+    'do_folder': False,
+    'do_tmdb': False,
+    'do_itunes': False,
+    'include_tfh_trailers': False,
+    'use_trailer_cache': False,
+    'use_remote_data_cache': True,
+    'normalize_volume_of_downloaded_trailers': False,
+    'normalize_volume_of_local_trailers': False,
+    'prompt_for_settings': False,
+    'enable_movie_stats': False,
+    'tmdb_api_key': 'harness',
+    'do_debug': False,
+    # The youtube_dl stand-in is configured, and counts, within this process
+    'youtube_dl_workers': 0,
+    # Best available: every download is the stand-in's download_bytes
+    'trailer_quality': 3,
+}
+
+
+class KodiEnvironment:
+    """
+    A throw-away Kodi home directory plus the state behind the Kodi stand-in
+    modules. Must be installed before any add-on module is imported, since
+    many of them read settings and paths at import time.
+
+        environment = KodiEnvironment(settings={'do_tmdb': True})
+        environment.install()
+        environment.redirect_remote_urls(server.start())
+        ...
+        environment.close()
+    """
+
+    def __init__(self, home: str = None, settings: Dict[str, Any] = None,
+                 log_level: int = xbmc.LOGWARNING,
+                 json_rpc_handler: Callable[[str], str] = None) -> None:
+        """
+        :param home: Directory for the fake Kodi home. A temporary directory,
+                     removed by close(), if None.
+        :param settings: Overrides of HEADLESS_SETTINGS
+        :param log_level: Kodi log records below this level are discarded
+        :param json_rpc_handler: Handler for xbmc.executeJSONRPC
+        """
+        self._owns_home: bool = home is None
+        self.home: str = home if home is not None else tempfile.mkdtemp(
+            prefix='rt_harness_')
+        self._settings: Dict[str, Any] = dict(HEADLESS_SETTINGS)
+        if settings is not None:
+            self._settings.update(settings)
+        self._log_level: int = log_level
+        self._json_rpc_handler: Callable[[str], str] = json_rpc_handler
+        self._log_file: io.TextIOBase = None
+        self._main_loop: threading.Thread = None
+
+    @property
+    def addon_data_path(self) -> str:
+        return os.path.join(self.home, 'userdata', 'addon_data', state.ADDON_ID)
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.home, 'kodi.log')
+
+    def install(self) -> 'KodiEnvironment':
+        """
+        :return: self
+        """
+        state.reset()
+        state.kodi_home = self.home
+        for folder in (self.addon_data_path,
+                       os.path.join(self.home, 'temp'),
+                       os.path.join(self.home, 'userdata', 'playlists', 'video'),
+                       os.path.join(self.home, 'addons', 'script.module.youtube.dl',
+                                    'lib')):
+            os.makedirs(folder, exist_ok=True)
+
+        self._settings.setdefault('remote_db_cache_path',
+                                  os.path.join(self.home, 'cache'))
+        self._settings.setdefault('trailer_cache_path',
+                                  os.path.join(self.home, 'trailer_cache'))
+        state.load_default_settings(state.ADDON_ID).update(
+            state.split_settings(self._settings))
+
+        self._log_file = io.open(self.log_path, mode='at', encoding='utf-8',
+                                 buffering=1024 * 1024)
+        state.log_file = self._log_file
+        state.log_level = self._log_level
+        state.json_rpc_handler = self._json_rpc_handler
+        return self
+
+    def set_json_rpc_handler(self, handler: Callable[[str], str]) -> None:
+        self._json_rpc_handler = handler
+        state.json_rpc_handler = handler
+
+    @staticmethod
+    def redirect_remote_urls(base_url: str) -> None:
+        """
+        Points the TMDb and iTunes urls at a FakeRemoteServer. Modules which
+        copied APPLE_URL_PREFIX when imported are changed as well.
+
+        :param base_url: As returned by FakeRemoteServer.start
+        :return:
+        """
+        from backend import backend_constants
+        from backend.backend_constants import iTunes, TMDbConstants
+        from test.harness.fake_remote_server import ITUNES_PREFIX, TMDB_PREFIX
+
+        tmdb: str = f'{base_url}{TMDB_PREFIX}'
+        itunes: str = f'{base_url}{ITUNES_PREFIX}'
+        for name in ('URL_PREFIX', 'FIND_URL', 'SEARCH_URL', 'DISCOVER_ALL_URL',
+                     'DISCOVER_TRAILER_URL'):
+            url: str = getattr(TMDbConstants, name)
+            url = url.replace('https://api.themoviedb.org', tmdb)
+            url = url.replace('http://api.themoviedb.org', tmdb)
+            setattr(TMDbConstants, name, url)
+
+        apple_url_prefix: str = backend_constants.APPLE_URL_PREFIX
+        for module in list(sys.modules.values()):
+            if getattr(module, 'APPLE_URL_PREFIX', None) == apple_url_prefix:
+                module.APPLE_URL_PREFIX = itunes
+        iTunes.TRAILER_BASE_URL = itunes
+
+    def change_settings(self, **values: Any) -> None:
+        """
+        Changes settings and notifies the add-on, as Kodi does when the user
+        saves the settings dialog.
+
+        :param values: setting id -> new value
+        :return:
+        """
+        state.load_default_settings(state.ADDON_ID).update(
+            state.split_settings(values))
+        xbmc.Monitor.notify_settings_changed()
+
+    def start_main_loop(self) -> None:
+        """
+        Polls for abort the way back_end_service's main thread does, so
+        that threads waiting in Monitor see the abort.
+
+        :return:
+        """
+        from common.minimal_monitor import MinimalMonitor
+
+        def loop() -> None:
+            while not MinimalMonitor.real_waitForAbort(timeout=0.05):
+                pass
+
+        self._main_loop = threading.Thread(target=loop, name='KodiMainLoop',
+                                           daemon=True)
+        self._main_loop.start()
+
+    def request_abort(self) -> None:
+        """
+        Simulates Kodi shutting down
+
+        :return:
+        """
+        state.abort_event.set()
+        if self._main_loop is not None:
+            self._main_loop.join(timeout=2.0)
+        elif 'common.minimal_monitor' in sys.modules:
+            # No main loop was polling, poll once so that add-on threads
+            # waiting in Monitor are released
+
+            from common.minimal_monitor import MinimalMonitor
+            MinimalMonitor.real_waitForAbort(timeout=0.0)
+
+    def get_log_records(self) -> int:
+        """
+        :return: Number of records logged through xbmc.log at or above the
+                 log level
+        """
+        return state.log_records
+
+    def close(self) -> None:
+        """
+        Aborts, then removes the fake Kodi home if it was created here
+
+        :return:
+        """
+        self.request_abort()
+        if self._log_file is not None:
+            state.log_file = None
+            self._log_file.close()
+            self._log_file = None
+        if self._owns_home:
+            shutil.rmtree(self.home, ignore_errors=True)
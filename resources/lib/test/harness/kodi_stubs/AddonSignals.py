@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Headless stand-in for script.module.addon.signals. Kodi delivers signals
+between processes as notifications; here they are delivered in-process,
+on a new thread, to every slot registered for the signal.
+"""
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+RECEIVER = None
+
+_slots: Dict[Tuple[str, str], List[Callable[[Any], None]]] = {}
+_lock: threading.Lock = threading.Lock()
+
+
+def registerSlot(signaler_id: str, signal: str,
+                 callback: Callable[[Any], None]) -> None:
+    with _lock:
+        _slots.setdefault((signaler_id, signal), []).append(callback)
+
+
+def unRegisterSlot(signaler_id: str, signal: str) -> None:
+    with _lock:
+        _slots.pop((signaler_id, signal), None)
+
+
+def sendSignal(signal: str, data: Any = None, source_id: str = None,
+               sourceID: str = None) -> None:
+    if source_id is None:
+        source_id = sourceID
+    with _lock:
+        callbacks: List[Callable[[Any], None]] = []
+        for (signaler_id, slot_signal), slot_callbacks in _slots.items():
+            if slot_signal == signal and (source_id is None
+                                          or signaler_id == source_id):
+                callbacks.extend(slot_callbacks)
+
+    for callback in callbacks:
+        threading.Thread(target=callback, args=(data,),
+                         name=f'AddonSignals.{signal}', daemon=True).start()
+
+
+def returnCall(signal: str, data: Any = None, source_id: str = None) -> None:
+    sendSignal(f'_return.{signal}', data=data, source_id=source_id)
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+State shared by the stand-ins for Kodi's python modules (xbmc, xbmcvfs,
+xbmcaddon, xbmcgui, kutils, youtube_dl). KodiEnvironment configures it
+before any add-on module is imported.
+
+Nothing here may import add-on code: these modules sit below the add-on
+on sys.path.
+"""
+import io
+import os
+import re
+import threading
+import xml.etree.ElementTree as ElementTree
+from typing import Any, Callable, Dict, Optional
+
+# Root of the add-on (the directory containing addon.xml)
+
+ADDON_ROOT: str = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', '..'))
+ADDON_ID: str = 'script.video.randomtrailers'
+
+# Root of the fake Kodi home. special:// paths are mapped beneath it.
+
+kodi_home: str = ''
+
+# Settings of every installed add-on, keyed by add-on id
+
+addon_settings: Dict[str, Dict[str, str]] = {}
+
+# Handler for xbmc.executeJSONRPC: query text -> response text
+
+json_rpc_handler: Optional[Callable[[str], str]] = None
+
+abort_event: threading.Event = threading.Event()
+
+# Values returned by xbmc.getInfoLabel
+
+info_labels: Dict[str, str] = {}
+
+log_lock: threading.Lock = threading.Lock()
+log_file: Optional[io.TextIOBase] = None
+log_level: int = 0
+log_records: int = 0
+
+_localized_strings: Dict[int, str] = {}
+
+
+def translate_path(path: str) -> str:
+    """
+    Maps a special:// path to the fake Kodi home, in the same way as
+    Kodi's xbmcvfs.translatePath.
+
+    :param path:
+    :return:
+    """
+    if not path.startswith('special://'):
+        return path
+
+    remainder: str = path[len('special://'):]
+    root, _, rest = remainder.partition('/')
+    if root in ('profile', 'masterprofile', 'userdata'):
+        base = os.path.join(kodi_home, 'userdata')
+    elif root == 'home':
+        if rest.startswith(f'addons/{ADDON_ID}'):
+            rest = rest[len(f'addons/{ADDON_ID}'):].lstrip('/')
+            base = ADDON_ROOT
+        else:
+            base = kodi_home
+    elif root == 'temp':
+        base = os.path.join(kodi_home, 'temp')
+    elif root == 'xbmc':
+        base = os.path.join(kodi_home, 'xbmc')
+    else:
+        base = os.path.join(kodi_home, root)
+
+    translated: str = os.path.join(base, rest) if rest else base
+    if path.endswith('/') and not translated.endswith(os.sep):
+        translated += os.sep
+    return translated
+
+
+def get_addon_path(addon_id: str) -> str:
+    """
+    :param addon_id:
+    :return: Installation directory of the add-on
+    """
+    if addon_id == ADDON_ID:
+        return ADDON_ROOT
+    return os.path.join(kodi_home, 'addons', addon_id)
+
+
+def load_default_settings(addon_id: str) -> Dict[str, str]:
+    """
+    Reads the default value of every setting from the add-on's
+    resources/settings.xml. Values are kept as Kodi stores them: strings,
+    with booleans as 'true' | 'false'.
+
+    :param addon_id:
+    :return:
+    """
+    settings: Dict[str, str] = addon_settings.get(addon_id)
+    if settings is not None:
+        return settings
+
+    settings = {}
+    settings_path: str = os.path.join(get_addon_path(addon_id), 'resources',
+                                      'settings.xml')
+    if os.path.exists(settings_path):
+        tree = ElementTree.parse(settings_path)
+        for setting in tree.iter('setting'):
+            setting_id: str = setting.get('id')
+            if setting_id is None:
+                continue
+            default = setting.find('default')
+            value: str = ''
+            if default is not None and default.text is not None:
+                value = default.text.strip()
+            settings[setting_id] = value
+
+    addon_settings[addon_id] = settings
+    return settings
+
+
+def get_localized_string(string_id: int) -> str:
+    """
+    :param string_id:
+    :return: The en_gb text for the message id, or '' if unknown
+    """
+    if len(_localized_strings) == 0:
+        po_path: str = os.path.join(ADDON_ROOT, 'resources', 'language',
+                                    'resource.language.en_gb', 'strings.po')
+        if os.path.exists(po_path):
+            with io.open(po_path, mode='rt', encoding='utf-8') as po_file:
+                text: str = po_file.read()
+            pattern = re.compile(r'msgctxt "#(\d+)"\s*\nmsgid "(.*)"')
+            for match in pattern.finditer(text):
+                _localized_strings[int(match.group(1))] = match.group(2)
+
+    return _localized_strings.get(string_id, '')
+
+
+def write_log(msg: str, level: int) -> None:
+    """
+    :param msg:
+    :param level:
+    :return:
+    """
+    global log_records
+    if level < log_level:
+        return
+
+    with log_lock:
+        log_records += 1
+        if log_file is not None:
+            log_file.write(f'{threading.current_thread().name} '
+                           f'{level}: {msg}\n')
+
+
+def get_addon_versions() -> Dict[str, str]:
+    """
+    :return: id -> version of the add-on under test
+    """
+    versions: Dict[str, str] = {}
+    tree = ElementTree.parse(os.path.join(ADDON_ROOT, 'addon.xml'))
+    root = tree.getroot()
+    versions[root.get('id')] = root.get('version')
+    return versions
+
+
+def get_addon_info(addon_id: str, key: str) -> str:
+    """
+    :param addon_id:
+    :param key: Any of the keys accepted by xbmcaddon.Addon.getAddonInfo
+    :return:
+    """
+    if key == 'id':
+        return addon_id
+    if key == 'path':
+        return get_addon_path(addon_id)
+    if key == 'profile':
+        return f'special://profile/addon_data/{addon_id}/'
+    if key == 'version':
+        return get_addon_versions().get(addon_id, '1.0.0')
+    if key == 'name':
+        return addon_id
+    if key in ('icon', 'fanart'):
+        return os.path.join(get_addon_path(addon_id), f'{key}.png')
+    return ''
+
+
+def reset() -> None:
+    """
+    Forgets everything, so that a new environment can be configured
+
+    :return:
+    """
+    global json_rpc_handler, log_file, log_records
+    addon_settings.clear()
+    json_rpc_handler = None
+    abort_event.clear()
+    log_file = None
+    log_records = 0
+
+
+def split_settings(values: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Converts python values to the string form Kodi stores
+
+    :param values:
+    :return:
+    """
+    converted: Dict[str, str] = {}
+    for key, value in values.items():
+        if isinstance(value, bool):
+            converted[key] = 'true' if value else 'false'
+        elif isinstance(value, (list, tuple)):
+            converted[key] = '|'.join(str(item) for item in value)
+        else:
+            converted[key] = str(value)
+    return converted
+
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Headless stand-in for the script.module.kutils package
+"""
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Headless stand-in for kutils.addon, which describes the running add-on
+"""
+from kutils.kodiaddon import Addon
+
+_addon: Addon = Addon()
+
+ADDON = _addon.addon
+ID: str = _addon.ID
+ICON: str = _addon.ICON
+NAME: str = _addon.NAME
+FANART: str = _addon.FANART
+PATH: str = _addon.PATH
+VERSION: str = _addon.VERSION
+DATA_PATH: str = _addon.DATA_PATH
+MEDIA_PATH: str = _addon.MEDIA_PATH
+
+
+def setting(setting_name: str) -> str:
+    return _addon.setting(setting_name)
+
+
+def set_setting(setting_name: str, string: str) -> None:
+    _addon.set_setting(setting_name, string)
+
+
+def bool_setting(setting_name: str) -> bool:
+    return _addon.bool_setting(setting_name)
+
+
+def LANG(label_id: int) -> str:
+    return _addon.LANG(label_id)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Headless stand-in for kutils.kodiaddon
+"""
+import os
+
+import xbmcaddon
+import xbmcvfs
+
+
+class Addon:
+    """
+    Wrapper around xbmcaddon.Addon, as provided by kutils
+    """
+
+    def __init__(self, addon_id: str = None) -> None:
+        if addon_id is None:
+            self.addon = xbmcaddon.Addon()
+        else:
+            self.addon = xbmcaddon.Addon(addon_id)
+        self.ID: str = self.addon.getAddonInfo('id')
+        self.ICON: str = self.addon.getAddonInfo('icon')
+        self.NAME: str = self.addon.getAddonInfo('name')
+        self.FANART: str = self.addon.getAddonInfo('fanart')
+        self.PATH: str = self.addon.getAddonInfo('path')
+        self.VERSION: str = self.addon.getAddonInfo('version')
+        self.DATA_PATH: str = xbmcvfs.translatePath(
+            f'special://profile/addon_data/{self.ID}')
+        self.MEDIA_PATH: str = os.path.join(self.PATH, 'resources', 'media')
+
+    def setting(self, setting_name: str) -> str:
+        return self.addon.getSetting(setting_name)
+
+    def set_setting(self, setting_name: str, string: str) -> None:
+        self.addon.setSetting(setting_name, string)
+
+    def bool_setting(self, setting_name: str) -> bool:
+        return self.addon.getSetting(setting_name) == 'true'
+
+    def reload_addon(self) -> None:
+        self.addon = xbmcaddon.Addon(self.ID)
+
+    def LANG(self, label_id: int) -> str:
+        return self.addon.getLocalizedString(label_id)
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Headless stand-in for Kodi's xbmc module. Only the parts used by the
+add-on are provided. Behavior follows the Kodi 19 (Matrix) python API.
+"""
+import time
+from typing import Any, List
+
+import kodi_harness_state as state
+
+LOGDEBUG: int = 0
+LOGINFO: int = 1
+LOGWARNING: int = 2
+LOGERROR: int = 3
+LOGFATAL: int = 4
+LOGNONE: int = 5
+
+ISO_639_1: int = 0
+ISO_639_2: int = 1
+ENGLISH_NAME: int = 2
+
+PLAYLIST_MUSIC: int = 0
+PLAYLIST_VIDEO: int = 1
+
+
+def log(msg: str, level: int = LOGDEBUG) -> None:
+    state.write_log(msg, level)
+
+
+def sleep(time_ms: int) -> None:
+    state.abort_event.wait(time_ms / 1000.0)
+
+
+def executeJSONRPC(jsonrpccommand: str) -> str:
+    if state.json_rpc_handler is None:
+        return '{"id": 1, "jsonrpc": "2.0", "result": "OK"}'
+    return state.json_rpc_handler(jsonrpccommand)
+
+
+def executebuiltin(function: str, wait: bool = False) -> None:
+    log(f'executebuiltin: {function}', LOGDEBUG)
+
+
+def getCondVisibility(condition: str) -> bool:
+    return False
+
+
+def getInfoLabel(cLine: str) -> str:
+    return state.info_labels.get(cLine, '')
+
+
+def getLanguage(format: int = ENGLISH_NAME, region: bool = False) -> str:
+    if format == ISO_639_1:
+        return 'en-us' if region else 'en'
+    if format == ISO_639_2:
+        return 'eng'
+    return 'English'
+
+
+def getFreeMem() -> int:
+    return 1024
+
+
+def getSkinDir() -> str:
+    return 'skin.estuary'
+
+
+def getUserAgent() -> str:
+    return 'Kodi/19.0 (X11; Linux x86_64) headless harness'
+
+
+class Monitor:
+    """
+    Abort is signalled by the harness through kodi_harness_state.abort_event.
+    Settings changes are delivered by KodiEnvironment.change_settings calling
+    onSettingsChanged on every live Monitor.
+    """
+    _instances: List['Monitor'] = []
+
+    def __init__(self) -> None:
+        Monitor._instances.append(self)
+
+    def waitForAbort(self, timeout: float = -1) -> bool:
+        if timeout is None or timeout < 0:
+            state.abort_event.wait()
+            return True
+        return state.abort_event.wait(timeout)
+
+    def abortRequested(self) -> bool:
+        return state.abort_event.is_set()
+
+    def onSettingsChanged(self) -> None:
+        pass
+
+    def onNotification(self, sender: str, method: str, data: str) -> None:
+        pass
+
+    def onScreensaverActivated(self) -> None:
+        pass
+
+    def onScreensaverDeactivated(self) -> None:
+        pass
+
+    @classmethod
+    def notify_settings_changed(cls) -> None:
+        for monitor in list(cls._instances):
+            monitor.onSettingsChanged()
+
+
+class InfoTagVideo:
+    def __init__(self, *args: Any) -> None:
+        self._title: str = ''
+
+    def getTitle(self) -> str:
+        return self._title
+
+    def getFile(self) -> str:
+        return ''
+
+
+class InfoTagMusic:
+    def __init__(self, *args: Any) -> None:
+        pass
+
+
+class InfoTagRadioRDS:
+    def __init__(self, *args: Any) -> None:
+        pass
+
+
+class PlayList:
+    def __init__(self, playList: int = PLAYLIST_VIDEO) -> None:
+        self._items: List[Any] = []
+        self._position: int = -1
+
+    def add(self, url: str, listitem: Any = None, index: int = -1) -> None:
+        if index < 0:
+            self._items.append((url, listitem))
+        else:
+            self._items.insert(index, (url, listitem))
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._position = -1
+
+    def size(self) -> int:
+        return len(self._items)
+
+    def getposition(self) -> int:
+        return self._position
+
+    def getPlayListId(self) -> int:
+        return PLAYLIST_VIDEO
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index: int) -> Any:
+        return self._items[index][1]
+
+
+class Player:
+    """
+    Plays nothing. Playing a file completes immediately, after delivering
+    the callbacks Kodi would.
+    """
+
+    def __init__(self) -> None:
+        self._playing_file: str = ''
+        self._started: float = 0.0
+
+    def play(self, item: Any = '', listitem: Any = None,
+             windowed: bool = False, startpos: int = -1) -> None:
+        self._playing_file = item if isinstance(item, str) else ''
+        self._started = time.time()
+        self.onAVStarted()
+        self._playing_file = ''
+        self.onPlayBackEnded()
+
+    def stop(self) -> None:
+        self._playing_file = ''
+        self.onPlayBackStopped()
+
+    def pause(self) -> None:
+        pass
+
+    def playnext(self) -> None:
+        pass
+
+    def isPlaying(self) -> bool:
+        return self._playing_file != ''
+
+    def isPlayingVideo(self) -> bool:
+        return self.isPlaying()
+
+    def isPlayingAudio(self) -> bool:
+        return False
+
+    def getPlayingFile(self) -> str:
+        return self._playing_file
+
+    def getTime(self) -> float:
+        return time.time() - self._started if self.isPlaying() else 0.0
+
+    def getTotalTime(self) -> float:
+        return 0.0
+
+    def getVideoInfoTag(self) -> InfoTagVideo:
+        return InfoTagVideo()
+
+    def getMusicInfoTag(self) -> InfoTagMusic:
+        return InfoTagMusic()
+
+    def getRadioRDSInfoTag(self) -> InfoTagRadioRDS:
+        return InfoTagRadioRDS()
+
+    def seekTime(self, seekTime: float) -> None:
+        pass
+
+    def showSubtitles(self, bVisible: bool) -> None:
+        pass
+
+    def onPlayBackStarted(self) -> None:
+        pass
+
+    def onAVStarted(self) -> None:
+        pass
+
+    def onAVChange(self) -> None:
+        pass
+
+    def onPlayBackEnded(self) -> None:
+        pass
+
+    def onPlayBackStopped(self) -> None:
+        pass
+
+    def onPlayBackError(self) -> None:
+        pass
+
+    def onPlayBackPaused(self) -> None:
+        pass
+
+    def onPlayBackResumed(self) -> None:
+        pass
+
+    def onQueueNextItem(self) -> None:
+        pass
+
+    def onPlayBackSpeedChanged(self, speed: int) -> None:
+        pass
+
+    def onPlayBackSeek(self, time: int, seekOffset: int) -> None:
+        pass
+
+    def onPlayBackSeekChapter(self, chapter: int) -> None:
+        pass
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Headless stand-in for Kodi's xbmcaddon module. Settings start from the
+defaults in the add-on's settings.xml and may be overridden by the
+harness.
+"""
+import kodi_harness_state as state
+
+
+class Addon:
+    def __init__(self, id: str = None) -> None:
+        self._id: str = id if id is not None else state.ADDON_ID
+        self._settings = state.load_default_settings(self._id)
+
+    def getAddonInfo(self, id: str) -> str:
+        return state.get_addon_info(self._id, id)
+
+    def getLocalizedString(self, id: int) -> str:
+        return state.get_localized_string(id)
+
+    def getSetting(self, id: str) -> str:
+        return self._settings.get(id, '')
+
+    def getSettingBool(self, id: str) -> bool:
+        return self._settings.get(id, 'false') == 'true'
+
+    def getSettingInt(self, id: str) -> int:
+        value: str = self._settings.get(id, '0')
+        return int(float(value)) if value else 0
+
+    def getSettingNumber(self, id: str) -> float:
+        value: str = self._settings.get(id, '0')
+        return float(value) if value else 0.0
+
+    def getSettingString(self, id: str) -> str:
+        return self._settings.get(id, '')
+
+    def setSetting(self, id: str, value: str) -> None:
+        self._settings[id] = value
+
+    def setSettingBool(self, id: str, value: bool) -> bool:
+        self._settings[id] = 'true' if value else 'false'
+        return True
+
+    def setSettingInt(self, id: str, value: int) -> bool:
+        self._settings[id] = str(value)
+        return True
+
+    def setSettingNumber(self, id: str, value: float) -> bool:
+        self._settings[id] = str(value)
+        return True
+
+    def setSettingString(self, id: str, value: str) -> bool:
+        self._settings[id] = value
+        return True
+
+    def openSettings(self) -> None:
+        pass
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Headless stand-in for Kodi's xbmcgui module. Windows and controls accept
+every call and display nothing. Action ids are those of Kodi 19.
+"""
+from typing import Any, Dict, List
+
+ACTION_BUILT_IN_FUNCTION: int = 122
+ACTION_ENTER: int = 135
+ACTION_JUMP_SMS2: int = 142
+ACTION_JUMP_SMS3: int = 143
+ACTION_JUMP_SMS4: int = 144
+ACTION_JUMP_SMS5: int = 145
+ACTION_JUMP_SMS6: int = 146
+ACTION_JUMP_SMS7: int = 147
+ACTION_JUMP_SMS8: int = 148
+ACTION_JUMP_SMS9: int = 149
+ACTION_MOVE_DOWN: int = 4
+ACTION_MOVE_LEFT: int = 1
+ACTION_MOVE_RIGHT: int = 2
+ACTION_MOVE_UP: int = 3
+ACTION_NAV_BACK: int = 92
+ACTION_NEXT_ITEM: int = 14
+ACTION_PAGE_DOWN: int = 6
+ACTION_PAGE_UP: int = 5
+ACTION_PAUSE: int = 12
+ACTION_PLAYER_PLAY: int = 79
+ACTION_PREVIOUS_MENU: int = 10
+ACTION_PREV_ITEM: int = 15
+ACTION_QUEUE_ITEM: int = 34
+ACTION_SELECT_ITEM: int = 7
+ACTION_SHOW_GUI: int = 18
+ACTION_SHOW_INFO: int = 11
+ACTION_STOP: int = 13
+REMOTE_0: int = 58
+REMOTE_1: int = 59
+REMOTE_2: int = 60
+REMOTE_3: int = 61
+REMOTE_4: int = 62
+REMOTE_5: int = 63
+REMOTE_6: int = 64
+REMOTE_7: int = 65
+REMOTE_8: int = 66
+REMOTE_9: int = 67
+
+
+def getCurrentWindowId() -> int:
+    return 10000
+
+
+def getCurrentWindowDialogId() -> int:
+    return 9999
+
+
+class Action:
+    def __init__(self, action_id: int = 0, button_code: int = 0) -> None:
+        self._id: int = action_id
+        self._button_code: int = button_code
+
+    def getId(self) -> int:
+        return self._id
+
+    def getButtonCode(self) -> int:
+        return self._button_code
+
+    def getAmount1(self) -> float:
+        return 0.0
+
+    def getAmount2(self) -> float:
+        return 0.0
+
+
+class ListItem:
+    def __init__(self, label: str = '', label2: str = '', path: str = '',
+                 offscreen: bool = False) -> None:
+        self._label: str = label
+        self._label2: str = label2
+        self._path: str = path
+        self._properties: Dict[str, str] = {}
+        self._info: Dict[str, Any] = {}
+        self._art: Dict[str, str] = {}
+
+    def getLabel(self) -> str:
+        return self._label
+
+    def setLabel(self, label: str) -> None:
+        self._label = label
+
+    def getLabel2(self) -> str:
+        return self._label2
+
+    def setLabel2(self, label: str) -> None:
+        self._label2 = label
+
+    def getPath(self) -> str:
+        return self._path
+
+    def setPath(self, path: str) -> None:
+        self._path = path
+
+    def setInfo(self, type: str, infoLabels: Dict[str, Any]) -> None:
+        self._info.update(infoLabels)
+
+    def setArt(self, dictionary: Dict[str, str]) -> None:
+        self._art.update(dictionary)
+
+    def getArt(self, key: str) -> str:
+        return self._art.get(key, '')
+
+    def setProperty(self, key: str, value: str) -> None:
+        self._properties[key.lower()] = value
+
+    def getProperty(self, key: str) -> str:
+        return self._properties.get(key.lower(), '')
+
+
+class Control:
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self._id: int = 0
+        self._visible: bool = True
+        self._label: str = ''
+        self._items: List[Any] = []
+
+    def __getattr__(self, name: str) -> Any:
+        # Any setter or query not explicitly modelled does nothing
+
+        def no_op(*args: Any, **kwargs: Any) -> None:
+            return None
+        return no_op
+
+    def getId(self) -> int:
+        return self._id
+
+    def setVisible(self, visible: bool) -> None:
+        self._visible = visible
+
+    def isVisible(self) -> bool:
+        return self._visible
+
+    def setLabel(self, label: str = '', *args: Any, **kwargs: Any) -> None:
+        self._label = label
+
+    def getLabel(self) -> str:
+        return self._label
+
+    def setText(self, text: str) -> None:
+        self._label = text
+
+    def getText(self) -> str:
+        return self._label
+
+    def addItem(self, item: Any) -> None:
+        self._items.append(item)
+
+    def reset(self) -> None:
+        self._items.clear()
+
+
+class ControlButton(Control):
+    pass
+
+
+class ControlEdit(Control):
+    pass
+
+
+class ControlFadeLabel(Control):
+    pass
+
+
+class ControlGroup(Control):
+    pass
+
+
+class ControlImage(Control):
+    pass
+
+
+class ControlLabel(Control):
+    pass
+
+
+class ControlList(Control):
+    pass
+
+
+class ControlProgress(Control):
+    pass
+
+
+class ControlRadioButton(Control):
+    pass
+
+
+class ControlSlider(Control):
+    pass
+
+
+class ControlSpin(Control):
+    pass
+
+
+class ControlTextBox(Control):
+    pass
+
+
+class Window:
+    def __init__(self, existingWindowId: int = -1) -> None:
+        self._controls: Dict[int, Control] = {}
+        self._properties: Dict[str, str] = {}
+
+    def show(self) -> None:
+        pass
+
+    def doModal(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def setFocus(self, control: Control) -> None:
+        pass
+
+    def setFocusId(self, control_id: int) -> None:
+        pass
+
+    def getFocusId(self) -> int:
+        return 0
+
+    def getControl(self, iControlId: int) -> Control:
+        return self._controls.setdefault(iControlId, Control())
+
+    def addControl(self, pControl: Control) -> None:
+        pass
+
+    def removeControl(self, pControl: Control) -> None:
+        pass
+
+    def setProperty(self, key: str, value: str) -> None:
+        self._properties[key.lower()] = value
+
+    def getProperty(self, key: str) -> str:
+        return self._properties.get(key.lower(), '')
+
+    def clearProperty(self, key: str) -> None:
+        self._properties.pop(key.lower(), None)
+
+    def onAction(self, action: Action) -> None:
+        pass
+
+    def onClick(self, controlId: int) -> None:
+        pass
+
+    def onFocus(self, controlId: int) -> None:
+        pass
+
+    def onInit(self) -> None:
+        pass
+
+
+class WindowDialog(Window):
+    pass
+
+
+class WindowXML(Window):
+    def __init__(self, xmlFilename: str = '', scriptPath: str = '',
+                 defaultSkin: str = 'Default', defaultRes: str = '720p',
+                 isMedia: bool = False) -> None:
+        super().__init__()
+
+
+class WindowXMLDialog(WindowXML):
+    pass
+
+
+class Dialog:
+    def ok(self, heading: str, message: str) -> bool:
+        return True
+
+    def yesno(self, heading: str, message: str, *args: Any, **kwargs: Any) -> bool:
+        return False
+
+    def notification(self, heading: str, message: str, *args: Any,
+                     **kwargs: Any) -> None:
+        pass
+
+    def select(self, heading: str, items: List[Any], *args: Any,
+               **kwargs: Any) -> int:
+        return -1
+
+
+class DialogProgress:
+    def create(self, heading: str, message: str = '') -> None:
+        pass
+
+    def update(self, percent: int, message: str = '') -> None:
+        pass
+
+    def iscanceled(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Headless stand-in for Kodi's xbmcvfs module, backed by the local file
+system. special:// paths are mapped beneath the harness's fake Kodi home.
+"""
+import io
+import os
+import shutil
+from typing import List, Tuple
+
+import kodi_harness_state as state
+
+
+def translatePath(path: str) -> str:
+    return state.translate_path(path)
+
+
+def validatePath(path: str) -> str:
+    return os.path.normpath(path) + (os.sep if path.endswith(('/', '\\')) else '')
+
+
+def makeLegalFilename(filename: str) -> str:
+    return filename.replace(':', '_')
+
+
+def exists(path: str) -> bool:
+    return os.path.exists(translatePath(path))
+
+
+def mkdir(path: str) -> bool:
+    try:
+        os.mkdir(translatePath(path))
+        return True
+    except OSError:
+        return False
+
+
+def mkdirs(path: str) -> bool:
+    os.makedirs(translatePath(path), exist_ok=True)
+    return True
+
+
+def delete(file: str) -> bool:
+    try:
+        os.remove(translatePath(file))
+        return True
+    except OSError:
+        return False
+
+
+def rmdir(path: str, force: bool = False) -> bool:
+    try:
+        if force:
+            shutil.rmtree(translatePath(path))
+        else:
+            os.rmdir(translatePath(path))
+        return True
+    except OSError:
+        return False
+
+
+def copy(strSource: str, strDestination: str) -> bool:
+    shutil.copyfile(translatePath(strSource), translatePath(strDestination))
+    return True
+
+
+def rename(file: str, newFile: str) -> bool:
+    os.replace(translatePath(file), translatePath(newFile))
+    return True
+
+
+def listdir(path: str) -> Tuple[List[str], List[str]]:
+    path = translatePath(path)
+    dirs: List[str] = []
+    files: List[str] = []
+    for entry in os.scandir(path):
+        if entry.is_dir():
+            dirs.append(entry.name)
+        else:
+            files.append(entry.name)
+    return dirs, files
+
+
+class Stat:
+    def __init__(self, path: str) -> None:
+        self._stat = os.stat(translatePath(path))
+
+    def st_size(self) -> int:
+        return self._stat.st_size
+
+    def st_mtime(self) -> int:
+        return int(self._stat.st_mtime)
+
+
+class File:
+    def __init__(self, filepath: str, mode: str = None) -> None:
+        file_mode: str = 'wb' if mode == 'w' else 'rb'
+        self._file = io.open(translatePath(filepath), mode=file_mode)
+
+    def read(self, numBytes: int = -1) -> str:
+        return self._file.read(numBytes).decode('utf-8')
+
+    def readBytes(self, numBytes: int = -1) -> bytearray:
+        return bytearray(self._file.read(numBytes))
+
+    def write(self, buffer: str) -> bool:
+        if isinstance(buffer, str):
+            buffer = buffer.encode('utf-8')
+        self._file.write(buffer)
+        return True
+
+    def size(self) -> int:
+        position: int = self._file.tell()
+        self._file.seek(0, io.SEEK_END)
+        size: int = self._file.tell()
+        self._file.seek(position)
+        return size
+
+    def seek(self, seekBytes: int, iWhence: int = 0) -> int:
+        return self._file.seek(seekBytes, iWhence)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> 'File':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Headless stand-in for youtube_dl. Nothing is fetched from the network:
+downloads write DOWNLOAD_BYTES of filler to the requested template after
+a simulated delay, and report progress and json the same way youtube_dl
+does (progress_hooks and the logger's debug method). Downloads beyond
+max_concurrent_downloads fail with HTTP Error 429, as from an overloaded
+site.
+
+As youtube_dl does, a download is written to a '.part' file which is
+renamed when complete. With continuedl, an existing '.part' file is resumed
+rather than downloaded again. A download (once) stops after
+interrupt_after_bytes, as a dropped connection does.
+
+Every video is offered as YouTube offers it: video only formats of
+FORMAT_HEIGHTS, an audio only format and a single file (video and audio)
+format of the smallest height. iTunes feature pages offer single file
+formats of every height. The format option is honored (see
+select_format). Merging a video and an audio format needs ffmpeg, present
+when merger_available (see postprocessor.FFmpegMergerPP).
+
+Playlists (such as the TFH index) are served from YoutubeDL.playlists,
+which the harness fills with synthetic entries. As with YouTube, a playlist
+is fetched a page (PLAYLIST_PAGE_SIZE entries) at a time; playlistrandom
+fetches every page before the first entry is reported, otherwise pages are
+fetched as the entries are reached. extract_info with process=False returns
+the playlist's entries as a generator which fetches pages as it is
+consumed.
+
+info_cpu_seconds of busy work (holding the GIL, as youtube_dl's extractors
+do) precede each video's information. The stand-in also runs in
+youtube-dl worker processes, where its settings are read from the
+RT_HARNESS_YOUTUBE_DL environment variable (json, attribute -> value); its
+counters only count the worker's own work.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import kodi_harness_state as state
+from youtube_dl.utils import DownloadError
+
+__version__: str = '2021.12.17'
+
+
+class YoutubeDL:
+    # Simulated time to fetch a video's information and to download it
+
+    info_seconds: float = 0.0
+    info_cpu_seconds: float = 0.0
+    download_seconds: float = 0.0
+    download_bytes: int = 64 * 1024
+
+    # url -> entries reported for the url, one json line per entry
+
+    playlists: Dict[str, List[Dict[str, Any]]] = {}
+
+    # urls (or youtube ids) which fail as 'Video unavailable'
+
+    unavailable: Set[str] = set()
+
+    PLAYLIST_PAGE_SIZE: int = 30
+
+    # Heights of the video formats offered for every video. download_bytes
+    # is the size of the largest, the others are smaller in proportion to
+    # their pixels. The audio format is AUDIO_FRACTION of download_bytes.
+
+    FORMAT_HEIGHTS: Tuple[int, ...] = (360, 480, 720, 1080)
+    AUDIO_FRACTION: int = 32
+
+    # Whether ffmpeg, to merge video and audio formats, is installed
+
+    merger_available: bool = True
+
+    # Downloads which may run at once before the 'site' answers 429,
+    # 0 for no limit
+
+    max_concurrent_downloads: int = 0
+    active_downloads: int = 0
+    too_many_requests: int = 0
+    _active_lock: threading.Lock = threading.Lock()
+
+    # When non-zero, the next download fails after writing this many bytes
+
+    interrupt_after_bytes: int = 0
+
+    downloads: int = 0
+    info_requests: int = 0
+    page_requests: int = 0
+    transferred_bytes: int = 0
+    resumed_bytes: int = 0
+
+    def __init__(self, params: Dict[str, Any] = None) -> None:
+        self.params: Dict[str, Any] = params if params is not None else {}
+
+    def __enter__(self) -> 'YoutubeDL':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+    def _debug(self, line: str) -> None:
+        logger = self.params.get('logger')
+        if logger is not None:
+            logger.debug(line)
+
+    def _hooks(self) -> List[Callable[[Dict[str, Any]], None]]:
+        return self.params.get('progress_hooks', [])
+
+    def _error(self, line: str) -> None:
+        logger = self.params.get('logger')
+        if logger is not None:
+            logger.error(line)
+        raise DownloadError(line)
+
+    @staticmethod
+    def extract() -> None:
+        """
+        Spends info_cpu_seconds of CPU, in python, as extraction does
+        """
+        deadline: float = time.thread_time() + YoutubeDL.info_cpu_seconds
+        while time.thread_time() < deadline:
+            sum(range(1000))
+
+    @staticmethod
+    def get_format_bytes(height: int) -> int:
+        largest: int = YoutubeDL.FORMAT_HEIGHTS[-1]
+        return int(YoutubeDL.download_bytes * height * height / (largest * largest))
+
+    @staticmethod
+    def get_formats(url: str) -> List[Dict[str, Any]]:
+        """
+        :param url:
+        :return: The formats offered for the video
+        """
+        if '/trailers/' in url:
+            return [{'format_id': f'hd{height}', 'url': url, 'ext': 'mp4',
+                     'height': height, 'width': height * 16 // 9,
+                     'vcodec': 'avc1', 'acodec': 'mp4a',
+                     'filesize': YoutubeDL.get_format_bytes(height)}
+                    for height in YoutubeDL.FORMAT_HEIGHTS]
+
+        audio_bytes: int = YoutubeDL.download_bytes // YoutubeDL.AUDIO_FRACTION
+        smallest: int = YoutubeDL.FORMAT_HEIGHTS[0]
+        formats: List[Dict[str, Any]] = [
+            {'format_id': f'sd{smallest}', 'url': url, 'ext': 'mp4',
+             'height': smallest, 'width': smallest * 16 // 9,
+             'vcodec': 'avc1', 'acodec': 'mp4a',
+             'filesize': YoutubeDL.get_format_bytes(smallest) + audio_bytes},
+            {'format_id': 'audio', 'url': url, 'ext': 'm4a', 'height': None,
+             'width': None, 'vcodec': 'none', 'acodec': 'mp4a',
+             'filesize': audio_bytes}]
+        formats.extend({'format_id': f'hd{height}', 'url': url, 'ext': 'mp4',
+                        'height': height, 'width': height * 16 // 9,
+                        'vcodec': 'avc1', 'acodec': 'none',
+                        'filesize': YoutubeDL.get_format_bytes(height)}
+                       for height in YoutubeDL.FORMAT_HEIGHTS)
+        return formats
+
+    @staticmethod
+    def select_single_format(spec: str, formats: List[Dict[str, Any]]
+                             ) -> Optional[Dict[str, Any]]:
+        """
+        :param spec: best, worst, bestvideo, worstvideo, bestaudio,
+                     worstaudio or a format_id, with numeric filters such
+                     as [height>=720] or [filesize<=?1000]
+        :param formats:
+        :return: The selected format, None when none matches
+        """
+        match = re.fullmatch(r'([\w-]+)((?:\[[^\]]+\])*)', spec)
+        if match is None:
+            raise DownloadError(f'ERROR: Invalid format specification {spec}')
+
+        choice: str = match.group(1)
+        candidates: List[Dict[str, Any]]
+        if choice in ('best', 'worst'):
+            candidates = [f for f in formats
+                          if f['vcodec'] != 'none' and f['acodec'] != 'none']
+        elif choice in ('bestvideo', 'worstvideo'):
+            candidates = [f for f in formats
+                          if f['vcodec'] != 'none' and f['acodec'] == 'none']
+        elif choice in ('bestaudio', 'worstaudio'):
+            candidates = [f for f in formats
+                          if f['vcodec'] == 'none' and f['acodec'] != 'none']
+        else:
+            candidates = [f for f in formats if f['format_id'] == choice]
+        candidates.sort(key=lambda f: (f.get('height') or 0, f.get('filesize') or 0))
+
+        for condition in re.findall(r'\[([^\]]+)\]', match.group(2)):
+            key, operator, unknown_ok, value = re.fullmatch(
+                r'(\w+)\s*(<=|>=|<|>|=|!=)(\?)?\s*(\d+)', condition).groups()
+            compare: Callable[[Any, Any], bool] = {
+                '<=': lambda a, b: a <= b, '>=': lambda a, b: a >= b,
+                '<': lambda a, b: a < b, '>': lambda a, b: a > b,
+                '=': lambda a, b: a == b, '!=': lambda a, b: a != b}[operator]
+            candidates = [f for f in candidates
+                          if (f.get(key) is None and unknown_ok == '?')
+                          or (f.get(key) is not None
+                              and compare(f.get(key), int(value)))]
+        if len(candidates) == 0:
+            return None
+        return candidates[0] if choice.startswith('worst') else candidates[-1]
+
+    @staticmethod
+    def select_format(spec: str, formats: List[Dict[str, Any]]
+                      ) -> Optional[Dict[str, Any]]:
+        """
+        Evaluates the subset of youtube_dl's format selectors used by the
+        add-on: alternatives ('/') of single formats (see
+        select_single_format) or of a video and an audio format to merge
+        ('+')
+
+        :param spec: The format option, None for youtube_dl's default
+        :param formats:
+        :return: The selected format, None when no alternative matches
+        """
+        if spec is None:
+            spec = 'bestvideo+bestaudio/best' if YoutubeDL.merger_available else 'best'
+        for alternative in spec.split('/'):
+            selected: List[Optional[Dict[str, Any]]] = [
+                YoutubeDL.select_single_format(part, formats)
+                for part in alternative.split('+')]
+            if None in selected:
+                continue
+            if len(selected) == 1:
+                return selected[0]
+
+            video: Dict[str, Any] = selected[0]
+            return {'format_id': '+'.join(f['format_id'] for f in selected),
+                    'ext': video['ext'], 'height': video['height'],
+                    'width': video['width'],
+                    'filesize': sum(f['filesize'] for f in selected),
+                    'requested_formats': selected}
+        return None
+
+    @staticmethod
+    def make_info(url: str) -> Dict[str, Any]:
+        """
+        :param url:
+        :return: Plausible youtube_dl json for the given url
+        """
+        video_id: str = url.rstrip('/').split('/')[-1].split('=')[-1]
+        if len(video_id) == 0:
+            video_id = hashlib.md5(url.encode('utf-8')).hexdigest()[:11]
+        info: Dict[str, Any] = {'id': video_id,
+                                'title': f'Trailer {video_id}',
+                                'ext': 'mp4',
+                                'url': url,
+                                'webpage_url': url,
+                                'upload_date': '20200101',
+                                'duration': 120,
+                                'thumbnail': f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg',
+                                'description': '',
+                                'average_rating': 4.5,
+                                'n_entries': 1,
+                                'formats': YoutubeDL.get_formats(url)}
+        if '/trailers/' in url:
+            # An iTunes feature page, as reported by youtube_dl's
+            # AppleTrailersIE
+
+            info['fulltitle'] = 'Trailer'
+        return info
+
+    def download(self, url_list: List[str]) -> int:
+        for url in url_list:
+            if state.abort_event.wait(YoutubeDL.info_seconds):
+                raise DownloadError('ERROR: Interrupted by abort')
+
+            YoutubeDL.info_requests += 1
+            entries: List[Dict[str, Any]] = YoutubeDL.playlists.get(url)
+            if entries is not None:
+                self._download_playlist(entries)
+                continue
+
+            YoutubeDL.extract()
+            info: Dict[str, Any] = YoutubeDL.make_info(url)
+            if url in YoutubeDL.unavailable or info['id'] in YoutubeDL.unavailable:
+                raise DownloadError('ERROR: Video unavailable')
+
+            selected: Optional[Dict[str, Any]] = YoutubeDL.select_format(
+                self.params.get('format'), info['formats'])
+            if selected is None:
+                self._error('ERROR: requested format not available')
+            if ('requested_formats' in selected
+                    and not YoutubeDL.merger_available):
+                logger = self.params.get('logger')
+                if logger is not None:
+                    logger.warning('WARNING: You have requested multiple formats '
+                                   'but ffmpeg or avconv are not installed. '
+                                   'The formats won\'t be merged.')
+            info.update({key: selected[key] for key in
+                         ('format_id', 'ext', 'height', 'width', 'filesize')})
+
+            if self.params.get('forcejson'):
+                self._debug(json.dumps(info))
+
+            if (self.params.get('skip_download') or self.params.get('simulate')
+                    or self.params.get('extract_flat')):
+                continue
+
+            with YoutubeDL._active_lock:
+                overloaded: bool = (0 < YoutubeDL.max_concurrent_downloads
+                                    <= YoutubeDL.active_downloads)
+                if overloaded:
+                    YoutubeDL.too_many_requests += 1
+                else:
+                    YoutubeDL.active_downloads += 1
+            if overloaded:
+                self._error('ERROR: unable to download video data: '
+                            'HTTP Error 429: Too Many Requests')
+            try:
+                self._download_video(info)
+            finally:
+                with YoutubeDL._active_lock:
+                    YoutubeDL.active_downloads -= 1
+        return 0
+
+    def _download_video(self, info: Dict[str, Any]) -> None:
+        template: str = self.params.get('outtmpl', '%(title)s.%(ext)s')
+        path: str = template % {'title': info['title'], 'ext': info['ext'],
+                                'id': info['id'], 'format_id': info['format_id']}
+        part_path: str = path + '.part'
+        total: int = info.get('filesize') or YoutubeDL.download_bytes
+        info['_filename'] = path
+        if os.path.exists(path):
+            self._debug(f'[download] {path} has already been downloaded')
+            for hook in self._hooks():
+                hook({'status': 'finished', 'filename': path,
+                      'downloaded_bytes': total, 'total_bytes': total})
+            return
+
+        existing: int = 0
+        if self.params.get('continuedl', True) and os.path.exists(part_path):
+            existing = min(os.path.getsize(part_path), total)
+            self._debug(f'[download] Resuming download at byte {existing}')
+        start: float = time.time()
+        for hook in self._hooks():
+            hook({'status': 'downloading', 'filename': path,
+                  'tmpfilename': part_path, 'downloaded_bytes': existing,
+                  'total_bytes': total,
+                  'elapsed': 0.0, 'eta': YoutubeDL.download_seconds,
+                  'speed': 0.0})
+
+        # Transfer time is proportional to the bytes remaining, download_seconds
+        # being the time for download_bytes
+
+        end: int = total
+        interrupted: bool = 0 < YoutubeDL.interrupt_after_bytes < total - existing
+        if interrupted:
+            end = existing + YoutubeDL.interrupt_after_bytes
+            YoutubeDL.interrupt_after_bytes = 0
+        if state.abort_event.wait(YoutubeDL.download_seconds * (end - existing)
+                                  / max(YoutubeDL.download_bytes, 1)):
+            raise DownloadError('ERROR: Interrupted by abort')
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(part_path, 'ab' if existing > 0 else 'wb') as video_file:
+            video_file.truncate(existing)
+            video_file.write(b'\0' * (end - existing))
+        YoutubeDL.transferred_bytes += end - existing
+        if interrupted:
+            self._error('ERROR: unable to download video data: '
+                        '<urlopen error [Errno 104] Connection reset by peer>')
+
+        os.replace(part_path, path)
+        YoutubeDL.downloads += 1
+        YoutubeDL.resumed_bytes += existing
+
+        for hook in self._hooks():
+            hook({'status': 'finished', 'filename': path,
+                  'downloaded_bytes': total,
+                  'total_bytes': total,
+                  'elapsed': time.time() - start})
+
+    def _download_playlist(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Reports the playlist's entries honoring playliststart, playlistend
+        and playlistrandom. Exceptions raised by the logger (such as
+        MaxDownloadsReached) end the playlist, as in youtube_dl.
+        """
+        start: int = max(self.params.get('playliststart', 1), 1) - 1
+        end: int = self.params.get('playlistend') or len(entries)
+        randomize: bool = self.params.get('playlistrandom', False)
+        page_size: int = YoutubeDL.PLAYLIST_PAGE_SIZE
+        pages: int = 0
+
+        def fetch_pages(needed: int) -> None:
+            nonlocal pages
+            while pages * page_size < needed:
+                if state.abort_event.wait(YoutubeDL.info_seconds):
+                    raise DownloadError('ERROR: Interrupted by abort')
+                pages += 1
+                YoutubeDL.page_requests += 1
+                self._debug(f'[youtube:tab] Downloading page {pages}')
+
+        if randomize:
+            fetch_pages(len(entries))
+            entries = entries[start:end]
+            random.shuffle(entries)
+        else:
+            entries = entries[start:end]
+
+        total: int = len(entries)
+        for index, entry in enumerate(entries):
+            if not randomize:
+                fetch_pages(start + index + 1)
+            self._debug(f'[download] Downloading video {index + 1} of {total}')
+            self._debug(json.dumps(entry))
+
+    def extract_info(self, url: str, download: bool = True,
+                     ie_key: str = None, extra_info: Dict[str, Any] = None,
+                     process: bool = True) -> Dict[str, Any]:
+        entries: List[Dict[str, Any]] = YoutubeDL.playlists.get(url)
+        if entries is not None and not process:
+            if state.abort_event.wait(YoutubeDL.info_seconds):
+                raise DownloadError('ERROR: Interrupted by abort')
+            YoutubeDL.info_requests += 1
+            return {'_type': 'playlist', 'id': url,
+                    'entries': self._page_entries(entries)}
+
+        if not download:
+            self.params['skip_download'] = True
+        self.download([url])
+        if entries is not None:
+            return {'_type': 'playlist', 'entries': entries}
+        return YoutubeDL.make_info(url)
+
+    def _page_entries(self, entries: List[Dict[str, Any]]
+                      ) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the entries of a playlist, fetching a page of them at a time
+        """
+        page_size: int = YoutubeDL.PLAYLIST_PAGE_SIZE
+        for index, entry in enumerate(entries):
+            if index % page_size == 0:
+                if state.abort_event.wait(YoutubeDL.info_seconds):
+                    raise DownloadError('ERROR: Interrupted by abort')
+                YoutubeDL.page_requests += 1
+                self._debug(f'[youtube:tab] Downloading page '
+                            f'{index // page_size + 1}')
+            yield entry
+
+
+def _configure() -> None:
+    """
+    Applies the settings given to a worker process
+    """
+    config: str = os.environ.get('RT_HARNESS_YOUTUBE_DL', '')
+    if len(config) > 0:
+        for name, value in json.loads(config).items():
+            setattr(YoutubeDL, name, value)
+
+
+_configure()
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Headless stand-in for youtube_dl.postprocessor
+"""
+from typing import Any
+
+
+class FFmpegMergerPP:
+    """
+    Merges the video and audio formats of a download with ffmpeg
+    """
+
+    def __init__(self, downloader: Any = None) -> None:
+        self._downloader: Any = downloader
+
+    @property
+    def available(self) -> bool:
+        """
+        :return: True when ffmpeg is installed, see YoutubeDL.merger_available
+        """
+        from youtube_dl import YoutubeDL
+        return YoutubeDL.merger_available
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Headless stand-in for youtube_dl.utils
+"""
+
+
+class YoutubeDLError(Exception):
+    pass
+
+
+class DownloadError(YoutubeDLError):
+    def __init__(self, msg: str, exc_info=None) -> None:
+        super().__init__(msg)
+        self.exc_info = exc_info
+
+
+class MaxDownloadsReached(YoutubeDLError):
+    pass
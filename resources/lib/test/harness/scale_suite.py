@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Runs the benchmarks at several library sizes. Each size gets a fresh Kodi
+home and fresh processes:
+
+    1. --caches generates the synthetic caches in the home and times their
+       load, save and garbage collection
+    2. --pipeline then starts the add-on against those (now warm) caches,
+       giving cold start time to the first playable trailer, next()
+       latency and peak RSS of a process that did nothing else
+    3. --tmdb-memory, once, fills TMDb discovery with the largest size
+
+A separate process per step keeps one step's memory and class state out
+of the next step's measurements.
+
+run_startup likewise times loading the genre and certification
+definitions, with and without their bundle, each in a fresh process.
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+SCALES: Dict[str, int] = {'1k': 1000, '5k': 5000, '50k': 50000, '200k': 200000}
+
+
+def parse_scale(scale: str) -> int:
+    """
+    :param scale: '5k', '200k' or a plain number
+    :return:
+    """
+    scale = scale.strip().lower()
+    if scale in SCALES:
+        return SCALES[scale]
+    if scale.endswith('k'):
+        return int(float(scale[:-1]) * 1000)
+    return int(scale)
+
+
+def run_step(arguments: List[str], timeout: float) -> Dict[str, Any]:
+    """
+    Runs python -m test.harness in a new process
+
+    :param arguments:
+    :param timeout: Seconds before the process is killed
+    :return: The process' report, or a report with 'error' set
+    """
+    lib_dir: str = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as output:
+        output_path: str = output.name
+    command: List[str] = [sys.executable, '-m', 'test.harness', *arguments,
+                          '--output', output_path]
+    try:
+        completed = subprocess.run(command, cwd=lib_dir, timeout=timeout,
+                                   stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.PIPE)
+        if completed.returncode != 0:
+            return {'error': f'exit code {completed.returncode}',
+                    'stderr': completed.stderr.decode('utf-8', 'replace')[-4000:]}
+        with open(output_path, 'rt', encoding='utf-8') as report:
+            return json.load(report)
+    except subprocess.TimeoutExpired:
+        return {'error': f'timed out after {timeout} seconds'}
+    finally:
+        os.remove(output_path)
+
+
+def run_suite(scales: List[str], trailers: int = 50, seed: int = 1,
+              timeout: float = 3600.0, tmdb_memory_movies: int = None,
+              keep_homes: bool = False) -> List[Dict[str, Any]]:
+    """
+    :param scales: Library sizes, as accepted by parse_scale
+    :param trailers: Trailers fetched by each pipeline run
+    :param seed:
+    :param timeout: Per step
+    :param tmdb_memory_movies: Size of the TMDb discovery memory run,
+                               default the largest scale. 0 skips it.
+    :param keep_homes: Don't remove the generated Kodi homes
+    :return: Every step's results, each labelled with its scale
+    """
+    results: List[Dict[str, Any]] = []
+    largest: int = 0
+    for scale in scales:
+        movies: int = parse_scale(scale)
+        largest = max(largest, movies)
+        home: str = tempfile.mkdtemp(prefix=f'rt_suite_{scale}_')
+        try:
+            common: List[str] = ['--movies', str(movies), '--seed', str(seed),
+                                 '--home', home]
+            steps: List[List[str]] = [
+                ['--caches', '--sources', 'library,tmdb', *common],
+                ['--pipeline', '--sources', 'library,tmdb',
+                 '--trailers', str(trailers), '--timeout', str(timeout),
+                 *common]]
+            for step in steps:
+                report: Dict[str, Any] = run_step(step, timeout=timeout + 60.0)
+                step_name: str = step[0].lstrip('-')
+                if 'error' in report:
+                    results.append({'benchmark': f'suite.{step_name}',
+                                    **report})
+                    step_results: List[Dict[str, Any]] = results[-1:]
+                else:
+                    step_results = report['results']
+                    results.extend(step_results)
+                for result in step_results:
+                    result['scale'] = scale
+                    result['movies'] = movies
+        finally:
+            if not keep_homes:
+                shutil.rmtree(home, ignore_errors=True)
+
+    if tmdb_memory_movies is None:
+        tmdb_memory_movies = largest
+    if tmdb_memory_movies > 0:
+        report = run_step(['--tmdb-memory', str(tmdb_memory_movies),
+                           '--seed', str(seed)], timeout=timeout)
+        if 'error' in report:
+            results.append({'benchmark': 'suite.tmdb-memory', **report})
+        else:
+            results.extend(report['results'])
+    return results
+
+
+def run_startup(runs: int = 5, timeout: float = 300.0) -> List[Dict[str, Any]]:
+    """
+    Times loading the genre and certification definitions, in new processes
+    sharing one Kodi home: alternately without their bundle (removed, so
+    built from the XML, as on the first start) and with the bundle the
+    previous process wrote.
+
+    :param runs: Processes of each kind
+    :param timeout: Per process
+    :return: Each process' result, then the median of each kind
+    """
+    results: List[Dict[str, Any]] = []
+    seconds: Dict[str, List[float]] = {'no-bundle': [], 'bundle': []}
+    home: str = tempfile.mkdtemp(prefix='rt_startup_')
+    try:
+        for _ in range(runs):
+            for mode in ('no-bundle', 'bundle'):
+                report: Dict[str, Any] = run_step(
+                    ['--definitions', mode, '--home', home], timeout=timeout)
+                if 'error' in report:
+                    results.append({'benchmark': 'startup.definitions',
+                                    'mode': mode, **report})
+                    continue
+                for result in report['results']:
+                    result['mode'] = mode
+                    results.append(result)
+                    seconds[mode].append(result['seconds'])
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+    summary: Dict[str, Any] = {'benchmark': 'startup.definitions_summary',
+                               'runs': runs}
+    for mode, times in seconds.items():
+        key: str = mode.replace('-', '_')
+        summary[f'{key}_median_seconds'] = (statistics.median(times)
+                                            if times else None)
+    if seconds['no-bundle'] and seconds['bundle']:
+        summary['speedup'] = (summary['no_bundle_median_seconds']
+                              / max(summary['bundle_median_seconds'], 1e-9))
+    results.append(summary)
+    return results
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 10/19/26
+
+@author: Frank Feuerbacher
+
+Deterministic synthetic data for the benchmark harness: a Kodi movie
+library, TMDb discover pages and movie details, the iTunes feed and the
+TFH (youtube playlist) index. The same seed always produces the same
+data, so runs are comparable.
+"""
+import os
+import random
+from typing import Any, Dict, Iterator, List
+
+GENRES: List[str] = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime',
+                     'Documentary', 'Drama', 'Family', 'Fantasy', 'History',
+                     'Horror', 'Music', 'Mystery', 'Romance', 'Science Fiction',
+                     'Thriller', 'War', 'Western']
+
+# TMDb's ids for the genres above, in the same order
+
+TMDB_GENRE_IDS: List[int] = [28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27,
+                             10402, 9648, 10749, 878, 53, 10752, 37]
+
+CERTIFICATIONS: List[str] = ['G', 'PG', 'PG-13', 'R', 'NC-17']
+
+WORDS: List[str] = ['Silent', 'Red', 'Night', 'River', 'Last', 'Iron', 'Glass',
+                    'Summer', 'Hidden', 'Storm', 'Empire', 'Shadow', 'Golden',
+                    'Winter', 'Broken', 'Dream', 'City', 'Ghost', 'Wild', 'Star']
+
+TMDB_ID_BASE: int = 100000
+TFH_PLAYLIST_URL: str = 'https://www.youtube.com/user/trailersfromhell/videos'
+
+
+class SyntheticMovies:
+    """
+    One consistent catalog of movies. The library, TMDb, iTunes and TFH
+    views are all derived from it, so a library movie's TMDb id resolves
+    on the fake TMDb server.
+
+    Movies are derived from (seed, index) on demand rather than stored, so
+    that a 200k catalog does not inflate the memory being measured.
+    """
+
+    def __init__(self, count: int, seed: int = 1,
+                 local_trailer_fraction: float = 0.5) -> None:
+        """
+        :param count: Number of movies in the catalog
+        :param seed:
+        :param local_trailer_fraction: Fraction of library movies which
+                                       have a local trailer file
+        """
+        self.count: int = count
+        self.seed: int = seed
+        self.local_trailer_fraction: float = local_trailer_fraction
+
+    def _make_movie(self, index: int) -> Dict[str, Any]:
+        rng: random.Random = random.Random(self.seed * 1000003 + index)
+        title: str = (f'{rng.choice(WORDS)} {rng.choice(WORDS)} '
+                      f'{index:06d}')
+        genre_indexes: List[int] = rng.sample(range(len(GENRES)), k=rng.randint(1, 3))
+        return {'index': index,
+                'title': title,
+                'year': rng.randint(1930, 2023),
+                'month': rng.randint(1, 12),
+                'day': rng.randint(1, 28),
+                'genre_indexes': genre_indexes,
+                'certification': rng.choice(CERTIFICATIONS),
+                'rating': round(rng.uniform(1.0, 9.5), 1),
+                'votes': rng.randint(0, 50000),
+                'runtime': rng.randint(70, 180) * 60,
+                'language': rng.choice(['en', 'en', 'en', 'fr', 'de', 'ja']),
+                'youtube_key': f'yt{index:09d}',
+                'has_trailer': rng.random() < 0.8}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get_tmdb_id(self, index: int) -> int:
+        return TMDB_ID_BASE + index
+
+    def get_movie(self, index: int) -> Dict[str, Any]:
+        return self._make_movie(index)
+
+    def get_movies(self, start: int = 0,
+                   stop: int = None) -> Iterator[Dict[str, Any]]:
+        """
+        :param start: First index
+        :param stop: Index after the last, default the end of the catalog
+        :return:
+        """
+        if stop is None or stop > self.count:
+            stop = self.count
+        for index in range(start, stop):
+            yield self._make_movie(index)
+
+    def get_by_tmdb_id(self, tmdb_id: int) -> Dict[str, Any]:
+        index: int = tmdb_id - TMDB_ID_BASE
+        if 0 <= index < self.count:
+            return self._make_movie(index)
+        return None
+
+    # Kodi library
+
+    def get_library_movies(self, trailer_dir: str) -> List[Dict[str, Any]]:
+        """
+        :param trailer_dir: Folder where the local trailers live
+        :return: Movies in the form returned by VideoLibrary.GetMovies
+                 with every property requested
+        """
+        library: List[Dict[str, Any]] = []
+        local_limit: int = int(self.count * self.local_trailer_fraction)
+        for movie in self.get_movies():
+            index: int = movie['index']
+            trailer: str = ''
+            if index < local_limit:
+                trailer = os.path.join(trailer_dir, f'trailer_{index:06d}.mkv')
+            elif movie['has_trailer']:
+                trailer = (f'plugin://plugin.video.youtube/play/?video_id='
+                           f'{movie["youtube_key"]}')
+            genres: List[str] = [GENRES[i] for i in movie['genre_indexes']]
+            library.append({
+                'movieid': index + 1,
+                'label': movie['title'],
+                'title': movie['title'],
+                'originaltitle': movie['title'],
+                'year': movie['year'],
+                'lastplayed': '',
+                'playcount': 0,
+                'rating': movie['rating'],
+                'userrating': 0,
+                'votes': str(movie['votes']),
+                'ratings': {'themoviedb': {'default': True,
+                                           'rating': movie['rating'],
+                                           'votes': movie['votes']}},
+                'mpaa': f'Rated {movie["certification"]}',
+                'trailer': trailer,
+                'uniqueid': {'tmdb': str(self.get_tmdb_id(index)),
+                             'imdb': f'tt{index + 1000000:07d}'},
+                'imdbnumber': f'tt{index + 1000000:07d}',
+                'studio': ['Synthetic Pictures'],
+                'cast': [{'name': f'Actor {index % 997}', 'role': 'Lead',
+                          'order': 0, 'thumbnail': ''}],
+                'plot': f'The story of {movie["title"]}.',
+                'writer': [f'Writer {index % 311}'],
+                'director': [f'Director {index % 211}'],
+                'fanart': '',
+                'thumbnail': '',
+                'runtime': movie['runtime'],
+                'file': f'/movies/{index:06d}.mkv',
+                'genre': genres,
+                'tag': ['synthetic']})
+        return library
+
+    def write_local_trailers(self, trailer_dir: str, size: int = 1024) -> int:
+        """
+        Creates the (tiny) local trailer files referenced by the library
+
+        :param trailer_dir:
+        :param size: Bytes per file
+        :return: Number of files written
+        """
+        os.makedirs(trailer_dir, exist_ok=True)
+        local_limit: int = int(self.count * self.local_trailer_fraction)
+        filler: bytes = b'\0' * size
+        for index in range(local_limit):
+            path: str = os.path.join(trailer_dir, f'trailer_{index:06d}.mkv')
+            if not os.path.exists(path):
+                with open(path, 'wb') as trailer_file:
+                    trailer_file.write(filler)
+        return local_limit
+
+    # TMDb
+
+    def get_tmdb_discover_page(self, page: int,
+                               page_size: int = 20) -> Dict[str, Any]:
+        """
+        :param page: 1 based, as TMDb
+        :param page_size:
+        :return: A /3/discover/movie response
+        """
+        total_pages: int = max(1, (self.count + page_size - 1) // page_size)
+        start: int = (page - 1) * page_size
+        results: List[Dict[str, Any]] = []
+        for movie in self.get_movies(start, start + page_size):
+            results.append({
+                'id': self.get_tmdb_id(movie['index']),
+                'title': movie['title'],
+                'original_title': movie['title'],
+                'original_language': movie['language'],
+                'release_date': (f'{movie["year"]:04d}-{movie["month"]:02d}-'
+                                 f'{movie["day"]:02d}'),
+                'genre_ids': [TMDB_GENRE_IDS[i] for i in movie['genre_indexes']],
+                'vote_average': movie['rating'],
+                'vote_count': movie['votes'],
+                'popularity': round(movie['votes'] / 1000.0, 3),
+                'adult': False,
+                'video': False,
+                'overview': f'The story of {movie["title"]}.',
+                'poster_path': f'/poster{movie["index"]}.jpg',
+                'backdrop_path': f'/backdrop{movie["index"]}.jpg'})
+
+        return {'page': page,
+                'total_pages': min(total_pages, 500),  # TMDb's limit
+                'total_results': self.count,
+                'results': results}
+
+    def get_tmdb_details(self, tmdb_id: int) -> Dict[str, Any]:
+        """
+        :param tmdb_id:
+        :return: A /3/movie/<id> response, with credits, releases, keywords,
+                 videos and alternative_titles appended. None if unknown.
+        """
+        movie: Dict[str, Any] = self.get_by_tmdb_id(tmdb_id)
+        if movie is None:
+            return None
+
+        index: int = movie['index']
+        videos: List[Dict[str, Any]] = []
+        if movie['has_trailer']:
+            videos.append({'iso_639_1': 'en', 'iso_3166_1': 'US',
+                           'key': movie['youtube_key'], 'name': 'Trailer',
+                           'site': 'YouTube', 'size': 1080, 'type': 'Trailer',
+                           'official': True})
+
+        return {
+            'id': tmdb_id,
+            'imdb_id': f'tt{index + 1000000:07d}',
+            'title': movie['title'],
+            'original_title': movie['title'],
+            'original_language': movie['language'],
+            'release_date': (f'{movie["year"]:04d}-{movie["month"]:02d}-'
+                             f'{movie["day"]:02d}'),
+            'overview': f'The story of {movie["title"]}.',
+            'runtime': movie['runtime'] // 60,
+            'vote_average': movie['rating'],
+            'vote_count': movie['votes'],
+            'adult': False,
+            'poster_path': f'/poster{index}.jpg',
+            'backdrop_path': f'/backdrop{index}.jpg',
+            'genres': [{'id': TMDB_GENRE_IDS[i], 'name': GENRES[i]}
+                       for i in movie['genre_indexes']],
+            'production_companies': [{'id': 1, 'name': 'Synthetic Pictures'}],
+            'spoken_languages': [{'iso_639_1': movie['language']}],
+            'credits': {
+                'cast': [{'name': f'Actor {(index + n) % 997}', 'order': n,
+                          'character': f'Role {n}'} for n in range(6)],
+                'crew': [{'name': f'Director {index % 211}', 'job': 'Director',
+                          'department': 'Directing'},
+                         {'name': f'Writer {index % 311}', 'job': 'Screenplay',
+                          'department': 'Writing'}]},
+            'releases': {'countries': [{'iso_3166_1': 'US',
+                                        'certification': movie['certification'],
+                                        'release_date': f'{movie["year"]:04d}-01-01'}]},
+            'keywords': {'keywords': [{'id': 1000 + (index % 50),
+                                       'name': f'keyword{index % 50}'}]},
+            'videos': {'results': videos},
+            'alternative_titles': {'titles': []}}
+
+    # iTunes
+
+    def get_itunes_feed(self, limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        :param limit: iTunes only lists recent movies
+        :return: The studios.json feed
+        """
+        feed: List[Dict[str, Any]] = []
+        for movie in self.get_movies(0, limit):
+            slug: str = movie['title'].lower().replace(' ', '-')
+            feed.append({
+                'title': movie['title'],
+                'releasedate': f'Mon, 01 Jan {movie["year"]:04d} 00:00:00 -0700',
+                'studio': 'Synthetic Pictures',
+                'poster': f'http://trailers.apple.com/trailers/synthetic/{slug}/images/poster.jpg',
+                'location': f'/trailers/synthetic/{slug}/',
+                'rating': movie['certification'],
+                'genre': [GENRES[i] for i in movie['genre_indexes']],
+                'directors': f'Director {movie["index"] % 211}',
+                'actors': [f'Actor {movie["index"] % 997}'],
+                'trailers': [{'postdate': 'Mon, 01 Jan 2021 00:00:00 -0700',
+                              'url': f'/trailers/synthetic/{slug}/',
+                              'type': 'Trailer', 'exclusive': False,
+                              'hd': True}]})
+        return feed
+
+    # Trailers From Hell
+
+    def get_tfh_playlist(self, limit: int = 2000) -> List[Dict[str, Any]]:
+        """
+        :param limit:
+        :return: The flat playlist entries youtube_dl reports for TFH
+        """
+        entries: List[Dict[str, Any]] = []
+        for movie in self.get_movies(0, limit):
+            entries.append({'_type': 'url',
+                            'ie_key': 'Youtube',
+                            'id': f'tfh{movie["index"]:08d}',
+                            'url': f'tfh{movie["index"]:08d}',
+                            'title': f'Reviewer on {movie["title"].upper()}',
+                            'upload_date': '20200101',
+                            'n_entries': min(limit, self.count)})
+        return entries